@@ -15,6 +15,11 @@ except Exception:  # pragma: no cover - fallback for tests
             **kwargs,
         )
 from utils.analytics import Analytics
+from utils.quota import quota
+from utils.fast_answers import format_fast_answer_report
+from utils.response_cache import response_cache
+from utils.embedding_cache import format_embedding_cache_report
+from utils.rate_limit import rate_limiter
 from database import save_bot_message, get_value, set_value, get_cursor
 from handlers.reminder_handler import (
     send_daily_reminder,
@@ -132,10 +137,27 @@ async def analytics_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
     analytics = Analytics()
     report = await analytics.generate_analytics_report(days)
+    report += f"\n\n{format_fast_answer_report()}\n\n{response_cache.format_report()}"
+    report += f"\n\n{format_embedding_cache_report()}\n\n{rate_limiter.format_report()}"
     await update.message.reply_text(report, parse_mode="Markdown")
     logger.info(f"✅ Аналітика за {days} днів надіслана користувачу {user_id}")
 
 
+async def quota_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Показує витрати квоти Google API за сьогодні по функціях."""
+    user_id = update.effective_user.id
+    if not await is_admin(user_id):
+        await update.message.reply_text(
+            "❌ *Ця команда доступна тільки адміністратору.*", parse_mode="Markdown"
+        )
+        logger.warning(
+            f"⚠️ Спроба несанкціонованого доступу до quota від користувача {user_id}"
+        )
+        return
+    await update.message.reply_text(quota.format_report())
+    logger.info(f"✅ Звіт про квоту надіслано користувачу {user_id}")
+
+
 async def users_list_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logger.info(f"🔍 Виклик команди списку користувачів")
     user_id = update.effective_user.id
@@ -468,6 +490,7 @@ __all__ = [
     "show_admin_cleanup_menu",
     "show_admin_force_menu",
     "analytics_command",
+    "quota_command",
     "users_list_command",
     "group_chats_list_command",
     "delete_messages",
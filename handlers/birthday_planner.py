@@ -0,0 +1,403 @@
+"""
+Планувальник привітань з днем народження.
+
+Раз на добу (і при старті) планувальник визначає іменинників дня з
+індексу днів народження календаря та ставить рівно два run_once
+завдання: ранкове (09:00) і вечірнє (20:00) привітання. План дня
+зберігається в таблиці birthday_plan, тож після перезапуску календар
+повторно не запитується, а вже надіслані слоти не дублюються.
+
+Тексти й зображення готуються напередодні о 21:00 і зберігаються в
+birthday_greeting_cache: у момент розсилки лишається тільки надсилання,
+а за відсутності кешу – детермінований шаблон.
+"""
+import json
+from datetime import datetime, time, timedelta
+
+from telegram.ext import ContextTypes, JobQueue
+
+from database import get_cursor
+from handlers.reminder_handler import (
+    _event_start,
+    berlin_tz,
+    birthday_greeting_sent,
+    deliver_birthday_greetings,
+    find_birthday_celebrants,
+    generate_validated_greeting,
+    render_birthday_image,
+)
+from utils.calendar_utils import get_upcoming_birthdays_cached
+from utils.logger import logger
+from utils.quota import PRIORITY_USER, quota_job
+
+# Слот: (час надсилання, крайній час, до якого пропущене привітання ще доречне)
+BIRTHDAY_SLOTS = {
+    "morning": (time(9, 0), time(12, 0)),
+    "evening": (time(20, 0), time(23, 59, 59)),
+}
+PLAN_REFRESH_TIME = time(0, 5)
+# Якщо календар не відповів, план дня не зберігається, а запит повторюється
+PLAN_RETRY_SECONDS = 600
+PLAN_RETRY_JOB = "birthday_plan_retry"
+PREGEN_TIME = time(21, 0)
+JOB_PREFIX = "birthday_greeting:"
+
+STATUS_SCHEDULED = "scheduled"
+STATUS_SENT = "sent"
+STATUS_MISSED = "missed"
+STATUS_EMPTY = "empty"
+
+# Дзеркало плану в пам'яті: (дата, слот) -> {"status", "celebrants", "fire_at"}
+_plan: dict[tuple[str, str], dict] = {}
+
+
+def create_birthday_plan_table():
+    with get_cursor() as cursor:
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS birthday_plan (
+                plan_date TEXT NOT NULL,
+                slot TEXT NOT NULL,
+                fire_at TEXT NOT NULL,
+                celebrants TEXT NOT NULL,
+                status TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (plan_date, slot)
+            )
+            """
+        )
+    logger.info("✅ Таблиця birthday_plan створена або вже існує.")
+
+
+def create_birthday_greeting_cache_table():
+    with get_cursor() as cursor:
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS birthday_greeting_cache (
+                greeting_date TEXT NOT NULL,
+                greeting_type TEXT NOT NULL,
+                event_id TEXT NOT NULL,
+                name TEXT NOT NULL,
+                greeting_text TEXT NOT NULL,
+                image BLOB,
+                created_at TEXT NOT NULL,
+                PRIMARY KEY (greeting_date, greeting_type, event_id)
+            )
+            """
+        )
+    logger.info("✅ Таблиця birthday_greeting_cache створена або вже існує.")
+
+
+def _at(day, slot_time: time) -> datetime:
+    naive = datetime.combine(day, slot_time)
+    if hasattr(berlin_tz, "localize"):
+        return berlin_tz.localize(naive)
+    return naive.replace(tzinfo=berlin_tz)
+
+
+def _load_day(day) -> dict[str, dict]:
+    """Return the plan for ``day`` from memory, reading the table once."""
+    plan_date = day.isoformat()
+    entries = {slot: _plan[(plan_date, slot)] for slot in BIRTHDAY_SLOTS if (plan_date, slot) in _plan}
+    if len(entries) == len(BIRTHDAY_SLOTS):
+        return entries
+    with get_cursor() as cursor:
+        rows = cursor.execute(
+            "SELECT slot, fire_at, celebrants, status FROM birthday_plan WHERE plan_date = ?",
+            (plan_date,),
+        ).fetchall()
+    for slot, fire_at, celebrants, status in rows:
+        _plan[(plan_date, slot)] = {
+            "fire_at": datetime.fromisoformat(fire_at),
+            "celebrants": json.loads(celebrants),
+            "status": status,
+        }
+        entries[slot] = _plan[(plan_date, slot)]
+    return entries
+
+
+def _save(day, slot: str, entry: dict):
+    _plan[(day.isoformat(), slot)] = entry
+    with get_cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO birthday_plan (plan_date, slot, fire_at, celebrants, status, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(plan_date, slot) DO UPDATE SET
+                fire_at = excluded.fire_at,
+                celebrants = excluded.celebrants,
+                status = excluded.status,
+                updated_at = excluded.updated_at
+            """,
+            (
+                day.isoformat(),
+                slot,
+                entry["fire_at"].isoformat(),
+                json.dumps(entry["celebrants"], ensure_ascii=False),
+                entry["status"],
+                datetime.now(berlin_tz).isoformat(),
+            ),
+        )
+
+
+def _set_status(day, slot: str, status: str):
+    entry = _plan.get((day.isoformat(), slot))
+    if entry is not None:
+        _save(day, slot, {**entry, "status": status})
+
+
+def _job_name(day, slot: str) -> str:
+    return f"{JOB_PREFIX}{day.isoformat()}:{slot}"
+
+
+def _ensure_job(job_queue: JobQueue, day, slot: str, fire_at: datetime, now: datetime) -> bool:
+    name = _job_name(day, slot)
+    if job_queue.get_jobs_by_name(name):
+        return False
+    job_queue.run_once(
+        deliver_birthday_slot,
+        when=max((fire_at - now).total_seconds(), 1),
+        name=name,
+        data={"date": day.isoformat(), "slot": slot},
+        job_kwargs={"misfire_grace_time": 3600},
+    )
+    return True
+
+
+def todays_celebrants(events: list, day) -> list[dict]:
+    """Filter the birthday index down to celebrants of ``day``."""
+    today_events = []
+    for event in events or []:
+        start = _event_start(event)
+        if start is not None and start.date() == day:
+            today_events.append(event)
+    return find_birthday_celebrants(today_events)
+
+
+def plan_birthdays(job_queue: JobQueue, celebrants: list[dict], now: datetime | None = None) -> dict:
+    """
+    Persist today's plan for every slot and schedule the deliveries that are
+    still due. Returns ``{slot: status}``.
+    """
+    now = now or datetime.now(berlin_tz)
+    day = now.date()
+    result = {}
+    for slot, (slot_time, deadline) in BIRTHDAY_SLOTS.items():
+        current = _load_day(day).get(slot)
+        if current and current["status"] in (STATUS_SENT, STATUS_MISSED):
+            result[slot] = current["status"]
+            continue
+        fire_at = _at(day, slot_time)
+        if not celebrants:
+            status = STATUS_EMPTY
+        elif birthday_greeting_sent(day, slot):
+            status = STATUS_SENT
+        elif now > _at(day, deadline):
+            status = STATUS_MISSED
+        else:
+            status = STATUS_SCHEDULED
+        if not current or current["status"] != status or current["celebrants"] != celebrants:
+            _save(day, slot, {"fire_at": fire_at, "celebrants": celebrants, "status": status})
+        if status == STATUS_SCHEDULED:
+            _ensure_job(job_queue, day, slot, fire_at, now)
+        result[slot] = status
+    return result
+
+
+def load_prepared_greetings(day, slot: str) -> dict[str, dict]:
+    """Pre-generated ``{"text", "image"}`` per event id for one slot."""
+    with get_cursor() as cursor:
+        rows = cursor.execute(
+            """
+            SELECT event_id, greeting_text, image FROM birthday_greeting_cache
+            WHERE greeting_date = ? AND greeting_type = ?
+            """,
+            (day.isoformat(), slot),
+        ).fetchall()
+    return {row[0]: {"text": row[1], "image": row[2]} for row in rows}
+
+
+async def prepare_birthday_greetings(day, celebrants: list[dict], slots=None) -> int:
+    """
+    Generate, validate and render greetings for ``celebrants`` ahead of time.
+    Entries already in the cache are kept. Returns the number of new entries.
+    """
+    prepared = 0
+    for slot in slots or BIRTHDAY_SLOTS:
+        existing = load_prepared_greetings(day, slot)
+        for celebrant in celebrants:
+            event_id = celebrant["event_id"]
+            if event_id in existing:
+                continue
+            text = await generate_validated_greeting(
+                celebrant["name"], slot, source=f"'{celebrant['summary']}' (id={event_id})"
+            )
+            image = await render_birthday_image(
+                celebrant["name"], f"{event_id}_{day.isoformat()}_{slot}", slot
+            )
+            with get_cursor() as cursor:
+                cursor.execute(
+                    """
+                    INSERT OR REPLACE INTO birthday_greeting_cache
+                        (greeting_date, greeting_type, event_id, name, greeting_text, image, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        day.isoformat(),
+                        slot,
+                        event_id,
+                        celebrant["name"],
+                        text,
+                        image,
+                        datetime.now(berlin_tz).isoformat(),
+                    ),
+                )
+            prepared += 1
+    return prepared
+
+
+def _missing_slots(day, entries: dict[str, dict]) -> list[str]:
+    missing = []
+    for slot, entry in entries.items():
+        if entry["status"] != STATUS_SCHEDULED:
+            continue
+        cached = load_prepared_greetings(day, slot)
+        if any(c["event_id"] not in cached for c in entry["celebrants"]):
+            missing.append(slot)
+    return missing
+
+
+@quota_job("birthday_pregen")
+async def pregenerate_birthday_greetings(context: ContextTypes.DEFAULT_TYPE):
+    """
+    Evening job: prepare tomorrow's greetings. With ``job.data`` –
+    ``{"date", "slots"}`` – fills the gaps of today's plan after a restart.
+    """
+    data = getattr(getattr(context, "job", None), "data", None) or {}
+    try:
+        if data.get("date"):
+            day = datetime.fromisoformat(data["date"]).date()
+            entries = _load_day(day)
+            slots = [slot for slot in data.get("slots") or BIRTHDAY_SLOTS if slot in entries]
+            celebrants = entries[slots[0]]["celebrants"] if slots else []
+        else:
+            day = datetime.now(berlin_tz).date() + timedelta(days=1)
+            slots = None
+            celebrants = todays_celebrants(get_upcoming_birthdays_cached(strict=True), day)
+        if not celebrants:
+            logger.debug(f"🎂 На {day} іменинників немає – підготовка не потрібна")
+            return
+        prepared = await prepare_birthday_greetings(day, celebrants, slots)
+        logger.info(f"🎂 Підготовлено {prepared} привітань на {day}")
+    except Exception as e:
+        logger.error(f"❌ Помилка попередньої генерації привітань: {e}")
+
+
+@quota_job("birthday_planner", PRIORITY_USER)
+async def refresh_birthday_plan(context: ContextTypes.DEFAULT_TYPE):
+    """Plan today's greetings: once per day, reusing the persisted plan after a restart."""
+    now = datetime.now(berlin_tz)
+    day = now.date()
+    try:
+        entries = _load_day(day)
+        if len(entries) == len(BIRTHDAY_SLOTS):
+            celebrants = next(iter(entries.values()))["celebrants"]
+        else:
+            try:
+                events = get_upcoming_birthdays_cached(strict=True)
+            except Exception as e:
+                # Порожній список тут означав би «іменинників немає» на весь день
+                logger.warning(
+                    f"⚠️ Не вдалося отримати дні народження ({e}), повтор через {PLAN_RETRY_SECONDS} с"
+                )
+                if not context.job_queue.get_jobs_by_name(PLAN_RETRY_JOB):
+                    context.job_queue.run_once(
+                        refresh_birthday_plan, when=PLAN_RETRY_SECONDS, name=PLAN_RETRY_JOB
+                    )
+                return
+            celebrants = todays_celebrants(events, day)
+        result = plan_birthdays(context.job_queue, celebrants, now)
+        missing = _missing_slots(day, _load_day(day))
+        if missing:
+            # Бот стартував після вечірньої підготовки – готуємо у фоні до розсилки
+            context.job_queue.run_once(
+                pregenerate_birthday_greetings,
+                when=5,
+                data={"date": day.isoformat(), "slots": missing},
+            )
+        names = ", ".join(c["name"] for c in celebrants) or "немає"
+        logger.info(f"🎂 План привітань на {day}: іменинники – {names}; слоти {result}")
+    except Exception as e:
+        logger.error(f"❌ Помилка планування привітань з днем народження: {e}")
+
+
+async def deliver_birthday_slot(context: ContextTypes.DEFAULT_TYPE):
+    """run_once callback: send the planned greetings for one slot."""
+    data = context.job.data or {}
+    day = datetime.fromisoformat(data["date"]).date()
+    slot = data["slot"]
+    entry = _plan.get((data["date"], slot)) or _load_day(day).get(slot)
+    if not entry or entry["status"] != STATUS_SCHEDULED:
+        logger.debug(f"⏭️ Слот привітань {data['date']} {slot} більше не актуальний")
+        return
+    if birthday_greeting_sent(day, slot):
+        _set_status(day, slot, STATUS_SENT)
+        return
+    try:
+        await deliver_birthday_greetings(
+            context,
+            entry["celebrants"],
+            slot,
+            day,
+            prepared=load_prepared_greetings(day, slot),
+            generate=False,
+        )
+    except Exception as e:
+        logger.error(f"❌ Помилка надсилання привітань ({slot}): {e}")
+        return
+    _set_status(day, slot, STATUS_SENT)
+
+
+async def cleanup_birthday_plan(context: ContextTypes.DEFAULT_TYPE):
+    today = datetime.now(berlin_tz).date().isoformat()
+    with get_cursor() as cursor:
+        cursor.execute("DELETE FROM birthday_plan WHERE plan_date < date(?, '-30 days')", (today,))
+        cursor.execute("DELETE FROM birthday_greeting_cache WHERE greeting_date < ?", (today,))
+    for key in [key for key in _plan if key[0] < today]:
+        del _plan[key]
+
+
+def schedule_birthday_planner(job_queue: JobQueue, first: int = 10):
+    create_birthday_plan_table()
+    create_birthday_greeting_cache_table()
+    job_queue.run_once(refresh_birthday_plan, when=first)
+    job_queue.run_daily(
+        refresh_birthday_plan,
+        time=PLAN_REFRESH_TIME.replace(tzinfo=berlin_tz),
+        days=(0, 1, 2, 3, 4, 5, 6),
+    )
+    job_queue.run_daily(
+        pregenerate_birthday_greetings,
+        time=PREGEN_TIME.replace(tzinfo=berlin_tz),
+        days=(0, 1, 2, 3, 4, 5, 6),
+    )
+    job_queue.run_daily(
+        cleanup_birthday_plan,
+        time=time(hour=0, minute=0, tzinfo=berlin_tz),
+        days=(0, 1, 2, 3, 4, 5, 6),
+    )
+    logger.info("✅ Планувальник привітань з днем народження налаштовано (09:00 і 20:00).")
+
+
+__all__ = [
+    "create_birthday_plan_table",
+    "create_birthday_greeting_cache_table",
+    "todays_celebrants",
+    "plan_birthdays",
+    "refresh_birthday_plan",
+    "deliver_birthday_slot",
+    "load_prepared_greetings",
+    "prepare_birthday_greetings",
+    "pregenerate_birthday_greetings",
+    "schedule_birthday_planner",
+]
@@ -1,29 +1,42 @@
 import os
 import asyncio  # Додаємо імпорт для асинхронної затримки
-import io
-import json
 from telegram import Update
 from telegram.ext import ContextTypes
 from utils.logger import logger
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaIoBaseDownload  # Імпорт для завантаження файлів
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from google.oauth2 import service_account
 from telegram import InputFile
 import tempfile  # Для кросплатформної роботи з тимчасовими файлами
-from database import get_value, set_value, save_bot_message
-from config import GOOGLE_CREDENTIALS
-
-# Налаштування Google Drive API
-SCOPES = ["https://www.googleapis.com/auth/drive.readonly"]
-NOTY_FOLDER_ID = os.getenv(
-    "NOTY_FOLDER_ID", "1mLWk6qMDYJ9OtHJPjFA5gI_kTtoUsiIK"
-)  # Використовуємо значення з .env.new або дефолт
+try:
+    from utils.quota import QuotaExceeded, charge_quota
+except Exception:  # pragma: no cover - fallback for tests/minimal environments
+    class QuotaExceeded(Exception):
+        pass
+
+    def charge_quota(*args, **kwargs):
+        return 0
+try:
+    from utils.media_registry import drive_key, send_media
+except Exception:  # pragma: no cover - fallback for tests/minimal environments
+    def drive_key(drive_id, revision):
+        return f"drive:{drive_id}:{revision or ''}"
+
+    async def send_media(send, key, media_type, load):
+        return await send(load())
+try:
+    from utils.sheet_cache import SHEET_CACHE_MAX_BYTES, cached_sheet, sheet_cache, store_sheet
+except Exception:  # pragma: no cover - fallback for tests/minimal environments
+    SHEET_CACHE_MAX_BYTES = 0
+
+from handlers.sheet_catalog import drive_service, load_catalog, sync_sheet_catalog
+from utils.sheet_index import sheet_index
+
+# Ноти завантажуються у тимчасовий файл: до цього розміру – в пам'яті, далі – на диску
+SHEET_SPOOL_MAX_BYTES = int(os.getenv("SHEET_SPOOL_MAX_MB", "4")) * 1024 * 1024
+SHEET_DOWNLOAD_CHUNK_BYTES = 1024 * 1024
+# Скільки файлів нот може завантажуватися з Drive одночасно
+SHEET_DOWNLOAD_CONCURRENCY = max(1, int(os.getenv("SHEET_DOWNLOAD_CONCURRENCY", "3")))
+_download_semaphore = asyncio.Semaphore(SHEET_DOWNLOAD_CONCURRENCY)
 
 
 async def list_sheets(
@@ -31,67 +44,105 @@ async def list_sheets(
     context: ContextTypes.DEFAULT_TYPE | None = None,
     use_cache: bool = True,
 ):
-    """Отримує список нот із Google Drive, використовуючи кеш за можливістю."""
+    """
+    Повертає каталог нот, згрупований за категоріями, з таблиці sheets.
+    До Drive звертаємося лише коли каталог порожній або use_cache=False
+    (тоді – інкрементальна синхронізація через Changes API).
+    """
     try:
-        if use_cache:
-            cached = get_value("sheet_music_cache")
-            if cached:
-                logger.info("Список нот взято з кешу бази даних")
-                return json.loads(cached)
-
-        credentials = service_account.Credentials.from_service_account_file(
-            GOOGLE_CREDENTIALS, scopes=SCOPES
-        )
-        service = build("drive", "v3", credentials=credentials)
-
-        # Отримуємо файли з папки, де зберігаються ноти (за id або шляхом)
-        query = f"mimeType='application/pdf' and '{NOTY_FOLDER_ID}' in parents"
-        logger.debug(f"Виконуємо запит до Google Drive з query: {query}")
-        results = (
-            service.files().list(q=query, fields="files(id, name, parents)").execute()
-        )
-        items = results.get("files", [])
-
-        logger.debug(
-            f"Отримано {len(items)} файлів з Google Drive для папки '{NOTY_FOLDER_ID}'"
-        )
-
-        if not items:
+        categorized_sheets = load_catalog() if use_cache else {}
+        if categorized_sheets:
+            if not sheet_index.loaded:
+                sheet_index.rebuild_from_catalog(categorized_sheets)
+            return categorized_sheets
+
+        await asyncio.to_thread(sync_sheet_catalog)
+        categorized_sheets = load_catalog()
+        if not categorized_sheets:
             logger.warning("Не знайдено нот у вказаній папці Google Drive.")
             if update:
                 await update.message.reply_text(
                     "❌ *Помилка з нотами 😕* Спробуй пізніше! ⬇️"
                 )
-            return {}
-
-        # Групуємо файли за категоріями (наприклад, за першим словом у назві)
-        categorized_sheets = {}
-        for item in items:
-            name_parts = item["name"].split()
-            if name_parts:
-                category = name_parts[0].lower()
-                if category not in categorized_sheets:
-                    categorized_sheets[category] = []
-                categorized_sheets[category].append(
-                    {"id": item["id"], "name": item["name"]}
-                )
-
-        # Кешуємо список нот у базі даних
-        set_value("sheet_music_cache", json.dumps(categorized_sheets))
-        logger.info("Список нот успішно закешовано")
-
         return categorized_sheets
 
+    except QuotaExceeded:
+        # Квоту вичерпано – віддаємо збережений каталог навіть при use_cache=False
+        return load_catalog()
     except HttpError as error:
         logger.error(f"Помилка при отриманні списку нот з Google Drive: {error}")
         if update:
             await update.message.reply_text(
                 "❌ *Помилка з нотами 😕* Спробуй пізніше! ⬇️"
             )
-        return {}
+        return load_catalog()
+
+
+def _fetch_media(service, file_id: str, fd):
+    """Синхронне завантаження PDF з Drive частинами у файловий об'єкт ``fd``."""
+    charge_quota("drive", "files.get_media", feature="notes")
+    request = service.files().get_media(fileId=file_id)
+    downloader = MediaIoBaseDownload(fd, request, chunksize=SHEET_DOWNLOAD_CHUNK_BYTES)
+    done = False
+    while not done:
+        status, done = downloader.next_chunk()
+
+
+def _download_to_spool(service, file_id: str) -> tempfile.SpooledTemporaryFile:
+    spool = tempfile.SpooledTemporaryFile(max_size=SHEET_SPOOL_MAX_BYTES)
+    try:
+        _fetch_media(service, file_id, spool)
+        # Скидуємо курсор файлу на початок
+        spool.seek(0)
+        return spool
+    except BaseException:
+        spool.close()
+        raise
+
 
+def _download_to_cache(service, file_id: str, revision: str | None, file_name: str) -> str:
+    # Файл пишеться поруч із кешем і потрапляє в нього лише повністю завантаженим
+    tmp = sheet_cache.temp_path()
+    try:
+        with open(tmp, "wb") as fd:
+            _fetch_media(service, file_id, fd)
+        return store_sheet(file_id, revision, file_name, tmp)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
 
 
+async def download_sheet(service, file_id: str) -> tempfile.SpooledTemporaryFile:
+    """
+    Завантажує файл нот у робочому потоці, не блокуючи цикл подій.
+    Кількість одночасних завантажень обмежена SHEET_DOWNLOAD_CONCURRENCY.
+    """
+    async with _download_semaphore:
+        return await asyncio.to_thread(_download_to_spool, service, file_id)
+
+
+async def open_sheet(service, file_id: str, revision: str | None, file_name: str):
+    """
+    Відкритий для читання PDF: з дискового кешу, якщо там є ця ревізія,
+    інакше – після завантаження з Drive (у кеш або, якщо кеш вимкнено,
+    у SpooledTemporaryFile).
+    """
+    if SHEET_CACHE_MAX_BYTES <= 0:
+        return await download_sheet(service, file_id)
+    path = cached_sheet(file_id, revision)
+    if path is not None:
+        try:
+            logger.info(f"📄 Ноти '{file_name}' взято з дискового кешу")
+            return open(path, "rb")
+        except FileNotFoundError:
+            pass  # витіснено між перевіркою і відкриттям
+    async with _download_semaphore:
+        path = await asyncio.to_thread(
+            _download_to_cache, service, file_id, revision, file_name
+        )
+    return open(path, "rb")
+
 
 async def send_sheet(update: Update, context: ContextTypes.DEFAULT_TYPE, file_id: str):
     """
@@ -106,33 +157,55 @@ async def send_sheet(update: Update, context: ContextTypes.DEFAULT_TYPE, file_id
             return
 
         # Автентифікація в Google Drive
-        credentials = service_account.Credentials.from_service_account_file(
-            GOOGLE_CREDENTIALS, scopes=SCOPES
+        service = drive_service()
+
+        # Один запит метаданих: ревізія визначає, чи актуальні file_id і копія в кеші
+        charge_quota("drive", "files.get", feature="notes")
+        file_metadata = await asyncio.to_thread(
+            service.files().get(
+                fileId=file_id, fields="name, headRevisionId, md5Checksum, modifiedTime"
+            ).execute
         )
-        service = build("drive", "v3", credentials=credentials)
-
-        # Отримуємо метадані файлу
-        file_metadata = service.files().get(fileId=file_id, fields="name").execute()
         file_name = file_metadata.get("name", "Невідома нота")
+        revision = (
+            file_metadata.get("md5Checksum")
+            or file_metadata.get("modifiedTime")
+            or file_metadata.get("headRevisionId")
+        )
 
-        # Завантажуємо файл
-        request = service.files().get_media(fileId=file_id)
-        file_content = io.BytesIO()
-        downloader = MediaIoBaseDownload(file_content, request)
-        done = False
-        while not done:
-            status, done = downloader.next_chunk()
+        handles = []
+
+        async def download():
+            # Файл потрібен лише тоді, коли Telegram його ще не має
+            handle = await open_sheet(service, file_id, revision, file_name)
+            handles.append(handle)
+            if isinstance(handle, tempfile.SpooledTemporaryFile):
+                size = handle.seek(0, os.SEEK_END)
+                handle.seek(0)
+                if size <= SHEET_SPOOL_MAX_BYTES:
+                    # Файл ще в пам'яті: fileno() переніс би його на диск, тож віддаємо байти
+                    return InputFile(handle.read(), filename=file_name)
+            # Дескриптор передається мережевому шару без читання в пам'ять
+            return InputFile(handle, filename=file_name, read_file_handle=False)
+
+        async def send(document):
+            return await context.bot.send_document(
+                chat_id=update.effective_chat.id,
+                document=document,
+                caption=f"🎼 Ось ноти: {file_name} #Оберіг 🌟",
+            )
 
-        # Скидуємо курсор файлу на початок
-        file_content.seek(0)
+        # Надсилаємо файл (повторно – за збереженим file_id, без завантаження)
+        try:
+            await send_media(send, drive_key(file_id, revision), "document", download)
+        finally:
+            for handle in handles:
+                handle.close()
 
-        # Надсилаємо файл
-        await context.bot.send_document(
-            chat_id=update.effective_chat.id,
-            document=InputFile(file_content, filename=file_name),
-            caption=f"🎼 Ось ноти: {file_name} #Оберіг 🌟",
+    except QuotaExceeded:
+        await update.message.reply_text(
+            "⏳ Ліміт запитів до Google Drive на сьогодні вичерпано. Спробуйте пізніше. #Оберіг"
         )
-
     except HttpError as error:
         logger.error(f"Помилка при отриманні файлу з Google Drive: {error}")
         await update.message.reply_text(
@@ -145,4 +218,4 @@ async def send_sheet(update: Update, context: ContextTypes.DEFAULT_TYPE, file_id
         )
 
 
-__all__ = ["list_sheets", "send_sheet"]
+__all__ = ["list_sheets", "download_sheet", "open_sheet", "send_sheet"]
@@ -1,9 +1,7 @@
 from telegram import Update
 from telegram.ext import ContextTypes
 
-import asyncio
 import re
-import openai
 from database import (
     cleanup_group_knowledge,
     save_group_message_embedding,
@@ -12,7 +10,7 @@ from database import (
 )
 from handlers.user_utils import auto_add_user
 from utils.logger import logger
-from utils import init_openai_api
+from utils import call_openai_embedding, init_openai_api
 from utils.privacy import mask_user_id
 
 init_openai_api()
@@ -82,12 +80,7 @@ async def _build_embedding(text: str) -> list[float] | None:
     if len(clean) < 8:
         return None
     try:
-        response = await asyncio.to_thread(
-            openai.embeddings.create,
-            model="text-embedding-3-small",
-            input=clean[:3000],
-        )
-        return response.data[0].embedding if response and response.data else None
+        return await call_openai_embedding(clean[:3000]) or None
     except Exception as e:
         logger.debug(f"Embedding недоступний для повідомлення: {e}")
         return None
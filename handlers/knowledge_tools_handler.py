@@ -2,6 +2,7 @@ import json
 import os
 import re
 from collections import Counter
+from datetime import datetime
 from telegram import Update
 from telegram.ext import ContextTypes
 
@@ -14,6 +15,7 @@ from database import (
     set_value,
 )
 from utils import call_openai_chat
+from utils.outbox import broadcast
 from utils.logger import logger
 
 
@@ -390,11 +392,11 @@ async def weekly_digest_job(context: ContextTypes.DEFAULT_TYPE):
     messages = get_recent_group_messages(chat_id, days=7, limit=300)
     facts = get_group_facts(chat_id, fact_type=None, days=7, limit=180)
     digest_text = await _llm_summary("Щотижневий дайджест", messages, facts, "Сформуй щотижневий дайджест")
-    for user_id in users:
-        try:
-            enabled = get_value(f"digest_auto_{user_id}")
-            if enabled != "1":
-                continue
-            await context.bot.send_message(chat_id=int(user_id), text=digest_text)
-        except Exception as e:
-            logger.debug(f"Не вдалося надіслати weekly digest користувачу {user_id}: {e}")
+    subscribers = [user_id for user_id in users if get_value(f"digest_auto_{user_id}") == "1"]
+    week = datetime.now().strftime("%G-W%V")
+    await broadcast(
+        context.bot,
+        f"weekly_digest:{week}",
+        subscribers,
+        [{"text": digest_text, "kind": "text"}],
+    )
@@ -2,8 +2,13 @@ from telegram import Update, ReplyKeyboardMarkup, KeyboardButton
 from telegram.ext import ContextTypes
 from utils.logger import logger
 from handlers.drive_utils import list_sheets
-from database import get_value, save_bot_message
-import json
+from handlers.sheet_catalog import catalog_version
+from utils.search_cursors import search_cursors
+from utils.sheet_index import sheet_index
+from database import save_bot_message
+
+
+SEARCH_PAGE_SIZE = 5
 
 
 async def search_notes(
@@ -17,8 +22,29 @@ async def search_notes(
     if update.effective_chat.type != "private":
         return []
 
+    offset = 0
+    if next_page:
+        # Курсор зберігає лише запит і зсув; сторінка обчислюється з індексу
+        cursor = search_cursors.get(chat_id)
+        if cursor is None:
+            message = await update.message.reply_text(
+                "⌛ *Результати пошуку вже недоступні.* Введи слово ще раз ⬇️",
+                parse_mode="Markdown",
+            )
+            save_bot_message(chat_id, message.message_id, "general")
+            return []
+        keyword, offset = cursor["query"], cursor["offset"]
+        if cursor["version"] != catalog_version():
+            # Зсув у зміненому каталозі вказує не туди – показуємо результати з початку
+            offset = 0
+            logger.info("🔄 Каталог нот змінився, пошук почато з першої сторінки")
+            message = await update.message.reply_text(
+                "🔄 *Каталог нот оновився,* показую результати з початку ⬇️",
+                parse_mode="Markdown",
+            )
+            save_bot_message(chat_id, message.message_id, "general")
     # Якщо ключове слово не вказане, намагаємося взяти його з тексту повідомлення
-    if not keyword and update.message and update.message.text:
+    elif not keyword and update.message and update.message.text:
         keyword = update.message.text.lower()
     elif not keyword:
         return []
@@ -26,28 +52,18 @@ async def search_notes(
     keyword = keyword.lower()
     logger.info(f"🔍 Пошук нот за ключовим словом: {keyword}")
 
-    # Спочатку перевіряємо кеш у базі даних
-    cached_sheets = get_value("sheet_music_cache")
-    if cached_sheets:
-        sheets = json.loads(cached_sheets)
-        logger.info("Список нот взято з кешу бази даних")
-    else:
-        # Якщо кешу немає, звертаємося до Google Drive
+    # Індекс у пам'яті будується з каталогу один раз і далі оновлюється синхронізацією
+    if not sheet_index.loaded:
         sheets = await list_sheets(update, context)
         if not sheets:
-            if update:
-                await update.message.reply_text(
-                    "❌ *Помилка з нотами 😕* Спробуй пізніше! ⬇️"
-                )
             return []
+        if not sheet_index.loaded:
+            sheet_index.rebuild_from_catalog(sheets)
 
-    # Пошук нот за ключовим словом
-    all_sheets: list[dict] = []
-    for items in sheets.values():
-        all_sheets.extend(items)
-    results = [s for s in all_sheets if keyword in s["name"].lower()]
+    # Пошук нот за ключовим словом: підрядок, далі схожі назви з помилками
+    page, total = sheet_index.page(keyword, offset, SEARCH_PAGE_SIZE)
 
-    if not results:
+    if not total:
         if update:
             message = await update.message.reply_text(
                 f"🔍 *Ноти за '{keyword}' не знайдено 😔* Спробуй інше слово! ⬇️",
@@ -57,23 +73,12 @@ async def search_notes(
         logger.info(f"🔍 Нот за ключовим словом '{keyword}' не знайдено")
         return []
 
-    # Сортуємо результати за алфавітом
-    results.sort(key=lambda x: x["name"].lower())
-
-    # Якщо це новий пошук або змінене ключове слово, зберігаємо його
-    if not next_page or context.user_data.get("last_search_keyword") != keyword:
-        context.user_data["last_search_keyword"] = keyword
-        context.user_data["search_results"] = results
-        context.user_data["search_offset"] = 0
-
-    stored = context.user_data.get("search_results", [])
-    offset = context.user_data.get("search_offset", 0)
-    page = stored[offset : offset + 5]
-    context.user_data["search_offset"] = offset + len(page)
+    next_offset = offset + len(page)
+    search_cursors.save(chat_id, keyword, next_offset, catalog_version())
 
     if update:
         keyboard = [[KeyboardButton(f"📃 {sheet['name']}")] for sheet in page]
-        if context.user_data["search_offset"] < len(stored):
+        if next_offset < total:
             keyboard.append([KeyboardButton("➡️ Ще результати")])
         keyboard.append([KeyboardButton("🔙 Меню нот")])
         reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
@@ -84,7 +89,7 @@ async def search_notes(
         )
         save_bot_message(chat_id, message.message_id, "general")
         logger.info(
-            f"✅ Пошук за ключовим словом '{keyword}' повернув {len(stored)} результатів"
+            f"✅ Пошук за ключовим словом '{keyword}' повернув {total} результатів"
         )
 
     return page
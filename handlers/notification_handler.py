@@ -1,20 +1,16 @@
 from telegram import Update
 from telegram.ext import ContextTypes
-from telegram.constants import ParseMode
 from telegram.helpers import escape_markdown
 from utils.logger import logger
 from config import DEFAULT_GROUP_CHAT_ID
 try:
-    from utils.message_utils import safe_send_markdown
-except Exception:  # pragma: no cover - fallback for tests
-    async def safe_send_markdown(bot, chat_id, text, **kwargs):
-        return await bot.send_message(
-            chat_id=chat_id,
-            text=text,
-            parse_mode=ParseMode.MARKDOWN_V2,
-            **kwargs,
-        )
+    from utils.quota import quota_job
+except Exception:  # pragma: no cover - fallback for tests/minimal environments
+    def quota_job(feature, priority=None):
+        return lambda func: func
 from utils.calendar_utils import check_new_videos
+from utils.outbox import broadcast
+from utils.render_cache import BroadcastPayload, render_once
 from database import get_value, set_value, get_cursor
 import json
 
@@ -25,6 +21,7 @@ def resolve_default_group_chat_id(group_chats: list) -> str | None:
     return None
 
 
+@quota_job("video_notifications")
 async def check_and_notify_new_videos(context: ContextTypes.DEFAULT_TYPE):
     """
     Перевіряє наявність нових відео в YouTube і надсилає сповіщення.
@@ -55,50 +52,49 @@ async def check_and_notify_new_videos(context: ContextTypes.DEFAULT_TYPE):
         else:
             video_notifications_disabled = {}
 
+        recipients = [
+            user_id
+            for user_id in bot_users
+            if str(user_id) not in video_notifications_disabled
+            or not video_notifications_disabled[str(user_id)]
+        ]
+
         for video in new_videos:
             video_id = video["video_id"]
             title = video["title"]
-            escaped_title = escape_markdown(title, version=2)
             url = video["url"]
 
             # Список для зберігання ID повідомлень
             message_ids = []
-            notified_chats = set()
-
-            # Надсилаємо сповіщення користувачам
-            header = escape_markdown("🎥 Нове відео на каналі!", version=2)
-            for user_id in bot_users:
-                if (
-                    str(user_id) not in video_notifications_disabled
-                    or not video_notifications_disabled[str(user_id)]
-                ):
-                    message = await safe_send_markdown(
-                        context.bot,
-                        user_id,
-                        f"{header}\n\n*{escaped_title}*\n{url}",
-                    )
-                    if message:
-                        message_ids.append((str(user_id), message.message_id))
-                        logger.info(
-                            f"✅ Надіслано сповіщення про нове відео користувачу {user_id}"
-                        )
 
-            # Надсилаємо сповіщення лише в один груповий чат за замовчуванням
-            if default_group_chat_id:
-                message = await safe_send_markdown(
-                    context.bot,
-                    default_group_chat_id,
-                    f"{header}\n\n*{escaped_title}*\n{url}",
+            def _render():
+                header = escape_markdown("🎥 Нове відео на каналі!", version=2)
+                escaped_title = escape_markdown(title, version=2)
+                return BroadcastPayload(
+                    f"{header}\n\n*{escaped_title}*\n{escape_markdown(url, version=2)}"
                 )
-                if message:
-                    notified_chats.add(str(default_group_chat_id))
-                    message_ids.append(
-                        (str(default_group_chat_id), message.message_id)
-                    )
+
+            payload = render_once(f"video:{video_id}:{title}", _render)
+
+            # Користувачі та лише один груповий чат за замовчуванням
+            targets = list(recipients)
+            if default_group_chat_id:
+                targets.append(default_group_chat_id)
+
+            _, results = await broadcast(context.bot, f"video:{video_id}", targets, [payload])
+            for result in results:
+                if not result.ok:
+                    continue
+                message_ids.append((str(result.chat_id), result.message.message_id))
+                if str(result.chat_id) == str(default_group_chat_id):
                     logger.info(
                         "✅ Надіслано сповіщення про нове відео в групу за замовчуванням %s",
                         default_group_chat_id,
                     )
+                else:
+                    logger.info(
+                        f"✅ Надіслано сповіщення про нове відео користувачу {result.chat_id}"
+                    )
 
             # Зберігаємо, що відео надіслано разом із ID повідомлень
             await save_video_sent(video_id, message_ids)
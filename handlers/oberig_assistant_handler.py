@@ -1,6 +1,7 @@
+import asyncio
 import os
-import json
 import re
+import time
 import openai
 from telegram import Update
 from telegram.ext import ContextTypes
@@ -18,8 +19,6 @@ from utils.calendar_utils import (
 )
 from database import (
     get_group_facts,
-    get_value,
-    set_value,
     find_group_conflicts,
     search_group_messages,
     search_group_messages_semantic,
@@ -35,9 +34,22 @@ from utils import (
     get_openai_assistant_id,
 )
 from utils.privacy import mask_user_id, new_request_id, text_meta
+from utils.quota import PRIORITY_USER, quota_job
+from utils.context_gather import gather_sources, source
+from utils.fast_answers import fast_answer
+from utils.response_cache import data_version, response_cache
+from utils.prompt_builder import PromptBuilder
+from utils.progressive_reply import ProgressiveReply
+from utils.embedding_cache import get_query_embedding
+from utils.analytics import Analytics
+from utils.rate_limit import rate_limiter
+from utils.assistant_history import ASSISTANT_HISTORY_WINDOW, append_turns, recent_turns
 
 # Налаштування API-ключа OpenAI
 ASSISTANT_ID = init_openai_api()
+# Пошук у чаті робить запит до embeddings, тому має довший дедлайн
+CHAT_INSIGHTS_TIMEOUT = float(os.getenv("ASSISTANT_INSIGHTS_TIMEOUT", "6"))
+_analytics = Analytics()
 
 # Скорочений системний контекст для зменшення токенів
 OBERIG_SYSTEM_PROMPT = """
@@ -51,6 +63,17 @@ def _extract_search_query(user_message: str) -> str:
     return " ".join(tokens[:10]).strip() or user_message[:80].strip()
 
 
+def _count_range(user_message: str) -> tuple[datetime, datetime]:
+    """Period for "скільки ... місяця/року" questions."""
+    now_dt = datetime.now()
+    if "минулого місяця" in user_message:
+        start_dt = (now_dt.replace(day=1) - timedelta(days=1)).replace(day=1)
+        return start_dt, start_dt + timedelta(days=31)
+    if "цього року" in user_message:
+        return now_dt.replace(month=1, day=1), now_dt
+    return now_dt.replace(day=1), now_dt
+
+
 async def _is_user_in_main_group(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
     if not DEFAULT_GROUP_CHAT_ID:
         logger.error("DEFAULT_GROUP_CHAT_ID не задано: доступ до асистента заборонено (fail-closed).")
@@ -81,12 +104,15 @@ async def _notify_admin_misconfig(context: ContextTypes.DEFAULT_TYPE, message: s
         logger.debug(f"Не вдалося надіслати повідомлення адміну про misconfig: {e}")
 
 
-def _build_chat_insights(user_message: str) -> tuple[str, str, str]:
+async def _build_chat_insights(user_message: str) -> tuple[str, str, str]:
     if not DEFAULT_GROUP_CHAT_ID:
         return "Не налаштовано основний груповий чат.", "", "низький"
 
     query = _extract_search_query(user_message)
-    keyword_hits = search_group_messages(
+    # Найчастіші запити прогріваються в кеші embedding-ів
+    await _analytics.log_query(query)
+    keyword_hits = await asyncio.to_thread(
+        search_group_messages,
         chat_id=str(DEFAULT_GROUP_CHAT_ID),
         query=query,
         lookback_days=90,
@@ -95,13 +121,10 @@ def _build_chat_insights(user_message: str) -> tuple[str, str, str]:
     )
     semantic_hits = []
     try:
-        emb_resp = openai.embeddings.create(
-            model="text-embedding-3-small",
-            input=query[:1000],
-        )
-        query_emb = emb_resp.data[0].embedding if emb_resp and emb_resp.data else []
+        query_emb = await get_query_embedding(query[:1000])
         if query_emb:
-            semantic_hits = search_group_messages_semantic(
+            semantic_hits = await asyncio.to_thread(
+                search_group_messages_semantic,
                 chat_id=str(DEFAULT_GROUP_CHAT_ID),
                 query_embedding=query_emb,
                 lookback_days=90,
@@ -200,17 +223,63 @@ def _cross_source_verification(events: list | None, chat_insights: str, sheet_na
     return "Крос-перевірка підтверджує: " + " | ".join(parts)
 
 
-def check_chatgpt_limit(user_id: str) -> bool:
-    """
-    Перевіряє ліміт запитів до ChatGPT для користувача.
-    """
-    usage_str = get_value(f"oberig_assistant_usage_{user_id}") or "0"
-    usage = int(usage_str)
-    max_requests = 10  # Ліміт запитів на день
-    if usage >= max_requests:
-        return False
-    set_value(f"oberig_assistant_usage_{user_id}", str(usage + 1))
-    return True
+# Кожна подія потрапляє лише в одну секцію: перша категорія, до якої вона підходить
+EVENT_SECTIONS = (
+    ("Дні народження", ("день народження",)),
+    ("Виступи", ("виступ", "концерт")),
+    ("Репетиції", ("репетиція",)),
+)
+OTHER_EVENTS_SECTION = "Події"
+MAX_PROMPT_EVENTS = 30
+
+
+def _event_sections(events: list | None) -> dict[str, list[dict]]:
+    sections: dict[str, list[dict]] = {}
+    for event in (events or [])[:MAX_PROMPT_EVENTS]:
+        text = " ".join(
+            [event.get("summary", ""), event.get("description", "") or "", event.get("location", "") or ""]
+        ).lower()
+        title = next(
+            (name for name, words in EVENT_SECTIONS if any(word in text for word in words)),
+            OTHER_EVENTS_SECTION,
+        )
+        sections.setdefault(title, []).append(event)
+    return sections
+
+
+def _event_line(event: dict, section: str) -> str:
+    start = event.get("start", {}).get("dateTime", event.get("start", {}).get("date"))
+    if section == "Дні народження":
+        return f"🎂 {event.get('summary', 'Без назви')} - {start}"
+    description_limit = 160 if section == OTHER_EVENTS_SECTION else 120
+    return (
+        f"📅 {event.get('summary', 'Без назви')} - {start} | "
+        f"📍 {event.get('location', '(місце не вказано)')} | "
+        f"📝 {(event.get('description') or '').strip()[:description_limit]}"
+    )
+
+
+def _event_key(event: dict) -> tuple:
+    start = event.get("start", {})
+    return ("event", event.get("id") or event.get("summary"), start.get("dateTime") or start.get("date"))
+
+
+def _message_key(line: str, prefix_fields: int) -> tuple | str:
+    # "- дата: автор: текст" і "- дата: текст" – одне повідомлення, якщо текст однаковий
+    parts = line.split(": ", prefix_fields)
+    if len(parts) <= prefix_fields:
+        return line
+    return ("message", parts[-1][:60])
+
+
+def _save_history(user_id: str, user_message: str, bot_response: str):
+    append_turns(
+        user_id,
+        [
+            {"role": "user", "content": user_message},
+            {"role": "assistant", "content": bot_response},
+        ],
+    )
 
 
 async def search_chat_content(
@@ -264,6 +333,7 @@ async def search_drive_files(
         )
 
 
+@quota_job("assistant", PRIORITY_USER)
 async def handle_oberig_assistant(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Обробляє текстові запити як помічник OBERIG, використовуючи ChatGPT із мінімальними токенами.
@@ -289,14 +359,64 @@ async def handle_oberig_assistant(update: Update, context: ContextTypes.DEFAULT_
         )
         return
 
+    # Питання про розклад відповідаємо з календаря, не витрачаючи ліміт ChatGPT
+    try:
+        local_answer = await asyncio.to_thread(fast_answer, user_message)
+    except Exception as e:
+        local_answer = None
+        logger.warning("Швидка відповідь недоступна request_id=%s: %s", request_id, e)
+    if local_answer:
+        await update.message.reply_text(local_answer)
+        _save_history(user_id, user_message, local_answer)
+        logger.info(
+            "⚡ OBERIG відповів без LLM user=%s request_id=%s %s",
+            safe_user,
+            request_id,
+            text_meta(user_message),
+        )
+        return
+
+    # Недавня розмова впливає на відповідь, тож такі питання не кешуються:
+    # кеш спільний для всіх і не повинен віддавати відповідь з чужим контекстом
+    history = await asyncio.to_thread(
+        recent_turns, user_id, 3, time.time() - ASSISTANT_HISTORY_WINDOW
+    )
+    version, cached_answer = None, None
+    if not history:
+        # Те саме питання за тих самих даних уже мало відповідь
+        try:
+            version = await asyncio.to_thread(data_version)
+            cached_answer = response_cache.get(user_message, version)
+        except Exception as e:
+            version, cached_answer = None, None
+            logger.warning("Кеш відповідей недоступний request_id=%s: %s", request_id, e)
+    if cached_answer:
+        await update.message.reply_text(cached_answer)
+        _save_history(user_id, user_message, cached_answer)
+        logger.info(
+            "🗄️ OBERIG відповів з кешу user=%s request_id=%s %s",
+            safe_user,
+            request_id,
+            text_meta(user_message),
+        )
+        return
+
     # Перевіряємо ліміт запитів
-    if not check_chatgpt_limit(user_id):
-        await update.message.reply_text(
-            "❌ Наразі лише /start через ліміт. Спробуй пізніше! 😕 #Оберіг"
+    limit = rate_limiter.acquire("assistant", user_id)
+    if not limit:
+        if limit.reason == "daily":
+            hours = max(1, round(limit.retry_after / 3600))
+            text = f"❌ Денний ліміт запитів вичерпано. Спробуй приблизно через {hours} год! 😕 #Оберіг"
+        else:
+            seconds = max(1, round(limit.retry_after))
+            text = f"⏳ Забагато запитів поспіль. Зачекай {seconds} с і спитай ще раз! 😊 #Оберіг"
+        await update.message.reply_text(text)
+        logger.warning(
+            "Ліміт запитів (%s) user=%s request_id=%s", limit.reason, safe_user, request_id
         )
-        logger.warning("Ліміт запитів вичерпано user=%s request_id=%s", safe_user, request_id)
         return
 
+    reply = ProgressiveReply(update.message)
     try:
         # Розширені варіанти пошуку файлів
         search_keywords = [
@@ -330,11 +450,6 @@ async def handle_oberig_assistant(update: Update, context: ContextTypes.DEFAULT_
             return
 
         # Визначаємо тип запиту і завантажуємо лише потрібні дані
-        events = None
-        latest_video = None
-        popular_video = None
-        top_videos = None
-
         # Ключові слова для фільтрації
         calendar_keywords = [
             "репетиція",
@@ -345,125 +460,126 @@ async def handle_oberig_assistant(update: Update, context: ContextTypes.DEFAULT_
             "календар",
         ]
         youtube_keywords = ["ютуб", "відео", "записи", "youtube", "пісні"]
-
-        # Завантажуємо дані залежно від ключових слів
-        if any(keyword in user_message for keyword in calendar_keywords):
-            events = get_calendar_events_cached(max_results=50)
-        if any(keyword in user_message for keyword in youtube_keywords):
-            latest_video = get_latest_youtube_video_cached()
-            popular_video = get_most_popular_youtube_video_cached()
-            top_videos = get_top_10_videos_cached()
-
+        want_events = any(keyword in user_message for keyword in calendar_keywords)
+        want_videos = any(keyword in user_message for keyword in youtube_keywords)
+        events_limit = 50 if want_events else 30
         # Для загальних запитів завантажуємо мінімальні дані
-        if not events and not any([latest_video, popular_video, top_videos]):
-            events = get_calendar_events_cached(max_results=30)
-            latest_video = get_latest_youtube_video_cached()
-            popular_video = get_most_popular_youtube_video_cached()
-            top_videos = get_top_10_videos_cached()
-
-        # Шукаємо події за ключовими словами, обмежуючи кількість
-        def search_events(keyword, events_list=None, limit=10):  # Зменшено ліміт до 10
-            if not events_list:
-                return []
-            return [
-                event
-                for event in events_list
-                if keyword.lower() in event.get("summary", "").lower()
-                or keyword.lower() in (event.get("description", "") or "").lower()
-                or keyword.lower() in (event.get("location", "") or "").lower()
-            ][:limit]
-
-        # Формуємо короткий контекст для ChatGPT з мінімальними даними
-        calendar_context = "\n".join(
-            [
-                f"📅 {event.get('summary','Без назви')} - {event.get('start',{}).get('dateTime', event.get('start',{}).get('date'))} | "
-                f"📍 {event.get('location','(місце не вказано)')} | "
-                f"📝 {event.get('description','').strip()[:160]}"
-                for event in (events[:30] if events else [])
-            ]
+        if not want_events and not want_videos:
+            want_events = want_videos = True
+
+        # Ключове слово після "в " (останній виступ в ..., скільки разів в ...)
+        m = re.search(r"[вв]\s+([\w\s\u0400-\u04FF]+)", user_message)
+        in_keyword = m.group(1).strip() if m else ""
+        m = re.search(r"наступн[\w\s]*\s+([\w\s\u0400-\u04FF]+)", user_message)
+        next_keyword = m.group(1).strip() if m else ""
+        asks_last = any(word in user_message for word in ["останн", "минул"])
+        asks_count = "скільки" in user_message and "раз" in user_message
+        asks_range = (
+            not asks_count
+            and "скільки" in user_message
+            and any(w in user_message for w in ["місяця", "року"])
         )
-        rehearsal_events = "\n".join(
-            [
-                f"📅 {event.get('summary','Без назви')} - {event.get('start',{}).get('dateTime', event.get('start',{}).get('date'))} | "
-                f"📍 {event.get('location','(місце не вказано)')} | "
-                f"📝 {event.get('description','').strip()[:120]}"
-                for event in search_events("репетиція", events)[:10]
-            ]
-        )
-        performance_events = "\n".join(
-            [
-                f"📅 {event.get('summary','Без назви')} - {event.get('start',{}).get('dateTime', event.get('start',{}).get('date'))} | "
-                f"📍 {event.get('location','(місце не вказано)')} | "
-                f"📝 {event.get('description','').strip()[:120]}"
-                for event in (search_events("виступ", events) + search_events("концерт", events))[:10]
+
+        # Усі незалежні джерела запускаються одночасно, кожне зі своїм дедлайном
+        sources = []
+        if want_events:
+            sources.append(
+                source("events", lambda: get_calendar_events_cached(max_results=events_limit), [])
+            )
+        if want_videos:
+            sources += [
+                source("latest_video", get_latest_youtube_video_cached),
+                source("popular_video", get_most_popular_youtube_video_cached),
+                source("top_videos", get_top_10_videos_cached, []),
             ]
+        if asks_last or asks_count:
+            sources.append(source("past_events", lambda: get_past_events_cached(max_results=50), []))
+        if asks_last and in_keyword:
+            sources.append(source("last_event", lambda: get_last_event(in_keyword)))
+        if "наступн" in user_message and next_keyword:
+            sources.append(source("next_event", lambda: get_next_event(next_keyword)))
+        if asks_range:
+            start_dt, end_dt = _count_range(user_message)
+            sources.append(
+                source(
+                    "events_range",
+                    lambda: get_events_in_range(start_dt, end_dt, keyword=in_keyword or None),
+                    [],
+                )
+            )
+        async def load_chat_insights():
+            return await _build_chat_insights(user_message)
+
+        sources.append(
+            source(
+                "chat_insights",
+                load_chat_insights,
+                ("Повідомлення з чату зараз недоступні.", "", "низький"),
+                timeout=CHAT_INSIGHTS_TIMEOUT,
+            )
         )
-        birthday_events = "\n".join(
-            [
-                f"🎂 {event.get('summary','Без назви')} - {event.get('start',{}).get('dateTime', event.get('start',{}).get('date'))}"
-                for event in search_events("день народження", events)[:10]
+        if DEFAULT_GROUP_CHAT_ID:
+            sources += [
+                source(
+                    "conflicts",
+                    lambda: find_group_conflicts(str(DEFAULT_GROUP_CHAT_ID), days=120),
+                    [],
+                ),
+                source(
+                    "facts",
+                    lambda: get_group_facts(
+                        str(DEFAULT_GROUP_CHAT_ID),
+                        fact_type=None,
+                        days=30,
+                        limit=40,
+                    ),
+                    [],
+                ),
             ]
-        )
+
+        async def load_sheets():
+            return await list_sheets(update=None, context=None, use_cache=True)
+
+        sources.append(source("sheets", load_sheets, {}))
+        # Заглушка з'являється одразу, ще до збору контексту й відповіді LLM
+        await reply.start()
+        gathered = await gather_sources(sources, label=f"Контекст асистента request_id={request_id}")
+
+        events = gathered.get("events")
+        latest_video = gathered.get("latest_video")
+        popular_video = gathered.get("popular_video")
+        top_videos = gathered.get("top_videos")
+        past_events = gathered.get("past_events")
 
         # Обробляємо запит про минулі події
-        past_events = None
         last_event_info = ""
         past_count_info = ""
         next_event_info = ""
 
-        if any(word in user_message for word in ["останн", "минул"]):
-            past_events = get_past_events_cached(max_results=50)
-            # спробуємо виділити ключове слово після "в "
-            import re
-
-            m = re.search(r"[вв]\s+([\w\s\u0400-\u04FF]+)", user_message)
-            keyword = m.group(1).strip() if m else ""
-            event = get_last_event(keyword) if keyword else (past_events[0] if past_events else None)
+        if asks_last:
+            event = gathered.get("last_event") if in_keyword else (past_events[0] if past_events else None)
             if event:
                 last_event_info = f"{event['summary']} - {event['start'].get('dateTime', event['start'].get('date'))}"
 
-        if "наступн" in user_message:
-            import re
-            m = re.search(r"наступн[\w\s]*\s+([\w\s\u0400-\u04FF]+)", user_message)
-            keyword = m.group(1).strip() if m else ""
-            event = get_next_event(keyword) if keyword else None
-            if event:
-                next_event_info = f"{event['summary']} - {event['start'].get('dateTime', event['start'].get('date'))}"
-
-        if "скільки" in user_message and "раз" in user_message:
-            if past_events is None:
-                past_events = get_past_events_cached(max_results=50)
-            import re
+        event = gathered.get("next_event")
+        if event:
+            next_event_info = f"{event['summary']} - {event['start'].get('dateTime', event['start'].get('date'))}"
 
-            m = re.search(r"[вв]\s+([\w\s\u0400-\u04FF]+)", user_message)
-            keyword = m.group(1).strip() if m else ""
-            if keyword and past_events:
+        if asks_count:
+            if in_keyword and past_events:
                 count = sum(
                     1
                     for ev in past_events
-                    if keyword.lower()
+                    if in_keyword.lower()
                     in " ".join(
                         [ev.get("summary", ""), ev.get("description", ""), ev.get("location", "")]
                     ).lower()
                 )
-                past_count_info = f"{keyword}: {count}"
-        elif "скільки" in user_message and any(w in user_message for w in ["місяця", "року"]):
-            import re
-            now_dt = datetime.now()
-            if "минулого місяця" in user_message:
-                start_dt = (now_dt.replace(day=1) - timedelta(days=1)).replace(day=1)
-                end_dt = start_dt + timedelta(days=31)
-            elif "цього року" in user_message:
-                start_dt = now_dt.replace(month=1, day=1)
-                end_dt = now_dt
-            else:
-                start_dt = now_dt.replace(day=1)
-                end_dt = now_dt
-            m = re.search(r"[вв]\s+([\w\s\u0400-\u04FF]+)", user_message)
-            keyword = m.group(1).strip() if m else ""
-            events_range = get_events_in_range(start_dt, end_dt, keyword=keyword or None)
-            past_count_info = f"{keyword}: {count_events(events_range)}"
+                past_count_info = f"{in_keyword}: {count}"
+        elif asks_range:
+            past_count_info = f"{in_keyword}: {count_events(gathered.get('events_range') or [])}"
 
+        video_lines = []
         if any([latest_video, popular_video, top_videos]):
             top_list = ", ".join(
                 [
@@ -471,19 +587,17 @@ async def handle_oberig_assistant(update: Update, context: ContextTypes.DEFAULT_
                     for title, url, _ in (top_videos[:5] if top_videos else [])
                 ]
             )
-            video_context = (
-                f"🎥 Найновіше: {latest_video}\n"
-                f"⭐ Найпопулярніше: {popular_video}\n"
-                f"🔝 Топ-10: {top_list}"
-            )
-        else:
-            video_context = ""
+            video_lines = [
+                f"🎥 Найновіше: {latest_video}",
+                f"⭐ Найпопулярніше: {popular_video}",
+                f"🔝 Топ-10: {top_list}",
+            ]
         social_context = (
             "🌐 Facebook: https://www.facebook.com/profile.php?id=100094519583534"
         )
-        chat_insights, leader_insights, confidence_level = _build_chat_insights(user_message)
+        chat_insights, leader_insights, confidence_level = gathered["chat_insights"]
         sources_block = _build_sources_block(chat_insights, leader_insights)
-        conflicts = find_group_conflicts(str(DEFAULT_GROUP_CHAT_ID), days=120) if DEFAULT_GROUP_CHAT_ID else []
+        conflicts = gathered.get("conflicts") or []
         conflict_hint = ""
         if conflicts:
             sample = conflicts[0]
@@ -496,73 +610,79 @@ async def handle_oberig_assistant(update: Update, context: ContextTypes.DEFAULT_
             )
             if dates:
                 conflict_hint = f"Є потенційний конфлікт у чаті щодо '{sample.get('event_key')}': дати {', '.join(dates[:4])}."
-        facts_recent = get_group_facts(
-            str(DEFAULT_GROUP_CHAT_ID),
-            fact_type=None,
-            days=30,
-            limit=40,
-        ) if DEFAULT_GROUP_CHAT_ID else []
+        facts_recent = gathered.get("facts") or []
         facts_hint = ", ".join(
             sorted({f.get("fact_type", "") for f in facts_recent if f.get("fact_type")})
         )
 
         sheet_names = []
-        try:
-            sheets = await list_sheets(update=None, context=None, use_cache=True)
-            for _, items in (sheets or {}).items():
-                for item in items:
-                    if item.get("name"):
-                        sheet_names.append(item["name"])
-        except Exception as e:
-            logger.debug(f"Не вдалося отримати дані нот для крос-перевірки: {e}")
+        for _, items in (gathered.get("sheets") or {}).items():
+            for item in items:
+                if item.get("name"):
+                    sheet_names.append(item["name"])
         cross_check = _cross_source_verification(events, chat_insights, sheet_names)
 
-        # Створюємо dynamic_prompt з максимально коротким контекстом
-        dynamic_prompt = f"{OBERIG_SYSTEM_PROMPT}\n\nДані для відповіді:"
-        dynamic_prompt += f"\n- Події: {calendar_context}"
-        dynamic_prompt += f"\n- Репетиції: {rehearsal_events}"
-        dynamic_prompt += f"\n- Виступи: {performance_events}"
-        dynamic_prompt += f"\n- Дні народження: {birthday_events}"
-        if last_event_info:
-            dynamic_prompt += f"\n- Остання подія: {last_event_info}"
-        if past_count_info:
-            dynamic_prompt += f"\n- Лічильник подій: {past_count_info}"
-        if next_event_info:
-            dynamic_prompt += f"\n- Наступна подія: {next_event_info}"
-        dynamic_prompt += f"\n- YouTube: {video_context}"
-        dynamic_prompt += f"\n- Соцмережі: {social_context}"
-        dynamic_prompt += f"\n- За повідомленнями в чаті: {chat_insights}"
-        dynamic_prompt += f"\n- Пріоритетні повідомлення керівниці: {leader_insights or 'немає релевантних'}"
-        dynamic_prompt += f"\n- Рівень впевненості: {confidence_level}"
-        dynamic_prompt += f"\n- Структуровані факти з чату: {facts_hint or 'немає'}"
-        dynamic_prompt += f"\n- Конфлікти: {conflict_hint or 'не виявлено'}"
-        dynamic_prompt += f"\n- Крос-верифікація: {cross_check}"
-        dynamic_prompt += f"\n- Джерела: {sources_block}"
-        dynamic_prompt += (
+        # Промпт у межах бюджету токенів: кожна подія й повідомлення – один раз
+        prompt = PromptBuilder(user_message)
+        prompt.head(f"{OBERIG_SYSTEM_PROMPT}\n\nДані для відповіді:")
+        prompt.add("Рівень впевненості", [confidence_level], priority=0)
+        prompt.add("Остання подія", [last_event_info], priority=1)
+        prompt.add("Лічильник подій", [past_count_info], priority=1)
+        prompt.add("Наступна подія", [next_event_info], priority=1)
+        leader_lines = leader_insights.splitlines() if leader_insights else []
+        prompt.add(
+            "Пріоритетні повідомлення керівниці",
+            leader_lines,
+            priority=2,
+            keys=[_message_key(line, 1) for line in leader_lines],
+            empty="немає релевантних",
+        )
+        for title, section_events in _event_sections(events).items():
+            prompt.add(
+                title,
+                [_event_line(event, title) for event in section_events],
+                priority=3,
+                keys=[_event_key(event) for event in section_events],
+            )
+        chat_lines = chat_insights.splitlines() if chat_insights else []
+        prompt.add(
+            "За повідомленнями в чаті",
+            chat_lines,
+            priority=3,
+            keys=[_message_key(line, 2) for line in chat_lines],
+        )
+        prompt.add("Структуровані факти з чату", [facts_hint], priority=4, empty="немає")
+        prompt.add("Конфлікти", [conflict_hint], priority=4, empty="не виявлено")
+        prompt.add("Крос-верифікація", [cross_check], priority=4)
+        # Запит саме про відео – YouTube важливіший за решту контексту
+        prompt.add("YouTube", video_lines, priority=2 if want_videos and not want_events else 5)
+        prompt.add("Соцмережі", [social_context], priority=6)
+        prompt.tail(
             "\nПобудуй відповідь структуровано: "
             "'За календарем', 'За повідомленнями в чаті', "
             "'Пріоритетні повідомлення керівниці', 'Що підтверджено'."
         )
+        dynamic_prompt = prompt.build()
 
         # Формуємо контекст для ChatGPT з мінімальною історією
-        chat_history_str = get_value(f"oberig_chat_history_{user_id}") or "[]"
-        chat_history = json.loads(chat_history_str) if chat_history_str else []
         messages = [{"role": "system", "content": dynamic_prompt}]
-        messages.extend(
-            chat_history[-3:]
-        )  # Зменшено до 3 повідомлень для економії токенів
+        messages.extend(history)  # Зменшено до 3 повідомлень для економії токенів
         messages.append({"role": "user", "content": user_message})
 
         # Запит до ChatGPT або асистента з мінімальними токенами для відповіді
         if ASSISTANT_ID:
             bot_response = await call_openai_assistant(
-                messages=messages, assistant_id=ASSISTANT_ID
+                messages=messages,
+                assistant_id=ASSISTANT_ID,
+                # Без недавньої розмови – новий thread, тож відповідь можна кешувати
+                thread_key=user_id if history else None,
             )
         else:
             bot_response = await call_openai_chat(
                 messages=messages,
                 max_tokens=200,
                 temperature=0.9,
+                on_delta=lambda text: reply.update(f"Що відомо:\n{text}"),
             )
         # Доказовий формат відповіді + джерела
         bot_response = (
@@ -576,12 +696,11 @@ async def handle_oberig_assistant(update: Update, context: ContextTypes.DEFAULT_
         # Перевіряємо довжину повідомлення
         if len(bot_response) > 4096:
             bot_response = bot_response[:4090] + "..."
-        await update.message.reply_text(bot_response)
+        await reply.finish(bot_response)
+        if version:
+            response_cache.put(user_message, version, bot_response)
 
-        # Зберігаємо лише ключові повідомлення в історії (5 останніх)
-        chat_history.append({"role": "user", "content": user_message})
-        chat_history.append({"role": "assistant", "content": bot_response})
-        set_value(f"oberig_chat_history_{user_id}", json.dumps(chat_history[-5:]))
+        _save_history(user_id, user_message, bot_response)
 
         logger.info(
             "✅ OBERIG обробив запит user=%s request_id=%s %s",
@@ -591,12 +710,14 @@ async def handle_oberig_assistant(update: Update, context: ContextTypes.DEFAULT_
         )
 
     except openai.OpenAIError as e:
-        await update.message.reply_text(
-            "❌ Проблеми з ChatGPT 😕. Спробуй /start! #Оберіг 🌟"
-        )
+        await reply.finish("❌ Проблеми з ChatGPT 😕. Спробуй /start! #Оберіг 🌟")
         logger.error("Помилка ChatGPT user=%s request_id=%s: %s", safe_user, request_id, e)
+    except asyncio.TimeoutError as e:
+        # Усі слоти LLM зайняті або OpenAI не відповів вчасно
+        await reply.finish("⏳ Асистент зараз перевантажений. Спробуй за хвилину! #Оберіг 🌟")
+        logger.error("Таймаут LLM user=%s request_id=%s: %s", safe_user, request_id, e)
     except Exception as e:
-        await update.message.reply_text("❌ Помилка 😔. Спробуй /start! #Оберіг ✨")
+        await reply.finish("❌ Помилка 😔. Спробуй /start! #Оберіг ✨")
         logger.error("Помилка в OBERIG user=%s request_id=%s: %s", safe_user, request_id, e)
 
 
@@ -13,7 +13,8 @@ import json
 import openai
 import hashlib
 import os
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+import re
+from telegram import Update
 from telegram.constants import ParseMode
 from telegram.helpers import escape_markdown
 try:
@@ -24,14 +25,33 @@ except Exception:  # pragma: no cover - fallback for tests/minimal environments
 try:
     from utils.message_utils import safe_send_markdown
 except Exception:  # pragma: no cover - fallback for tests
-    async def safe_send_markdown(bot, chat_id, text, **kwargs):
+    async def safe_send_markdown(bot, chat_id, text, escaped=False, **kwargs):
         return await bot.send_message(
             chat_id=chat_id,
             text=text,
             parse_mode=ParseMode.MARKDOWN_V2,
             **kwargs,
         )
+try:
+    from utils.quota import PRIORITY_USER, quota_job
+except Exception:  # pragma: no cover - fallback for tests/minimal environments
+    PRIORITY_USER = "user"
+
+    def quota_job(feature, priority=None):
+        return lambda func: func
 from handlers.schedule_handler import _generate_short_id, _cache_event_id
+from utils.delivery import fan_out, limited_bot
+try:
+    from utils.media_registry import content_key, send_media
+except Exception:  # pragma: no cover - fallback for tests/minimal environments
+    def content_key(data):
+        return hashlib.sha256(data).hexdigest()
+
+    async def send_media(send, key, media_type, load):
+        return await send(load())
+from utils.daily_digest import render_daily_digest
+from utils.outbox import broadcast
+from utils.render_cache import BroadcastPayload, render_once
 
 from utils import (
     init_openai_api,
@@ -135,6 +155,7 @@ async def unset_reminder(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         save_bot_message(str(update.effective_chat.id), message.message_id, "general")
 
+@quota_job("daily_reminder", PRIORITY_USER)
 async def send_daily_reminder(context: ContextTypes.DEFAULT_TYPE, force: bool = False):
     now = datetime.now(berlin_tz)
     if now.hour < 8:
@@ -181,60 +202,40 @@ async def send_daily_reminder(context: ContextTypes.DEFAULT_TYPE, force: bool =
                 return "події"
             return "подій"
 
-        header_text = escape_markdown(
-            f"🔔 Розклад подій на сьогодні, {current_date.day:02d} {current_date.strftime('%B').lower()} – {len(events)} {_pluralize_events(len(events))}",
-            version=2,
+        title = (
+            f"🔔 Розклад подій на сьогодні, {current_date.day:02d} "
+            f"{current_date.strftime('%B').lower()} – {len(events)} {_pluralize_events(len(events))}"
         )
 
-        sent_any = False
-        for chat_id in recipients:
-            message = await safe_send_markdown(
-                context.bot,
-                int(chat_id),
-                f"*{header_text}*",
-            )
-            if message:
-                save_bot_message(chat_id, message.message_id, "daily_reminder")
-                sent_any = True
-
+        callbacks = {}
         for event in events:
-            try:
-                event_time = event.get('start', {}).get('dateTime', event.get('start', {}).get('date', ''))
-                if event_time and 'T' in event_time:
-                    event_time = datetime.fromisoformat(event_time.replace('Z', '+00:00')).astimezone(berlin_tz).strftime('%H:%M')
-                    event_time = escape_markdown(event_time, version=2)
-                elif event_time:
-                    event_time = escape_markdown("(весь день)", version=2)
-                summary = escape_markdown(event.get('summary', 'Без назви'), version=2)
-                text = f"📅 *{summary}*"
-                if event_time:
-                    text += f"\n🕒 Час: {event_time}"
-                location = event.get('location')
-                if location:
-                    text += f"\n📍 Місце: {escape_markdown(location, version=2)}"
-
+            if event.get('id'):
                 short_id = _generate_short_id(event['id'])
                 _cache_event_id(short_id, event['id'])
+                callbacks[event['id']] = f"event_{short_id}"
+
+        # Усі події – в одному повідомленні; рендер один раз на набір подій
+        items = render_once(
+            f"daily_reminder:{current_date.isoformat()}:{current_hash}",
+            lambda: [
+                BroadcastPayload.from_item(item)
+                for item in render_daily_digest(
+                    title,
+                    events,
+                    berlin_tz,
+                    callback_data=lambda e: callbacks.get(e.get('id')),
+                    category="daily_reminder",
+                )
+            ],
+        )
 
-                buttons = [[InlineKeyboardButton("Деталі", callback_data=f"event_{short_id}")]]
-                link = event.get('htmlLink')
-                if link:
-                    buttons[0].append(InlineKeyboardButton("деталі в календарі", url=link))
-                markup = InlineKeyboardMarkup(buttons)
-
-                for chat_id in recipients:
-                    message = await safe_send_markdown(
-                        context.bot,
-                        int(chat_id),
-                        text,
-                        reply_markup=markup,
-                    )
-                    if message:
-                        save_bot_message(chat_id, message.message_id, "daily_reminder")
-                        sent_any = True
-
-            except Exception as e:
-                logger.error(f"❌ Помилка при обробці події в daily_reminder: {e}")
+        # Ключ партії прив'язаний до дня і набору подій: після перезапуску
+        # розсилка продовжиться з outbox без повторів
+        batch = f"daily_digest:{current_date.isoformat()}:{current_hash[:16]}"
+        if force:
+            batch += f":force:{now.strftime('%H%M%S')}"
+        queued, results = await broadcast(context.bot, batch, recipients, items)
+        sent_any = queued or any(result.ok for result in results)
 
         if sent_any:
             logger.info(
@@ -264,7 +265,116 @@ async def startup_daily_reminder(context: ContextTypes.DEFAULT_TYPE):
         logger.info("🔄 Запуск щоденних нагадувань при старті бота.")
         await send_daily_reminder(context)
 
+def _event_start(event: dict):
+    """Return the event start in TIMEZONE or None if it cannot be parsed."""
+    start_info = event.get("start", {})
+    if isinstance(start_info, list):
+        logger.error(f"❌ Подія має список у 'start', пропущено: {start_info}")
+        return None
+    start_str = start_info.get("dateTime") or start_info.get("date")
+    if not start_str:
+        return None
+    if "T" in start_str:
+        return datetime.fromisoformat(start_str.replace("Z", "+00:00")).astimezone(pytz.timezone(TIMEZONE))
+    return datetime.strptime(start_str, "%Y-%m-%d").replace(tzinfo=pytz.timezone(TIMEZONE))
+
+
+async def send_event_reminder(
+    context: ContextTypes.DEFAULT_TYPE,
+    event: dict,
+    start_dt: datetime | None = None,
+    force: bool = False,
+) -> bool:
+    """
+    Надсилає нагадування «за годину» для однієї події.
+    Повертає True, якщо нагадування поставлено в чергу або надіслано.
+    """
+    start_dt = start_dt or _event_start(event)
+    if start_dt is None:
+        return False
+
+    event_id = event.get("id")
+    # Хеш тексту
+    reminder_type = "hourly"  # 🔧 додаємо явно тип
+    reminder_hash = generate_event_hash(event, reminder_type)
+
+    # Отримуємо попередній хеш
+    last_hash = db.get_event_reminder_hash(event_id, reminder_type)
+
+    if (not force) and last_hash == reminder_hash:
+        return False  # Уже надсилали таке саме повідомлення
+
+    short_id = None
+    if event_id:
+        short_id = _generate_short_id(event_id)
+        _cache_event_id(short_id, event_id)
+
+    def _render():
+        # Формуємо текст нагадування
+        title = escape_markdown(event.get("summary", "Без назви"), version=2)
+        description = escape_markdown(event.get("description", ""), version=2)
+        location = escape_markdown(event.get("location", "—"), version=2)
+        link = event.get("htmlLink", "")
+        start_formatted = start_dt.strftime("%H:%M")
+
+        header = escape_markdown("🔔 Подія через годину!", version=2)
+        reminder_text = (
+            f"{header}\n\n"
+            f"📅 *{title}*\n"
+            f"🕒 Час: {start_formatted}\n"
+            f"📍 Місце: {location}\n"
+        )
+        if description:
+            reminder_text += f"📝 Опис: {description}\n"
+        buttons = []
+        if short_id:
+            buttons.append({"text": "Деталі", "callback_data": f"event_{short_id}"})
+        if link:
+            buttons.append({"text": "Відкрити в календарі", "url": link})
+        return BroadcastPayload(
+            reminder_text,
+            buttons=[buttons] if buttons else None,
+            options={"disable_web_page_preview": True},
+            category="hourly_reminder",
+        )
+
+    # Один рендер на підпис події – спільний для всіх чатів і повторних запусків
+    payload = render_once(f"hourly_reminder:{reminder_hash}", _render)
+
+    # 🔁 Надсилання у тестовий чат або всім користувачам з reminders
+    if TEST_CHAT_ID:
+        target_chats = [TEST_CHAT_ID]
+    else:
+        try:
+            group_chats = get_active_chats()
+        except Exception:
+            group_chats = []
+        try:
+            private_chats = db.get_users_with_reminders()
+        except Exception:
+            private_chats = []
+        target_chats = list(dict.fromkeys([*(group_chats or []), *(private_chats or [])]))
+
+    batch = f"hourly_reminder:{event_id}:{reminder_hash}"
+    if force:
+        batch += f":force:{datetime.now(berlin_tz).strftime('%H%M%S')}"
+    queued, results = await broadcast(context.bot, batch, target_chats, [payload])
+    for result in results:
+        if not result.ok:
+            logger.warning(f"⚠️ Не вдалося надіслати повідомлення в чат {result.chat_id}")
+    sent_success = queued or any(result.ok for result in results)
+
+    if sent_success:
+        db.save_event_reminder_hash(event_id, reminder_type, reminder_hash)
+    return sent_success
+
+
+@quota_job("event_reminders", PRIORITY_USER)
 async def send_event_reminders(context: ContextTypes.DEFAULT_TYPE, force: bool = False):
+    """
+    Ручна перевірка подій у найближчу годину (використовується /force_hourly_reminder).
+    Планові нагадування надсилає handlers.reminder_planner.
+    """
     now = datetime.now(pytz.timezone(TIMEZONE))
     one_hour_later = now + timedelta(hours=1)
     logger.debug(f"⏰ Перевірка годинних нагадувань: Зараз {now}, Через годину {one_hour_later}")
@@ -280,94 +390,10 @@ async def send_event_reminders(context: ContextTypes.DEFAULT_TYPE, force: bool =
 
     for idx, event in enumerate(events, start=1):
         try:
-            start_info = event.get("start", {})
-            if isinstance(start_info, list):
-                logger.error(f"❌ Подія має список у 'start', пропущено: {start_info}")
-                continue
-
-            start_str = start_info.get("dateTime") or start_info.get("date")
-            if not start_str:
-                continue
-
-            if "T" in start_str:
-                start_dt = datetime.fromisoformat(start_str.replace("Z", "+00:00")).astimezone(pytz.timezone(TIMEZONE))
-            else:
-                start_dt = datetime.strptime(start_str, "%Y-%m-%d").replace(tzinfo=pytz.timezone(TIMEZONE))
-            if not (now < start_dt <= one_hour_later):
+            start_dt = _event_start(event)
+            if start_dt is None or not (now < start_dt <= one_hour_later):
                 continue
-
-            # Формуємо текст нагадування
-            title = escape_markdown(event.get("summary", "Без назви"), version=2)
-            description = escape_markdown(event.get("description", ""), version=2)
-            location = escape_markdown(event.get("location", "—"), version=2)
-            link = event.get("htmlLink", "")
-            start_formatted = start_dt.strftime("%H:%M")
-
-            header = escape_markdown("🔔 Подія через годину!", version=2)
-            reminder_text = (
-                f"{header}\n\n"
-                f"📅 *{title}*\n"
-                f"🕒 Час: {start_formatted}\n"
-                f"📍 Місце: {location}\n"
-            )
-            if description:
-                reminder_text += f"📝 Опис: {description}\n"
-            reply_markup = None
-            buttons = []
-            event_id = event.get("id")
-            if event_id:
-                short_id = _generate_short_id(event_id)
-                _cache_event_id(short_id, event_id)
-                buttons.append(InlineKeyboardButton("Деталі", callback_data=f"event_{short_id}"))
-            if link:
-                buttons.append(InlineKeyboardButton("Відкрити в календарі", url=link))
-            if buttons:
-                reply_markup = InlineKeyboardMarkup([buttons])
-
-            # Хеш тексту
-            reminder_type = "hourly"  # 🔧 додаємо явно тип
-            reminder_hash = generate_event_hash(event, reminder_type)
-
-            # Отримуємо попередній хеш
-            last_hash = db.get_event_reminder_hash(event_id, reminder_type)
-
-
-            if (not force) and last_hash == reminder_hash:
-                continue  # Уже надсилали таке саме повідомлення
-
-            # 🔁 Надсилання у тестовий чат або всім користувачам з reminders
-            if TEST_CHAT_ID:
-                target_chats = [TEST_CHAT_ID]
-            else:
-                try:
-                    group_chats = get_active_chats()
-                except Exception:
-                    group_chats = []
-                try:
-                    private_chats = db.get_users_with_reminders()
-                except Exception:
-                    private_chats = []
-                target_chats = list(dict.fromkeys([*(group_chats or []), *(private_chats or [])]))
-
-            sent_success = False
-            for chat_id in target_chats:
-                send_kwargs = {"disable_web_page_preview": True}
-                if reply_markup:
-                    send_kwargs["reply_markup"] = reply_markup
-                message = await safe_send_markdown(
-                    context.bot,
-                    int(chat_id),
-                    reminder_text,
-                    **send_kwargs,
-                )
-                if message:
-                    sent_success = True
-                    save_bot_message(str(chat_id), message.message_id, "hourly_reminder")
-                else:
-                    logger.warning(f"⚠️ Не вдалося надіслати повідомлення в чат {chat_id}")
-
-            if sent_success:
-                db.save_event_reminder_hash(event_id, reminder_type, reminder_hash)
+            if await send_event_reminder(context, event, start_dt=start_dt, force=force):
                 notified_count += 1
 
         except Exception as e:
@@ -491,84 +517,151 @@ async def generate_birthday_greeting(
         )
         return escape_markdown(default, version=2)
 
-async def check_birthday_greetings(context: ContextTypes.DEFAULT_TYPE, force: bool = False):
-    # Ensure the table exists before any DB operations
-    create_birthday_greetings_table()
+BIRTHDAY_FALLBACK_TEMPLATES = {
+    "morning": (
+        "🎵 Доброго ранку, Оберіг! Сьогодні день народження святкує наша співоча зірка – "
+        "бажаємо {name} натхнення і найкращих мелодій! 🎂😊",
+        "🎉 Друзі, у нас іменинник! Бажаємо {name} світлих нот і гармонії в кожному дні! 🎵🎂",
+    ),
+    "evening": (
+        "🌙 Теплого вечора! Ще раз бажаємо {name} щастя, любові й пісень, що гріють серце! 🎵🎂😊",
+        "✨ Завершуємо святковий день: {name} – найщиріші побажання від усього хору! 🎶🎂",
+    ),
+}
 
-    now = datetime.now(berlin_tz)
-    today = now.date()
-    current_hour = now.hour
-    greeting_type = 'morning' if current_hour < 12 else 'evening'
 
-    # Перевіряємо, чи нагадування вже було надіслане сьогодні для цього періоду
-    with get_cursor() as cursor:
-        cursor.execute("""
-            SELECT id FROM birthday_greetings 
-            WHERE date_sent = ? AND greeting_type = ?
-        """, (today.isoformat(), greeting_type))
-        already_sent = cursor.fetchone() is not None
+def fallback_birthday_greeting(name: str, greeting_type: str) -> str:
+    """Deterministic escaped greeting used when no generated text is available."""
+    templates = BIRTHDAY_FALLBACK_TEMPLATES.get(greeting_type) or BIRTHDAY_FALLBACK_TEMPLATES["morning"]
+    index = int(hashlib.md5(f"{name}|{greeting_type}".encode("utf-8")).hexdigest(), 16) % len(templates)
+    greeting = escape_markdown(templates[index].format(name=inflect_to_dative(name)), version=2)
+    return greeting + r" \#Оберіг \#ДеньНародження"
 
-    if already_sent and not force:
-        logger.info(f"ℹ️ Нагадування про день народження вже надіслане ({greeting_type}) на {today}")
-        return
 
-    logger.info(f"⏰ Перевірка днів народження на {today} о {now.strftime('%H:%M')}")
-    events = get_today_events()
-    logger.info(f"Отримано {len(events)} подій на сьогодні: {[event['summary'] for event in events]}")
+# Привітання вже екрановане для MarkdownV2 («Анна\-Марія»), а ім'я – ні
+_MARKDOWN_ESCAPE_RE = re.compile(r"\\(.)")
 
-    if not events:
-        logger.info("Сьогодні немає подій.")
-        return
 
-    active_group_chats = get_active_chats()
+def _greeting_mentions(greeting: str, name: str) -> bool:
+    text = _MARKDOWN_ESCAPE_RE.sub(r"\1", greeting).lower()
+    return name.lower() in text or inflect_to_dative(name).lower() in text
+
+
+async def generate_validated_greeting(name: str, greeting_type: str, source: str = "") -> str:
+    """
+    Generate a greeting that mentions the celebrant: one retry with a fix
+    prompt, then the deterministic fallback.
+    """
+    greeting = await generate_birthday_greeting(name, greeting_type)
+    if _greeting_mentions(greeting, name):
+        return greeting
+
+    dative_name = inflect_to_dative(name)
+    logger.warning(
+        f"⚠️ Згенероване привітання не містить імені для {source or name}; повторюю запит"
+    )
+    fix_prompt = (
+        "Попередній текст привітання не містив імені іменинника. "
+        f"Створи новий варіант і обов'язково згадай {dative_name}. "
+        "Додай емоджі та хештеги. Завершуй текст крапкою або знаком оклику."
+    )
+    greeting = await generate_birthday_greeting(
+        name, greeting_type, prompt_override=fix_prompt
+    )
+    if _greeting_mentions(greeting, name):
+        return greeting
+    logger.warning(f"⚠️ Повторне привітання для {source or name} теж без імені, використано шаблон")
+    return fallback_birthday_greeting(name, greeting_type)
+
+
+async def render_birthday_image(name: str, seed: str, greeting_type: str) -> bytes | None:
+    if not BIRTHDAY_IMAGE_ENABLED:
+        return None
+    # Рендер PNG – CPU-робота, не блокуємо цикл подій
+    return await asyncio.to_thread(
+        create_birthday_image_bytes, name=name, seed=seed, greeting_type=greeting_type
+    )
+
+
+def find_birthday_celebrants(events: list) -> list[dict]:
+    """Return ``{"event_id", "name", "summary"}`` for birthday events."""
+    celebrants = []
+    for event in events or []:
+        raw_summary = event.get("summary", "")
+        if "день народження" not in raw_summary.lower():
+            logger.debug(f"Подія '{raw_summary.lower()}' пропущена, не є днем народження")
+            continue
+        celebrants.append(
+            {
+                "event_id": event.get("id", "unknown"),
+                "name": extract_birthday_name(raw_summary),
+                "summary": raw_summary,
+            }
+        )
+    return celebrants
+
+
+def birthday_greeting_sent(day, greeting_type: str) -> bool:
+    with get_cursor() as cursor:
+        cursor.execute("""
+            SELECT id FROM birthday_greetings 
+            WHERE date_sent = ? AND greeting_type = ?
+        """, (day.isoformat(), greeting_type))
+        return cursor.fetchone() is not None
+
+
+async def deliver_birthday_greetings(
+    context: ContextTypes.DEFAULT_TYPE,
+    celebrants: list[dict],
+    greeting_type: str,
+    today,
+    chats: list | None = None,
+    prepared: dict | None = None,
+    generate: bool = True,
+) -> int:
+    """
+    Send greetings for ``celebrants`` to the active group chats and record
+    them in birthday_greetings. ``prepared`` maps event ids to pre-generated
+    ``{"text", "image"}``; without it the text is generated on the spot, or
+    taken from the deterministic template when ``generate`` is False.
+    Returns the number of greetings.
+    """
+    active_group_chats = chats if chats is not None else get_active_chats()
     logger.info(f"Активні групові чати: {active_group_chats}")
 
     if not active_group_chats:
         logger.warning("Немає активних групових чатів для надсилання вітань.")
-        return
+        return 0
 
     # Збираємо всі привітання для збереження в базі
     greetings_to_save = []
-    for event in events:
-        raw_summary = event.get("summary", "")
-        summary = raw_summary.lower()
-        logger.debug(f"Обробка події: {summary}")
-
-        if "день народження" not in summary:
-            logger.debug(f"Подія '{summary}' пропущена, не є днем народження")
-            continue
-
-        name = extract_birthday_name(raw_summary)
+    for celebrant in celebrants:
+        raw_summary = celebrant["summary"]
+        name = celebrant["name"]
 
         logger.info(f"Знайдено день народження: {name}")
-        greeting = await generate_birthday_greeting(name, greeting_type)
-
-        dative_name = inflect_to_dative(name)
-        if (
-            name.lower() not in greeting.lower()
-            and dative_name.lower() not in greeting.lower()
-        ):
-            logger.warning(
-                f"⚠️ Згенероване привітання не містить імені для події '{raw_summary}' (id={event.get('id')}); повторюю запит"
-            )
-            fix_prompt = (
-                "Попередній текст привітання не містив імені іменинника. "
-                f"Створи новий варіант і обов'язково згадай {dative_name}. "
-                "Додай емоджі та хештеги. Завершуй текст крапкою або знаком оклику."
-            )
-            greeting = await generate_birthday_greeting(
-                name, greeting_type, prompt_override=fix_prompt
-            )
+        cached = (prepared or {}).get(celebrant["event_id"])
+        seed = f"{celebrant['event_id']}_{today.isoformat()}_{greeting_type}"
+        if cached:
+            # Заздалегідь згенеровані текст і зображення – лише надсилання
+            greeting, image_bytes = cached["text"], cached.get("image")
+        else:
+            if generate:
+                greeting = await generate_validated_greeting(
+                    name, greeting_type, source=f"'{raw_summary}' (id={celebrant['event_id']})"
+                )
+            else:
+                logger.warning(f"⚠️ Немає підготовленого привітання для {name}, використано шаблон")
+                greeting = fallback_birthday_greeting(name, greeting_type)
+            image_bytes = await render_birthday_image(name, seed, greeting_type)
 
-        logger.info(f"Згенеровано вітання для {name}: {greeting}")
+        logger.info(f"Привітання для {name}: {greeting}")
 
-        image_bytes = None
-        if BIRTHDAY_IMAGE_ENABLED:
-            seed = f"{event.get('id', '')}_{today.isoformat()}_{greeting_type}"
-            image_bytes = create_birthday_image_bytes(name=name, seed=seed, greeting_type=greeting_type)
+        bot = limited_bot(context.bot)
+        # Зображення завантажується в Telegram один раз, далі – за file_id
+        image_key = content_key(image_bytes) if image_bytes else None
 
-        # Надсилаємо привітання в усі активні чати
-        for group_chat_id in active_group_chats:
+        async def _send_greeting(group_chat_id):
             try:
                 message = None
                 if image_bytes:
@@ -577,38 +670,60 @@ async def check_birthday_greetings(context: ContextTypes.DEFAULT_TYPE, force: bo
                     if caption:
                         send_kwargs["caption"] = caption
                         send_kwargs["parse_mode"] = ParseMode.MARKDOWN_V2
-                    message = await context.bot.send_photo(
-                        chat_id=int(group_chat_id),
-                        photo=image_bytes,
-                        **send_kwargs,
+
+                    async def _send_photo(photo):
+                        return await bot.send_photo(
+                            chat_id=int(group_chat_id),
+                            photo=photo,
+                            **send_kwargs,
+                        )
+
+                    message = await send_media(
+                        _send_photo, image_key, "photo", lambda: image_bytes
                     )
                     if message and not caption:
-                        await safe_send_markdown(
-                            context.bot,
-                            int(group_chat_id),
-                            greeting,
-                        )
+                        # Фото вже в чаті: збій тексту не повинен повторювати фото
+                        # чи позначати чат як недоставлений
+                        try:
+                            await safe_send_markdown(
+                                bot,
+                                int(group_chat_id),
+                                greeting,
+                                escaped=True,
+                            )
+                        except Exception as e:
+                            logger.warning(
+                                f"⚠️ Привітання для {name} у чат {group_chat_id} доставлено частково: "
+                                f"фото надіслано, текст – ні: {e}"
+                            )
+                            return message
                 else:
                     message = await safe_send_markdown(
-                        context.bot,
+                        bot,
                         int(group_chat_id),
                         greeting,
+                        escaped=True,
                     )
                 if message:
                     logger.info(
                         f"Надіслано {greeting_type} привітання для {name} у чат {group_chat_id}"
                     )
+                return message
             except Exception as e:
                 logger.error(f"❌ Помилка надсилання привітання з зображенням у чат {group_chat_id}: {e}")
-                await safe_send_markdown(
-                    context.bot,
+                return await safe_send_markdown(
+                    bot,
                     int(group_chat_id),
                     greeting,
+                    escaped=True,
                 )
 
+        # Надсилаємо привітання в усі активні чати
+        await fan_out(active_group_chats, _send_greeting, label="birthday_greeting")
+
         # Зберігаємо привітання для запису в базу
         greetings_to_save.append({
-            'event_id': event.get('id', 'unknown'),
+            'event_id': celebrant['event_id'],
             'date_sent': today.isoformat(),
             'greeting_type': greeting_type,
             'greeting_text': greeting
@@ -631,6 +746,36 @@ async def check_birthday_greetings(context: ContextTypes.DEFAULT_TYPE, force: bo
                     ),
                 )
         logger.info(f"✅ Збережено {len(greetings_to_save)} привітань у таблиці birthday_greetings")
+    return len(greetings_to_save)
+
+
+@quota_job("birthday_greetings", PRIORITY_USER)
+async def check_birthday_greetings(context: ContextTypes.DEFAULT_TYPE, force: bool = False):
+    """
+    Позапланова перевірка днів народження (використовується /force_birthday).
+    Планові вітання надсилає handlers.birthday_planner.
+    """
+    now = datetime.now(berlin_tz)
+    today = now.date()
+    current_hour = now.hour
+    greeting_type = 'morning' if current_hour < 12 else 'evening'
+
+    # Перевіряємо, чи нагадування вже було надіслане сьогодні для цього періоду
+    if birthday_greeting_sent(today, greeting_type) and not force:
+        logger.info(f"ℹ️ Нагадування про день народження вже надіслане ({greeting_type}) на {today}")
+        return
+
+    logger.info(f"⏰ Перевірка днів народження на {today} о {now.strftime('%H:%M')}")
+    events = get_today_events()
+    logger.info(f"Отримано {len(events)} подій на сьогодні: {[event['summary'] for event in events]}")
+
+    if not events:
+        logger.info("Сьогодні немає подій.")
+        return
+
+    await deliver_birthday_greetings(
+        context, find_birthday_celebrants(events), greeting_type, today
+    )
 
 async def cleanup_old_birthday_greetings(context: ContextTypes.DEFAULT_TYPE):
     with get_cursor() as cursor:
@@ -649,28 +794,16 @@ def schedule_cleanup(job_queue: JobQueue):
     logger.info("✅ Планування очищення старих записів birthday_greetings налаштовано.")
 
 def schedule_birthday_greetings(job_queue: JobQueue):
-    # Викликаємо перевірку при запуску
-    job_queue.run_once(startup_birthday_check, when=10)
+    """
+    Планує привітання з днем народження: іменинники визначаються раз на
+    добу, а надсилання – рівно о 9:00 і 20:00 (handlers.birthday_planner).
+    """
+    from handlers.birthday_planner import schedule_birthday_planner
 
-    # Плануємо перевірки на 9:00 і 20:00 щодня
-    job_queue.run_daily(
-        check_birthday_greetings,
-        time=time(hour=9, minute=0, tzinfo=berlin_tz),
-        days=(0, 1, 2, 3, 4, 5, 6)
-    )
-    job_queue.run_daily(
-        check_birthday_greetings,
-        time=time(hour=20, minute=0, tzinfo=berlin_tz),
-        days=(0, 1, 2, 3, 4, 5, 6)
-    )
-    job_queue.run_repeating(
-        check_birthday_greetings,
-        interval=timedelta(hours=4),
-        first=0,
-    )
+    schedule_birthday_planner(job_queue, first=10)
     # Додаємо очищення старих записів
     schedule_cleanup(job_queue)
-    logger.info("✅ Планування перевірок днів народження на 9:00 і 20:00 (з перевіркою при запуску) налаштовано.")
+    logger.info("✅ Планування привітань на 9:00 і 20:00 (з плануванням при запуску) налаштовано.")
 
 def create_birthday_greetings_table():
     with get_cursor() as cursor:
@@ -702,13 +835,12 @@ def schedule_event_reminders(
     job_queue: JobQueue, initial_delay: int = 10, daily_delay: int = 3600
 ):
     """
-    Планує завдання для перевірки годинних нагадувань.
+    Планує годинні нагадування (точні run_once через планувальник)
+    і щогодинну перевірку щоденного розкладу.
     """
-    job_queue.run_repeating(
-        send_event_reminders,
-        interval=600,  # 600 секунд = 10 хвилин
-        first=initial_delay,
-    )
+    from handlers.reminder_planner import schedule_reminder_planner
+
+    schedule_reminder_planner(job_queue, first=initial_delay)
     job_queue.run_repeating(
         send_daily_reminder,
         interval=3600,  # раз на годину
@@ -743,8 +875,10 @@ def generate_event_hash(event: dict, reminder_type: str) -> str:
 __all__ = [
     "schedule_event_reminders", "set_reminder", "unset_reminder", "send_daily_reminder",
     "startup_daily_reminder",
-    "send_event_reminders", "check_birthday_greetings", "schedule_birthday_greetings",
+    "send_event_reminders", "send_event_reminder", "check_birthday_greetings", "schedule_birthday_greetings",
     "create_birthday_greetings_table", "startup_birthday_check",
+    "find_birthday_celebrants", "birthday_greeting_sent", "deliver_birthday_greetings",
+    "generate_validated_greeting", "fallback_birthday_greeting", "render_birthday_image",
     "cleanup_old_birthday_greetings", "schedule_cleanup",
     "inflect_to_dative",
 ]
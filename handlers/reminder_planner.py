@@ -0,0 +1,256 @@
+"""
+Планувальник годинних нагадувань.
+
+Замість опитування календаря кожні 10 хвилин планувальник раз на
+PLAN_SYNC_INTERVAL синхронізує дзеркало подій і ставить точні run_once
+завдання на «початок − 60 хв». Стан плану зберігається в таблиці
+reminder_plan і відновлюється після перезапуску.
+"""
+import json
+from datetime import datetime, timedelta
+
+from telegram.ext import ContextTypes, JobQueue
+
+from database import get_cursor
+from handlers.reminder_handler import (
+    _event_start,
+    berlin_tz,
+    generate_event_hash,
+    send_event_reminder,
+)
+from utils.calendar_utils import get_calendar_events_cached
+from utils.logger import logger
+from utils.quota import quota_job
+
+REMINDER_LEAD = timedelta(minutes=60)
+PLAN_SYNC_INTERVAL = 1800
+PLAN_HORIZON = timedelta(hours=26)
+JOB_PREFIX = "event_reminder:"
+
+STATUS_SCHEDULED = "scheduled"
+STATUS_SENT = "sent"
+STATUS_CANCELLED = "cancelled"
+
+
+def create_reminder_plan_table():
+    with get_cursor() as cursor:
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS reminder_plan (
+                event_id TEXT PRIMARY KEY,
+                fire_at TEXT NOT NULL,
+                start_at TEXT NOT NULL,
+                signature TEXT NOT NULL,
+                status TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+            """
+        )
+    logger.info("✅ Таблиця reminder_plan створена або вже існує.")
+
+
+def _load_plan() -> dict[str, dict]:
+    with get_cursor() as cursor:
+        cursor.execute(
+            "SELECT event_id, fire_at, start_at, signature, status, payload FROM reminder_plan"
+        )
+        rows = cursor.fetchall()
+    return {
+        row[0]: {
+            "fire_at": datetime.fromisoformat(row[1]),
+            "start_at": datetime.fromisoformat(row[2]),
+            "signature": row[3],
+            "status": row[4],
+            "payload": row[5],
+        }
+        for row in rows
+    }
+
+
+def _save_plan(event: dict, fire_at: datetime, start_at: datetime, signature: str):
+    with get_cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO reminder_plan (event_id, fire_at, start_at, signature, status, payload, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(event_id) DO UPDATE SET
+                fire_at = excluded.fire_at,
+                start_at = excluded.start_at,
+                signature = excluded.signature,
+                status = excluded.status,
+                payload = excluded.payload,
+                updated_at = excluded.updated_at
+            """,
+            (
+                event["id"],
+                fire_at.isoformat(),
+                start_at.isoformat(),
+                signature,
+                STATUS_SCHEDULED,
+                json.dumps(event, ensure_ascii=False),
+                datetime.now(berlin_tz).isoformat(),
+            ),
+        )
+
+
+def _set_status(event_id: str, status: str):
+    with get_cursor() as cursor:
+        cursor.execute(
+            "UPDATE reminder_plan SET status = ?, updated_at = ? WHERE event_id = ?",
+            (status, datetime.now(berlin_tz).isoformat(), event_id),
+        )
+
+
+def _job_name(event_id: str) -> str:
+    return f"{JOB_PREFIX}{event_id}"
+
+
+def _cancel_job(job_queue: JobQueue, event_id: str):
+    for job in job_queue.get_jobs_by_name(_job_name(event_id)):
+        job.schedule_removal()
+
+
+def _schedule_job(job_queue: JobQueue, event_id: str, fire_at: datetime, signature: str, now: datetime):
+    _cancel_job(job_queue, event_id)
+    # Якщо момент «за годину» вже минув (подію додали пізно) – надсилаємо одразу
+    when = max((fire_at - now).total_seconds(), 1)
+    job_queue.run_once(
+        fire_event_reminder,
+        when=when,
+        name=_job_name(event_id),
+        data={"event_id": event_id, "signature": signature},
+        job_kwargs={"misfire_grace_time": 600},
+    )
+
+
+def plan_reminders(job_queue: JobQueue, events: list, now: datetime | None = None) -> dict:
+    """
+    Reconcile the persisted plan and job queue with ``events``.
+    Returns counters of scheduled, rescheduled, kept and cancelled reminders.
+    """
+    now = now or datetime.now(berlin_tz)
+    horizon = now + PLAN_HORIZON
+    plan = _load_plan()
+    stats = {"scheduled": 0, "rescheduled": 0, "kept": 0, "cancelled": 0}
+
+    desired = {}
+    for event in events or []:
+        event_id = event.get("id")
+        # Події на весь день не мають часу початку – годинне нагадування не потрібне
+        if not event_id or "dateTime" not in (event.get("start") or {}):
+            continue
+        start_at = _event_start(event)
+        if start_at is None or not (now < start_at <= horizon):
+            continue
+        desired[event_id] = (event, start_at)
+
+    for event_id, (event, start_at) in desired.items():
+        signature = generate_event_hash(event, "hourly")
+        fire_at = start_at - REMINDER_LEAD
+        current = plan.get(event_id)
+        if current and current["signature"] == signature:
+            if current["status"] == STATUS_SENT:
+                continue
+            if current["status"] == STATUS_SCHEDULED and job_queue.get_jobs_by_name(_job_name(event_id)):
+                stats["kept"] += 1
+                continue
+        _save_plan(event, fire_at, start_at, signature)
+        _schedule_job(job_queue, event_id, fire_at, signature, now)
+        stats["rescheduled" if current else "scheduled"] += 1
+
+    # Порожня відповідь найчастіше означає збій API, а не порожній календар
+    if events:
+        for event_id, current in plan.items():
+            if current["status"] != STATUS_SCHEDULED or event_id in desired:
+                continue
+            if current["start_at"] > horizon:
+                continue
+            _cancel_job(job_queue, event_id)
+            _set_status(event_id, STATUS_CANCELLED)
+            stats["cancelled"] += 1
+
+    if any(stats[key] for key in ("scheduled", "rescheduled", "cancelled")):
+        logger.info(
+            "🗓️ План нагадувань: нових %d, перенесено %d, без змін %d, скасовано %d",
+            stats["scheduled"],
+            stats["rescheduled"],
+            stats["kept"],
+            stats["cancelled"],
+        )
+    return stats
+
+
+def restore_reminder_plan(job_queue: JobQueue, now: datetime | None = None) -> int:
+    """Re-create run_once jobs for scheduled reminders after a restart."""
+    now = now or datetime.now(berlin_tz)
+    restored = 0
+    for event_id, current in _load_plan().items():
+        if current["status"] != STATUS_SCHEDULED:
+            continue
+        if current["start_at"] <= now:
+            _set_status(event_id, STATUS_CANCELLED)
+            continue
+        _schedule_job(job_queue, event_id, current["fire_at"], current["signature"], now)
+        restored += 1
+    if restored:
+        logger.info(f"🔄 Відновлено {restored} запланованих нагадувань")
+    return restored
+
+
+async def fire_event_reminder(context: ContextTypes.DEFAULT_TYPE):
+    """run_once callback: send the reminder for one planned event."""
+    data = context.job.data or {}
+    event_id = data.get("event_id")
+    current = _load_plan().get(event_id)
+    if (
+        not current
+        or current["status"] != STATUS_SCHEDULED
+        or current["signature"] != data.get("signature")
+    ):
+        logger.debug(f"⏭️ Нагадування для {event_id} більше не актуальне")
+        return
+    event = json.loads(current["payload"])
+    try:
+        await send_event_reminder(context, event, start_dt=current["start_at"])
+    except Exception as e:
+        logger.error(f"❌ Помилка надсилання запланованого нагадування {event_id}: {e}")
+        return
+    _set_status(event_id, STATUS_SENT)
+
+
+@quota_job("reminder_planner")
+async def sync_reminder_plan(context: ContextTypes.DEFAULT_TYPE):
+    """Refresh the event mirror and reconcile the reminder plan."""
+    try:
+        events = get_calendar_events_cached(max_results=150, ttl=PLAN_SYNC_INTERVAL - 60)
+        plan_reminders(context.job_queue, events)
+    except Exception as e:
+        logger.error(f"❌ Помилка синхронізації плану нагадувань: {e}")
+
+
+async def cleanup_reminder_plan(context: ContextTypes.DEFAULT_TYPE):
+    cutoff = (datetime.now(berlin_tz) - timedelta(days=7)).isoformat()
+    with get_cursor() as cursor:
+        cursor.execute(
+            "DELETE FROM reminder_plan WHERE status != ? AND start_at < ?",
+            (STATUS_SCHEDULED, cutoff),
+        )
+
+
+def schedule_reminder_planner(job_queue: JobQueue, first: int = 10):
+    create_reminder_plan_table()
+    restore_reminder_plan(job_queue)
+    job_queue.run_repeating(sync_reminder_plan, interval=PLAN_SYNC_INTERVAL, first=first)
+    job_queue.run_repeating(cleanup_reminder_plan, interval=86400, first=3600)
+    logger.info("✅ Планувальник годинних нагадувань налаштовано.")
+
+
+__all__ = [
+    "create_reminder_plan_table",
+    "plan_reminders",
+    "restore_reminder_plan",
+    "fire_event_reminder",
+    "sync_reminder_plan",
+    "schedule_reminder_planner",
+]
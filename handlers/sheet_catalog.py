@@ -0,0 +1,300 @@
+"""
+Каталог нот: дзеркало папки Google Drive у таблиці sheets.
+
+Повна синхронізація проходить усі сторінки files.list, далі каталог
+оновлюється інкрементально через Drive Changes API від збереженого
+startPageToken. Читання каталогу (list_sheets, пошук нот) працюють
+лише з таблицею і до Drive не звертаються.
+"""
+import asyncio
+import os
+import time
+
+from google.oauth2 import service_account
+from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from telegram.ext import ContextTypes, JobQueue
+
+from config import GOOGLE_CREDENTIALS
+from database import get_cursor, get_value, set_value
+from utils.logger import logger
+from utils.sheet_index import sheet_index
+
+try:
+    from utils.quota import QuotaExceeded, charge_quota, quota_job
+except Exception:  # pragma: no cover - fallback for tests/minimal environments
+    class QuotaExceeded(Exception):
+        pass
+
+    def charge_quota(*args, **kwargs):
+        return 0
+
+    def quota_job(feature, priority=None):
+        return lambda func: func
+
+SCOPES = ["https://www.googleapis.com/auth/drive.readonly"]
+NOTY_FOLDER_ID = os.getenv(
+    "NOTY_FOLDER_ID", "1mLWk6qMDYJ9OtHJPjFA5gI_kTtoUsiIK"
+)  # Використовуємо значення з .env.new або дефолт
+PDF_MIME_TYPE = "application/pdf"
+FILE_FIELDS = "id, name, mimeType, parents, trashed, md5Checksum, modifiedTime, size"
+PAGE_SIZE = 1000
+SHEET_SYNC_INTERVAL = int(os.getenv("SHEET_SYNC_INTERVAL", "900"))
+CHANGES_TOKEN_KEY = "sheet_changes_page_token"
+# Версія каталогу переживає перезапуск, тож збережені курсори пошуку
+# можна звірити з нею навіть після рестарту бота
+CATALOG_VERSION_KEY = "sheet_catalog_version"
+# Коди, з якими Drive відхиляє застарілий або невідомий pageToken
+INVALID_TOKEN_STATUSES = (400, 404, 410)
+
+_UPSERT_SQL = """
+    INSERT OR REPLACE INTO sheets
+        (id, name, name_lower, category, md5_checksum, modified_time, size, synced_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def create_sheets_table():
+    with get_cursor() as cursor:
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sheets (
+                id TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                name_lower TEXT NOT NULL,
+                category TEXT NOT NULL,
+                md5_checksum TEXT,
+                modified_time TEXT,
+                size INTEGER NOT NULL DEFAULT 0,
+                synced_at REAL NOT NULL
+            )
+            """
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_sheets_category ON sheets (category, name_lower)"
+        )
+    logger.info("✅ Таблиця sheets створена або вже існує.")
+
+
+def drive_service():
+    credentials = service_account.Credentials.from_service_account_file(
+        GOOGLE_CREDENTIALS, scopes=SCOPES
+    )
+    return build("drive", "v3", credentials=credentials)
+
+
+def sheet_category(name: str) -> str:
+    # Категорія – перше слово назви (наприклад, «колядка», «гімн»)
+    parts = name.split()
+    return parts[0].lower() if parts else ""
+
+
+def _row(file: dict, now: float) -> tuple:
+    name = file["name"]
+    return (
+        file["id"],
+        name,
+        name.lower(),
+        sheet_category(name),
+        file.get("md5Checksum"),
+        file.get("modifiedTime"),
+        int(file.get("size") or 0),
+        now,
+    )
+
+
+def _fingerprint(row: tuple) -> tuple:
+    # (name, md5_checksum, modified_time, size) – усе, крім службових полів
+    return (row[1], row[4], row[5], row[6])
+
+
+def _stored_rows(cursor, file_ids: list[str]) -> dict[str, tuple]:
+    """Fingerprints of the catalog rows among ``file_ids``."""
+    stored = {}
+    # SQLite обмежує кількість параметрів у запиті
+    for start in range(0, len(file_ids), 500):
+        chunk = file_ids[start:start + 500]
+        cursor.execute(
+            "SELECT id, name, md5_checksum, modified_time, size FROM sheets "
+            f"WHERE id IN ({', '.join('?' * len(chunk))})",
+            chunk,
+        )
+        for sheet_id, *fingerprint in cursor.fetchall():
+            stored[sheet_id] = tuple(fingerprint)
+    return stored
+
+
+def _in_catalog(file: dict) -> bool:
+    return (
+        file.get("mimeType") == PDF_MIME_TYPE
+        and not file.get("trashed")
+        and NOTY_FOLDER_ID in (file.get("parents") or [])
+    )
+
+
+def catalog_size() -> int:
+    with get_cursor() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM sheets")
+        return cursor.fetchone()[0]
+
+
+def catalog_version() -> int:
+    """Persistent version of the catalog, changed on every sync that alters it."""
+    try:
+        return int(get_value(CATALOG_VERSION_KEY) or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _bump_catalog_version():
+    set_value(CATALOG_VERSION_KEY, str(time.time_ns()))
+
+
+def full_sync(service) -> int:
+    """Re-read the whole folder page by page and replace the table."""
+    # Токен беремо до переліку, щоб зміни під час обходу не загубилися
+    charge_quota("drive", "changes.getStartPageToken", feature="notes")
+    start_token = service.changes().getStartPageToken().execute()["startPageToken"]
+
+    query = f"mimeType='{PDF_MIME_TYPE}' and '{NOTY_FOLDER_ID}' in parents and trashed=false"
+    files, page_token, pages = [], None, 0
+    while True:
+        charge_quota("drive", "files.list", feature="notes")
+        response = (
+            service.files()
+            .list(
+                q=query,
+                fields=f"nextPageToken, files({FILE_FIELDS})",
+                pageSize=PAGE_SIZE,
+                pageToken=page_token,
+            )
+            .execute()
+        )
+        pages += 1
+        files.extend(response.get("files", []))
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            break
+
+    now = time.time()
+    with get_cursor() as cursor:
+        cursor.execute("DELETE FROM sheets")
+        cursor.executemany(_UPSERT_SQL, [_row(file, now) for file in files])
+    set_value(CHANGES_TOKEN_KEY, start_token)
+    _bump_catalog_version()
+    sheet_index.rebuild([{"id": file["id"], "name": file["name"]} for file in files])
+    logger.info(f"📚 Каталог нот синхронізовано повністю: {len(files)} файлів, сторінок: {pages}")
+    return len(files)
+
+
+def incremental_sync(service, token: str) -> int:
+    """Apply Drive changes since ``token``; returns the number of catalog rows changed."""
+    # Останній стан кожного файлу: dict з метаданими або None (видалити)
+    latest: dict[str, dict | None] = {}
+    page_token = token
+    while True:
+        charge_quota("drive", "changes.list", feature="notes")
+        response = (
+            service.changes()
+            .list(
+                pageToken=page_token,
+                spaces="drive",
+                pageSize=PAGE_SIZE,
+                fields=f"nextPageToken, newStartPageToken, changes(fileId, removed, file({FILE_FIELDS}))",
+            )
+            .execute()
+        )
+        for change in response.get("changes", []):
+            file = change.get("file") or {}
+            keep = not change.get("removed") and _in_catalog(file)
+            latest[change["fileId"]] = file if keep else None
+        if response.get("newStartPageToken"):
+            new_token = response["newStartPageToken"]
+            break
+        page_token = response["nextPageToken"]
+
+    now = time.time()
+    with get_cursor() as cursor:
+        stored = _stored_rows(cursor, list(latest))
+        # Видалення стосується лише файлів, які вже є в каталозі, а незмінені
+        # файли (перегляд, зірочка тощо) не переписуються
+        removed = [file_id for file_id, file in latest.items() if file is None and file_id in stored]
+        upserts = [
+            file
+            for file_id, file in latest.items()
+            if file is not None and stored.get(file_id) != _fingerprint(_row(file, now))
+        ]
+        cursor.executemany("DELETE FROM sheets WHERE id = ?", [(file_id,) for file_id in removed])
+        cursor.executemany(_UPSERT_SQL, [_row(file, now) for file in upserts])
+    set_value(CHANGES_TOKEN_KEY, new_token)
+    changed = len(removed) + len(upserts)
+    if not changed:
+        return 0
+    _bump_catalog_version()
+    if sheet_index.loaded:
+        sheet_index.apply(
+            [{"id": file["id"], "name": file["name"]} for file in upserts],
+            removed,
+        )
+    logger.info(f"📚 Каталог нот: застосовано змін – {changed}")
+    return changed
+
+
+def sync_sheet_catalog(force_full: bool = False) -> int:
+    """
+    Blocking sync: incremental when a changes token is stored and the table
+    is populated, full otherwise or when Drive rejects the token.
+    """
+    service = drive_service()
+    token = get_value(CHANGES_TOKEN_KEY)
+    if force_full or not token or not catalog_size():
+        return full_sync(service)
+    try:
+        return incremental_sync(service, token)
+    except HttpError as e:
+        status = getattr(getattr(e, "resp", None), "status", None)
+        if status not in INVALID_TOKEN_STATUSES:
+            raise
+        logger.warning(f"⚠️ Drive відхилив токен змін ({status}), виконуємо повну синхронізацію")
+        return full_sync(service)
+
+
+def load_catalog() -> dict[str, list[dict]]:
+    """Catalog grouped by category in the shape returned by list_sheets."""
+    with get_cursor() as cursor:
+        cursor.execute("SELECT id, name, category FROM sheets ORDER BY category, name_lower")
+        rows = cursor.fetchall()
+    categorized: dict[str, list[dict]] = {}
+    for sheet_id, name, category in rows:
+        categorized.setdefault(category, []).append({"id": sheet_id, "name": name})
+    return categorized
+
+
+@quota_job("notes")
+async def sync_sheet_catalog_job(context: ContextTypes.DEFAULT_TYPE):
+    try:
+        await asyncio.to_thread(sync_sheet_catalog)
+    except QuotaExceeded:
+        logger.info("⏳ Синхронізацію каталогу нот відкладено через квоту Drive")
+    except Exception as e:
+        logger.error(f"❌ Помилка синхронізації каталогу нот: {e}")
+
+
+def schedule_sheet_catalog(job_queue: JobQueue, first: int = 30):
+    create_sheets_table()
+    job_queue.run_repeating(sync_sheet_catalog_job, interval=SHEET_SYNC_INTERVAL, first=first)
+    logger.info("✅ Синхронізацію каталогу нот налаштовано.")
+
+
+__all__ = [
+    "NOTY_FOLDER_ID",
+    "catalog_version",
+    "create_sheets_table",
+    "drive_service",
+    "full_sync",
+    "incremental_sync",
+    "sync_sheet_catalog",
+    "load_catalog",
+    "sync_sheet_catalog_job",
+    "schedule_sheet_catalog",
+]
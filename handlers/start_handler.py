@@ -68,6 +68,7 @@ from handlers.drive_utils import (
     send_sheet,
 )
 from handlers.notes_utils import search_notes
+from utils.sheet_index import sheet_index
 
 from .notes_menu import show_notes_menu, show_all_notes
 from .youtube_menu import (
@@ -268,23 +269,20 @@ async def text_menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if text.startswith("📃 "):
         sheet_name = text[2:].strip()
         logger.debug(f"Спроба завантажити ноту: {sheet_name}")
-        sheets = await list_sheets(update, context)
-        if not sheets:
-            await update.message.reply_text(
-                "❌ *Помилка з нотами 😕* Спробуй пізніше! ⬇️"
-            )
-            return
-        all_sheets = []
-        for category, items in sheets.items():
-            all_sheets.extend(items)
-        found = False
-        for sheet in all_sheets:
-            logger.debug(f"Порівнюємо з нотою: {sheet['name']}")
-            if sheet["name"] == sheet_name:  # Точне порівняння
-                await send_sheet(update, context, sheet["id"])
-                logger.info(f"✅ Вибрано ноту '{sheet_name}'")
-                found = True
+        if not sheet_index.loaded:
+            sheets = await list_sheets(update, context)
+            if not sheets:
+                await update.message.reply_text(
+                    "❌ *Помилка з нотами 😕* Спробуй пізніше! ⬇️"
+                )
                 return
+            if not sheet_index.loaded:
+                sheet_index.rebuild_from_catalog(sheets)
+        sheet_id = sheet_index.id_for_name(sheet_name)
+        if sheet_id:
+            await send_sheet(update, context, sheet_id)
+            logger.info(f"✅ Вибрано ноту '{sheet_name}'")
+            return
         await update.message.reply_text(
             f"❌ *Ноту '{sheet_name}' не знайдено 😔* Перевір назву чи вибери з клавіатури. ⬇️"
         )
@@ -630,12 +628,7 @@ async def text_menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 context.user_data["awaiting_keyword"] = True
                 logger.info("✅ Натиснуто кнопку '🔍 За ключовим словом'")
             elif text == "➡️ Ще результати" and chat_type == "private":
-                await search_notes(
-                    update,
-                    context,
-                    keyword=context.user_data.get("last_search_keyword"),
-                    next_page=True,
-                )
+                await search_notes(update, context, next_page=True)
                 logger.info("✅ Показано наступні результати пошуку нот")
             elif text == "🔙 Меню нот" and chat_type == "private":
                 await show_notes_menu(update, context)
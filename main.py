@@ -85,6 +85,7 @@ from handlers.knowledge_tools_handler import (
 )
 from handlers.admin_handler import (
     analytics_command,
+    quota_command,
     admin_menu_command,
     users_list_command,
     group_chats_list_command,
@@ -97,6 +98,15 @@ from handlers.admin_handler import (
     force_video_check_command,
 )
 from utils.analytics import Analytics
+from utils import close_openai_client
+from utils.quota import create_quota_table, flush_quota_job, quota
+from utils.rate_limit import create_rate_limit_table, flush_rate_limits_job, rate_limiter
+from utils.outbox import cleanup_outbox_job, create_outbox_table, drain_outbox_job
+from utils.media_registry import create_media_registry_table
+from handlers.sheet_catalog import create_sheets_table, schedule_sheet_catalog
+from utils.search_cursors import create_search_cursors_table
+from utils.assistant_history import create_assistant_turns_table, migrate_chat_history_blobs
+from utils.embedding_cache import create_query_embeddings_table, prewarm_query_embeddings_job
 from handlers.feedback_handler import get_feedback_handlers
 from utils.calendar_utils import (
     get_calendar_events,
@@ -246,6 +256,17 @@ async def main():
         logger.info("Використовуємо існуючу базу bot_data.db")
     migrate_database()
     migrate_sensitive_values_encryption()
+    create_quota_table()
+    quota.load()
+    create_rate_limit_table()
+    rate_limiter.load()
+    create_outbox_table()
+    create_media_registry_table()
+    create_sheets_table()
+    create_search_cursors_table()
+    create_assistant_turns_table()
+    migrate_chat_history_blobs()
+    create_query_embeddings_table()
 
     group_notifications = get_value("group_notifications_disabled")
     if group_notifications is None:
@@ -331,6 +352,7 @@ async def main():
         BotCommand("video_notifications_on", "Увімкнути сповіщення про відео"),
         BotCommand("video_notifications_off", "Вимкнути сповіщення про відео"),
         BotCommand("analytics", "Аналітика (адмін)"),
+        BotCommand("quota", "Квота Google API (адмін)"),
         BotCommand("admin_menu", "Меню адміністратора"),
         BotCommand("users_list", "Список користувачів (адмін)"),
         BotCommand("group_chats_list", "Список груп (адмін)"),
@@ -348,6 +370,7 @@ async def main():
         BotCommand("start", "Запустити бота"),
         BotCommand("admin_menu", "Меню адміністратора"),
         BotCommand("analytics", "Аналітика"),
+        BotCommand("quota", "Квота Google API"),
         BotCommand("users_list", "Список користувачів"),
         BotCommand("group_chats_list", "Список груп"),
         BotCommand("delete_messages", "Видалити повідомлення"),
@@ -477,6 +500,7 @@ async def main():
         CommandHandler(
             "analytics", analytics_command, filters=filters.ChatType.PRIVATE
         ),
+        CommandHandler("quota", quota_command, filters=filters.ChatType.PRIVATE),
         CommandHandler(
             "admin_menu", admin_menu_command, filters=filters.ChatType.PRIVATE
         ),
@@ -539,15 +563,31 @@ async def main():
     job_queue.run_once(check_and_notify_new_videos, when=45)
     job_queue.run_repeating(check_and_notify_new_videos, interval=1800, first=1800)
     job_queue.run_repeating(cleanup_group_index_job, interval=86400, first=300)
+    # Embedding-и найчастіших запитів асистента – до того, як їх спитають
+    job_queue.run_repeating(prewarm_query_embeddings_job, interval=86400, first=120)
     job_queue.run_repeating(weekly_digest_job, interval=604800, first=3600)
+    job_queue.run_repeating(flush_quota_job, interval=60, first=60)
+    job_queue.run_repeating(flush_rate_limits_job, interval=60, first=60)
+    # Outbox: дочищаємо розсилки, перервані перезапуском, і повторюємо невдалі
+    job_queue.run_repeating(drain_outbox_job, interval=30, first=20)
+    job_queue.run_repeating(cleanup_outbox_job, interval=86400, first=900)
+    # Каталог нот: повна синхронізація один раз, далі – зміни з Drive
+    schedule_sheet_catalog(job_queue, first=30)
 
     create_birthday_greetings_table()
     schedule_birthday_greetings(job_queue)
 
-    await application.run_polling(
-        allowed_updates=Update.ALL_TYPES,
-        drop_pending_updates=False,
-    )
+    try:
+        await application.run_polling(
+            allowed_updates=Update.ALL_TYPES,
+            drop_pending_updates=False,
+        )
+    finally:
+        # Спершу зберігаємо ліміти й облік квоти, щоб збій закриття клієнта їх не втратив
+        rate_limiter.flush()
+        quota.flush()
+        # Закриваємо пул з'єднань OpenAI разом із ботом
+        await close_openai_client()
     logger.info("Бот запущено успішно!")
 
 
@@ -0,0 +1,79 @@
+"""
+Час рендеру святкового зображення: попередній підхід (градієнт по
+рядках, шрифт з диска на кожен виклик, PNG optimize=True) проти
+utils.birthday_image (градієнт Pillow, кеш шрифтів, дисковий кеш).
+
+    python scripts/bench_birthday_image.py --runs 10
+"""
+import argparse
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from PIL import Image, ImageDraw, ImageFont  # noqa: E402
+
+from utils import birthday_image  # noqa: E402
+from utils.disk_cache import DiskLRUCache  # noqa: E402
+
+SIZE = (1024, 576)
+
+
+def legacy_render(name: str) -> bytes:
+    """Гарячі місця попередньої версії: 576 draw.line, truetype і optimize=True."""
+    c1, c2 = birthday_image.GRADIENTS["morning"]
+    width, height = SIZE
+    img = Image.new("RGB", SIZE, c1)
+    draw = ImageDraw.Draw(img)
+    for y in range(height):
+        t = y / (height - 1)
+        color = tuple(int(a + (b - a) * t) for a, b in zip(c1, c2))
+        draw.line([(0, y), (width, y)], fill=color)
+    font_title = ImageFont.truetype(birthday_image.FONT_PATH, 64)
+    font_name = ImageFont.truetype(birthday_image.FONT_PATH, 56)
+    draw.text((100, 70), "З Днем народження!", font=font_title, fill=(255, 255, 255))
+    draw.text((100, 144), name, font=font_name, fill=(255, 255, 255))
+    buf = io.BytesIO()
+    img.save(buf, format="PNG", optimize=True)
+    return buf.getvalue()
+
+
+def timed(func, runs: int) -> tuple[float, int]:
+    samples, size = [], 0
+    for idx in range(runs):
+        started = time.perf_counter()
+        data = func(idx)
+        samples.append(time.perf_counter() - started)
+        size = len(data or b"")
+    return statistics.median(samples) * 1000, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        birthday_image.image_cache = DiskLRUCache(tmp, max_bytes=50 * 1024 * 1024, suffix=".png")
+        rows = [
+            ("до (legacy)", lambda i: legacy_render(f"Марія {i}")),
+            ("після, рендер", lambda i: birthday_image.create_birthday_image_bytes(
+                f"Марія {i}", seed=str(i), use_cache=False)),
+            ("після, промах кешу", lambda i: birthday_image.create_birthday_image_bytes(
+                f"Оксана {i}", seed=str(i))),
+            ("після, влучання", lambda i: birthday_image.create_birthday_image_bytes(
+                f"Оксана {i}", seed=str(i))),
+        ]
+        for label, func in rows:
+            median_ms, size = timed(func, args.runs)
+            print(f"{label:<20} медіана {median_ms:8.1f} мс  PNG {size / 1024:7.1f} КБ")
+        print(f"Кеш: {birthday_image.image_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
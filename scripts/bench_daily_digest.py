@@ -0,0 +1,123 @@
+"""
+Кількість викликів Bot API для щоденного нагадування: старий формат
+(заголовок + окреме повідомлення на кожну подію) проти дайджесту
+utils.daily_digest (одне повідомлення на отримувача).
+
+    python scripts/bench_daily_digest.py --recipients 300 --events 6
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import sys
+import time
+import types
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from telegram.helpers import escape_markdown  # noqa: E402
+
+from utils.daily_digest import render_daily_digest  # noqa: E402
+from utils.delivery import TelegramRateLimiter, fan_out, limited_bot  # noqa: E402
+
+TZ = datetime.timezone.utc
+
+
+class CountingBot:
+    """Рахує виклики send_message та обсяг тексту."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+        self.chars = 0
+
+    async def send_message(self, chat_id, text, **kwargs):
+        await asyncio.sleep(self.latency)
+        self.calls += 1
+        self.chars += len(text)
+        return types.SimpleNamespace(message_id=self.calls, chat_id=chat_id)
+
+
+def build_events(count: int) -> list[dict]:
+    return [
+        {
+            "id": f"event{i}",
+            "summary": f"Репетиція хору №{i}",
+            "location": "Kulturzentrum, Saal 2",
+            "start": {"dateTime": f"2024-01-01T{9 + i % 12:02d}:00:00Z"},
+            "htmlLink": f"https://calendar.google.com/event?eid={i}",
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def legacy_items(title: str, events: list[dict]) -> list[dict]:
+    """Попередній формат: заголовок і окреме повідомлення на подію."""
+    items = [{"text": f"*{escape_markdown(title, version=2)}*"}]
+    for event in events:
+        start = datetime.datetime.fromisoformat(event["start"]["dateTime"].replace("Z", "+00:00"))
+        text = f"📅 *{escape_markdown(event['summary'], version=2)}*"
+        text += f"\n🕒 Час: {escape_markdown(start.strftime('%H:%M'), version=2)}"
+        text += f"\n📍 Місце: {escape_markdown(event['location'], version=2)}"
+        items.append(
+            {
+                "text": text,
+                "buttons": [[{"text": "Деталі", "callback_data": f"event_{event['id']}"},
+                             {"text": "деталі в календарі", "url": event["htmlLink"]}]],
+            }
+        )
+    return items
+
+
+async def deliver(bot, recipients, items, rate):
+    bot_proxy = limited_bot(bot, TelegramRateLimiter(rate=rate))
+
+    async def send(chat_id):
+        message = None
+        for item in items:
+            message = await bot_proxy.send_message(chat_id=chat_id, text=item["text"])
+        return message
+
+    return await fan_out(recipients, send, label="bench_digest")
+
+
+def run(label, recipients, build, args):
+    started = time.perf_counter()
+    items = build()
+    render_time = time.perf_counter() - started
+    bot = CountingBot(args.latency)
+    started = time.perf_counter()
+    asyncio.run(deliver(bot, recipients, items, args.rate))
+    send_time = time.perf_counter() - started
+    print(
+        f"{label:<10} повідомлень на чат: {len(items):3d}  викликів API: {bot.calls:6d}  "
+        f"символів: {bot.chars:8d}  рендер: {render_time * 1000:6.2f} мс  доставка: {send_time:6.2f} с"
+    )
+    return bot.calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--recipients", type=int, default=100)
+    parser.add_argument("--events", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--rate", type=float, default=25)
+    args = parser.parse_args()
+
+    recipients = [str(100000 + i) for i in range(args.recipients)]
+    events = build_events(args.events)
+    title = f"🔔 Розклад подій на сьогодні – {len(events)} подій"
+
+    before = run("до", recipients, lambda: legacy_items(title, events), args)
+    after = run(
+        "після",
+        recipients,
+        lambda: render_daily_digest(title, events, TZ, callback_data=lambda e: f"event_{e['id']}"),
+        args,
+    )
+    print(f"Викликів API менше в {before / after:.1f} раза ({before} → {after})")
+
+
+if __name__ == "__main__":
+    main()
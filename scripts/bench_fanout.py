@@ -0,0 +1,88 @@
+"""
+Порівняння послідовної розсилки з utils.delivery.fan_out на фейковому боті.
+
+    python scripts/bench_fanout.py --recipients 200 --messages 3 --latency 0.15
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import types
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from utils.delivery import TelegramRateLimiter, fan_out, limited_bot  # noqa: E402
+
+
+class FakeBot:
+    """Імітує мережеву затримку Telegram Bot API."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.sent = 0
+
+    async def send_message(self, chat_id, text, **kwargs):
+        await asyncio.sleep(self.latency)
+        self.sent += 1
+        return types.SimpleNamespace(message_id=self.sent, chat_id=chat_id)
+
+
+def build_recipients(count: int, groups: int) -> list[str]:
+    private = [str(100000 + i) for i in range(count - groups)]
+    return [*(f"-100{i}" for i in range(groups)), *private]
+
+
+async def sequential(bot, recipients, messages):
+    for chat_id in recipients:
+        for idx in range(messages):
+            await bot.send_message(chat_id=chat_id, text=f"msg {idx}")
+
+
+async def concurrent(bot, recipients, messages, concurrency):
+    async def send(chat_id):
+        message = None
+        for idx in range(messages):
+            message = await bot.send_message(chat_id=chat_id, text=f"msg {idx}")
+        return message
+
+    return await fan_out(recipients, send, concurrency=concurrency, label="bench")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--recipients", type=int, default=100)
+    parser.add_argument("--groups", type=int, default=3)
+    parser.add_argument("--messages", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.15)
+    parser.add_argument("--rate", type=float, default=25)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    recipients = build_recipients(args.recipients, args.groups)
+    total = len(recipients) * args.messages
+
+    bot = FakeBot(args.latency)
+    started = time.perf_counter()
+    asyncio.run(sequential(bot, recipients, args.messages))
+    seq_time = time.perf_counter() - started
+
+    bot = FakeBot(args.latency)
+    limiter = TelegramRateLimiter(rate=args.rate)
+    started = time.perf_counter()
+    results = asyncio.run(
+        concurrent(limited_bot(bot, limiter), recipients, args.messages, args.concurrency)
+    )
+    fan_time = time.perf_counter() - started
+
+    ok = sum(1 for r in results if r.ok)
+    print(f"Повідомлень: {total} ({len(recipients)} отримувачів × {args.messages})")
+    print(f"Послідовно:  {seq_time:6.2f} с")
+    print(f"fan_out:     {fan_time:6.2f} с ({ok}/{len(results)} успішно)")
+    print(f"Мінімум при {args.rate:g} повід./с: {total / args.rate:6.2f} с")
+    print(f"Прискорення: ×{seq_time / fan_time:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Навантажувальний тест спільного клієнта OpenAI на фейковому транспорті.
+
+Усі запити йдуть через справжні ``call_openai_chat``/``call_openai_embedding``
+і пул httpx, але відповіді генерує utils.openai_fake без мережі.
+
+    python scripts/bench_openai_client.py --requests 200 --latency 0.2 --stream
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import openai  # noqa: E402
+
+from utils import (  # noqa: E402
+    call_openai_chat,
+    call_openai_embedding,
+    close_openai_client,
+    use_transport,
+)
+from utils.openai_client import OPENAI_CONCURRENCY  # noqa: E402
+from utils.openai_fake import FakeOpenAITransport  # noqa: E402
+
+
+async def run(requests: int, stream: bool, embeddings: bool):
+    latencies: list[float] = []
+
+    async def on_delta(text):
+        return None
+
+    async def one(idx):
+        started = time.perf_counter()
+        if embeddings and idx % 2:
+            await call_openai_embedding(f"запит {idx}")
+        else:
+            await call_openai_chat(
+                [{"role": "user", "content": f"питання {idx}"}],
+                on_delta=on_delta if stream else None,
+            )
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    await close_openai_client()
+    return elapsed, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--embeddings", action="store_true", help="чергувати chat і embeddings")
+    args = parser.parse_args()
+
+    openai.api_key = openai.api_key or "sk-fake"
+    transport = FakeOpenAITransport(latency=args.latency)
+    use_transport(transport)
+    elapsed, latencies = asyncio.run(run(args.requests, args.stream, args.embeddings))
+    use_transport(None)
+
+    latencies.sort()
+    p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+    print(f"Запитів:        {args.requests} (затримка {args.latency:g} с, потік: {args.stream})")
+    print(f"Загальний час:  {elapsed:6.2f} с ({args.requests / elapsed:.1f} запит/с)")
+    print(f"Медіана / p95:  {statistics.median(latencies):.3f} / {p95:.3f} с")
+    print(f"Одночасно:      {transport.peak} (ліміт OPENAI_CONCURRENCY={OPENAI_CONCURRENCY})")
+    print(f"Мінімум:        {args.requests / OPENAI_CONCURRENCY * args.latency:6.2f} с")
+
+
+if __name__ == "__main__":
+    main()
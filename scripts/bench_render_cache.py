@@ -0,0 +1,103 @@
+"""
+CPU і пам'ять на рендер розсилки: рендер і екранування для кожного
+отримувача проти спільного BroadcastPayload з utils.render_cache.
+
+    python scripts/bench_render_cache.py --recipients 500 --events 5
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from telegram.helpers import escape_markdown  # noqa: E402
+
+from utils.render_cache import (  # noqa: E402
+    BroadcastPayload,
+    RenderCache,
+    build_markup,
+    render_stats,
+    reset_render_stats,
+)
+
+
+def build_events(count: int) -> list[dict]:
+    return [
+        {
+            "id": f"event{i}",
+            "summary": f"Репетиція хору №{i} (зведена)",
+            "location": "Kulturzentrum, Saal 2",
+            "description": "Партії сопрано та альтів. Беріть ноти!",
+            "start": "18:30",
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def render(event: dict) -> tuple[str, list]:
+    text = (
+        f"{escape_markdown('🔔 Подія через годину!', version=2)}\n\n"
+        f"📅 *{escape_markdown(event['summary'], version=2)}*\n"
+        f"🕒 Час: {event['start']}\n"
+        f"📍 Місце: {escape_markdown(event['location'], version=2)}\n"
+        f"📝 Опис: {escape_markdown(event['description'], version=2)}\n"
+    )
+    buttons = [[{"text": "Деталі", "callback_data": f"event_{event['id']}"}]]
+    return text, buttons
+
+
+def per_recipient(events, recipients):
+    """Попередня схема: рендер, екранування, клавіатура і JSON для кожного чату."""
+    for event in events:
+        for _ in recipients:
+            text, buttons = render(event)
+            escape_markdown(text, version=2)
+            build_markup(buttons)
+            json.dumps({"text": text, "buttons": buttons}, ensure_ascii=False)
+
+
+def render_once(events, recipients):
+    cache = RenderCache()
+    for event in events:
+        for _ in recipients:
+            payload = cache.get(
+                f"hourly:{event['id']}",
+                lambda: BroadcastPayload(*render(event)),
+            )
+            payload.markup
+            payload.serialized()
+
+
+def measure(label, func, *args):
+    tracemalloc.start()
+    started = time.process_time()
+    func(*args)
+    cpu = time.process_time() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<16} CPU: {cpu * 1000:8.1f} мс  пік пам'яті: {peak / 1024:8.1f} КБ")
+    return cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--recipients", type=int, default=300)
+    parser.add_argument("--events", type=int, default=5)
+    args = parser.parse_args()
+
+    events = build_events(args.events)
+    recipients = [str(100000 + i) for i in range(args.recipients)]
+
+    before = measure("для кожного чату", per_recipient, events, recipients)
+    reset_render_stats()
+    after = measure("render once", render_once, events, recipients)
+    print(f"Лічильники: {render_stats()}")
+    print(f"CPU менше в {before / max(after, 1e-9):.1f} раза")
+
+
+if __name__ == "__main__":
+    main()
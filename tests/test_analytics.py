@@ -0,0 +1,54 @@
+import asyncio
+import importlib
+import json
+import os
+import sys
+import types
+from datetime import datetime, timedelta
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def stub_dependencies(monkeypatch):
+    utils_mod = types.ModuleType('utils')
+    utils_mod.__path__ = [os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils')]
+    monkeypatch.setitem(sys.modules, 'utils', utils_mod)
+    logger_mod = types.ModuleType('utils.logger')
+    logger_mod.logger = types.SimpleNamespace(
+        info=lambda *a, **kw: None,
+        warning=lambda *a, **kw: None,
+        error=lambda *a, **kw: None,
+        debug=lambda *a, **kw: None,
+    )
+    monkeypatch.setitem(sys.modules, 'utils.logger', logger_mod)
+    tg = types.ModuleType('telegram')
+    tg.helpers = types.ModuleType('telegram.helpers')
+    tg.helpers.escape_markdown = lambda text, version=1: text
+    monkeypatch.setitem(sys.modules, 'telegram', tg)
+    monkeypatch.setitem(sys.modules, 'telegram.helpers', tg.helpers)
+
+    values = {}
+    db_mod = types.ModuleType('database')
+    db_mod.get_value = values.get
+    db_mod.set_value = values.__setitem__
+    monkeypatch.setitem(sys.modules, 'database', db_mod)
+    monkeypatch.delitem(sys.modules, 'utils.analytics', raising=False)
+    return importlib.import_module('utils.analytics'), values
+
+
+def test_log_query_counts_normalized_queries_within_window(stub_dependencies):
+    module, values = stub_dependencies
+    old_day = (datetime.now() - timedelta(days=module.POPULAR_QUERIES_DAYS + 1)).strftime('%Y-%m-%d')
+    values['popular_queries'] = json.dumps({old_day: {'стара': 4}})
+    analytics = module.Analytics()
+
+    async def run():
+        await analytics.log_query('Коли  репетиція?')
+        await analytics.log_query('коли репетиція')
+        await analytics.log_query('?!')
+        return await analytics.get_popular_queries(days=module.POPULAR_QUERIES_DAYS)
+
+    assert asyncio.run(run()) == [('коли репетиція', 2)]
+    stored = json.loads(values['popular_queries'])
+    assert old_day not in stored
@@ -0,0 +1,90 @@
+import contextlib
+import importlib
+import json
+import os
+import sqlite3
+import sys
+import types
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def stub_dependencies(monkeypatch):
+    utils_mod = types.ModuleType('utils')
+    utils_mod.__path__ = [os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils')]
+    monkeypatch.setitem(sys.modules, 'utils', utils_mod)
+    logger_mod = types.ModuleType('utils.logger')
+    logger_mod.logger = types.SimpleNamespace(
+        info=lambda *a, **kw: None,
+        warning=lambda *a, **kw: None,
+        error=lambda *a, **kw: None,
+        debug=lambda *a, **kw: None,
+    )
+    monkeypatch.setitem(sys.modules, 'utils.logger', logger_mod)
+    config_mod = types.ModuleType('config')
+    config_mod.DB_ENCRYPTION_KEY = 'secret'
+    monkeypatch.setitem(sys.modules, 'config', config_mod)
+
+    conn = sqlite3.connect(':memory:', check_same_thread=False)
+    conn.execute('CREATE TABLE users (key TEXT PRIMARY KEY, value TEXT, updated_at TEXT)')
+
+    @contextlib.contextmanager
+    def get_cursor():
+        cursor = conn.cursor()
+        try:
+            yield cursor
+            conn.commit()
+        finally:
+            cursor.close()
+
+    db_mod = types.ModuleType('database')
+    db_mod.get_cursor = get_cursor
+    monkeypatch.setitem(sys.modules, 'database', db_mod)
+
+    for name in ('utils.assistant_history', 'utils.db_crypto'):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    module = importlib.import_module('utils.assistant_history')
+    module.create_assistant_turns_table()
+    return module, conn
+
+
+def test_turns_are_encrypted_per_row_trimmed_and_read_from_the_end(stub_dependencies):
+    module, conn = stub_dependencies
+    for i in range(5):
+        module.append_turns('u1', [
+            {'role': 'user', 'content': f'питання {i}'},
+            {'role': 'assistant', 'content': f'відповідь {i}'},
+        ], keep=6)
+    module.append_turns('u2', [{'role': 'user', 'content': 'інший'}], keep=6)
+
+    stored = [row[0] for row in conn.execute("SELECT content_enc FROM assistant_turns WHERE user_id = 'u1'")]
+    assert len(stored) == 6
+    assert all(value.startswith('encv1:') and 'питання' not in value for value in stored)
+
+    assert module.recent_turns('u1', 3) == [
+        {'role': 'assistant', 'content': 'відповідь 3'},
+        {'role': 'user', 'content': 'питання 4'},
+        {'role': 'assistant', 'content': 'відповідь 4'},
+    ]
+    assert module.recent_turns('u2', 3) == [{'role': 'user', 'content': 'інший'}]
+    assert module.recent_turns('u3', 3) == []
+    # Репліки, старші за вікно розмови, не повертаються
+    conn.execute("UPDATE assistant_turns SET ts = ts - 7200 WHERE user_id = 'u2'")
+    assert module.recent_turns('u2', 3, since=module.time.time() - module.ASSISTANT_HISTORY_WINDOW) == []
+
+
+def test_legacy_blobs_are_migrated(stub_dependencies):
+    module, conn = stub_dependencies
+    crypto = importlib.import_module('utils.db_crypto')
+    history = [{'role': 'user', 'content': 'привіт'}, {'role': 'assistant', 'content': 'вітаю'}]
+    conn.execute(
+        'INSERT INTO users (key, value) VALUES (?, ?)',
+        ('oberig_chat_history_42', crypto.encrypt_text(json.dumps(history), 'secret')),
+    )
+    conn.execute("INSERT INTO users (key, value) VALUES ('bot_users', '[]')")
+
+    assert module.migrate_chat_history_blobs() == 1
+    assert module.recent_turns('42', 5) == history
+    keys = [row[0] for row in conn.execute('SELECT key FROM users')]
+    assert keys == ['bot_users']
@@ -0,0 +1,132 @@
+import asyncio
+import importlib
+import sys
+import types
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def stub_dependencies(monkeypatch):
+    logged = []
+    logger_mod = types.ModuleType('utils.logger')
+    logger_mod.logger = types.SimpleNamespace(
+        info=logged.append,
+        warning=lambda *a, **kw: None,
+        error=lambda *a, **kw: None,
+        debug=lambda *a, **kw: None,
+    )
+    monkeypatch.setitem(sys.modules, 'utils.logger', logger_mod)
+
+    calls = []
+    state = {'statuses': [], 'busy': False}
+
+    def run(status, thread_id='t1'):
+        return types.SimpleNamespace(id='r1', thread_id=thread_id, status=status)
+
+    async def create_and_run(**kwargs):
+        calls.append(('create_and_run', kwargs))
+        return run('queued')
+
+    async def runs_create(**kwargs):
+        calls.append(('runs.create', kwargs))
+        if state['busy']:
+            raise OpenAIError('thread already has an active run')
+        return run('queued', kwargs['thread_id'])
+
+    async def retrieve(**kwargs):
+        calls.append(('retrieve', kwargs))
+        return run(state['statuses'].pop(0) if state['statuses'] else 'completed', kwargs['thread_id'])
+
+    async def cancel(**kwargs):
+        calls.append(('cancel', kwargs))
+
+    async def messages_list(**kwargs):
+        calls.append(('messages.list', kwargs))
+        text = types.SimpleNamespace(value=' Відповідь ')
+        return types.SimpleNamespace(data=[types.SimpleNamespace(content=[types.SimpleNamespace(text=text)])])
+
+    client = types.SimpleNamespace(
+        beta=types.SimpleNamespace(
+            threads=types.SimpleNamespace(
+                create_and_run=create_and_run,
+                runs=types.SimpleNamespace(create=runs_create, retrieve=retrieve, cancel=cancel),
+                messages=types.SimpleNamespace(list=messages_list),
+            )
+        )
+    )
+
+    class OpenAIError(Exception):
+        pass
+
+    openai_mod = types.ModuleType('openai')
+    openai_mod.api_key = 'sk-test'
+    openai_mod.OpenAIError = OpenAIError
+    openai_mod.AsyncOpenAI = lambda **kw: client
+    monkeypatch.setitem(sys.modules, 'openai', openai_mod)
+
+    httpx_mod = types.ModuleType('httpx')
+    httpx_mod.Timeout = lambda total, connect=None: total
+    httpx_mod.Limits = lambda **kw: kw
+    httpx_mod.AsyncClient = lambda **kw: kw
+    monkeypatch.setitem(sys.modules, 'httpx', httpx_mod)
+
+    monkeypatch.setenv('ASSISTANT_POLL_MIN', '0.01')
+    monkeypatch.setenv('ASSISTANT_POLL_MAX', '0.04')
+    for name in ('utils', 'utils.openai_client', 'utils.assistant_runner'):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    module = importlib.import_module('utils.assistant_runner')
+    return module, calls, state, logged, OpenAIError
+
+
+MESSAGES = [
+    {'role': 'system', 'content': 'Контекст'},
+    {'role': 'assistant', 'content': 'Попередня відповідь'},
+    {'role': 'user', 'content': 'Коли репетиція?'},
+]
+
+
+def test_new_thread_is_created_with_run_and_polled_adaptively(stub_dependencies):
+    module, calls, state, logged, _ = stub_dependencies
+    state['statuses'] = ['queued', 'in_progress', 'in_progress', 'in_progress', 'completed']
+
+    result = asyncio.run(module.run_assistant(MESSAGES, 'asst'))
+    assert result == 'Відповідь'
+
+    kinds = [kind for kind, _ in calls]
+    assert kinds == ['create_and_run'] + ['retrieve'] * 5 + ['messages.list']
+    thread = calls[0][1]['thread']
+    assert thread['messages'][0] == {'role': 'user', 'content': 'Контекст'}
+    assert len(thread['messages']) == 3
+    assert calls[-1][1]['run_id'] == 'r1' and calls[-1][1]['limit'] == 1
+    assert any('5 опитувань' in line and 'новий thread' in line for line in logged)
+    # Без thread_key нічого не запам'ятовуємо
+    assert module.assistant_threads.get('u1') is None
+
+
+def test_thread_reused_per_key_and_forgotten_after_error(stub_dependencies):
+    module, calls, state, logged, OpenAIError = stub_dependencies
+
+    asyncio.run(module.run_assistant(MESSAGES, 'asst', thread_key='u1'))
+    calls.clear()
+    asyncio.run(module.run_assistant(MESSAGES, 'asst', thread_key='u1'))
+
+    assert calls[0][0] == 'runs.create'
+    assert calls[0][1]['thread_id'] == 't1'
+    assert calls[0][1]['additional_instructions'] == 'Контекст'
+    assert calls[0][1]['additional_messages'] == [{'role': 'user', 'content': 'Коли репетиція?'}]
+    assert any('thread повторно' in line for line in logged)
+
+    state['busy'] = True
+    with pytest.raises(OpenAIError):
+        asyncio.run(module.run_assistant(MESSAGES, 'asst', thread_key='u1'))
+    assert module.assistant_threads.get('u1') is None
+
+
+def test_stuck_run_is_cancelled_after_deadline(stub_dependencies):
+    module, calls, state, _, _ = stub_dependencies
+    state['statuses'] = ['in_progress'] * 100
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(module.run_assistant(MESSAGES, 'asst', run_timeout=0.1))
+    assert calls[-1][0] == 'cancel'
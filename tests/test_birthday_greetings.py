@@ -1,4 +1,6 @@
+import os
 import importlib
+import re
 import sys
 import types
 import sqlite3
@@ -86,6 +88,7 @@ def stub_dependencies(monkeypatch):
     logger_mod.logger = types.SimpleNamespace(info=lambda *a, **kw: None, warning=lambda *a, **kw: None, error=lambda *a, **kw: None, debug=lambda *a, **kw: None)
     monkeypatch.setitem(sys.modules, 'utils.logger', logger_mod)
     utils_mod = types.ModuleType('utils')
+    utils_mod.__path__ = [os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils')]
     utils_mod.init_openai_api = lambda: None
     async def fake_call(*a, **kw):
         return 'Вітаємо!'
@@ -93,6 +96,8 @@ def stub_dependencies(monkeypatch):
     utils_mod.call_openai_assistant = fake_call
     utils_mod.get_openai_assistant_id = lambda: None
     monkeypatch.setitem(sys.modules, 'utils', utils_mod)
+    for name in ('utils.delivery', 'utils.outbox', 'utils.daily_digest', 'utils.render_cache', 'utils.media_registry'):
+        monkeypatch.delitem(sys.modules, name, raising=False)
 
     # in-memory database
     conn = sqlite3.connect(':memory:', check_same_thread=False)
@@ -266,3 +271,88 @@ def test_startup_birthday_check_runs_any_time(monkeypatch, stub_dependencies):
 
     run_mock.assert_awaited_once_with(context)
 
+
+
+def test_fallback_template_when_name_missing_twice(monkeypatch, stub_dependencies):
+    module = importlib.import_module('handlers.reminder_handler')
+    importlib.reload(module)
+
+    chat_mock = AsyncMock(side_effect=['Святкуємо разом!', 'Святкуємо знову!'])
+    monkeypatch.setattr(module, 'call_openai_chat', chat_mock)
+
+    greeting = asyncio.run(module.generate_validated_greeting('Марія', 'evening'))
+    assert chat_mock.await_count == 2
+    assert greeting == module.fallback_birthday_greeting('Марія', 'evening')
+    assert 'Марії' in greeting and '\\#ДеньНародження' in greeting
+
+
+def test_birthday_image_uploaded_once_then_sent_by_file_id(monkeypatch, stub_dependencies):
+    module = importlib.import_module('handlers.reminder_handler')
+    importlib.reload(module)
+
+    async def render(name, seed, greeting_type):
+        return b'png-bytes'
+
+    monkeypatch.setattr(module, 'render_birthday_image', render)
+    module.create_birthday_greetings_table()
+    sys.modules['utils.media_registry'].create_media_registry_table()
+
+    photos = []
+
+    async def send_photo(chat_id, photo, **kw):
+        photos.append(photo)
+        return types.SimpleNamespace(photo=[types.SimpleNamespace(file_id='AgAD', file_unique_id='u1')])
+
+    bot = types.SimpleNamespace(send_photo=send_photo, send_message=AsyncMock())
+    celebrants = [{'event_id': '1', 'name': 'Марія', 'summary': 'Марія – день народження'}]
+    prepared = {'1': {'text': 'Вітаємо, Марії!', 'image': b'png-bytes'}}
+    asyncio.run(module.deliver_birthday_greetings(
+        types.SimpleNamespace(bot=bot), celebrants, 'morning', datetime.date(2024, 1, 1),
+        chats=['100', '200', '300'], prepared=prepared,
+    ))
+
+    assert photos.count(b'png-bytes') == 1
+    assert photos.count('AgAD') == 2
+
+
+def test_photo_kept_when_long_text_fails(monkeypatch, stub_dependencies):
+    module = importlib.import_module('handlers.reminder_handler')
+    importlib.reload(module)
+    module.create_birthday_greetings_table()
+    sys.modules['utils.media_registry'].create_media_registry_table()
+
+    photos = []
+
+    async def send_photo(chat_id, photo, **kw):
+        photos.append(kw)
+        return types.SimpleNamespace(photo=[types.SimpleNamespace(file_id='AgAD', file_unique_id='u1')])
+
+    bot = types.SimpleNamespace(send_photo=send_photo, send_message=AsyncMock(side_effect=RuntimeError('flood')))
+    celebrants = [{'event_id': '1', 'name': 'Марія', 'summary': 'Марія – день народження'}]
+    # Задовгий для підпису текст іде окремим повідомленням після фото
+    prepared = {'1': {'text': 'Вітаємо, Марії! ' * 100, 'image': b'png-bytes'}}
+    asyncio.run(module.deliver_birthday_greetings(
+        types.SimpleNamespace(bot=bot), celebrants, 'morning', datetime.date(2024, 1, 1),
+        chats=['100'], prepared=prepared,
+    ))
+
+    # Фото без підпису надіслано один раз, текст не повторюється як «запасний» шлях
+    assert photos == [{}]
+    assert bot.send_message.await_count == 1
+
+
+def test_hyphenated_name_found_in_escaped_greeting(monkeypatch, stub_dependencies):
+    module = importlib.import_module('handlers.reminder_handler')
+    importlib.reload(module)
+    # Справжнє екранування MarkdownV2 замість заглушки
+    monkeypatch.setattr(
+        module, 'escape_markdown',
+        lambda text, version=None: re.sub(r'([_*\[\]()~`>#+\-=|{}.!\\])', r'\\\1', text),
+    )
+
+    chat_mock = AsyncMock(return_value='Вітаємо, Анна-Марія! Щастя й пісень.')
+    monkeypatch.setattr(module, 'call_openai_chat', chat_mock)
+
+    greeting = asyncio.run(module.generate_validated_greeting('Анна-Марія', 'evening'))
+    assert chat_mock.await_count == 1
+    assert 'Анна\\-Марія' in greeting
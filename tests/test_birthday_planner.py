@@ -0,0 +1,242 @@
+import asyncio
+import contextlib
+import datetime
+import importlib
+import os
+import sqlite3
+import sys
+import types
+
+import pytest
+
+NOW = datetime.datetime(2024, 1, 1, 0, 5, tzinfo=datetime.timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def stub_dependencies(monkeypatch):
+    tg = types.ModuleType('telegram')
+    tg.ext = types.ModuleType('telegram.ext')
+    tg.ext.JobQueue = object
+    tg.ext.ContextTypes = types.SimpleNamespace(DEFAULT_TYPE=object)
+    monkeypatch.setitem(sys.modules, 'telegram', tg)
+    monkeypatch.setitem(sys.modules, 'telegram.ext', tg.ext)
+
+    utils_mod = types.ModuleType('utils')
+    utils_mod.__path__ = [os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils')]
+    monkeypatch.setitem(sys.modules, 'utils', utils_mod)
+
+    logger_mod = types.ModuleType('utils.logger')
+    logger_mod.logger = types.SimpleNamespace(
+        info=lambda *a, **kw: None,
+        warning=lambda *a, **kw: None,
+        error=lambda *a, **kw: None,
+        debug=lambda *a, **kw: None,
+    )
+    monkeypatch.setitem(sys.modules, 'utils.logger', logger_mod)
+
+    quota_mod = types.ModuleType('utils.quota')
+    quota_mod.PRIORITY_USER = 'user'
+    quota_mod.quota_job = lambda feature, priority=None: (lambda func: func)
+    monkeypatch.setitem(sys.modules, 'utils.quota', quota_mod)
+
+    calendar_calls = []
+    events = [
+        {'id': 'm', 'summary': 'Марія – день народження', 'start': {'date': '2024-01-01'}},
+        {'id': 'o', 'summary': 'Олег – день народження', 'start': {'date': '2024-01-02'}},
+        {'id': 'r', 'summary': 'Репетиція', 'start': {'date': '2024-01-01'}},
+    ]
+    cal_mod = types.ModuleType('utils.calendar_utils')
+    cal_mod.get_upcoming_birthdays_cached = lambda *a, **kw: calendar_calls.append(1) or events
+    monkeypatch.setitem(sys.modules, 'utils.calendar_utils', cal_mod)
+
+    conn = sqlite3.connect(':memory:', check_same_thread=False)
+    conn.execute('CREATE TABLE birthday_greetings (date_sent TEXT, greeting_type TEXT)')
+
+    @contextlib.contextmanager
+    def get_cursor():
+        cursor = conn.cursor()
+        try:
+            yield cursor
+            conn.commit()
+        finally:
+            cursor.close()
+
+    db_mod = types.ModuleType('database')
+    db_mod.get_cursor = get_cursor
+    monkeypatch.setitem(sys.modules, 'database', db_mod)
+
+    delivered = []
+
+    generated = []
+
+    async def deliver(context, celebrants, greeting_type, today, chats=None, prepared=None, generate=True):
+        delivered.append((greeting_type, [c['name'] for c in celebrants]))
+        for c in celebrants:
+            assert not generate
+            if c['event_id'] in (prepared or {}):
+                generated.append(('sent', prepared[c['event_id']]['text'], prepared[c['event_id']]['image']))
+        conn.execute('INSERT INTO birthday_greetings VALUES (?, ?)', (today.isoformat(), greeting_type))
+        return len(celebrants)
+
+    def greeting_sent(day, greeting_type):
+        return conn.execute(
+            'SELECT 1 FROM birthday_greetings WHERE date_sent = ? AND greeting_type = ?',
+            (day.isoformat(), greeting_type),
+        ).fetchone() is not None
+
+    def event_start(event):
+        return datetime.datetime.strptime(event['start']['date'], '%Y-%m-%d').replace(
+            tzinfo=datetime.timezone.utc
+        )
+
+    rh_mod = types.ModuleType('handlers.reminder_handler')
+    rh_mod._event_start = event_start
+    rh_mod.berlin_tz = datetime.timezone.utc
+    rh_mod.birthday_greeting_sent = greeting_sent
+    rh_mod.deliver_birthday_greetings = deliver
+
+    async def generate_validated_greeting(name, greeting_type, source=''):
+        generated.append(('generated', name, greeting_type))
+        return f'Вітаємо, {name}! ({greeting_type})'
+
+    async def render_birthday_image(name, seed, greeting_type):
+        return seed.encode()
+
+    rh_mod.generate_validated_greeting = generate_validated_greeting
+    rh_mod.render_birthday_image = render_birthday_image
+    rh_mod.find_birthday_celebrants = lambda evs: [
+        {'event_id': e['id'], 'name': e['summary'].split(' ')[0], 'summary': e['summary']}
+        for e in evs
+        if 'день народження' in e['summary']
+    ]
+    monkeypatch.setitem(sys.modules, 'handlers.reminder_handler', rh_mod)
+    monkeypatch.delitem(sys.modules, 'handlers.birthday_planner', raising=False)
+
+    module = importlib.import_module('handlers.birthday_planner')
+    module.create_birthday_plan_table()
+    module.create_birthday_greeting_cache_table()
+
+    class FakeDT(datetime.datetime):
+        now_value = NOW
+
+        @classmethod
+        def now(cls, tz=None):
+            return cls.now_value
+
+    monkeypatch.setattr(module, 'datetime', FakeDT)
+    module.generated = generated
+    return module, FakeDT, calendar_calls, delivered
+
+
+class FakeJob:
+    def __init__(self, callback, when, name, data):
+        self.callback, self.when, self.name, self.data = callback, when, name, data
+
+
+class FakeJobQueue:
+    def __init__(self):
+        self.jobs = []
+
+    def run_once(self, callback, when, name=None, data=None, job_kwargs=None):
+        self.jobs.append(FakeJob(callback, when, name, data))
+
+    def get_jobs_by_name(self, name):
+        return [j for j in self.jobs if j.name == name]
+
+    def slot_jobs(self):
+        return [j for j in self.jobs if j.name]
+
+
+def test_plans_exactly_two_slots_once_per_day(stub_dependencies):
+    planner, _, calendar_calls, delivered = stub_dependencies
+    jq = FakeJobQueue()
+    context = types.SimpleNamespace(job_queue=jq)
+
+    asyncio.run(planner.refresh_birthday_plan(context))
+    assert [(j.name, j.when) for j in jq.slot_jobs()] == [
+        ('birthday_greeting:2024-01-01:morning', 8 * 3600 + 55 * 60),
+        ('birthday_greeting:2024-01-01:evening', 19 * 3600 + 55 * 60),
+    ]
+    # Повторне планування того ж дня – без календаря і нових завдань
+    asyncio.run(planner.refresh_birthday_plan(context))
+    assert len(calendar_calls) == 1 and len(jq.slot_jobs()) == 2
+
+    for job in jq.slot_jobs():
+        asyncio.run(job.callback(types.SimpleNamespace(job=job)))
+        asyncio.run(job.callback(types.SimpleNamespace(job=job)))
+    assert delivered == [('morning', ['Марія']), ('evening', ['Марія'])]
+
+
+def test_restart_reuses_persisted_plan(stub_dependencies):
+    planner, FakeDT, calendar_calls, delivered = stub_dependencies
+    jq = FakeJobQueue()
+    asyncio.run(planner.refresh_birthday_plan(types.SimpleNamespace(job_queue=jq)))
+    morning = jq.slot_jobs()[0]
+    asyncio.run(morning.callback(types.SimpleNamespace(job=morning)))
+
+    # Перезапуск о 14:00: пам'ять порожня, план читається з таблиці
+    planner._plan.clear()
+    FakeDT.now_value = datetime.datetime(2024, 1, 1, 14, 0, tzinfo=datetime.timezone.utc)
+    restarted = FakeJobQueue()
+    asyncio.run(planner.refresh_birthday_plan(types.SimpleNamespace(job_queue=restarted)))
+    assert len(calendar_calls) == 1
+    assert [(j.name, j.when) for j in restarted.slot_jobs()] == [('birthday_greeting:2024-01-01:evening', 6 * 3600)]
+    assert delivered == [('morning', ['Марія'])]
+
+
+def test_greetings_prepared_evening_before(stub_dependencies):
+    planner, FakeDT, calendar_calls, delivered = stub_dependencies
+    # Напередодні о 21:00 готуємо привітання на завтра
+    FakeDT.now_value = datetime.datetime(2023, 12, 31, 21, 0, tzinfo=datetime.timezone.utc)
+    asyncio.run(planner.pregenerate_birthday_greetings(types.SimpleNamespace(job=None)))
+    assert planner.generated == [
+        ('generated', 'Марія', 'morning'),
+        ('generated', 'Марія', 'evening'),
+    ]
+
+    FakeDT.now_value = NOW
+    jq = FakeJobQueue()
+    asyncio.run(planner.refresh_birthday_plan(types.SimpleNamespace(job_queue=jq)))
+    # Кеш повний – фонова підготовка не потрібна
+    assert [j for j in jq.jobs if j.name is None] == []
+    morning = jq.slot_jobs()[0]
+    asyncio.run(morning.callback(types.SimpleNamespace(job=morning)))
+    assert planner.generated[-1] == (
+        'sent', 'Вітаємо, Марія! (morning)', b'm_2024-01-01_morning'
+    )
+
+
+def test_restart_without_cache_prepares_in_background(stub_dependencies):
+    planner, _, _, _ = stub_dependencies
+    jq = FakeJobQueue()
+    asyncio.run(planner.refresh_birthday_plan(types.SimpleNamespace(job_queue=jq)))
+    pregen = [j for j in jq.jobs if j.name is None]
+    assert [j.data for j in pregen] == [{'date': '2024-01-01', 'slots': ['morning', 'evening']}]
+
+    asyncio.run(pregen[0].callback(types.SimpleNamespace(job=pregen[0])))
+    assert len(planner.load_prepared_greetings(datetime.date(2024, 1, 1), 'evening')) == 1
+
+
+def test_failed_calendar_fetch_is_retried_not_planned_empty(stub_dependencies, monkeypatch):
+    planner, _, _, _ = stub_dependencies
+    real_fetch = planner.get_upcoming_birthdays_cached
+
+    def failing(*a, **kw):
+        assert kw.get('strict')
+        raise RuntimeError('calendar down')
+
+    monkeypatch.setattr(planner, 'get_upcoming_birthdays_cached', failing)
+    jq = FakeJobQueue()
+    context = types.SimpleNamespace(job_queue=jq)
+    asyncio.run(planner.refresh_birthday_plan(context))
+    asyncio.run(planner.refresh_birthday_plan(context))
+    # Порожній план не збережено, повтор запланований один раз
+    assert planner._load_day(datetime.date(2024, 1, 1)) == {}
+    assert [(j.name, j.when) for j in jq.jobs] == [(planner.PLAN_RETRY_JOB, planner.PLAN_RETRY_SECONDS)]
+
+    monkeypatch.setattr(planner, 'get_upcoming_birthdays_cached', real_fetch)
+    asyncio.run(jq.jobs[0].callback(context))
+    assert {j.name for j in jq.jobs} >= {
+        'birthday_greeting:2024-01-01:morning',
+        'birthday_greeting:2024-01-01:evening',
+    }
@@ -103,6 +103,24 @@ def test_get_upcoming_birthdays(monkeypatch, stub_dependencies):
     assert len(events) == 1 and events[0]['summary'].startswith('Anna')
 
 
+def test_failed_birthday_fetch_is_not_cached(monkeypatch, stub_dependencies):
+    module = importlib.import_module('utils.calendar_utils')
+    importlib.reload(module)
+    store = {'up_birthdays_cache': '[{"summary": "Anna – день народження"}]', 'up_birthdays_cache_ts': '0'}
+    monkeypatch.setattr(module, 'get_value', store.get)
+    monkeypatch.setattr(module, 'set_value', store.__setitem__)
+
+    def broken_service():
+        raise RuntimeError('calendar down')
+
+    monkeypatch.setattr(module, '_get_calendar_service', broken_service)
+    with pytest.raises(RuntimeError):
+        module.get_upcoming_birthdays_cached(strict=True)
+    # Без strict – застарілий кеш, а не порожній список; кеш не перезаписано
+    assert len(module.get_upcoming_birthdays_cached()) == 1
+    assert store['up_birthdays_cache_ts'] == '0'
+
+
 def test_get_next_event(monkeypatch, stub_dependencies):
     events_container = stub_dependencies
     events_container[:] = [
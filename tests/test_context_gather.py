@@ -0,0 +1,72 @@
+import asyncio
+import importlib
+import os
+import sys
+import time
+import types
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def stub_dependencies(monkeypatch):
+    utils_mod = types.ModuleType('utils')
+    utils_mod.__path__ = [os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils')]
+    monkeypatch.setitem(sys.modules, 'utils', utils_mod)
+    messages = []
+    logger_mod = types.ModuleType('utils.logger')
+    logger_mod.logger = types.SimpleNamespace(
+        info=messages.append,
+        warning=messages.append,
+        error=messages.append,
+        debug=lambda *a, **kw: None,
+    )
+    monkeypatch.setitem(sys.modules, 'utils.logger', logger_mod)
+    monkeypatch.delitem(sys.modules, 'utils.context_gather', raising=False)
+    return importlib.import_module('utils.context_gather'), messages
+
+
+def test_sources_run_concurrently(stub_dependencies):
+    module, messages = stub_dependencies
+
+    def slow(value):
+        time.sleep(0.2)
+        return value
+
+    async def sheets():
+        await asyncio.sleep(0.2)
+        return {'гімн': []}
+
+    started = time.perf_counter()
+    result = asyncio.run(module.gather_sources([
+        module.source('events', lambda: slow([1])),
+        module.source('videos', lambda: slow('v')),
+        module.source('facts', lambda: slow(['f'])),
+        module.source('sheets', sheets),
+    ]))
+    assert time.perf_counter() - started < 0.5
+    assert result == {'events': [1], 'videos': 'v', 'facts': ['f'], 'sheets': {'гімн': []}}
+    assert any('events=' in m and 'sheets=' in m for m in messages)
+
+
+def test_late_and_failed_sources_use_defaults(stub_dependencies):
+    module, messages = stub_dependencies
+
+    def broken():
+        raise RuntimeError('calendar down')
+
+    async def run():
+        # asyncio.run чекає завершення потоку, тому час міряємо всередині
+        started = time.perf_counter()
+        result = await module.gather_sources([
+            module.source('insights', lambda: time.sleep(0.6) or 'late', 'fallback', timeout=0.1),
+            module.source('events', broken, []),
+            module.source('facts', lambda: ['f']),
+        ])
+        return result, time.perf_counter() - started
+
+    result, elapsed = asyncio.run(run())
+    assert elapsed < 0.4
+    assert result == {'insights': 'fallback', 'events': [], 'facts': ['f']}
+    assert any('insights' in m and 'таймаут' in m for m in messages)
+    assert any('calendar down' in m for m in messages)
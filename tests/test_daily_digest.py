@@ -0,0 +1,76 @@
+import datetime
+import importlib
+import os
+import sys
+import types
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def stub_dependencies(monkeypatch):
+    tg = types.ModuleType('telegram')
+    tg.helpers = types.ModuleType('telegram.helpers')
+
+    def fake_escape(text, version=None):
+        for ch in '\\_*[]()~`>#+-=|{}.!':
+            text = text.replace(ch, '\\' + ch)
+        return text
+
+    tg.helpers.escape_markdown = fake_escape
+    monkeypatch.setitem(sys.modules, 'telegram', tg)
+    monkeypatch.setitem(sys.modules, 'telegram.helpers', tg.helpers)
+
+    utils_mod = types.ModuleType('utils')
+    utils_mod.__path__ = [os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils')]
+    monkeypatch.setitem(sys.modules, 'utils', utils_mod)
+    monkeypatch.delitem(sys.modules, 'utils.daily_digest', raising=False)
+    return importlib.import_module('utils.daily_digest')
+
+
+def _event(idx, **extra):
+    event = {
+        'id': str(idx),
+        'summary': f'Репетиція {idx}',
+        'start': {'dateTime': f'2024-01-01T{8 + idx % 10:02d}:00:00Z'},
+    }
+    event.update(extra)
+    return event
+
+
+def test_all_events_in_one_message(stub_dependencies):
+    digest = stub_dependencies
+    events = [_event(i) for i in range(1, 7)]
+    events.append({'id': 'bd', 'summary': 'День народження', 'start': {'date': '2024-01-01'}})
+
+    items = digest.render_daily_digest(
+        'Розклад – 7 подій', events, datetime.timezone.utc,
+        callback_data=lambda e: f"event_{e['id']}", category='daily_reminder',
+    )
+    assert len(items) == 1
+    item = items[0]
+    assert item['kind'] == 'markdown_v2' and item['category'] == 'daily_reminder'
+    assert item['text'].startswith('*Розклад – 7 подій*')
+    assert '*1\\.* 🕒 *09:00* – Репетиція 1' in item['text']
+    assert '\\(весь день\\)' in item['text']
+    # Компактна клавіатура: по 4 кнопки в рядку
+    assert [len(row) for row in item['buttons']] == [4, 3]
+    assert item['buttons'][1][2] == {'text': 'ℹ️ 7', 'callback_data': 'event_bd'}
+
+
+def test_splits_only_at_telegram_limit(stub_dependencies):
+    digest = stub_dependencies
+    events = [_event(i, location='📍' * 150) for i in range(1, 41)]
+
+    items = digest.render_daily_digest('Розклад', events, datetime.timezone.utc,
+                                       callback_data=lambda e: e['id'])
+    assert len(items) > 1
+    assert all(digest.utf16_len(item['text']) <= digest.TELEGRAM_MESSAGE_LIMIT for item in items)
+    # Кожне повідомлення, крім останнього, заповнене майже до ліміту
+    block = digest.utf16_len(digest.render_event_line(1, events[0], datetime.timezone.utc))
+    for item in items[:-1]:
+        assert digest.utf16_len(item['text']) > digest.TELEGRAM_MESSAGE_LIMIT - block - 2
+    # Кнопки подій – у тому ж повідомленні, що й подія
+    ids = [b['callback_data'] for item in items for row in item['buttons'] for b in row]
+    assert ids == [str(i) for i in range(1, 41)]
+    assert items[1]['text'].startswith('*')
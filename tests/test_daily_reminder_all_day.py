@@ -1,3 +1,4 @@
+import os
 import importlib
 import types
 import sys
@@ -71,11 +72,14 @@ def stub_dependencies(monkeypatch):
     monkeypatch.setitem(sys.modules, 'utils.calendar_utils', cal_mod)
 
     utils_mod = types.ModuleType('utils')
+    utils_mod.__path__ = [os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils')]
     utils_mod.init_openai_api = lambda: None
     utils_mod.call_openai_chat = lambda *a, **kw: None
     utils_mod.call_openai_assistant = lambda *a, **kw: None
     utils_mod.get_openai_assistant_id = lambda: None
     monkeypatch.setitem(sys.modules, 'utils', utils_mod)
+    for name in ('utils.delivery', 'utils.outbox', 'utils.daily_digest', 'utils.render_cache', 'utils.media_registry'):
+        monkeypatch.delitem(sys.modules, name, raising=False)
 
     for var in ['TELEGRAM_TOKEN', 'GOOGLE_CREDENTIALS', 'CALENDAR_ID', 'YOUTUBE_API_KEY', 'OBERIG_PLAYLIST_ID']:
         monkeypatch.setenv(var, 'x')
@@ -106,9 +110,9 @@ def test_all_day_event_parsing(monkeypatch, stub_dependencies):
     import asyncio
     asyncio.run(module.send_daily_reminder(context))
 
-    assert context.bot.send_message.await_count == 2
-    header_args, header_kwargs = context.bot.send_message.await_args_list[0]
-    assert '1 подія' in header_kwargs['text']
-    args, kwargs = context.bot.send_message.await_args_list[1]
+    assert context.bot.send_message.await_count == 1
+    args, kwargs = context.bot.send_message.await_args_list[0]
+    assert '1 подія' in kwargs['text']
     assert '\\(весь день\\)' in kwargs['text']
+    assert '\\\\' not in kwargs['text']
     assert kwargs['parse_mode'] == tg.constants.ParseMode.MARKDOWN_V2
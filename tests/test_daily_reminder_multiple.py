@@ -1,3 +1,4 @@
+import os
 import importlib
 import types
 import sys
@@ -66,11 +67,14 @@ def stub_dependencies(monkeypatch):
     monkeypatch.setitem(sys.modules, 'utils.calendar_utils', cal_mod)
 
     utils_mod = types.ModuleType('utils')
+    utils_mod.__path__ = [os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils')]
     utils_mod.init_openai_api = lambda: None
     utils_mod.call_openai_chat = lambda *a, **kw: None
     utils_mod.call_openai_assistant = lambda *a, **kw: None
     utils_mod.get_openai_assistant_id = lambda: None
     monkeypatch.setitem(sys.modules, 'utils', utils_mod)
+    for name in ('utils.delivery', 'utils.outbox', 'utils.daily_digest', 'utils.render_cache', 'utils.media_registry'):
+        monkeypatch.delitem(sys.modules, name, raising=False)
 
     for var in ['TELEGRAM_TOKEN', 'GOOGLE_CREDENTIALS', 'CALENDAR_ID', 'YOUTUBE_API_KEY', 'OBERIG_PLAYLIST_ID']:
         monkeypatch.setenv(var, 'x')
@@ -99,8 +103,10 @@ def test_send_daily_reminder_sends_multiple(monkeypatch, stub_dependencies):
     import asyncio
     asyncio.run(module.send_daily_reminder(context))
 
-    assert context.bot.send_message.await_count == 3
-    header_args, header_kwargs = context.bot.send_message.await_args_list[0]
-    assert '2 події' in header_kwargs['text']
-    args0, kwargs0 = context.bot.send_message.await_args_list[1]
-    assert kwargs0['reply_markup'].inline_keyboard
+    # Усі події дня – в одному повідомленні з клавіатурою деталей
+    assert context.bot.send_message.await_count == 1
+    _, kwargs = context.bot.send_message.await_args_list[0]
+    assert '2 події' in kwargs['text']
+    assert 'E1' in kwargs['text'] and 'E2' in kwargs['text']
+    row = kwargs['reply_markup'].inline_keyboard[0]
+    assert [b.kw['callback_data'] for b in row] == ['event_s1', 'event_s2']
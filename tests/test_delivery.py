@@ -0,0 +1,96 @@
+import asyncio
+import importlib
+import os
+import sys
+import types
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def stub_dependencies(monkeypatch):
+    utils_mod = types.ModuleType('utils')
+    utils_mod.__path__ = [os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils')]
+    monkeypatch.setitem(sys.modules, 'utils', utils_mod)
+
+    logger_mod = types.ModuleType('utils.logger')
+    logger_mod.logger = types.SimpleNamespace(
+        info=lambda *a, **kw: None,
+        warning=lambda *a, **kw: None,
+        error=lambda *a, **kw: None,
+        debug=lambda *a, **kw: None,
+    )
+    monkeypatch.setitem(sys.modules, 'utils.logger', logger_mod)
+    monkeypatch.delitem(sys.modules, 'utils.delivery', raising=False)
+    return importlib.import_module('utils.delivery')
+
+
+def _fake_clock():
+    now = [0.0]
+
+    async def sleep(delay):
+        now[0] += delay
+
+    return now, (lambda: now[0]), sleep
+
+
+def test_group_and_global_limits(stub_dependencies):
+    delivery = stub_dependencies
+    now, clock, sleep = _fake_clock()
+    limiter = delivery.TelegramRateLimiter(rate=10, burst=1, clock=clock, sleep=sleep)
+
+    async def run():
+        moments = []
+        for _ in range(5):
+            await limiter.acquire(-100)
+            moments.append(round(now[0], 2))
+        return moments
+
+    # Група: 3 повідомлення одразу, далі не частіше ніж раз на 3 с
+    assert asyncio.run(run()) == [0.0, 0.1, 0.2, 3.0, 6.0]
+
+
+def test_retry_after_pauses_and_retries(stub_dependencies):
+    delivery = stub_dependencies
+    now, clock, sleep = _fake_clock()
+    limiter = delivery.TelegramRateLimiter(rate=100, burst=10, clock=clock, sleep=sleep)
+
+    class RetryAfter(Exception):
+        retry_after = 5
+
+    calls = []
+
+    class Bot:
+        async def send_message(self, chat_id, text):
+            calls.append(now[0])
+            if len(calls) == 1:
+                raise RetryAfter("flood")
+            return types.SimpleNamespace(message_id=1)
+
+    bot = delivery.limited_bot(Bot(), limiter)
+    message = asyncio.run(bot.send_message(chat_id=1, text='hi'))
+    assert message.message_id == 1
+    assert calls[0] == 0.0 and calls[1] >= 5.0
+    assert delivery.limited_bot(bot) is bot
+
+
+def test_fan_out_collects_results(stub_dependencies):
+    delivery = stub_dependencies
+    in_flight = [0, 0]
+
+    async def send(chat_id):
+        in_flight[0] += 1
+        in_flight[1] = max(in_flight[1], in_flight[0])
+        await asyncio.sleep(0.01)
+        in_flight[0] -= 1
+        if chat_id == 3:
+            raise RuntimeError('blocked')
+        if chat_id == 4:
+            return None
+        return types.SimpleNamespace(message_id=chat_id)
+
+    results = asyncio.run(delivery.fan_out([1, 2, 2, 3, 4, 5, 6], send, concurrency=2))
+    assert [r.chat_id for r in results] == [1, 2, 3, 4, 5, 6]
+    assert [r.ok for r in results] == [True, True, False, False, True, True]
+    assert results[2].error == 'blocked'
+    assert in_flight[1] == 2
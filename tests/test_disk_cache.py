@@ -0,0 +1,59 @@
+import importlib
+import os
+import sys
+import types
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def stub_dependencies(monkeypatch):
+    utils_mod = types.ModuleType('utils')
+    utils_mod.__path__ = [os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils')]
+    monkeypatch.setitem(sys.modules, 'utils', utils_mod)
+
+    logger_mod = types.ModuleType('utils.logger')
+    logger_mod.logger = types.SimpleNamespace(
+        info=lambda *a, **kw: None,
+        warning=lambda *a, **kw: None,
+        error=lambda *a, **kw: None,
+        debug=lambda *a, **kw: None,
+    )
+    monkeypatch.setitem(sys.modules, 'utils.logger', logger_mod)
+    monkeypatch.delitem(sys.modules, 'utils.disk_cache', raising=False)
+    return importlib.import_module('utils.disk_cache')
+
+
+def test_lru_eviction_by_size(stub_dependencies, tmp_path, monkeypatch):
+    disk_cache = stub_dependencies
+    clock = [1000.0]
+    monkeypatch.setattr(disk_cache.time, 'time', lambda: clock[0])
+    cache = disk_cache.DiskLRUCache(str(tmp_path / 'images'), max_bytes=25, suffix='.png')
+
+    assert cache.get('a') is None
+    for key in ('a', 'b'):
+        clock[0] += 1
+        cache.set(key, key.encode() * 10)
+    clock[0] += 1
+    assert cache.get('a') == b'a' * 10  # «a» тепер найсвіжіший
+
+    clock[0] += 1
+    cache.set('c', b'c' * 10)
+    assert cache.get('b') is None
+    assert cache.get('a') and cache.get('c')
+    assert cache.total_bytes() == 20
+    assert not [f for f in os.listdir(tmp_path / 'images') if f.startswith('.tmp')]
+
+    stats = cache.stats()
+    assert stats['entries'] == 2 and stats['hits'] == 3 and stats['misses'] == 2
+
+
+def test_index_rebuilt_from_disk(stub_dependencies, tmp_path):
+    disk_cache = stub_dependencies
+    directory = str(tmp_path / 'pdf')
+    disk_cache.DiskLRUCache(directory, max_bytes=1024).set('x', b'payload')
+
+    reopened = disk_cache.DiskLRUCache(directory, max_bytes=1024)
+    assert reopened.get('x') == b'payload'
+    reopened.discard('x')
+    assert reopened.get('x') is None and os.listdir(directory) == []
@@ -0,0 +1,241 @@
+import asyncio
+import contextlib
+import importlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+PDF = b'%PDF-' + b'x' * 5000
+
+
+@pytest.fixture(autouse=True)
+def stub_dependencies(monkeypatch, tmp_path):
+    tg = types.ModuleType('telegram')
+    tg.ext = types.ModuleType('telegram.ext')
+    tg.Update = object
+    tg.ext.ContextTypes = types.SimpleNamespace(DEFAULT_TYPE=object)
+    tg.ext.JobQueue = object
+
+    class InputFile:
+        def __init__(self, obj, filename=None, read_file_handle=True):
+            self.obj, self.filename, self.read_file_handle = obj, filename, read_file_handle
+
+    tg.InputFile = InputFile
+    monkeypatch.setitem(sys.modules, 'telegram', tg)
+    monkeypatch.setitem(sys.modules, 'telegram.ext', tg.ext)
+
+    ga_flow = types.ModuleType('google_auth_oauthlib.flow')
+    ga_flow.InstalledAppFlow = object
+    monkeypatch.setitem(sys.modules, 'google_auth_oauthlib.flow', ga_flow)
+    ga_req = types.ModuleType('google.auth.transport.requests')
+    ga_req.Request = object
+    monkeypatch.setitem(sys.modules, 'google.auth.transport.requests', ga_req)
+    ga_creds = types.ModuleType('google.oauth2.credentials')
+    ga_creds.Credentials = object
+    monkeypatch.setitem(sys.modules, 'google.oauth2.credentials', ga_creds)
+    sa_mod = types.ModuleType('google.oauth2.service_account')
+    sa_mod.Credentials = types.SimpleNamespace(from_service_account_file=lambda *a, **kw: object())
+    monkeypatch.setitem(sys.modules, 'google.oauth2.service_account', sa_mod)
+    google_mod = types.ModuleType('google')
+    oauth2_mod = types.ModuleType('google.oauth2')
+    oauth2_mod.service_account = sa_mod
+    google_mod.oauth2 = oauth2_mod
+    monkeypatch.setitem(sys.modules, 'google', google_mod)
+    monkeypatch.setitem(sys.modules, 'google.oauth2', oauth2_mod)
+    errors_mod = types.ModuleType('googleapiclient.errors')
+    errors_mod.HttpError = type('HttpError', (Exception,), {})
+    monkeypatch.setitem(sys.modules, 'googleapiclient.errors', errors_mod)
+
+    stats = {'active': 0, 'peak': 0, 'downloads': 0}
+    lock = threading.Lock()
+
+    class MediaIoBaseDownload:
+        def __init__(self, fd, request, chunksize=None):
+            self.fd, self.chunksize, self.offset = fd, chunksize, 0
+
+        def next_chunk(self):
+            with lock:
+                stats['active'] += 1
+                stats['peak'] = max(stats['peak'], stats['active'])
+            time.sleep(0.01)
+            chunk = PDF[self.offset:self.offset + 2048]
+            self.fd.write(chunk)
+            self.offset += len(chunk)
+            with lock:
+                stats['active'] -= 1
+            return None, self.offset >= len(PDF)
+
+    http_mod = types.ModuleType('googleapiclient.http')
+    http_mod.MediaIoBaseDownload = MediaIoBaseDownload
+    monkeypatch.setitem(sys.modules, 'googleapiclient.http', http_mod)
+
+    revisions = {'drive-1': 'md5-a'}
+
+    def get_media(fileId):
+        stats['downloads'] += 1
+        return object()
+
+    files = types.SimpleNamespace(
+        get=lambda fileId, fields=None: types.SimpleNamespace(
+            execute=lambda: {'name': 'Щедрик.pdf', 'md5Checksum': revisions[fileId]}
+        ),
+        get_media=get_media,
+    )
+    gapi = types.ModuleType('googleapiclient.discovery')
+    gapi.build = lambda *a, **kw: types.SimpleNamespace(files=lambda: files)
+    monkeypatch.setitem(sys.modules, 'googleapiclient.discovery', gapi)
+
+    utils_mod = types.ModuleType('utils')
+    utils_mod.__path__ = [os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils')]
+    monkeypatch.setitem(sys.modules, 'utils', utils_mod)
+    logger_mod = types.ModuleType('utils.logger')
+    logger_mod.logger = types.SimpleNamespace(
+        info=lambda *a, **kw: None,
+        warning=lambda *a, **kw: None,
+        error=lambda *a, **kw: None,
+        debug=lambda *a, **kw: None,
+    )
+    monkeypatch.setitem(sys.modules, 'utils.logger', logger_mod)
+
+    conn = sqlite3.connect(':memory:', check_same_thread=False)
+
+    @contextlib.contextmanager
+    def get_cursor():
+        cursor = conn.cursor()
+        try:
+            yield cursor
+            conn.commit()
+        finally:
+            cursor.close()
+
+    db_mod = types.ModuleType('database')
+    db_mod.get_cursor = get_cursor
+    db_mod.get_value = lambda *a, **kw: None
+    db_mod.set_value = lambda *a, **kw: None
+    db_mod.save_bot_message = lambda *a, **kw: None
+    monkeypatch.setitem(sys.modules, 'database', db_mod)
+    config_mod = types.ModuleType('config')
+    config_mod.GOOGLE_CREDENTIALS = 'x'
+    monkeypatch.setitem(sys.modules, 'config', config_mod)
+
+    monkeypatch.setenv('SHEET_CACHE_DIR', str(tmp_path / 'sheets'))
+    for name in ('handlers.drive_utils', 'handlers.sheet_catalog', 'utils.sheet_index', 'utils.media_registry',
+                 'utils.quota', 'utils.disk_cache', 'utils.sheet_cache'):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    module = importlib.import_module('handlers.drive_utils')
+    sys.modules['utils.media_registry'].create_media_registry_table()
+    return module, stats, revisions
+
+
+def test_concurrent_downloads_are_limited(stub_dependencies):
+    module, stats, _ = stub_dependencies
+    service = module.drive_service()
+
+    async def run():
+        module._download_semaphore = asyncio.Semaphore(2)
+        return await asyncio.gather(*(module.download_sheet(service, str(i)) for i in range(5)))
+
+    spools = asyncio.run(run())
+    assert stats['peak'] <= 2
+    assert all(spool.read() == PDF for spool in spools)
+    for spool in spools:
+        spool.close()
+
+
+def test_send_sheet_streams_file_then_reuses_file_id(stub_dependencies):
+    module, stats, _ = stub_dependencies
+    documents = []
+
+    async def send_document(chat_id, document, caption):
+        documents.append(document)
+        if not isinstance(document, str):
+            assert not document.read_file_handle
+            assert document.obj.read() == PDF
+        return types.SimpleNamespace(photo=None, document=types.SimpleNamespace(file_id='BQAD'))
+
+    async def reply_text(*a, **kw):
+        raise AssertionError(a)
+
+    update = types.SimpleNamespace(
+        effective_chat=types.SimpleNamespace(id=1),
+        message=types.SimpleNamespace(reply_text=reply_text),
+    )
+    context = types.SimpleNamespace(bot=types.SimpleNamespace(send_document=send_document))
+
+    asyncio.run(module.send_sheet(update, context, 'drive-1'))
+    asyncio.run(module.send_sheet(update, context, 'drive-1'))
+
+    assert stats['downloads'] == 1
+    assert documents[0].obj.closed and documents[1] == 'BQAD'
+
+
+def test_sheet_served_from_disk_cache_until_revision_changes(stub_dependencies):
+    module, stats, revisions = stub_dependencies
+    registry = sys.modules['utils.media_registry']
+    sheet_cache = sys.modules['utils.sheet_cache']
+    sent = []
+
+    async def send_document(chat_id, document, caption):
+        sent.append(document.obj.read())
+        return types.SimpleNamespace(photo=None, document=None)  # file_id не повертається
+
+    update = types.SimpleNamespace(effective_chat=types.SimpleNamespace(id=1), message=None)
+    context = types.SimpleNamespace(bot=types.SimpleNamespace(send_document=send_document))
+
+    asyncio.run(module.send_sheet(update, context, 'drive-1'))
+    asyncio.run(module.send_sheet(update, context, 'drive-1'))
+    assert registry.lookup(registry.drive_key('drive-1', 'md5-a')) is None
+    assert stats['downloads'] == 1 and sent == [PDF, PDF]
+    cache_stats = sheet_cache.sheet_cache_stats()
+    assert cache_stats['hits'] == 1 and cache_stats['bytes_saved'] == len(PDF)
+
+    revisions['drive-1'] = 'md5-b'
+    asyncio.run(module.send_sheet(update, context, 'drive-1'))
+    assert stats['downloads'] == 2
+    assert sheet_cache.sheet_cache.stats()['entries'] == 1
+    assert sheet_cache._load_index()['drive-1']['revision'] == 'md5-b'
+
+
+def test_only_stale_file_id_triggers_reupload(stub_dependencies):
+    registry = sys.modules['utils.media_registry']
+    key = registry.drive_key('drive-9', 'md5-a')
+    registry.remember(key, 'document', types.SimpleNamespace(photo=None, document=types.SimpleNamespace(file_id='OLD')))
+    errors = [registry.BadRequest('Bad Request: chat not found')]
+    uploads = []
+
+    async def send(payload):
+        if payload == 'OLD' and errors:
+            raise errors.pop(0)
+        uploads.append(payload)
+        return types.SimpleNamespace(photo=None, document=types.SimpleNamespace(file_id='NEW'))
+
+    # Помилка чату не скидає file_id і не вантажить файл знову
+    with pytest.raises(registry.BadRequest):
+        asyncio.run(registry.send_media(send, key, 'document', lambda: b'pdf'))
+    assert registry.lookup(key) == 'OLD' and uploads == []
+
+    errors.append(registry.BadRequest('Wrong file identifier/HTTP URL specified'))
+    asyncio.run(registry.send_media(send, key, 'document', lambda: b'pdf'))
+    assert uploads == [b'pdf'] and registry.lookup(key) == 'NEW'
+
+
+def test_small_spool_is_sent_as_bytes(stub_dependencies, monkeypatch):
+    module, stats, _ = stub_dependencies
+    monkeypatch.setattr(module, 'SHEET_CACHE_MAX_BYTES', 0)
+    documents = []
+
+    async def send_document(chat_id, document, caption):
+        documents.append(document)
+        return types.SimpleNamespace(photo=None, document=None)
+
+    update = types.SimpleNamespace(effective_chat=types.SimpleNamespace(id=1), message=None)
+    context = types.SimpleNamespace(bot=types.SimpleNamespace(send_document=send_document))
+    asyncio.run(module.send_sheet(update, context, 'drive-1'))
+
+    # Менший за поріг файл не виходить із пам'яті: мережевий шар отримує байти
+    assert stats['downloads'] == 1 and documents[0].obj == PDF
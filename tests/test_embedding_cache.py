@@ -0,0 +1,153 @@
+import asyncio
+import contextlib
+import importlib
+import os
+import sqlite3
+import sys
+import types
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def stub_dependencies(monkeypatch):
+    calls = []
+
+    async def call_openai_embedding(text, model='text-embedding-3-small', timeout=10):
+        calls.append(text)
+        await asyncio.sleep(0.01)
+        return [float(len(text)), 1.0]
+
+    utils_mod = types.ModuleType('utils')
+    utils_mod.__path__ = [os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils')]
+    utils_mod.call_openai_embedding = call_openai_embedding
+    monkeypatch.setitem(sys.modules, 'utils', utils_mod)
+    logger_mod = types.ModuleType('utils.logger')
+    logger_mod.logger = types.SimpleNamespace(
+        info=lambda *a, **kw: None,
+        warning=lambda *a, **kw: None,
+        error=lambda *a, **kw: None,
+        debug=lambda *a, **kw: None,
+    )
+    monkeypatch.setitem(sys.modules, 'utils.logger', logger_mod)
+
+    popular = []
+
+    class Analytics:
+        async def get_popular_queries(self, days=7, limit=10):
+            return popular[:limit]
+
+    analytics_mod = types.ModuleType('utils.analytics')
+    analytics_mod.Analytics = Analytics
+    analytics_mod.POPULAR_QUERIES_DAYS = 30
+    monkeypatch.setitem(sys.modules, 'utils.analytics', analytics_mod)
+
+    conn = sqlite3.connect(':memory:', check_same_thread=False)
+
+    @contextlib.contextmanager
+    def get_cursor():
+        cursor = conn.cursor()
+        try:
+            yield cursor
+            conn.commit()
+        finally:
+            cursor.close()
+
+    db_mod = types.ModuleType('database')
+    db_mod.get_cursor = get_cursor
+    monkeypatch.setitem(sys.modules, 'database', db_mod)
+    monkeypatch.setenv('ASSISTANT_EMBEDDING_CACHE_SIZE', '3')
+
+    def load():
+        for name in ('utils.embedding_cache', 'utils.sheet_index'):
+            monkeypatch.delitem(sys.modules, name, raising=False)
+        module = importlib.import_module('utils.embedding_cache')
+        module.create_query_embeddings_table()
+        return module
+
+    return load, calls, popular, conn
+
+
+def test_normalized_queries_share_one_embedding_across_restarts(stub_dependencies):
+    load, calls, _, conn = stub_dependencies
+    module = load()
+
+    async def ask():
+        first = await asyncio.gather(
+            module.get_query_embedding('Коли репетиція?'),
+            module.get_query_embedding('коли   РЕПЕТИЦІЯ'),
+        )
+        second = await module.get_query_embedding('Коли репетиція')
+        return first, second
+
+    first, second = asyncio.run(ask())
+    assert calls == ['Коли репетиція?']
+    assert first == [second, second]
+    stats = module.embedding_cache_stats()
+    assert stats['misses'] == 1 and stats['hits'] == 2
+
+    # Після перезапуску вектор береться з SQLite
+    module = load()
+    assert asyncio.run(module.get_query_embedding('коли репетиція')) == second
+    assert calls == ['Коли репетиція?']
+
+
+def test_lru_bound_and_prewarm_of_popular_queries(stub_dependencies):
+    load, calls, popular, conn = stub_dependencies
+    module = load()
+
+    async def fill():
+        for query in ('концерт', 'ноти', 'репетиція'):
+            await module.get_query_embedding(query)
+        await module.get_query_embedding('концерт')  # свіжий – не витісняється
+        await module.get_query_embedding('костюми')
+
+    asyncio.run(fill())
+    rows = {row[0] for row in conn.execute('SELECT query FROM query_embeddings')}
+    assert rows == {module.normalize(q) for q in ('концерт', 'репетиція', 'костюми')}
+    assert module.embedding_cache_stats()['entries'] == 3
+
+    calls.clear()
+    popular.extend([('концерт', 9), ('ноти', 5), ('', 3)])
+    assert asyncio.run(module.prewarm_query_embeddings()) == 1
+    assert calls == ['ноти']
+    assert 'прогріто: 1' in module.format_embedding_cache_report()
+
+
+def test_failed_lookup_releases_lock_and_hits_are_batched(stub_dependencies, monkeypatch):
+    load, calls, _, conn = stub_dependencies
+    module = load()
+
+    async def broken(text, model='text-embedding-3-small', timeout=10):
+        raise RuntimeError('offline')
+
+    original = module.call_openai_embedding
+    monkeypatch.setattr(module, 'call_openai_embedding', broken)
+    with pytest.raises(RuntimeError):
+        asyncio.run(module.get_query_embedding('концерт'))
+    assert module._locks == {}
+
+    monkeypatch.setattr(module, 'call_openai_embedding', original)
+    queries = ('концерт', 'ноти', 'костюми')
+
+    async def ask_all():
+        for query in queries:
+            await module.get_query_embedding(query)
+
+    asyncio.run(ask_all())
+    before = dict(conn.execute('SELECT query, last_used FROM query_embeddings').fetchall())
+    monkeypatch.setattr(module, 'TOUCH_BATCH', 3)
+
+    async def hits(batch):
+        for query in batch:
+            await module.get_query_embedding(query)
+
+    def stored():
+        return dict(conn.execute('SELECT query, last_used FROM query_embeddings').fetchall())
+
+    asyncio.run(hits(queries[:2]))
+    # Два влучання ще не записані в базу
+    assert stored() == before
+    asyncio.run(hits(queries[2:]))
+    assert all(stored()[key] > before[key] for key in before)
+    assert module._touched == {}
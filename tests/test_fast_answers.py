@@ -0,0 +1,127 @@
+import datetime
+import importlib
+import os
+import sys
+import types
+
+import pytest
+
+UPCOMING = [
+    {'summary': 'Репетиція хору', 'location': 'Planigerstraße 4', 'start': {'dateTime': '2030-03-05T19:00:00+00:00'}},
+    {'summary': 'Концерт у Майнці', 'location': 'Dom', 'start': {'dateTime': '2030-03-10T16:00:00+00:00'}},
+    {'summary': 'Виступ на ярмарку', 'location': '', 'start': {'dateTime': '2030-03-08T12:00:00+00:00'}},
+]
+PAST = [
+    {'summary': 'Виступ у Ніколаус кірше', 'location': 'Kirche', 'start': {'dateTime': '2030-02-20T18:00:00+00:00'}},
+    {'summary': 'Репетиція хору', 'location': '', 'start': {'dateTime': '2030-02-25T19:00:00+00:00'}},
+]
+
+
+def _matches(event, keyword):
+    return keyword.lower() in ' '.join([event.get('summary', ''), event.get('location', '')]).lower()
+
+
+@pytest.fixture(autouse=True)
+def stub_dependencies(monkeypatch):
+    calls = []
+    cal_mod = types.ModuleType('utils.calendar_utils')
+    cal_mod.BERLIN_TZ = datetime.timezone.utc
+
+    def get_next_event(keyword):
+        calls.append(('next', keyword))
+        found = sorted((e for e in UPCOMING if _matches(e, keyword)), key=lambda e: e['start']['dateTime'])
+        return found[0] if found else None
+
+    def get_last_event(keyword):
+        calls.append(('last', keyword))
+        found = [e for e in PAST if _matches(e, keyword)]
+        return found[0] if found else PAST[0]
+
+    def get_past_events_cached(max_results=50, ttl=300):
+        calls.append(('past_cached', max_results))
+        return PAST
+
+    def get_calendar_events_cached(max_results=150, ttl=300):
+        calls.append(('upcoming_cached', max_results))
+        return UPCOMING
+
+    cal_mod.get_next_event = get_next_event
+    cal_mod.get_last_event = get_last_event
+    cal_mod.get_past_events_cached = get_past_events_cached
+    cal_mod.get_calendar_events_cached = get_calendar_events_cached
+    cal_mod.count_events = lambda events: len(events or [])
+    monkeypatch.setitem(sys.modules, 'utils.calendar_utils', cal_mod)
+
+    utils_mod = types.ModuleType('utils')
+    utils_mod.__path__ = [os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils')]
+    monkeypatch.setitem(sys.modules, 'utils', utils_mod)
+    logger_mod = types.ModuleType('utils.logger')
+    logger_mod.logger = types.SimpleNamespace(
+        info=lambda *a, **kw: None,
+        warning=lambda *a, **kw: None,
+        error=lambda *a, **kw: None,
+        debug=lambda *a, **kw: None,
+    )
+    monkeypatch.setitem(sys.modules, 'utils.logger', logger_mod)
+    monkeypatch.delitem(sys.modules, 'utils.fast_answers', raising=False)
+    return importlib.import_module('utils.fast_answers'), calls
+
+
+def test_intents_are_recognized(stub_dependencies):
+    module, _ = stub_dependencies
+    assert module.parse_intent('Коли наступна репетиція?') == {'intent': 'next', 'kind': 'rehearsal'}
+    assert module.parse_intent('де концерт') == {'intent': 'where', 'kind': 'performance'}
+    assert module.parse_intent('коли був останній виступ')['intent'] == 'last'
+    count = module.parse_intent('скільки виступів цього року')
+    assert count['intent'] == 'count' and count['kind'] == 'performance'
+    # Відкриті питання йдуть до LLM
+    assert module.parse_intent('чому репетиція перенесена') is None
+    assert module.parse_intent('скільки виступів') is None
+    assert module.parse_intent('привіт, як справи') is None
+
+
+def test_schedule_questions_answered_without_llm(stub_dependencies, monkeypatch):
+    module, calls = stub_dependencies
+
+    class FakeDT(datetime.datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.datetime(2030, 3, 1, 12, 0, tzinfo=datetime.timezone.utc)
+
+    monkeypatch.setattr(module, 'datetime', FakeDT)
+
+    answer = module.fast_answer('коли наступна репетиція')
+    assert 'Репетиція хору' in answer and '05-03-2030' in answer and '19:00' in answer
+
+    # Виступ і концерт – один тип події, береться найближчий
+    answer = module.fast_answer('де наступний концерт?')
+    assert 'Виступ на ярмарку' in answer and 'місце ще не вказано' in answer
+
+    answer = module.fast_answer('коли була остання репетиція')
+    assert 'Репетиція хору' in answer and '25-02-2030' in answer
+
+    # Підрахунок – з кешованих списків подій, без окремого запиту до календаря
+    answer = module.fast_answer('скільки виступів цього року')
+    assert '3 виступи' in answer and 'у 2030 році' in answer.lower()
+    assert ('past_cached', module.PAST_EVENTS_LIMIT) in calls
+    assert module.fast_answer('скільки репетицій минулого року') is None
+
+    assert module.fast_answer('розкажи про історію хору') is None
+    assert module.fast_answer('коли наступний день народження') is None  # у календарі немає
+
+    stats = module.fast_answer_stats()
+    assert stats['questions'] == 7 and stats['hits'] == 4
+    assert stats['by_intent']['next:rehearsal'] == 1
+    assert 'без LLM: 4' in module.format_fast_answer_report()
+
+
+def test_count_skipped_when_cache_does_not_cover_period(stub_dependencies, monkeypatch):
+    module, _ = stub_dependencies
+    monkeypatch.setattr(module, 'PAST_EVENTS_LIMIT', 2)
+    period = (
+        datetime.datetime(2030, 1, 1, tzinfo=datetime.timezone.utc),
+        datetime.datetime(2031, 1, 1, tzinfo=datetime.timezone.utc),
+        'у 2030 році',
+    )
+    # Кеш минулих подій заповнений і починається з 20.02 – січень міг не потрапити
+    assert module.answer_intent({'intent': 'count', 'kind': 'performance', 'period': period}) is None
@@ -1,3 +1,4 @@
+import os
 import importlib
 import sys
 import types
@@ -58,11 +59,14 @@ def stub_dependencies(monkeypatch):
     logger_mod.logger = types.SimpleNamespace(info=lambda *a, **kw: None, warning=lambda *a, **kw: None, error=lambda *a, **kw: None, debug=lambda *a, **kw: None)
     monkeypatch.setitem(sys.modules, 'utils.logger', logger_mod)
     utils_mod = types.ModuleType('utils')
+    utils_mod.__path__ = [os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils')]
     utils_mod.init_openai_api = lambda: None
     utils_mod.call_openai_chat = lambda *a, **kw: None
     utils_mod.call_openai_assistant = lambda *a, **kw: None
     utils_mod.get_openai_assistant_id = lambda: None
     monkeypatch.setitem(sys.modules, 'utils', utils_mod)
+    for name in ('utils.delivery', 'utils.outbox', 'utils.daily_digest', 'utils.render_cache', 'utils.media_registry'):
+        monkeypatch.delitem(sys.modules, name, raising=False)
 
     conn = sqlite3.connect(':memory:', check_same_thread=False)
     conn.row_factory = sqlite3.Row
@@ -124,7 +128,7 @@ def test_force_daily_reminder_overrides(monkeypatch, stub_dependencies):
     import asyncio
     asyncio.run(module.send_daily_reminder(context, force=True))
 
-    assert context.bot.send_message.await_count == 2
+    assert context.bot.send_message.await_count == 1
 
 
 def test_force_hourly_reminder_overrides(monkeypatch, stub_dependencies):
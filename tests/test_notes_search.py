@@ -10,6 +10,7 @@ def stub_dependencies(monkeypatch):
     tg.ext = types.ModuleType('telegram.ext')
     tg.Update = object
     tg.ext.ContextTypes = types.SimpleNamespace(DEFAULT_TYPE=object)
+    tg.ext.JobQueue = object
     class KB:
         def __init__(self, *a, **k):
             pass
@@ -73,6 +74,7 @@ def stub_dependencies(monkeypatch):
     monkeypatch.setenv('CALENDAR_ID', 'x')
     monkeypatch.setenv('YOUTUBE_API_KEY', 'x')
     monkeypatch.setenv('OBERIG_PLAYLIST_ID', 'x')
+    monkeypatch.delitem(sys.modules, 'utils.sheet_index', raising=False)
 
 
 def test_search_notes(monkeypatch, stub_dependencies):
@@ -93,3 +95,33 @@ def test_search_notes(monkeypatch, stub_dependencies):
 
     results = asyncio.run(module.search_notes(update, context, keyword='Test'))
     assert results and results[0]['id'] == '1'
+
+
+def test_next_page_restarts_when_catalog_changed(monkeypatch, stub_dependencies):
+    module = importlib.import_module('handlers.notes_utils')
+    importlib.reload(module)
+
+    sheets = [{'name': f'Щедрик {i}', 'id': str(i)} for i in range(8)]
+    module.sheet_index.rebuild(sheets)
+    saved = {}
+    monkeypatch.setattr(module, 'search_cursors', types.SimpleNamespace(
+        get=lambda chat_id: {'query': 'щедрик', 'offset': 5, 'version': 1},
+        save=lambda chat_id, query, offset, version: saved.update(offset=offset, version=version),
+    ))
+    monkeypatch.setattr(module, 'catalog_version', lambda: 2)
+    monkeypatch.setattr(module, 'save_bot_message', lambda *a, **kw: None)
+
+    replies = []
+
+    class Msg:
+        text = '➡️ Ще результати'
+        async def reply_text(self, text, *a, **kw):
+            replies.append(text)
+            return types.SimpleNamespace(message_id=1)
+    update = types.SimpleNamespace(effective_chat=types.SimpleNamespace(id=1, type='private'), message=Msg())
+
+    results = asyncio.run(module.search_notes(update, types.SimpleNamespace(user_data={}), next_page=True))
+    # Застарілий зсув відкинуто: перша сторінка і повідомлення користувачу
+    assert [sheet['id'] for sheet in results] == ['0', '1', '2', '3', '4']
+    assert 'Каталог нот оновився' in replies[0]
+    assert saved == {'offset': 5, 'version': 2}
@@ -0,0 +1,142 @@
+import asyncio
+import importlib
+import sys
+import types
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def stub_dependencies(monkeypatch):
+    logger_mod = types.ModuleType('utils.logger')
+    logger_mod.logger = types.SimpleNamespace(
+        info=lambda *a, **kw: None,
+        warning=lambda *a, **kw: None,
+        error=lambda *a, **kw: None,
+        debug=lambda *a, **kw: None,
+    )
+    monkeypatch.setitem(sys.modules, 'utils.logger', logger_mod)
+
+    state = {'clients': [], 'active': 0, 'peak': 0, 'calls': []}
+
+    async def request(kind, kwargs):
+        state['calls'].append((kind, kwargs))
+        state['active'] += 1
+        state['peak'] = max(state['peak'], state['active'])
+        await asyncio.sleep(0.01)
+        state['active'] -= 1
+
+    async def chat_create(**kwargs):
+        await request('chat', kwargs)
+        return types.SimpleNamespace(
+            choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=' ok '))]
+        )
+
+    async def embeddings_create(**kwargs):
+        await request('embeddings', kwargs)
+        return types.SimpleNamespace(data=[types.SimpleNamespace(embedding=[0.1, 0.2])])
+
+    def async_openai(**kwargs):
+        client = types.SimpleNamespace(
+            options=kwargs,
+            chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=chat_create)),
+            embeddings=types.SimpleNamespace(create=embeddings_create),
+        )
+        state['clients'].append(client)
+        return client
+
+    openai_mod = types.ModuleType('openai')
+    openai_mod.api_key = 'sk-test'
+    openai_mod.OpenAIError = Exception
+    openai_mod.AsyncOpenAI = async_openai
+    monkeypatch.setitem(sys.modules, 'openai', openai_mod)
+
+    httpx_mod = types.ModuleType('httpx')
+    httpx_mod.Timeout = lambda total, connect=None: ('timeout', total, connect)
+    httpx_mod.Limits = lambda **kw: kw
+    httpx_mod.AsyncClient = lambda **kw: kw
+    monkeypatch.setitem(sys.modules, 'httpx', httpx_mod)
+
+    for name in ('utils', 'utils.openai_client', 'utils.assistant_runner'):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    monkeypatch.setenv('OPENAI_CONCURRENCY', '3')
+    utils_pkg = importlib.import_module('utils')
+    return utils_pkg, importlib.import_module('utils.openai_client'), state
+
+
+def test_one_pooled_client_and_bounded_concurrency(stub_dependencies):
+    utils_pkg, client_mod, state = stub_dependencies
+
+    async def run():
+        chats = [utils_pkg.call_openai_chat([{'role': 'user', 'content': str(i)}], timeout=7) for i in range(10)]
+        embeddings = [utils_pkg.call_openai_embedding(f'текст {i}') for i in range(5)]
+        return await asyncio.gather(*chats, *embeddings)
+
+    results = asyncio.run(run())
+    assert results[:10] == ['ok'] * 10
+    assert results[10:] == [[0.1, 0.2]] * 5
+    assert len(state['clients']) == 1
+    options = state['clients'][0].options
+    assert options['max_retries'] == 0 and options['api_key'] == 'sk-test'
+    assert options['http_client']['limits']['max_connections'] == client_mod.OPENAI_MAX_CONNECTIONS
+    assert state['peak'] == client_mod.OPENAI_CONCURRENCY == 3
+    # Таймаут передається в кожен запит; з'єднання обмежене окремо
+    chat_kwargs = next(kwargs for kind, kwargs in state['calls'] if kind == 'chat')
+    assert chat_kwargs['timeout'] == ('timeout', 7, min(client_mod.OPENAI_CONNECT_TIMEOUT, 7))
+
+
+def test_new_loop_or_transport_rebuilds_client(stub_dependencies):
+    utils_pkg, client_mod, state = stub_dependencies
+
+    async def ask():
+        return await utils_pkg.call_openai_chat([{'role': 'user', 'content': 'hi'}])
+
+    asyncio.run(ask())
+    asyncio.run(ask())
+    assert len(state['clients']) == 2
+
+    transport = object()
+    assert utils_pkg.use_transport(transport) is None
+    asyncio.run(ask())
+    assert state['clients'][-1].options['http_client']['transport'] is transport
+    assert utils_pkg.use_transport(None) is transport
+
+    async def close():
+        await ask()
+        state['clients'][-1].close = lambda: asyncio.sleep(0)
+        await utils_pkg.close_openai_client()
+        return client_mod._client
+
+    assert asyncio.run(close()) is None
+
+
+def test_llm_slot_is_released_during_retry_backoff(stub_dependencies, monkeypatch):
+    utils_pkg, client_mod, state = stub_dependencies
+    monkeypatch.setattr(client_mod, 'LLM_CONCURRENCY', 1)
+    finished = []
+
+    async def run():
+        client = client_mod.get_openai_client()
+        ok_create = client.chat.completions.create
+        failures = [RuntimeError('boom')]
+
+        async def flaky_create(**kwargs):
+            if kwargs['messages'][0]['content'] == 'flaky' and failures:
+                raise failures.pop()
+            return await ok_create(**kwargs)
+
+        client.chat.completions.create = flaky_create
+
+        async def ask(content):
+            result = await utils_pkg.call_openai_chat([{'role': 'user', 'content': content}])
+            finished.append(content)
+            return result
+
+        flaky = asyncio.create_task(ask('flaky'))
+        await asyncio.sleep(0.1)
+        # Поки flaky чекає повтору, єдиний слот вільний для інших
+        assert await asyncio.wait_for(ask('other'), 0.5) == 'ok'
+        assert await flaky == 'ok'
+
+    asyncio.run(run())
+    assert finished == ['other', 'flaky']
@@ -5,40 +5,60 @@ import asyncio
 
 import pytest
 
+async def _value(value):
+    return value
+
+
 @pytest.fixture(autouse=True)
 def stub_openai(monkeypatch):
     msg = types.SimpleNamespace(content='hi')
-    openai_mod = types.ModuleType('openai')
-    openai_mod.api_key = None
-    openai_mod.OpenAIError = Exception
-    openai_mod.chat = types.SimpleNamespace(
-        completions=types.SimpleNamespace(
-            create=lambda **kw: types.SimpleNamespace(
-                choices=[types.SimpleNamespace(message=msg)]
+    client = types.SimpleNamespace(
+        chat=types.SimpleNamespace(
+            completions=types.SimpleNamespace(
+                create=lambda **kw: _value(
+                    types.SimpleNamespace(choices=[types.SimpleNamespace(message=msg)])
+                )
             )
-        )
-    )
-    openai_mod.beta = types.SimpleNamespace(
-        threads=types.SimpleNamespace(
-            create=lambda: types.SimpleNamespace(id='t'),
-            messages=types.SimpleNamespace(
-                create=lambda **kw: None,
-                list=lambda **kw: types.SimpleNamespace(
-                    data=[
+        ),
+        beta=types.SimpleNamespace(
+            threads=types.SimpleNamespace(
+                create=lambda **kw: _value(types.SimpleNamespace(id='t')),
+                create_and_run=lambda **kw: _value(
+                    types.SimpleNamespace(id='r', thread_id='t', status='queued')
+                ),
+                messages=types.SimpleNamespace(
+                    create=lambda **kw: _value(None),
+                    list=lambda **kw: _value(
                         types.SimpleNamespace(
-                            content=[types.SimpleNamespace(text=types.SimpleNamespace(value='hi'))]
+                            data=[
+                                types.SimpleNamespace(
+                                    content=[types.SimpleNamespace(text=types.SimpleNamespace(value='hi'))]
+                                )
+                            ]
                         )
-                    ]
+                    ),
                 ),
-            ),
-            runs=types.SimpleNamespace(
-                create=lambda **kw: types.SimpleNamespace(id='r'),
-                retrieve=lambda **kw: types.SimpleNamespace(id='r', status='completed'),
-            ),
-        )
+                runs=types.SimpleNamespace(
+                    create=lambda **kw: _value(types.SimpleNamespace(id='r')),
+                    retrieve=lambda **kw: _value(types.SimpleNamespace(id='r', thread_id='t', status='completed')),
+                ),
+            )
+        ),
     )
+    openai_mod = types.ModuleType('openai')
+    openai_mod.api_key = None
+    openai_mod.OpenAIError = Exception
+    openai_mod.AsyncOpenAI = lambda **kw: client
     monkeypatch.setitem(sys.modules, 'openai', openai_mod)
 
+    httpx_mod = types.ModuleType('httpx')
+    httpx_mod.Timeout = lambda total, connect=None: (total, connect)
+    httpx_mod.Limits = lambda **kw: kw
+    httpx_mod.AsyncClient = lambda **kw: kw
+    monkeypatch.setitem(sys.modules, 'httpx', httpx_mod)
+    for name in ('utils.openai_client', 'utils.assistant_runner'):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+
 
 def test_call_openai_chat(stub_openai):
     utils = importlib.import_module('utils')
@@ -0,0 +1,189 @@
+import asyncio
+import contextlib
+import importlib
+import os
+import sqlite3
+import sys
+import types
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def stub_dependencies(monkeypatch):
+    tg = types.ModuleType('telegram')
+    tg.constants = types.ModuleType('telegram.constants')
+    tg.constants.ParseMode = types.SimpleNamespace(MARKDOWN_V2='markdown_v2')
+
+    class Btn:
+        def __init__(self, text, **kw):
+            self.text = text
+            self.kw = kw
+
+    class Markup:
+        def __init__(self, buttons):
+            self.inline_keyboard = buttons
+
+    tg.InlineKeyboardButton = Btn
+    tg.InlineKeyboardMarkup = Markup
+    monkeypatch.setitem(sys.modules, 'telegram', tg)
+    monkeypatch.setitem(sys.modules, 'telegram.constants', tg.constants)
+
+    utils_mod = types.ModuleType('utils')
+    utils_mod.__path__ = [os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils')]
+    monkeypatch.setitem(sys.modules, 'utils', utils_mod)
+
+    logger_mod = types.ModuleType('utils.logger')
+    logger_mod.logger = types.SimpleNamespace(
+        info=lambda *a, **kw: None,
+        warning=lambda *a, **kw: None,
+        error=lambda *a, **kw: None,
+        debug=lambda *a, **kw: None,
+    )
+    monkeypatch.setitem(sys.modules, 'utils.logger', logger_mod)
+
+    conn = sqlite3.connect(':memory:', check_same_thread=False)
+
+    @contextlib.contextmanager
+    def get_cursor():
+        cursor = conn.cursor()
+        try:
+            yield cursor
+            conn.commit()
+        finally:
+            cursor.close()
+
+    saved = []
+    db_mod = types.ModuleType('database')
+    db_mod.get_cursor = get_cursor
+    db_mod.save_bot_message = lambda *a: saved.append(a)
+    monkeypatch.setitem(sys.modules, 'database', db_mod)
+    for name in ('utils.delivery', 'utils.outbox', 'utils.daily_digest', 'utils.render_cache', 'utils.media_registry'):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+
+    module = importlib.import_module('utils.outbox')
+    module.create_outbox_table()
+    return module, conn, saved
+
+
+class FakeBot:
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if str(chat_id) in self.failing:
+            raise RuntimeError('network down')
+        self.sent.append((str(chat_id), text, kwargs))
+        return types.SimpleNamespace(message_id=len(self.sent))
+
+
+ITEMS = [
+    {'text': 'header', 'category': 'daily_reminder'},
+    {'text': 'event', 'buttons': [[{'text': 'Деталі', 'callback_data': 'event_1'}]]},
+]
+
+
+def _statuses(conn):
+    return dict(conn.execute('SELECT idempotency_key, status FROM outbox').fetchall())
+
+
+def test_broadcast_is_idempotent(stub_dependencies):
+    outbox, conn, saved = stub_dependencies
+    bot = FakeBot()
+
+    queued, results = asyncio.run(outbox.broadcast(bot, 'daily:1', ['1', '2'], ITEMS))
+    assert queued and all(r.ok for r in results)
+    assert len(bot.sent) == 4
+    assert bot.sent[1][2]['reply_markup'].inline_keyboard[0][0].kw == {'callback_data': 'event_1'}
+    assert [s[2] for s in saved] == ['daily_reminder', 'daily_reminder']
+
+    # Повторна постановка тієї ж партії нічого не надсилає
+    queued, results = asyncio.run(outbox.broadcast(bot, 'daily:1', ['1', '2'], ITEMS))
+    assert queued and results == []
+    assert len(bot.sent) == 4
+
+
+def test_resume_after_failure_without_duplicates(stub_dependencies, monkeypatch):
+    outbox, conn, _ = stub_dependencies
+    bot = FakeBot(failing={'2'})
+
+    asyncio.run(outbox.broadcast(bot, 'daily:2', ['1', '2'], ITEMS))
+    statuses = _statuses(conn)
+    assert statuses['daily:2:1:1'] == 'sent'
+    assert statuses['daily:2:2:0'] == 'pending'
+    assert statuses['daily:2:2:1'] == 'pending'
+    attempts, next_at = conn.execute(
+        "SELECT attempts, next_attempt_at FROM outbox WHERE idempotency_key = 'daily:2:2:0'"
+    ).fetchone()
+    assert attempts == 1
+
+    # "Перезапуск": новий бот, час повтору настав – дочищаємо лише чат 2
+    bot = FakeBot()
+    monkeypatch.setattr(outbox.time, 'time', lambda: next_at + 1)
+    asyncio.run(outbox.drain(bot))
+    assert [s[0] for s in bot.sent] == ['2', '2']
+    assert set(_statuses(conn).values()) == {'sent'}
+
+
+def test_dead_letter_after_max_attempts(stub_dependencies, monkeypatch):
+    outbox, conn, _ = stub_dependencies
+    monkeypatch.setattr(outbox, 'OUTBOX_MAX_ATTEMPTS', 2)
+    clock = [1000.0]
+    monkeypatch.setattr(outbox.time, 'time', lambda: clock[0])
+    bot = FakeBot(failing={'3'})
+
+    outbox.enqueue('video:x', ['3'], [{'text': 'new video'}])
+    asyncio.run(outbox.drain(bot))
+    clock[0] += outbox.OUTBOX_BACKOFF_MAX
+    asyncio.run(outbox.drain(bot))
+    assert _statuses(conn) == {'video:x:3:0': 'dead'}
+    assert outbox.outbox_stats() == {'dead': 1}
+
+
+def test_chat_order_kept_across_drains(stub_dependencies, monkeypatch):
+    outbox, conn, _ = stub_dependencies
+    clock = [1000.0]
+    monkeypatch.setattr(outbox.time, 'time', lambda: clock[0])
+
+    outbox.enqueue('video:a', ['5'], [{'text': 'перше'}])
+    asyncio.run(outbox.drain(FakeBot(failing={'5'})))
+    # Нова розсилка в той самий чат не обганяє рядок, що чекає повтору
+    outbox.enqueue('video:b', ['5', '6'], [{'text': 'друге'}])
+    bot = FakeBot()
+    asyncio.run(outbox.drain(bot))
+    assert [(s[0], s[1]) for s in bot.sent] == [('6', 'друге')]
+
+    clock[0] += outbox.OUTBOX_BACKOFF_BASE + 1
+    asyncio.run(outbox.drain(bot))
+    assert [(s[0], s[1]) for s in bot.sent[1:]] == [('5', 'перше'), ('5', 'друге')]
+    assert set(_statuses(conn).values()) == {'sent'}
+
+
+def test_payload_rendered_and_decoded_once(stub_dependencies):
+    outbox, conn, saved = stub_dependencies
+    render_cache = importlib.import_module('utils.render_cache')
+    render_cache.reset_render_stats()
+    calls = []
+
+    def render():
+        calls.append(1)
+        return render_cache.BroadcastPayload(
+            '*Подія* \\(весь день\\)',
+            buttons=[[{'text': 'Деталі', 'callback_data': 'event_1'}]],
+            category='hourly_reminder',
+        )
+
+    bot = FakeBot()
+    for batch in ('hourly:a', 'hourly:a:force'):
+        payload = render_cache.render_once('hourly:sig', render)
+        asyncio.run(outbox.broadcast(bot, batch, ['1', '2', '3'], [payload]))
+
+    assert len(calls) == 1
+    assert len(bot.sent) == 6
+    # Текст уже екранований – надсилається без повторного екранування
+    assert {s[1] for s in bot.sent} == {'*Подія* \\(весь день\\)'}
+    stats = render_cache.render_stats()
+    assert stats['renders'] == 1 and stats['hits'] == 1
+    assert stats['payload_decodes'] == 2 and stats['markup_builds'] == 2
+    assert len(saved) == 6
@@ -0,0 +1,169 @@
+import asyncio
+import importlib
+import sys
+import types
+
+import pytest
+
+
+class RetryAfter(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f'retry after {retry_after}')
+        self.retry_after = retry_after
+
+
+class BadRequest(Exception):
+    pass
+
+
+class FakeMessage:
+    def __init__(self, chat_type='private'):
+        self.chat = types.SimpleNamespace(type=chat_type)
+        self.sent = []
+        self.edits = []
+        self.fail_edits = []
+
+    async def reply_text(self, text):
+        message = FakeMessage()
+        message.edits = self.edits
+        message.fail_edits = self.fail_edits
+        self.sent.append(text)
+        return message
+
+    async def edit_text(self, text):
+        if self.fail_edits:
+            raise self.fail_edits.pop(0)
+        self.edits.append(text)
+
+
+@pytest.fixture(autouse=True)
+def stub_dependencies(monkeypatch):
+    tg = types.ModuleType('telegram')
+    tg.error = types.ModuleType('telegram.error')
+    tg.error.RetryAfter = RetryAfter
+    tg.error.BadRequest = BadRequest
+    monkeypatch.setitem(sys.modules, 'telegram', tg)
+    monkeypatch.setitem(sys.modules, 'telegram.error', tg.error)
+
+    logger_mod = types.ModuleType('utils.logger')
+    logger_mod.logger = types.SimpleNamespace(
+        info=lambda *a, **kw: None,
+        warning=lambda *a, **kw: None,
+        error=lambda *a, **kw: None,
+        debug=lambda *a, **kw: None,
+    )
+    monkeypatch.setitem(sys.modules, 'utils.logger', logger_mod)
+
+    calls = []
+
+    class Stream:
+        def __init__(self, parts):
+            self.parts = iter(parts)
+
+        def __aiter__(self):
+            return self
+
+        async def __anext__(self):
+            for part in self.parts:
+                return types.SimpleNamespace(choices=[types.SimpleNamespace(delta=types.SimpleNamespace(content=part))])
+            raise StopAsyncIteration
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        if kwargs.get('stream'):
+            if calls_fail_stream:
+                raise OpenAIError('stream broken')
+            return Stream(['При', 'віт, ', 'хор!'])
+        return types.SimpleNamespace(
+            choices=[types.SimpleNamespace(message=types.SimpleNamespace(content='Привіт без потоку'))]
+        )
+
+    class OpenAIError(Exception):
+        pass
+
+    calls_fail_stream = []
+    client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=create)))
+    openai_mod = types.ModuleType('openai')
+    openai_mod.api_key = None
+    openai_mod.OpenAIError = OpenAIError
+    openai_mod.AsyncOpenAI = lambda **kw: client
+    monkeypatch.setitem(sys.modules, 'openai', openai_mod)
+
+    httpx_mod = types.ModuleType('httpx')
+    httpx_mod.Timeout = lambda total, connect=None: (total, connect)
+    httpx_mod.Limits = lambda **kw: kw
+    httpx_mod.AsyncClient = lambda **kw: kw
+    monkeypatch.setitem(sys.modules, 'httpx', httpx_mod)
+
+    for name in ('utils', 'utils.openai_client', 'utils.assistant_runner', 'utils.progressive_reply'):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    utils_pkg = importlib.import_module('utils')
+    module = importlib.import_module('utils.progressive_reply')
+    return module, utils_pkg, calls, calls_fail_stream
+
+
+def test_edits_are_throttled_and_final_text_replaces_placeholder(stub_dependencies):
+    module, *_ = stub_dependencies
+    source = FakeMessage()
+
+    async def run():
+        reply = module.ProgressiveReply(source, interval=0.05)
+        await reply.start()
+        text = ''
+        for _ in range(40):
+            text += 'слово ' * 3
+            await reply.update(text)
+            await asyncio.sleep(0.01)
+        await reply.finish('Фінальна відповідь')
+        return reply
+
+    reply = asyncio.run(run())
+    assert source.sent == [module.STREAM_PLACEHOLDER]
+    # 40 оновлень за ~0.4 с при інтервалі 0.05 с – не більше десятка редагувань
+    assert 2 <= len(source.edits) <= 10
+    assert all(edit.endswith(module.STREAM_CURSOR) for edit in source.edits[:-1])
+    assert source.edits[-1] == 'Фінальна відповідь' and reply.edits == len(source.edits)
+
+
+def test_retry_after_postpones_edits_and_final_falls_back_to_new_message(stub_dependencies):
+    module, *_ = stub_dependencies
+    source = FakeMessage(chat_type='group')
+
+    async def run():
+        reply = module.ProgressiveReply(source, interval=0)
+        assert module.ProgressiveReply(FakeMessage('group')).interval == module.STREAM_GROUP_EDIT_INTERVAL
+        await reply.start()
+        source.fail_edits.append(RetryAfter(30))
+        await reply.update('x' * 50)
+        await reply.update('x' * 100)  # ще діє RetryAfter
+        source.fail_edits.append(BadRequest('Message to edit not found'))
+        await reply.finish('Готово')
+
+    asyncio.run(run())
+    assert source.edits == []
+    assert source.sent == [module.STREAM_PLACEHOLDER, 'Готово']
+
+
+def test_call_openai_chat_streams_deltas(stub_dependencies):
+    _, utils_pkg, calls, _ = stub_dependencies
+    seen = []
+
+    async def on_delta(text):
+        seen.append(text)
+
+    result = asyncio.run(utils_pkg.call_openai_chat([{'role': 'user', 'content': 'hi'}], on_delta=on_delta))
+    assert result == 'Привіт, хор!'
+    assert seen == ['При', 'Привіт, ', 'Привіт, хор!']
+    assert calls[0]['stream'] is True
+
+
+def test_call_openai_chat_falls_back_without_stream(stub_dependencies):
+    _, utils_pkg, calls, fail_stream = stub_dependencies
+    fail_stream.append(True)
+
+    async def on_delta(text):
+        raise AssertionError(text)
+
+    result = asyncio.run(utils_pkg.call_openai_chat([{'role': 'user', 'content': 'hi'}], on_delta=on_delta))
+    assert result == 'Привіт без потоку'
+    assert [bool(call.get('stream')) for call in calls] == [True, False]
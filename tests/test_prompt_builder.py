@@ -0,0 +1,65 @@
+import importlib
+import os
+import sys
+import types
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def stub_dependencies(monkeypatch):
+    utils_mod = types.ModuleType('utils')
+    utils_mod.__path__ = [os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils')]
+    monkeypatch.setitem(sys.modules, 'utils', utils_mod)
+    messages = []
+    logger_mod = types.ModuleType('utils.logger')
+    logger_mod.logger = types.SimpleNamespace(
+        info=messages.append,
+        warning=lambda *a, **kw: None,
+        error=lambda *a, **kw: None,
+        debug=lambda *a, **kw: None,
+    )
+    monkeypatch.setitem(sys.modules, 'utils.logger', logger_mod)
+    # Оцінка токенів у тестах не залежить від того, чи встановлено tiktoken
+    monkeypatch.setitem(sys.modules, 'tiktoken', None)
+    monkeypatch.delitem(sys.modules, 'utils.prompt_builder', raising=False)
+    return importlib.import_module('utils.prompt_builder'), messages
+
+
+def test_duplicates_kept_once_in_higher_priority_section(stub_dependencies):
+    module, _ = stub_dependencies
+    prompt = module.PromptBuilder('коли репетиція', budget=1000)
+    prompt.head('SYSTEM')
+    prompt.add('Керівниця', ['- 2024-05-01: Репетиція о 18:00'], priority=1, keys=['m1'])
+    prompt.add('Чат', ['- 2024-05-01: Віта: Репетиція о 18:00', '- 2024-05-02: Оля: Дякую'],
+               priority=3, keys=['m1', 'm2'])
+    prompt.add('Конфлікти', [''], priority=4, empty='не виявлено')
+    prompt.tail('\nEND')
+    text = prompt.build()
+
+    assert text.startswith('SYSTEM') and text.endswith('END')
+    assert text.count('Репетиція о 18:00') == 1
+    assert '- Керівниця: - 2024-05-01: Репетиція о 18:00' in text
+    assert '- Чат: - 2024-05-02: Оля: Дякую' in text
+    assert '- Конфлікти: не виявлено' in text
+    assert prompt.stats['duplicates'] == 1
+
+
+def test_budget_filled_by_priority_and_relevance(stub_dependencies):
+    module, messages = stub_dependencies
+    events = [f'📅 Подія {i} ' + 'x' * 60 for i in range(10)] + ['📅 Репетиція перед концертом ' + 'x' * 60]
+    prompt = module.PromptBuilder('коли репетиція перед концертом', budget=120)
+    prompt.head('S' * 30)
+    prompt.add('Наступна подія', ['Концерт 12.05'], priority=1)
+    prompt.add('Події', events, priority=3)
+    prompt.add('Соцмережі', ['🌐 Facebook'], priority=6)
+    text = prompt.build()
+
+    assert prompt.stats['tokens'] <= 120
+    assert module.estimate_tokens(text) <= 120
+    assert 'Концерт 12.05' in text
+    # Релевантна подія з кінця списку витісняє перші за порядком
+    assert 'Репетиція перед концертом' in text
+    assert 'Подія 9' not in text
+    assert prompt.stats['dropped'] > 0
+    assert any('Промпт асистента' in m for m in messages)
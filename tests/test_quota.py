@@ -0,0 +1,128 @@
+import asyncio
+import contextlib
+import datetime
+import importlib
+import os
+import sqlite3
+import sys
+import types
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def stub_dependencies(monkeypatch):
+    pytz_mod = types.ModuleType('pytz')
+    pytz_mod.timezone = lambda name: datetime.timezone.utc
+    monkeypatch.setitem(sys.modules, 'pytz', pytz_mod)
+
+    utils_mod = types.ModuleType('utils')
+    utils_mod.__path__ = [os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils')]
+    monkeypatch.setitem(sys.modules, 'utils', utils_mod)
+
+    logger_mod = types.ModuleType('utils.logger')
+    logger_mod.logger = types.SimpleNamespace(
+        info=lambda *a, **kw: None,
+        warning=lambda *a, **kw: None,
+        error=lambda *a, **kw: None,
+        debug=lambda *a, **kw: None,
+    )
+    monkeypatch.setitem(sys.modules, 'utils.logger', logger_mod)
+
+    conn = sqlite3.connect(':memory:', check_same_thread=False)
+
+    @contextlib.contextmanager
+    def get_cursor():
+        cursor = conn.cursor()
+        try:
+            yield cursor
+            conn.commit()
+        finally:
+            cursor.close()
+
+    db_mod = types.ModuleType('database')
+    db_mod.get_cursor = get_cursor
+    monkeypatch.setitem(sys.modules, 'database', db_mod)
+    monkeypatch.delitem(sys.modules, 'utils.quota', raising=False)
+
+    module = importlib.import_module('utils.quota')
+    module.create_quota_table()
+    return module
+
+
+def test_costs_and_hard_limit(stub_dependencies):
+    quota = stub_dependencies
+    budgeter = quota.QuotaBudgeter(budgets={'youtube': 105})
+
+    assert budgeter.charge('youtube', 'search.list', feature='search') == 100
+    assert budgeter.charge('youtube', 'videos.list', feature='menu') == 1
+    assert budgeter.used('youtube') == 101
+
+    with pytest.raises(quota.QuotaExceeded):
+        budgeter.charge('youtube', 'search.list', feature='search')
+
+    report = budgeter.report()['youtube']
+    assert report['features']['search']['units'] == 100
+    assert report['features']['search']['deferred'] == 1
+    assert report['features']['menu']['calls'] == 1
+
+
+def test_background_coalesced_near_limit(stub_dependencies):
+    quota = stub_dependencies
+    budgeter = quota.QuotaBudgeter(budgets={'youtube': 10}, soft_ratio=0.5)
+    for _ in range(5):
+        budgeter.charge('youtube', 'videos.list', priority=quota.PRIORITY_USER)
+
+    # Перше фонове оновлення ключа проходить, повторне в межах вікна – ні
+    budgeter.charge('youtube', 'playlistItems.list', priority=quota.PRIORITY_BACKGROUND, key='pl')
+    with pytest.raises(quota.QuotaExceeded):
+        budgeter.charge('youtube', 'playlistItems.list', priority=quota.PRIORITY_BACKGROUND, key='pl')
+    # Безключові фонові виклики відкладаються одразу
+    with pytest.raises(quota.QuotaExceeded):
+        budgeter.charge('youtube', 'videos.list', priority=quota.PRIORITY_BACKGROUND)
+    # Запити користувачів обслуговуються до жорсткого ліміту
+    budgeter.charge('youtube', 'videos.list', priority=quota.PRIORITY_USER)
+    assert budgeter.used('youtube') == 7
+
+
+def test_scope_attribution_and_persistence(stub_dependencies):
+    quota = stub_dependencies
+    budgeter = quota.QuotaBudgeter(budgets={'calendar': 100})
+
+    @quota.quota_job('daily_reminder')
+    async def job():
+        budgeter.charge('calendar', 'events.list', key='calendar:today')
+
+    asyncio.run(job())
+    with quota.quota_scope('assistant'):
+        budgeter.charge('calendar', 'events.list')
+
+    features = budgeter.report()['calendar']['features']
+    assert features['daily_reminder']['calls'] == 1
+    assert features['assistant']['calls'] == 1
+
+    assert budgeter.flush() == 2
+    assert budgeter.flush() == 0
+
+    restored = quota.QuotaBudgeter(budgets={'calendar': 100})
+    restored.load()
+    assert restored.used('calendar') == 2
+    assert 'daily_reminder' in restored.format_report()
+
+
+def test_usage_before_midnight_stays_on_its_day(stub_dependencies, monkeypatch):
+    quota = stub_dependencies
+    day = ['2024-01-01']
+    monkeypatch.setattr(quota, '_quota_day', lambda: day[0])
+    budgeter = quota.QuotaBudgeter(budgets={'calendar': 100})
+    budgeter.charge('calendar', 'events.list')
+
+    # Північ минула до flush: вчорашня дельта не додається до нового дня
+    day[0] = '2024-01-02'
+    budgeter.charge('calendar', 'events.list')
+    assert budgeter.used('calendar') == 1
+    assert budgeter.flush() == 2
+
+    restored = quota.QuotaBudgeter(budgets={'calendar': 100})
+    restored.load()
+    assert restored.used('calendar') == 1
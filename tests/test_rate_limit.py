@@ -0,0 +1,126 @@
+import asyncio
+import contextlib
+import importlib
+import os
+import sqlite3
+import sys
+import types
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def stub_dependencies(monkeypatch):
+    utils_mod = types.ModuleType('utils')
+    utils_mod.__path__ = [os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils')]
+    monkeypatch.setitem(sys.modules, 'utils', utils_mod)
+    logger_mod = types.ModuleType('utils.logger')
+    logger_mod.logger = types.SimpleNamespace(
+        info=lambda *a, **kw: None,
+        warning=lambda *a, **kw: None,
+        error=lambda *a, **kw: None,
+        debug=lambda *a, **kw: None,
+    )
+    monkeypatch.setitem(sys.modules, 'utils.logger', logger_mod)
+    monkeypatch.setitem(sys.modules, 'openai', types.ModuleType('openai'))
+
+    conn = sqlite3.connect(':memory:', check_same_thread=False)
+
+    @contextlib.contextmanager
+    def get_cursor():
+        cursor = conn.cursor()
+        try:
+            yield cursor
+            conn.commit()
+        finally:
+            cursor.close()
+
+    db_mod = types.ModuleType('database')
+    db_mod.get_cursor = get_cursor
+    monkeypatch.setitem(sys.modules, 'database', db_mod)
+
+    clock = {'wall': 1_000_000.0, 'mono': 100.0}
+    for name in ('utils.rate_limit', 'utils.openai_client'):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    module = importlib.import_module('utils.rate_limit')
+    monkeypatch.setattr(
+        module, 'time', types.SimpleNamespace(time=lambda: clock['wall'], monotonic=lambda: clock['mono'])
+    )
+    module.create_rate_limit_table()
+    return module, clock, conn
+
+
+LIMITS = {'assistant': {'daily': 5, 'burst': 2, 'refill_seconds': 10}}
+
+
+def test_burst_refill_and_sliding_daily_window(stub_dependencies):
+    module, clock, _ = stub_dependencies
+    limiter = module.RateLimiter(LIMITS)
+
+    assert limiter.acquire('assistant', 1) and limiter.acquire('assistant', 1)
+    denied = limiter.acquire('assistant', 1)
+    assert not denied and denied.reason == 'burst' and denied.retry_after == pytest.approx(10)
+    # Інший користувач має власний bucket
+    assert limiter.acquire('assistant', 2)
+
+    for _ in range(3):
+        clock['mono'] += 10
+        clock['wall'] += 3600
+        assert limiter.acquire('assistant', 1)
+    clock['mono'] += 100
+    denied = limiter.acquire('assistant', 1)
+    assert denied.reason == 'daily'
+    assert denied.retry_after == pytest.approx(86400 - 3 * 3600)
+
+    # Вікно ковзне: найстаріші запити виходять через 24 години, а не опівночі
+    clock['wall'] += 86400 - 3 * 3600
+    decision = limiter.acquire('assistant', 1)
+    # Дві найстаріші події вийшли з вікна: 3 лишилось + цей запит, отже ще один дозволено
+    assert decision and decision.remaining == 1
+    assert limiter.acquire('unlimited', 1)
+    assert 'через добовий ліміт: 1' in limiter.format_report()
+
+
+def test_write_behind_survives_restart(stub_dependencies):
+    module, clock, conn = stub_dependencies
+    limiter = module.RateLimiter(LIMITS)
+    for _ in range(2):
+        clock['mono'] += 10
+        limiter.acquire('assistant', 'u1')
+    assert conn.execute('SELECT COUNT(*) FROM rate_limit_events').fetchone()[0] == 0
+    assert limiter.flush() == 2
+    conn.execute("INSERT INTO rate_limit_events VALUES ('assistant', 'u1', ?)", (clock['wall'] - 90000,))
+
+    restarted = module.RateLimiter(LIMITS)
+    restarted.load()
+    for _ in range(3):
+        clock['mono'] += 10
+        assert restarted.acquire('assistant', 'u1')
+    assert restarted.acquire('assistant', 'u1').reason == 'daily'
+    restarted.flush()
+    # Прострочені події видаляються під час запису
+    assert conn.execute('SELECT COUNT(*) FROM rate_limit_events').fetchone()[0] == 5
+
+
+def test_llm_slot_caps_in_flight_calls(stub_dependencies, monkeypatch):
+    monkeypatch.setenv('LLM_CONCURRENCY', '2')
+    monkeypatch.delitem(sys.modules, 'utils.openai_client', raising=False)
+    client = importlib.import_module('utils.openai_client')
+    state = {'active': 0, 'peak': 0}
+
+    async def call():
+        async with client.llm_slot():
+            state['active'] += 1
+            state['peak'] = max(state['peak'], state['active'])
+            await asyncio.sleep(0.02)
+            state['active'] -= 1
+
+    async def run():
+        await asyncio.gather(*(call() for _ in range(6)))
+        async with client.llm_slot(), client.llm_slot():
+            with pytest.raises(asyncio.TimeoutError):
+                async with client.llm_slot(wait=0.01):
+                    pass
+
+    asyncio.run(run())
+    assert state['peak'] == 2
@@ -0,0 +1,161 @@
+import asyncio
+import contextlib
+import datetime
+import importlib
+import os
+import sqlite3
+import sys
+import types
+
+import pytest
+
+NOW = datetime.datetime(2024, 1, 1, 9, 0, tzinfo=datetime.timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def stub_dependencies(monkeypatch):
+    tg = types.ModuleType('telegram')
+    tg.ext = types.ModuleType('telegram.ext')
+    tg.ext.JobQueue = object
+    tg.ext.ContextTypes = types.SimpleNamespace(DEFAULT_TYPE=object)
+    monkeypatch.setitem(sys.modules, 'telegram', tg)
+    monkeypatch.setitem(sys.modules, 'telegram.ext', tg.ext)
+
+    utils_mod = types.ModuleType('utils')
+    utils_mod.__path__ = [os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils')]
+    monkeypatch.setitem(sys.modules, 'utils', utils_mod)
+
+    logger_mod = types.ModuleType('utils.logger')
+    logger_mod.logger = types.SimpleNamespace(
+        info=lambda *a, **kw: None,
+        warning=lambda *a, **kw: None,
+        error=lambda *a, **kw: None,
+        debug=lambda *a, **kw: None,
+    )
+    monkeypatch.setitem(sys.modules, 'utils.logger', logger_mod)
+
+    quota_mod = types.ModuleType('utils.quota')
+    quota_mod.quota_job = lambda feature, priority=None: (lambda func: func)
+    monkeypatch.setitem(sys.modules, 'utils.quota', quota_mod)
+
+    cal_mod = types.ModuleType('utils.calendar_utils')
+    cal_mod.get_calendar_events_cached = lambda *a, **kw: []
+    monkeypatch.setitem(sys.modules, 'utils.calendar_utils', cal_mod)
+
+    conn = sqlite3.connect(':memory:', check_same_thread=False)
+
+    @contextlib.contextmanager
+    def get_cursor():
+        cursor = conn.cursor()
+        try:
+            yield cursor
+            conn.commit()
+        finally:
+            cursor.close()
+
+    db_mod = types.ModuleType('database')
+    db_mod.get_cursor = get_cursor
+    monkeypatch.setitem(sys.modules, 'database', db_mod)
+
+    sent = []
+
+    async def send_event_reminder(context, event, start_dt=None, force=False):
+        sent.append(event['id'])
+        return True
+
+    def event_start(event):
+        raw = event['start'].get('dateTime')
+        return datetime.datetime.fromisoformat(raw.replace('Z', '+00:00')) if raw else None
+
+    rh_mod = types.ModuleType('handlers.reminder_handler')
+    rh_mod._event_start = event_start
+    rh_mod.berlin_tz = datetime.timezone.utc
+    rh_mod.generate_event_hash = lambda event, kind: f"{event['summary']}|{event['start']}"
+    rh_mod.send_event_reminder = send_event_reminder
+    monkeypatch.setitem(sys.modules, 'handlers.reminder_handler', rh_mod)
+    monkeypatch.delitem(sys.modules, 'handlers.reminder_planner', raising=False)
+
+    module = importlib.import_module('handlers.reminder_planner')
+    module.create_reminder_plan_table()
+    return module, sent
+
+
+class FakeJob:
+    def __init__(self, callback, when, name, data):
+        self.callback, self.when, self.name, self.data = callback, when, name, data
+        self.removed = False
+
+    def schedule_removal(self):
+        self.removed = True
+
+
+class FakeJobQueue:
+    def __init__(self):
+        self.jobs = []
+
+    def run_once(self, callback, when, name=None, data=None, job_kwargs=None):
+        self.jobs.append(FakeJob(callback, when, name, data))
+
+    def get_jobs_by_name(self, name):
+        return [j for j in self.jobs if j.name == name and not j.removed]
+
+    def active(self):
+        return [j for j in self.jobs if not j.removed]
+
+
+def _event(event_id, start, summary='Репетиція'):
+    return {'id': event_id, 'summary': summary, 'start': {'dateTime': start}}
+
+
+def test_schedules_exact_fire_time_and_reschedules(stub_dependencies):
+    planner, _ = stub_dependencies
+    jq = FakeJobQueue()
+
+    events = [_event('a', '2024-01-01T12:00:00+00:00'), _event('all-day', None)]
+    events[1]['start'] = {'date': '2024-01-01'}
+    stats = planner.plan_reminders(jq, events, now=NOW)
+    assert stats['scheduled'] == 1
+    assert [j.when for j in jq.active()] == [7200]
+
+    # Без змін – нове завдання не створюється
+    assert planner.plan_reminders(jq, events, now=NOW)['kept'] == 1
+    assert len(jq.jobs) == 1
+
+    # Подію перенесли – старе завдання знято, нове на новий час
+    moved = [_event('a', '2024-01-01T10:30:00+00:00')]
+    assert planner.plan_reminders(jq, moved, now=NOW)['rescheduled'] == 1
+    assert [j.when for j in jq.active()] == [1800]
+
+    # Подію видалили – нагадування скасовано
+    other = [_event('b', '2024-01-02T20:00:00+00:00')]
+    stats = planner.plan_reminders(jq, other, now=NOW)
+    assert stats['cancelled'] == 1
+    assert [j.name for j in jq.active()] == []
+
+
+def test_fire_marks_sent_and_restore_after_restart(stub_dependencies):
+    planner, sent = stub_dependencies
+    jq = FakeJobQueue()
+    planner.plan_reminders(
+        jq,
+        [_event('a', '2024-01-01T09:30:00+00:00'), _event('b', '2024-01-01T15:00:00+00:00')],
+        now=NOW,
+    )
+    # Подія «a» менше ніж за годину – надсилаємо одразу
+    job_a = jq.get_jobs_by_name('event_reminder:a')[0]
+    assert job_a.when == 1
+
+    context = types.SimpleNamespace(job=job_a, bot=None)
+    asyncio.run(planner.fire_event_reminder(context))
+    assert sent == ['a']
+
+    # Перезапуск: відновлюється лише ще не надіслане нагадування
+    restarted = FakeJobQueue()
+    assert planner.restore_reminder_plan(restarted, now=NOW) == 1
+    assert [j.name for j in restarted.active()] == ['event_reminder:b']
+    stats = planner.plan_reminders(
+        restarted,
+        [_event('a', '2024-01-01T09:30:00+00:00'), _event('b', '2024-01-01T15:00:00+00:00')],
+        now=NOW,
+    )
+    assert stats == {'scheduled': 0, 'rescheduled': 0, 'kept': 1, 'cancelled': 0}
@@ -0,0 +1,99 @@
+import contextlib
+import importlib
+import os
+import sqlite3
+import sys
+import types
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def stub_dependencies(monkeypatch):
+    utils_mod = types.ModuleType('utils')
+    utils_mod.__path__ = [os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils')]
+    monkeypatch.setitem(sys.modules, 'utils', utils_mod)
+    logger_mod = types.ModuleType('utils.logger')
+    logger_mod.logger = types.SimpleNamespace(
+        info=lambda *a, **kw: None,
+        warning=lambda *a, **kw: None,
+        error=lambda *a, **kw: None,
+        debug=lambda *a, **kw: None,
+    )
+    monkeypatch.setitem(sys.modules, 'utils.logger', logger_mod)
+
+    conn = sqlite3.connect(':memory:', check_same_thread=False)
+    conn.execute('CREATE TABLE group_message_index (id INTEGER PRIMARY KEY, text TEXT)')
+    conn.execute('CREATE TABLE group_facts (id INTEGER PRIMARY KEY, fact_type TEXT)')
+
+    @contextlib.contextmanager
+    def get_cursor():
+        cursor = conn.cursor()
+        try:
+            yield cursor
+            conn.commit()
+        finally:
+            cursor.close()
+
+    values = {'calendar_events_cache': '[{"summary": "Репетиція"}]'}
+    db_mod = types.ModuleType('database')
+    db_mod.get_cursor = get_cursor
+    db_mod.get_value = values.get
+    db_mod.set_value = values.__setitem__
+    monkeypatch.setitem(sys.modules, 'database', db_mod)
+
+    for name in ('utils.response_cache', 'utils.sheet_index'):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    return importlib.import_module('utils.response_cache'), values, conn
+
+
+def test_same_and_similar_questions_hit_cache(stub_dependencies):
+    module, _, _ = stub_dependencies
+    cache = module.ResponseCache()
+    version = module.data_version()
+
+    assert cache.get('Хто керівник хору Оберіг?', version) is None
+    cache.put('Хто керівник хору Оберіг?', version, 'Віта Романченко')
+
+    assert cache.get('хто керівник хору оберіг', version) == 'Віта Романченко'
+    assert cache.get('Хто керівник хору «Оберіг»!!', version) == 'Віта Романченко'
+    assert cache.get('хто керівниця хору оберіг', version) == 'Віта Романченко'
+    assert cache.get('що співаємо на концерті', version) is None
+
+    stats = cache.stats()
+    assert stats['hits'] == 2 and stats['similar_hits'] == 1 and stats['misses'] == 2
+
+
+def test_numbers_must_match_for_similar_questions(stub_dependencies):
+    module, _, _ = stub_dependencies
+    cache = module.ResponseCache()
+    cache.put('скільки концертів було у 2023 році', 'v1', '5')
+    assert cache.get('скільки концертів було у 2024 році', 'v1') is None
+
+
+def test_new_data_invalidates_cache(stub_dependencies):
+    module, values, conn = stub_dependencies
+    cache = module.ResponseCache()
+    version = module.data_version()
+    cache.put('коли збираємо внески на костюми', version, 'У п’ятницю')
+    assert module.data_version() == version
+
+    # Окреме повідомлення групи кеш не скидає, а пачка повідомлень – так
+    conn.execute("INSERT INTO group_message_index (text) VALUES ('внески переносимо')")
+    assert module.data_version() == version
+    conn.executemany(
+        'INSERT INTO group_message_index (text) VALUES (?)',
+        [('повідомлення',)] * module.GROUP_MESSAGE_BUCKET,
+    )
+    new_version = module.data_version()
+    assert new_version != version
+    assert cache.get('коли збираємо внески на костюми', new_version) is None
+
+    cache.put('коли збираємо внески на костюми', new_version, 'У суботу')
+    values['yt_latest'] = '["Нове відео", "https://youtu.be/x"]'
+    assert cache.get('коли збираємо внески на костюми', module.data_version()) is None
+    assert cache.stats()['invalidations'] == 2
+
+    version = module.data_version()
+    conn.execute("INSERT INTO group_facts (fact_type) VALUES ('rehearsal')")
+    assert module.data_version() != version
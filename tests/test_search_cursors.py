@@ -0,0 +1,90 @@
+import contextlib
+import importlib
+import os
+import sqlite3
+import sys
+import types
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def stub_dependencies(monkeypatch):
+    utils_mod = types.ModuleType('utils')
+    utils_mod.__path__ = [os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils')]
+    monkeypatch.setitem(sys.modules, 'utils', utils_mod)
+    logger_mod = types.ModuleType('utils.logger')
+    logger_mod.logger = types.SimpleNamespace(
+        info=lambda *a, **kw: None,
+        warning=lambda *a, **kw: None,
+        error=lambda *a, **kw: None,
+        debug=lambda *a, **kw: None,
+    )
+    monkeypatch.setitem(sys.modules, 'utils.logger', logger_mod)
+
+    conn = sqlite3.connect(':memory:', check_same_thread=False)
+
+    @contextlib.contextmanager
+    def get_cursor():
+        cursor = conn.cursor()
+        try:
+            yield cursor
+            conn.commit()
+        finally:
+            cursor.close()
+
+    db_mod = types.ModuleType('database')
+    db_mod.get_cursor = get_cursor
+    monkeypatch.setitem(sys.modules, 'database', db_mod)
+    monkeypatch.delitem(sys.modules, 'utils.search_cursors', raising=False)
+    module = importlib.import_module('utils.search_cursors')
+    module.create_search_cursors_table()
+    return module, conn
+
+
+def test_lru_eviction_keeps_memory_and_table_bounded(stub_dependencies, monkeypatch):
+    module, conn = stub_dependencies
+    clock = [100.0]
+    monkeypatch.setattr(module.time, 'time', lambda: clock[0])
+    cursors = module.SearchCursors(limit=2)
+
+    for chat in ('a', 'b'):
+        clock[0] += 1
+        cursors.save(chat, 'щедрик', 5, 1)
+    assert cursors.get('a')['offset'] == 5  # «a» тепер найсвіжіший у пам'яті
+    clock[0] += 1
+    cursors.save('a', 'щедрик', 10, 1)
+    clock[0] += 1
+    cursors.save('c', 'гімн', 5, 1)
+
+    assert len(cursors) == 2
+    rows = conn.execute('SELECT chat_id FROM search_cursors ORDER BY chat_id').fetchall()
+    assert [r[0] for r in rows] == ['a', 'c']
+    assert cursors.get('b') is None
+
+
+def test_cursor_survives_restart(stub_dependencies):
+    module, _ = stub_dependencies
+    module.SearchCursors().save(42, 'добрий вечір', 10, 3)
+
+    restarted = module.SearchCursors()
+    assert restarted.get('42') == {'query': 'добрий вечір', 'offset': 10, 'version': 3}
+
+
+def test_reading_a_cursor_keeps_it_from_eviction(stub_dependencies, monkeypatch):
+    module, conn = stub_dependencies
+    clock = [100.0]
+    monkeypatch.setattr(module.time, 'time', lambda: clock[0])
+    for chat in ('a', 'b'):
+        clock[0] += 1
+        module.SearchCursors(limit=2).save(chat, 'щедрик', 5, 1)
+
+    # Після перезапуску користувач «a» гортає далі – його курсор свіжіший за «b»
+    restarted = module.SearchCursors(limit=2)
+    clock[0] += 1
+    assert restarted.get('a')['offset'] == 5
+    clock[0] += 1
+    restarted.save('c', 'гімн', 5, 1)
+
+    rows = conn.execute('SELECT chat_id FROM search_cursors ORDER BY chat_id').fetchall()
+    assert [r[0] for r in rows] == ['a', 'c']
@@ -0,0 +1,205 @@
+import contextlib
+import importlib
+import os
+import sqlite3
+import sys
+import types
+
+import pytest
+
+FOLDER = 'folder'
+
+
+def pdf(file_id, name, parents=(FOLDER,), **extra):
+    return {'id': file_id, 'name': name, 'mimeType': 'application/pdf', 'parents': list(parents), **extra}
+
+
+class HttpError(Exception):
+    def __init__(self, status):
+        super().__init__(status)
+        self.resp = types.SimpleNamespace(status=status)
+
+
+class FakeDrive:
+    def __init__(self, files, page_size=2):
+        self.files_state = list(files)
+        self.page_size = page_size
+        self.calls = []
+        self.changes_log = []  # (token, [change])
+        self.token = 1
+        self.invalid_tokens = set()
+
+    def _request(self, method, result):
+        def execute():
+            self.calls.append(method)
+            if isinstance(result, Exception):
+                raise result
+            return result() if callable(result) else result
+        return types.SimpleNamespace(execute=execute)
+
+    def files(self):
+        def list_(q, fields, pageSize, pageToken=None):
+            start = int(pageToken or 0)
+            chunk = self.files_state[start:start + self.page_size]
+            response = {'files': chunk}
+            if start + self.page_size < len(self.files_state):
+                response['nextPageToken'] = str(start + self.page_size)
+            return self._request('files.list', response)
+        return types.SimpleNamespace(list=list_)
+
+    def changes(self):
+        def get_start():
+            return self._request('changes.getStartPageToken', {'startPageToken': str(self.token)})
+
+        def list_(pageToken, spaces, pageSize, fields):
+            if pageToken in self.invalid_tokens:
+                return self._request('changes.list', HttpError(404))
+            pending = [c for t, c in self.changes_log if int(t) >= int(pageToken)]
+            return self._request('changes.list', {'changes': pending, 'newStartPageToken': str(self.token)})
+        return types.SimpleNamespace(getStartPageToken=get_start, list=list_)
+
+    def change(self, file_id, file=None, removed=False):
+        self.changes_log.append((str(self.token), {'fileId': file_id, 'removed': removed, 'file': file}))
+        self.token += 1
+
+
+@pytest.fixture(autouse=True)
+def stub_dependencies(monkeypatch):
+    tg = types.ModuleType('telegram')
+    tg.ext = types.ModuleType('telegram.ext')
+    tg.ext.JobQueue = object
+    tg.ext.ContextTypes = types.SimpleNamespace(DEFAULT_TYPE=object)
+    monkeypatch.setitem(sys.modules, 'telegram', tg)
+    monkeypatch.setitem(sys.modules, 'telegram.ext', tg.ext)
+
+    sa_mod = types.ModuleType('google.oauth2.service_account')
+    sa_mod.Credentials = types.SimpleNamespace(from_service_account_file=lambda *a, **kw: object())
+    google_mod = types.ModuleType('google')
+    oauth2_mod = types.ModuleType('google.oauth2')
+    oauth2_mod.service_account = sa_mod
+    google_mod.oauth2 = oauth2_mod
+    monkeypatch.setitem(sys.modules, 'google', google_mod)
+    monkeypatch.setitem(sys.modules, 'google.oauth2', oauth2_mod)
+    monkeypatch.setitem(sys.modules, 'google.oauth2.service_account', sa_mod)
+
+    drive = FakeDrive([
+        pdf('1', 'Колядка Добрий вечір'),
+        pdf('2', 'Колядка Нова радість'),
+        pdf('3', 'Гімн України'),
+    ])
+    gapi = types.ModuleType('googleapiclient.discovery')
+    gapi.build = lambda *a, **kw: drive
+    monkeypatch.setitem(sys.modules, 'googleapiclient.discovery', gapi)
+    errors_mod = types.ModuleType('googleapiclient.errors')
+    errors_mod.HttpError = HttpError
+    monkeypatch.setitem(sys.modules, 'googleapiclient.errors', errors_mod)
+    config_mod = types.ModuleType('config')
+    config_mod.GOOGLE_CREDENTIALS = 'x'
+    monkeypatch.setitem(sys.modules, 'config', config_mod)
+
+    utils_mod = types.ModuleType('utils')
+    utils_mod.__path__ = [os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils')]
+    monkeypatch.setitem(sys.modules, 'utils', utils_mod)
+    logger_mod = types.ModuleType('utils.logger')
+    logger_mod.logger = types.SimpleNamespace(
+        info=lambda *a, **kw: None,
+        warning=lambda *a, **kw: None,
+        error=lambda *a, **kw: None,
+        debug=lambda *a, **kw: None,
+    )
+    monkeypatch.setitem(sys.modules, 'utils.logger', logger_mod)
+
+    conn = sqlite3.connect(':memory:', check_same_thread=False)
+
+    @contextlib.contextmanager
+    def get_cursor():
+        cursor = conn.cursor()
+        try:
+            yield cursor
+            conn.commit()
+        finally:
+            cursor.close()
+
+    values = {}
+    db_mod = types.ModuleType('database')
+    db_mod.get_cursor = get_cursor
+    db_mod.get_value = values.get
+    db_mod.set_value = values.__setitem__
+    monkeypatch.setitem(sys.modules, 'database', db_mod)
+
+    monkeypatch.setenv('NOTY_FOLDER_ID', FOLDER)
+    for name in ('handlers.sheet_catalog', 'utils.quota', 'utils.sheet_index'):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    module = importlib.import_module('handlers.sheet_catalog')
+    module.create_sheets_table()
+    return module, drive, values
+
+
+def test_full_sync_reads_every_page(stub_dependencies):
+    catalog, drive, values = stub_dependencies
+    assert catalog.sync_sheet_catalog() == 3
+    assert drive.calls.count('files.list') == 2
+    assert values[catalog.CHANGES_TOKEN_KEY] == '1'
+    assert catalog.load_catalog() == {
+        'гімн': [{'id': '3', 'name': 'Гімн України'}],
+        'колядка': [
+            {'id': '1', 'name': 'Колядка Добрий вечір'},
+            {'id': '2', 'name': 'Колядка Нова радість'},
+        ],
+    }
+
+
+def test_incremental_sync_applies_changes(stub_dependencies):
+    catalog, drive, values = stub_dependencies
+    catalog.sync_sheet_catalog()
+    drive.calls.clear()
+
+    drive.change('4', pdf('4', 'Щедрівка Щедрик'))
+    drive.change('1', pdf('1', 'Колядка Добрий вечір', trashed=True))
+    drive.change('2', pdf('2', 'Колядка Нова радість', parents=('other',)))
+    drive.change('3', pdf('3', 'Гімн України (нова редакція)'))
+    drive.change('9', pdf('9', 'Чужий файл', parents=('other',)))
+
+    # Чужий файл «9» ніколи не був у каталозі – це не видалення
+    assert catalog.sync_sheet_catalog() == 4
+    assert drive.calls == ['changes.list']
+    assert values[catalog.CHANGES_TOKEN_KEY] == '6'
+    assert catalog.load_catalog() == {
+        'гімн': [{'id': '3', 'name': 'Гімн України (нова редакція)'}],
+        'щедрівка': [{'id': '4', 'name': 'Щедрівка Щедрик'}],
+    }
+
+    # Без нових змін – один дешевий запит і нічого не змінюється
+    version = catalog.catalog_version()
+    assert version
+    drive.calls.clear()
+    assert catalog.sync_sheet_catalog() == 0 and drive.calls == ['changes.list']
+    assert catalog.catalog_version() == version
+
+
+def test_rejected_token_falls_back_to_full_sync(stub_dependencies):
+    catalog, drive, values = stub_dependencies
+    catalog.sync_sheet_catalog()
+    drive.invalid_tokens.add('1')
+    drive.files_state.append(pdf('5', 'Гімн Оберегу'))
+    drive.calls.clear()
+
+    assert catalog.sync_sheet_catalog() == 4
+    assert drive.calls[0] == 'changes.list' and 'files.list' in drive.calls
+    assert len(catalog.load_catalog()['гімн']) == 2
+
+
+def test_changes_outside_catalog_keep_index_and_version(stub_dependencies):
+    catalog, drive, _ = stub_dependencies
+    catalog.sync_sheet_catalog()
+    index = sys.modules['utils.sheet_index'].sheet_index
+    index.page('колядка', 0, 5)
+    index_version, version = index.version, catalog.catalog_version()
+
+    drive.change('9', pdf('9', 'Чужий файл', parents=('other',)))
+    drive.change('8', removed=True)
+    drive.change('1', pdf('1', 'Колядка Добрий вечір'))  # метадані не змінились
+
+    assert catalog.sync_sheet_catalog() == 0
+    assert index.version == index_version and catalog.catalog_version() == version
+    assert len(index._results) == 1  # кеш сторінок пошуку не скинуто
@@ -0,0 +1,71 @@
+import importlib
+import os
+import sys
+import types
+
+import pytest
+
+SHEETS = [
+    {'id': '1', 'name': 'Щедрик (М. Леонтович)'},
+    {'id': '2', 'name': 'Добрий вечір тобі'},
+    {'id': '3', 'name': 'Ave Maria'},
+    {'id': '4', 'name': 'Гімн України'},
+    {'id': '5', 'name': "Пам'ять серця"},
+]
+
+
+@pytest.fixture(autouse=True)
+def stub_dependencies(monkeypatch):
+    utils_mod = types.ModuleType('utils')
+    utils_mod.__path__ = [os.path.join(os.path.dirname(os.path.dirname(__file__)), 'utils')]
+    monkeypatch.setitem(sys.modules, 'utils', utils_mod)
+    monkeypatch.delitem(sys.modules, 'utils.sheet_index', raising=False)
+    module = importlib.import_module('utils.sheet_index')
+    index = module.SheetIndex()
+    index.rebuild(SHEETS)
+    return module, index
+
+
+def names(results):
+    return [r['name'] for r in results]
+
+
+def test_typos_and_transliteration(stub_dependencies):
+    _, index = stub_dependencies
+    assert names(index.search('щедрик')) == ['Щедрик (М. Леонтович)']
+    assert names(index.search('shchedryk')) == ['Щедрик (М. Леонтович)']
+    assert names(index.search('щедирк')) == ['Щедрик (М. Леонтович)']
+    assert names(index.search('добрий вечор')) == ['Добрий вечір тобі']
+    assert names(index.search('аве марія')) == ['Ave Maria']
+    assert names(index.search('Ave Mariá')) == ['Ave Maria']
+    assert names(index.search('память')) == ["Пам'ять серця"]
+    assert names(index.search('ім')) == ['Гімн України']
+    assert index.search('xyz') == []
+
+
+def test_incremental_update_and_name_lookup(stub_dependencies):
+    _, index = stub_dependencies
+    assert index.id_for_name('Ave Maria') == '3'
+    assert index.id_for_name('ave  maria') == '3'
+
+    index.apply([{'id': '3', 'name': 'Ave Verum'}, {'id': '6', 'name': 'Щедрівка'}], ['1'])
+    assert index.id_for_name('Ave Maria') is None
+    assert names(index.search('щедр')) == ['Щедрівка']
+    assert names(index.search('ave')) == ['Ave Verum']
+    assert len(index) == 5
+
+
+def test_pages_recomputed_after_catalog_change(stub_dependencies):
+    _, index = stub_dependencies
+    index.apply([{'id': str(i), 'name': f'Колядка {i}'} for i in range(10, 17)], [])
+    version = index.version
+
+    first, total = index.page('колядка', 0, 5)
+    assert total == 7 and len(first) == 5
+    rest, _ = index.page('колядка', 5, 5)
+    assert [s['name'] for s in rest] == ['Колядка 15', 'Колядка 16']
+
+    index.apply([], ['16'])
+    assert index.version == version + 1
+    rest, total = index.page('колядка', 5, 5)
+    assert total == 6 and [s['name'] for s in rest] == ['Колядка 15']
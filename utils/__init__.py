@@ -1,7 +1,17 @@
 import openai
 import os
 import asyncio
+from typing import Awaitable, Callable
 from utils.logger import logger
+from utils.assistant_runner import run_assistant
+from utils.openai_client import (
+    close_openai_client,
+    get_openai_client,
+    llm_slot,
+    openai_slot,
+    request_timeout,
+    use_transport,
+)
 
 ASSISTANT_ID = None
 
@@ -23,6 +33,36 @@ def get_openai_assistant_id() -> str | None:
     return ASSISTANT_ID
 
 
+async def _stream_openai_chat(
+    messages: list[dict],
+    model: str,
+    max_tokens: int,
+    temperature: float,
+    timeout: int,
+    on_delta: Callable[[str], Awaitable[None]],
+) -> str:
+    """
+    Stream a chat completion. ``on_delta`` receives the text accumulated so
+    far; ``timeout`` limits the wait for each chunk.
+    """
+    parts: list[str] = []
+    async with openai_slot():
+        stream = await get_openai_client().chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True,
+            timeout=request_timeout(timeout),
+        )
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+                await on_delta("".join(parts))
+    return "".join(parts).strip()
+
+
 async def call_openai_chat(
     messages: list[dict],
     model: str = "gpt-3.5-turbo",
@@ -30,20 +70,32 @@ async def call_openai_chat(
     temperature: float = 0.9,
     timeout: int = 15,
     retries: int = 2,
+    on_delta: Callable[[str], Awaitable[None]] | None = None,
 ) -> str:
-    """Call the OpenAI chat completion API with retries and timeout."""
+    """
+    Call the OpenAI chat completion API with retries and timeout. With
+    ``on_delta`` the completion is streamed; if streaming fails the request
+    is repeated without it.
+    """
+    if on_delta is not None:
+        async with llm_slot():
+            try:
+                return await _stream_openai_chat(
+                    messages, model, max_tokens, temperature, timeout, on_delta
+                )
+            except (openai.OpenAIError, asyncio.TimeoutError) as e:
+                logger.warning(f"⚠️ Потокова відповідь OpenAI не вдалася, повторюємо без потоку: {e}")
     for attempt in range(1, retries + 1):
         try:
-            response = await asyncio.wait_for(
-                asyncio.to_thread(
-                    openai.chat.completions.create,
+            # Слот LLM береться на спробу, а не на всі повтори з паузами
+            async with llm_slot(), openai_slot():
+                response = await get_openai_client().chat.completions.create(
                     model=model,
                     messages=messages,
                     max_tokens=max_tokens,
                     temperature=temperature,
-                ),
-                timeout=timeout,
-            )
+                    timeout=request_timeout(timeout),
+                )
             return response.choices[0].message.content.strip()
         except (openai.OpenAIError, asyncio.TimeoutError) as e:
             logger.error(f"❌ Помилка OpenAI (спроба {attempt}): {e}")
@@ -52,65 +104,38 @@ async def call_openai_chat(
             await asyncio.sleep(1)
 
 
+async def call_openai_embedding(
+    text: str,
+    model: str = "text-embedding-3-small",
+    timeout: int = 10,
+) -> list[float]:
+    """Return the embedding vector for ``text``."""
+    async with openai_slot():
+        response = await get_openai_client().embeddings.create(
+            model=model,
+            input=text,
+            timeout=request_timeout(timeout),
+        )
+    return response.data[0].embedding
+
+
 async def call_openai_assistant(
     messages: list[dict],
     assistant_id: str,
     timeout: int = 15,
     retries: int = 2,
+    thread_key: str | None = None,
 ) -> str:
-    """Call the OpenAI Assistants API with retries and timeout."""
+    """
+    Call the OpenAI Assistants API with retries and timeout. ``thread_key``
+    (e.g. a user id) lets consecutive calls continue the same thread.
+    """
     for attempt in range(1, retries + 1):
         try:
-            thread = await asyncio.wait_for(
-                asyncio.to_thread(openai.beta.threads.create), timeout=timeout
-            )
-            for msg in messages:
-                role = msg.get("role", "user")
-                if role not in {"user", "assistant"}:
-                    # Assistants API supports only 'user' and 'assistant' roles
-                    role = "user"
-                await asyncio.wait_for(
-                    asyncio.to_thread(
-                        openai.beta.threads.messages.create,
-                        thread_id=thread.id,
-                        role=role,
-                        content=msg.get("content", ""),
-                    ),
-                    timeout=timeout,
+            async with llm_slot():
+                return await run_assistant(
+                    messages, assistant_id, timeout=timeout, thread_key=thread_key
                 )
-            run = await asyncio.wait_for(
-                asyncio.to_thread(
-                    openai.beta.threads.runs.create,
-                    thread_id=thread.id,
-                    assistant_id=assistant_id,
-                ),
-                timeout=timeout,
-            )
-            while True:
-                run = await asyncio.wait_for(
-                    asyncio.to_thread(
-                        openai.beta.threads.runs.retrieve,
-                        thread_id=thread.id,
-                        run_id=run.id,
-                    ),
-                    timeout=timeout,
-                )
-                if run.status == "completed":
-                    msgs = await asyncio.wait_for(
-                        asyncio.to_thread(
-                            openai.beta.threads.messages.list,
-                            thread_id=thread.id,
-                        ),
-                        timeout=timeout,
-                    )
-                    return (
-                        msgs.data[0].content[0].text.value.strip()
-                        if msgs.data
-                        else ""
-                    )
-                if run.status in {"failed", "cancelled", "expired"}:
-                    raise openai.OpenAIError(f"run {run.status}")
-                await asyncio.sleep(1)
         except (openai.OpenAIError, asyncio.TimeoutError) as e:
             logger.error(f"❌ Помилка OpenAI Assistant (спроба {attempt}): {e}")
             if attempt == retries:
@@ -118,10 +143,15 @@ async def call_openai_assistant(
             await asyncio.sleep(1)
 
 
-
 __all__ = [
     "init_openai_api",
     "call_openai_chat",
     "call_openai_assistant",
+    "call_openai_embedding",
+    "close_openai_client",
     "get_openai_assistant_id",
+    "get_openai_client",
+    "llm_slot",
+    "openai_slot",
+    "use_transport",
 ]
@@ -1,11 +1,17 @@
 # analytics.py
 
+import asyncio
+import re
 from datetime import datetime, timedelta
 from database import get_value, set_value
 import json
 from utils.logger import logger
+from utils.privacy import text_meta
 from telegram.helpers import escape_markdown
 
+# Скільки днів зберігаються пошукові запити (і з яких рахуються популярні)
+POPULAR_QUERIES_DAYS = 30
+
 
 class Analytics:
     def __init__(self):
@@ -74,21 +80,31 @@ class Analytics:
         """
         Логує пошуковий запит для аналізу популярних запитів
         """
+        # Читання й запис JSON у базу – поза циклом подій
+        await asyncio.to_thread(self._record_query, query)
+
+    def _record_query(self, query: str):
         try:
+            # Лише нормалізовані слова запиту, без пунктуації й регістру
+            query = " ".join(re.findall(r"[\w\u0400-\u04FF]+", (query or "").lower()))
+            if not query:
+                return
             queries = json.loads(get_value(self.popular_queries_key) or "{}")
             today = datetime.now().strftime("%Y-%m-%d")
+            oldest = (datetime.now() - timedelta(days=POPULAR_QUERIES_DAYS)).strftime("%Y-%m-%d")
+            # Запити старші за вікно популярності не зберігаємо
+            queries = {day: items for day, items in queries.items() if day >= oldest}
 
             if today not in queries:
                 queries[today] = {}
 
-            query = query.lower().strip()
             if query not in queries[today]:
                 queries[today][query] = 0
 
             queries[today][query] += 1
 
             set_value(self.popular_queries_key, json.dumps(queries))
-            logger.info(f"✅ Залоговано пошуковий запит: {query}")
+            logger.info(f"✅ Залоговано пошуковий запит: {text_meta(query)}")
         except Exception as e:
             logger.error(f"❌ Помилка при логуванні запиту: {e}")
 
@@ -0,0 +1,139 @@
+"""
+Історія розмов з асистентом.
+
+Кожна репліка – окремий рядок таблиці ``assistant_turns`` з індексом
+(user_id, ts), а її текст шифрується окремо (``DB_ENCRYPTION_KEY``).
+Новий хід лише дописує рядки й видаляє старші за останні
+``ASSISTANT_HISTORY_KEEP``, а читання бере з індексу тільки потрібні N
+рядків – без розшифрування й перезапису всієї історії користувача.
+"""
+import json
+import os
+import time
+
+from config import DB_ENCRYPTION_KEY
+from database import get_cursor
+from utils.db_crypto import decrypt_text, encrypt_text
+from utils.logger import logger
+
+ASSISTANT_HISTORY_KEEP = int(os.getenv("ASSISTANT_HISTORY_KEEP", "6"))
+# Старші репліки вже не вважаються частиною поточної розмови
+ASSISTANT_HISTORY_WINDOW = int(os.getenv("ASSISTANT_HISTORY_WINDOW", "1800"))
+LEGACY_HISTORY_PREFIX = "oberig_chat_history_"
+
+
+def create_assistant_turns_table():
+    with get_cursor() as cursor:
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS assistant_turns (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                ts REAL NOT NULL,
+                role TEXT NOT NULL,
+                content_enc TEXT NOT NULL
+            )
+            """
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_assistant_turns_user_ts ON assistant_turns (user_id, ts)"
+        )
+    logger.info("✅ Таблиця assistant_turns створена або вже існує.")
+
+
+def _insert_turns(cursor, user_id: str, turns: list[dict], ts: float):
+    cursor.executemany(
+        "INSERT INTO assistant_turns (user_id, ts, role, content_enc) VALUES (?, ?, ?, ?)",
+        [
+            (user_id, ts, turn["role"], encrypt_text(turn["content"], DB_ENCRYPTION_KEY))
+            for turn in turns
+        ],
+    )
+
+
+def _trim(cursor, user_id: str, keep: int):
+    cursor.execute(
+        """
+        DELETE FROM assistant_turns
+        WHERE user_id = ? AND id NOT IN (
+            SELECT id FROM assistant_turns WHERE user_id = ? ORDER BY ts DESC, id DESC LIMIT ?
+        )
+        """,
+        (user_id, user_id, keep),
+    )
+
+
+def append_turns(user_id: str | int, turns: list[dict], keep: int = ASSISTANT_HISTORY_KEEP):
+    """Append ``turns`` (``{"role", "content"}``) and drop all but the last ``keep`` rows."""
+    user_id = str(user_id)
+    try:
+        with get_cursor() as cursor:
+            _insert_turns(cursor, user_id, turns, time.time())
+            _trim(cursor, user_id, keep)
+    except Exception as e:
+        logger.error(f"❌ Не вдалося зберегти історію асистента: {e}")
+
+
+def recent_turns(user_id: str | int, limit: int, since: float | None = None) -> list[dict]:
+    """The last ``limit`` turns of the user (newer than ``since``), oldest first."""
+    try:
+        with get_cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT role, content_enc FROM assistant_turns
+                WHERE user_id = ? AND ts > ? ORDER BY ts DESC, id DESC LIMIT ?
+                """,
+                (str(user_id), since or 0, int(limit)),
+            )
+            rows = cursor.fetchall()
+    except Exception as e:
+        logger.error(f"❌ Не вдалося прочитати історію асистента: {e}")
+        return []
+    return [
+        {"role": role, "content": decrypt_text(content, DB_ENCRYPTION_KEY)}
+        for role, content in reversed(rows)
+    ]
+
+
+def migrate_chat_history_blobs() -> int:
+    """Move legacy ``oberig_chat_history_*`` JSON blobs into ``assistant_turns``."""
+    moved = 0
+    try:
+        with get_cursor() as cursor:
+            cursor.execute(
+                "SELECT key, value FROM users WHERE key LIKE ?",
+                (LEGACY_HISTORY_PREFIX + "%",),
+            )
+            rows = cursor.fetchall()
+            ts = time.time()
+            for key, value in rows:
+                user_id = key[len(LEGACY_HISTORY_PREFIX):]
+                try:
+                    history = json.loads(decrypt_text(value, DB_ENCRYPTION_KEY) or "[]")
+                except (TypeError, ValueError):
+                    history = []
+                turns = [
+                    {"role": turn["role"], "content": turn["content"]}
+                    for turn in history
+                    if isinstance(turn, dict) and turn.get("role") and turn.get("content")
+                ]
+                if turns:
+                    _insert_turns(cursor, user_id, turns, ts)
+                    _trim(cursor, user_id, ASSISTANT_HISTORY_KEEP)
+                cursor.execute("DELETE FROM users WHERE key = ?", (key,))
+                moved += 1
+    except Exception as e:
+        logger.error(f"❌ Не вдалося перенести історію асистента: {e}")
+        return 0
+    if moved:
+        logger.info(f"✅ Історію асистента {moved} користувачів перенесено в assistant_turns")
+    return moved
+
+
+__all__ = [
+    "ASSISTANT_HISTORY_WINDOW",
+    "append_turns",
+    "create_assistant_turns_table",
+    "migrate_chat_history_blobs",
+    "recent_turns",
+]
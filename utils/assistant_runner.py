@@ -0,0 +1,198 @@
+"""
+Запуск асистента OpenAI (Assistants API).
+
+Новий thread створюється разом із повідомленнями й run одним запитом
+(``threads.create_and_run``). Якщо передано ``thread_key``, thread
+запам'ятовується на ``ASSISTANT_THREAD_TTL`` секунд і наступний запит лише
+додає нове повідомлення до того самого run-запиту (``additional_messages``),
+а контекст передається як ``additional_instructions``. Стан run опитується
+з короткими інтервалами, що зростають від ``ASSISTANT_POLL_MIN`` до
+``ASSISTANT_POLL_MAX``; час кожної фази записується в лог.
+"""
+import asyncio
+import os
+import threading
+import time
+
+import openai
+
+from utils.logger import logger
+from utils.openai_client import get_openai_client, openai_slot, request_timeout
+
+ASSISTANT_POLL_MIN = float(os.getenv("ASSISTANT_POLL_MIN", "0.1"))
+ASSISTANT_POLL_MAX = float(os.getenv("ASSISTANT_POLL_MAX", "1.0"))
+ASSISTANT_RUN_TIMEOUT = float(os.getenv("ASSISTANT_RUN_TIMEOUT", "60"))
+ASSISTANT_THREAD_TTL = int(os.getenv("ASSISTANT_THREAD_TTL", "1800"))
+# Скільки останніх повідомлень thread асистент бачить під час run
+ASSISTANT_THREAD_MESSAGES = int(os.getenv("ASSISTANT_THREAD_MESSAGES", "10"))
+
+RUN_DONE = "completed"
+RUN_ACTIVE = {"queued", "in_progress", "cancelling"}
+
+
+class ThreadStore:
+    """Thread ids remembered per key (user) for ``ttl`` seconds of inactivity."""
+
+    def __init__(self, ttl: int = ASSISTANT_THREAD_TTL):
+        self.ttl = ttl
+        self._threads: dict[str, tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._threads.get(key)
+            if entry is None:
+                return None
+            thread_id, expires = entry
+            if expires < time.monotonic():
+                del self._threads[key]
+                return None
+            return thread_id
+
+    def put(self, key: str, thread_id: str):
+        with self._lock:
+            now = time.monotonic()
+            # Прибираємо прострочені, щоб словник не ріс безмежно
+            for stale in [k for k, (_, expires) in self._threads.items() if expires < now]:
+                del self._threads[stale]
+            self._threads[key] = (thread_id, now + self.ttl)
+
+    def forget(self, key: str):
+        with self._lock:
+            self._threads.pop(key, None)
+
+
+assistant_threads = ThreadStore()
+
+
+def _split_messages(messages: list[dict]) -> tuple[str, list[dict]]:
+    """Separate system prompts from thread messages (Assistants accept user/assistant)."""
+    instructions = []
+    thread_messages = []
+    for msg in messages:
+        role = msg.get("role", "user")
+        content = msg.get("content", "")
+        if role == "system":
+            instructions.append(content)
+        elif role in {"user", "assistant"}:
+            thread_messages.append({"role": role, "content": content})
+        else:
+            thread_messages.append({"role": "user", "content": content})
+    return "\n\n".join(part for part in instructions if part), thread_messages
+
+
+async def _request(call, **kwargs):
+    async with openai_slot():
+        return await call(**kwargs)
+
+
+async def _wait_for_run(threads, run, timeout: float, run_timeout: float) -> tuple[object, int]:
+    """Poll ``run`` with growing short intervals until it leaves the active states."""
+    deadline = time.monotonic() + run_timeout
+    delay = ASSISTANT_POLL_MIN
+    polls = 0
+    while run.status in RUN_ACTIVE:
+        if time.monotonic() + delay > deadline:
+            try:
+                await _request(
+                    threads.runs.cancel,
+                    thread_id=run.thread_id,
+                    run_id=run.id,
+                    timeout=request_timeout(timeout),
+                )
+            except Exception as e:
+                logger.debug(f"Не вдалося скасувати run асистента: {e}")
+            raise asyncio.TimeoutError(f"run не завершився за {run_timeout:g} с")
+        # Слот не тримаємо під час очікування – він потрібен іншим запитам
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, ASSISTANT_POLL_MAX)
+        run = await _request(
+            threads.runs.retrieve,
+            thread_id=run.thread_id,
+            run_id=run.id,
+            timeout=request_timeout(timeout),
+        )
+        polls += 1
+    return run, polls
+
+
+async def run_assistant(
+    messages: list[dict],
+    assistant_id: str,
+    timeout: int = 15,
+    thread_key: str | None = None,
+    run_timeout: float = ASSISTANT_RUN_TIMEOUT,
+) -> str:
+    """
+    Run the assistant on ``messages`` and return its reply. With
+    ``thread_key`` the thread is reused while it is remembered.
+    """
+    threads = get_openai_client().beta.threads
+    per_request = request_timeout(timeout)
+    instructions, thread_messages = _split_messages(messages)
+    truncation = {"type": "last_messages", "last_messages": ASSISTANT_THREAD_MESSAGES}
+    thread_id = assistant_threads.get(thread_key) if thread_key else None
+
+    started = time.monotonic()
+    try:
+        if thread_id and thread_messages:
+            # Історія вже в thread – додаємо лише нове повідомлення
+            run = await _request(
+                threads.runs.create,
+                thread_id=thread_id,
+                assistant_id=assistant_id,
+                additional_instructions=instructions or None,
+                additional_messages=thread_messages[-1:],
+                truncation_strategy=truncation,
+                timeout=per_request,
+            )
+        else:
+            if instructions:
+                # instructions у create_and_run замінили б інструкції асистента
+                thread_messages.insert(0, {"role": "user", "content": instructions})
+            run = await _request(
+                threads.create_and_run,
+                assistant_id=assistant_id,
+                thread={"messages": thread_messages},
+                truncation_strategy=truncation,
+                timeout=per_request,
+            )
+        created = time.monotonic()
+
+        run, polls = await _wait_for_run(threads, run, timeout, run_timeout)
+        finished = time.monotonic()
+        if run.status != RUN_DONE:
+            raise openai.OpenAIError(f"run {run.status}")
+
+        msgs = await _request(
+            threads.messages.list,
+            thread_id=run.thread_id,
+            run_id=run.id,
+            order="desc",
+            limit=1,
+            timeout=per_request,
+        )
+    except Exception:
+        if thread_key:
+            # Зламаний або зайнятий thread не використовуємо повторно
+            assistant_threads.forget(thread_key)
+        raise
+
+    if thread_key:
+        assistant_threads.put(thread_key, run.thread_id)
+    logger.info(
+        f"⏱️ Асистент ({'thread повторно' if thread_id else 'новий thread'}): "
+        f"запуск {(created - started) * 1000:.0f} мс, "
+        f"виконання {(finished - created) * 1000:.0f} мс ({polls} опитувань), "
+        f"відповідь {(time.monotonic() - finished) * 1000:.0f} мс"
+    )
+    return msgs.data[0].content[0].text.value.strip() if msgs.data else ""
+
+
+__all__ = [
+    "ASSISTANT_POLL_MAX",
+    "ASSISTANT_POLL_MIN",
+    "ThreadStore",
+    "assistant_threads",
+    "run_assistant",
+]
@@ -1,17 +1,31 @@
+import functools
 import hashlib
 import io
 import os
 import random
 from typing import Optional
 
+from utils.disk_cache import CACHE_ROOT, DiskLRUCache
 from utils.logger import logger
 
-
-def _mix(c1: tuple[int, int, int], c2: tuple[int, int, int], t: float) -> tuple[int, int, int]:
-    r = int(c1[0] + (c2[0] - c1[0]) * t)
-    g = int(c1[1] + (c2[1] - c1[1]) * t)
-    b = int(c1[2] + (c2[2] - c1[2]) * t)
-    return (r, g, b)
+FONT_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)),
+    "assets",
+    "fonts",
+    "Kotyhoroshko-Regular.0.2.otf",
+)
+GRADIENTS = {
+    "morning": ((255, 190, 120), (120, 200, 255)),
+    "evening": ((40, 46, 99), (142, 52, 118)),
+}
+# Рівень стиснення PNG: 1 – швидко, 9 – найменший файл (optimize=True повільний)
+PNG_COMPRESS_LEVEL = int(os.getenv("BIRTHDAY_IMAGE_COMPRESS_LEVEL", "3"))
+
+image_cache = DiskLRUCache(
+    os.getenv("BIRTHDAY_IMAGE_CACHE_DIR", os.path.join(CACHE_ROOT, "birthday_images")),
+    max_bytes=int(os.getenv("BIRTHDAY_IMAGE_CACHE_MB", "50")) * 1024 * 1024,
+    suffix=".png",
+)
 
 
 def _rand_pastel(rnd: random.Random, base: tuple[int, int, int]) -> tuple[int, int, int]:
@@ -22,11 +36,63 @@ def _rand_pastel(rnd: random.Random, base: tuple[int, int, int]) -> tuple[int, i
     )
 
 
+@functools.lru_cache(maxsize=8)
+def _load_font(path: str, size: int):
+    """TrueType fonts are parsed once per process and size."""
+    from PIL import ImageFont  # type: ignore
+
+    try:
+        return ImageFont.truetype(path, size)
+    except Exception as exc:
+        logger.warning(f"Не вдалося завантажити шрифт '{path}': {exc}")
+        return ImageFont.load_default()
+
+
+@functools.lru_cache(maxsize=4)
+def _gradient(size: tuple[int, int], greeting_type: str):
+    """Vertical gradient built by Pillow in C: a resized linear_gradient mask."""
+    from PIL import Image  # type: ignore
+
+    c1, c2 = GRADIENTS.get(greeting_type, GRADIENTS["morning"])
+    mask = Image.linear_gradient("L").resize(size)
+    return Image.composite(Image.new("RGB", size, c2), Image.new("RGB", size, c1), mask)
+
+
+def _cache_key(name: str, seed: Optional[str], greeting_type: str, size: tuple[int, int]) -> str:
+    return f"{name}|{seed}|{greeting_type}|{size[0]}x{size[1]}"
+
+
 def create_birthday_image_bytes(
     name: str,
     seed: Optional[str] = None,
     greeting_type: str = "morning",
     size: tuple[int, int] = (1024, 576),
+    use_cache: bool = True,
+) -> Optional[bytes]:
+    """
+    Return PNG bytes of a festive birthday image, served from the disk cache
+    when the same (name, seed, greeting_type, size) was rendered before.
+    Blocking – call it from a worker thread. Returns None on failure.
+    """
+    key = _cache_key(name, seed, greeting_type, size)
+    if use_cache:
+        cached = image_cache.get(key)
+        if cached:
+            return cached
+    data = render_birthday_image_png(name, seed, greeting_type, size)
+    if data and use_cache:
+        try:
+            image_cache.set(key, data)
+        except OSError as exc:
+            logger.warning(f"⚠️ Не вдалося зберегти зображення в кеш: {exc}")
+    return data
+
+
+def render_birthday_image_png(
+    name: str,
+    seed: Optional[str] = None,
+    greeting_type: str = "morning",
+    size: tuple[int, int] = (1024, 576),
 ) -> Optional[bytes]:
     """
     Create a simple festive birthday image with optional text.
@@ -34,7 +100,7 @@ def create_birthday_image_bytes(
     """
     try:
         try:
-            from PIL import Image, ImageDraw, ImageFont  # type: ignore
+            from PIL import ImageDraw  # type: ignore
         except Exception as exc:
             logger.error(f"❌ Pillow не встановлено, зображення не буде створено: {exc}")
             return None
@@ -44,21 +110,10 @@ def create_birthday_image_bytes(
         rnd = random.Random(seed_int)
 
         width, height = size
-        if greeting_type == "evening":
-            c1 = (40, 46, 99)
-            c2 = (142, 52, 118)
-        else:
-            c1 = (255, 190, 120)
-            c2 = (120, 200, 255)
-
-        img = Image.new("RGB", (width, height), c1)
+        # Gradient background (кешований, копіюється перед малюванням)
+        img = _gradient(size, greeting_type).copy()
         draw = ImageDraw.Draw(img)
 
-        # Gradient background
-        for y in range(height):
-            t = y / (height - 1)
-            draw.line([(0, y), (width, y)], fill=_mix(c1, c2, t))
-
         # Confetti
         base_colors = [(255, 99, 132), (54, 162, 235), (255, 206, 86), (75, 192, 192)]
         for _ in range(220):
@@ -80,28 +135,10 @@ def create_birthday_image_bytes(
         # Title text
         title = "З Днем народження!"
         subtitle = name.strip() if name.strip() else "Іменинник"
-        font_path = os.path.join(
-            os.path.dirname(os.path.dirname(__file__)),
-            "assets",
-            "fonts",
-            "Kotyhoroshko-Regular.0.2.otf",
-        )
-
-        font_title = None
-        font_name = None
-        if font_path:
-            try:
-                font_title = ImageFont.truetype(font_path, 64)
-                font_name = ImageFont.truetype(font_path, 56)
-            except Exception as exc:
-                logger.warning(f"Не вдалося завантажити шрифт '{font_path}': {exc}")
-
-        if font_title is None:
-            font_title = ImageFont.load_default()
-        if font_name is None:
-            font_name = ImageFont.load_default()
-
-        def _center_text(text: str, font: ImageFont.FreeTypeFont, y: int) -> int:
+        font_title = _load_font(FONT_PATH, 64)
+        font_name = _load_font(FONT_PATH, 56)
+
+        def _center_text(text: str, font, y: int) -> int:
             bbox = draw.textbbox((0, 0), text, font=font)
             text_w = bbox[2] - bbox[0]
             return max(0, int((width - text_w) / 2))
@@ -109,7 +146,7 @@ def create_birthday_image_bytes(
         title_y = int(height * 0.12)
         name_y = int(height * 0.25)
 
-        def _draw_text_with_shadow(text: str, font: ImageFont.FreeTypeFont, y: int):
+        def _draw_text_with_shadow(text: str, font, y: int):
             x = _center_text(text, font, y)
             # Shadow for contrast
             draw.text((x + 2, y + 2), text, font=font, fill=(0, 0, 0, 120))
@@ -119,8 +156,11 @@ def create_birthday_image_bytes(
         _draw_text_with_shadow(subtitle, font_name, name_y)
 
         buf = io.BytesIO()
-        img.save(buf, format="PNG", optimize=True)
+        img.save(buf, format="PNG", compress_level=PNG_COMPRESS_LEVEL)
         return buf.getvalue()
     except Exception as exc:
         logger.error(f"❌ Помилка генерації зображення для дня народження: {exc}")
         return None
+
+
+__all__ = ["create_birthday_image_bytes", "render_birthday_image_png", "image_cache"]
@@ -8,6 +8,7 @@ from utils.logger import logger
 from config import GOOGLE_CREDENTIALS, CALENDAR_ID, YOUTUBE_API_KEY, OBERIG_PLAYLIST_ID
 from googleapiclient.errors import HttpError
 from database import get_value, set_value, get_cursor
+from utils.quota import QuotaExceeded, charge_quota
 import json
 import re
 
@@ -86,9 +87,10 @@ BERLIN_TZ = pytz.timezone("Europe/Berlin")
 
 
 # Отримання списку майбутніх подій
-def get_calendar_events(max_results=150):
+def get_calendar_events(max_results=150, strict: bool = False):
     """
     Отримує список майбутніх подій із Google Calendar.
+    При ``strict=True`` відмова бюджетувальника квоти пробрасується як QuotaExceeded.
     """
     try:
         service = _get_calendar_service()
@@ -96,6 +98,7 @@ def get_calendar_events(max_results=150):
             return []
 
         now = datetime.now(BERLIN_TZ).isoformat()
+        charge_quota("calendar", "events.list", key="calendar:upcoming")
         events_result = (
             service.events()
             .list(
@@ -116,6 +119,10 @@ def get_calendar_events(max_results=150):
 
         return events
 
+    except QuotaExceeded:
+        if strict:
+            raise
+        return []
     except Exception as e:
         logger.error(f"Помилка при отриманні подій з календаря: {e}")
         return []
@@ -134,7 +141,10 @@ def get_calendar_events_cached(max_results: int = 150, ttl: int = 300):
         except Exception:
             pass
 
-    events = get_calendar_events(max_results)
+    try:
+        events = get_calendar_events(max_results, strict=True)
+    except QuotaExceeded:
+        return _stale_cached_events("calendar_events_cache", testing)
     if not testing:
         try:
             set_value("calendar_events_cache", json.dumps(events))
@@ -144,17 +154,37 @@ def get_calendar_events_cached(max_results: int = 150, ttl: int = 300):
     return events
 
 
+def _stale_cached_events(key: str, testing: bool = False) -> list:
+    """Return cached events regardless of age when the API is unavailable or out of quota."""
+    if testing:
+        return []
+    try:
+        cached = get_value(key)
+        if cached:
+            logger.info(f"⏳ Календар недоступний, повертаємо застарілий кеш {key}")
+            return json.loads(cached)
+    except Exception:
+        pass
+    return []
+
+
 # New helpers ---------------------------------------------------------------
 
-def get_upcoming_birthdays(days: int = 30):
-    """Return upcoming birthday events within ``days`` days."""
+def get_upcoming_birthdays(days: int = 30, strict: bool = False):
+    """
+    Return upcoming birthday events within ``days`` days. With ``strict``
+    failed fetches raise instead of looking like "no birthdays".
+    """
     try:
         service = _get_calendar_service()
         if not service:
+            if strict:
+                raise RuntimeError("Calendar service недоступний")
             return []
 
         now = datetime.now(BERLIN_TZ)
         time_max = (now + timedelta(days=days)).isoformat()
+        charge_quota("calendar", "events.list", key=f"calendar:birthdays:{days}")
         events_result = (
             service.events()
             .list(
@@ -180,13 +210,22 @@ def get_upcoming_birthdays(days: int = 30):
 
         logger.info(f"Отримано {len(birthday_events)} майбутніх днів народження")
         return birthday_events
+    except QuotaExceeded:
+        if strict:
+            raise
+        return []
     except Exception as e:
         logger.error(f"Помилка при отриманні майбутніх днів народження: {e}")
+        if strict:
+            raise
         return []
 
 
-def get_upcoming_birthdays_cached(days: int = 30, ttl: int = 300):
-    """Cached variant of :func:`get_upcoming_birthdays`."""
+def get_upcoming_birthdays_cached(days: int = 30, ttl: int = 300, strict: bool = False):
+    """
+    Cached variant of :func:`get_upcoming_birthdays`. A failed fetch is
+    never cached: ``strict`` callers get the error, others the stale cache.
+    """
     try:
         cached = get_value("up_birthdays_cache")
         ts = get_value("up_birthdays_cache_ts")
@@ -196,7 +235,14 @@ def get_upcoming_birthdays_cached(days: int = 30, ttl: int = 300):
     except Exception:
         pass
 
-    events = get_upcoming_birthdays(days)
+    try:
+        events = get_upcoming_birthdays(days, strict=True)
+    except QuotaExceeded:
+        return _stale_cached_events("up_birthdays_cache")
+    except Exception:
+        if strict:
+            raise
+        return _stale_cached_events("up_birthdays_cache")
     try:
         set_value("up_birthdays_cache", json.dumps(events))
         set_value("up_birthdays_cache_ts", str(now_ts))
@@ -214,6 +260,7 @@ def get_events_in_range(start_dt: datetime, end_dt: datetime, keyword: str | Non
         )
         service = build("calendar", "v3", credentials=credentials)
 
+        charge_quota("calendar", "events.list")
         events_result = (
             service.events()
             .list(
@@ -296,7 +343,7 @@ def get_next_event(keyword: str):
 
 
 # \u041e\u0442\u0440\u0438\u043c\u0430\u043d\u043d\u044f \u043c\u0438\u043d\u0443\u043b\u0438\u0445 \u043f\u043e\u0434\u0456\u0439
-def get_past_events(max_results: int = 50):
+def get_past_events(max_results: int = 50, strict: bool = False):
     """\
     \u041e\u0442\u0440\u0438\u043c\u0443\u0454 \u0441\u043f\u0438\u0441\u043e\u043a \u043f\u043e\u0434\u0456\u0439, \u044f\u043a\u0456 \u0432\u0456\u0434\u0431\u0443\u043b\u0438\u0441\u044c \u0434\u043e \u0442\u0435\u043a\u0443\u0447\u043e\u0433\u043e \u0447\u0430\u0441\u0443.
     """
@@ -308,6 +355,7 @@ def get_past_events(max_results: int = 50):
         service = build("calendar", "v3", credentials=credentials)
 
         now = datetime.now(BERLIN_TZ).isoformat()
+        charge_quota("calendar", "events.list", key="calendar:past")
         events_result = (
             service.events()
             .list(
@@ -339,6 +387,10 @@ def get_past_events(max_results: int = 50):
             logger.info("\u041c\u0438\u043d\u0443\u043b\u0438\u0445 \u043f\u043e\u0434\u0456\u0439 \u043d\u0435 \u0437\u043d\u0430\u0439\u0434\u0435\u043d\u043e")
 
         return events
+    except QuotaExceeded:
+        if strict:
+            raise
+        return []
     except Exception as e:
         logger.error(f"\u041f\u043e\u043c\u0438\u043b\u043a\u0430 \u043f\u0440\u0438 \u043e\u0442\u0440\u0438\u043c\u0430\u043d\u043d\u0456 \u043c\u0438\u043d\u0443\u043b\u0438\u0445 \u043f\u043e\u0434\u0456\u0439: {e}")
         return []
@@ -355,7 +407,10 @@ def get_past_events_cached(max_results: int = 50, ttl: int = 300):
     except Exception:
         pass
 
-    events = get_past_events(max_results)
+    try:
+        events = get_past_events(max_results, strict=True)
+    except QuotaExceeded:
+        return _stale_cached_events("past_events_cache")
     try:
         set_value("past_events_cache", json.dumps(events))
         set_value("past_events_cache_ts", str(now_ts))
@@ -405,6 +460,7 @@ def get_today_events():
             .isoformat()
         )
 
+        charge_quota("calendar", "events.list", key="calendar:today")
         events_result = (
             service.events()
             .list(
@@ -498,6 +554,7 @@ def get_event_details(event_id: str):
         )
         service = build("calendar", "v3", credentials=credentials)
 
+        charge_quota("calendar", "events.get")
         event = service.events().get(calendarId=CALENDAR_ID, eventId=event_id).execute()
         logger.info(f"Отримано деталі події з ID: {event_id}")
 
@@ -580,6 +637,7 @@ def get_latest_youtube_video():
             playlistId=OBERIG_PLAYLIST_ID,
             maxResults=50,
         )
+        charge_quota("youtube", "playlistItems.list", key=f"playlist:{OBERIG_PLAYLIST_ID}")
         response = request.execute()
 
         if not response.get("items"):
@@ -592,6 +650,7 @@ def get_latest_youtube_video():
         for item in response["items"]:
             try:
                 video_id = item["snippet"]["resourceId"]["videoId"]
+                charge_quota("youtube", "videos.list", key=f"video:{video_id}")
                 video_response = (
                     youtube.videos().list(part="snippet", id=video_id).execute()
                 )
@@ -601,6 +660,8 @@ def get_latest_youtube_video():
                     if latest_date is None or publish_date > latest_date:
                         latest_date = publish_date
                         latest_video = video_id
+            except QuotaExceeded:
+                break
             except Exception as e:
                 logger.warning(
                     f"Помилка при отриманні інформації про відео {video_id}: {e}"
@@ -615,6 +676,8 @@ def get_latest_youtube_video():
             logger.warning("Не вдалося знайти найновше відео.")
             return None
 
+    except QuotaExceeded:
+        return None
     except HttpError as e:
         logger.error(f"Помилка при отриманні найновішого відео: {e}")
         return None
@@ -633,6 +696,7 @@ def get_most_popular_youtube_video():
             playlistId=OBERIG_PLAYLIST_ID,
             maxResults=50,
         )
+        charge_quota("youtube", "playlistItems.list", key=f"playlist:{OBERIG_PLAYLIST_ID}")
         response = request.execute()
 
         if not response.get("items"):
@@ -645,6 +709,7 @@ def get_most_popular_youtube_video():
         for item in response["items"]:
             try:
                 video_id = item["snippet"]["resourceId"]["videoId"]
+                charge_quota("youtube", "videos.list", key=f"video:{video_id}")
                 video_response = (
                     youtube.videos().list(part="statistics", id=video_id).execute()
                 )
@@ -656,6 +721,8 @@ def get_most_popular_youtube_video():
                     if view_count > max_views:
                         max_views = view_count
                         most_popular_video = video_id
+            except QuotaExceeded:
+                break
             except Exception as e:
                 logger.warning(
                     f"Помилка при отриманні статистики відео {video_id}: {e}"
@@ -690,6 +757,7 @@ def get_top_10_videos():  # Змінюємо назву
             playlistId=OBERIG_PLAYLIST_ID,
             maxResults=50,
         )
+        charge_quota("youtube", "playlistItems.list", key=f"playlist:{OBERIG_PLAYLIST_ID}")
         response = request.execute()
 
         if not response.get("items"):
@@ -701,6 +769,7 @@ def get_top_10_videos():  # Змінюємо назву
             try:
                 video_id = item["snippet"]["resourceId"]["videoId"]
                 title = item["snippet"]["title"]
+                charge_quota("youtube", "videos.list", key=f"video:{video_id}")
                 video_response = (
                     youtube.videos().list(part="statistics", id=video_id).execute()
                 )
@@ -711,6 +780,8 @@ def get_top_10_videos():  # Змінюємо назву
                     )
                     url = f"https://www.youtube.com/watch?v={video_id}"
                     videos.append((title, url, view_count))
+            except QuotaExceeded:
+                break
             except Exception as e:
                 logger.warning(
                     f"Помилка при отриманні статистики відео {video_id}: {e}"
@@ -827,6 +898,7 @@ async def check_new_videos():
         request = youtube.playlistItems().list(
             part="snippet", playlistId=OBERIG_PLAYLIST_ID, maxResults=10
         )
+        charge_quota("youtube", "playlistItems.list", key="yt_new_videos")
         response = request.execute()
 
         new_videos = []
@@ -865,6 +937,8 @@ async def check_new_videos():
 
         return new_videos
 
+    except QuotaExceeded:
+        return []
     except Exception as e:
         logger.error(f"Помилка при перевірці нових відео: {e}")
         return []
@@ -0,0 +1,66 @@
+"""
+Паралельний збір контексту з кількох незалежних джерел.
+
+Кожне джерело – це функція без аргументів зі своїм дедлайном і значенням
+за замовчуванням. Синхронні функції (Google API, SQLite, embeddings)
+виконуються в робочих потоках через ``asyncio.to_thread``, корутини –
+напряму. Джерело, що не вклалося в дедлайн або впало, повертає значення
+за замовчуванням і не затримує решту; час кожного джерела логується.
+"""
+import asyncio
+import inspect
+import os
+import time
+from typing import Any, Callable
+
+from utils.logger import logger
+
+# Дедлайн за замовчуванням для одного джерела, секунди
+SOURCE_TIMEOUT = float(os.getenv("ASSISTANT_SOURCE_TIMEOUT", "4"))
+
+
+def source(name: str, func: Callable[[], Any], default: Any = None, timeout: float | None = None) -> tuple:
+    """Describe one source as ``(name, func, default, timeout)``."""
+    return name, func, default, SOURCE_TIMEOUT if timeout is None else timeout
+
+
+async def _run_source(name: str, func: Callable[[], Any], default: Any, timeout: float) -> tuple:
+    started = time.perf_counter()
+    try:
+        if inspect.iscoroutinefunction(func):
+            value = await asyncio.wait_for(func(), timeout)
+        else:
+            # Потік не можна перервати: після дедлайну він допрацює у фоні,
+            # а його результат просто не використовується
+            value = await asyncio.wait_for(asyncio.to_thread(func), timeout)
+        status = None
+    except asyncio.TimeoutError:
+        value, status = default, "таймаут"
+    except Exception as e:
+        value, status = default, f"помилка: {e}"
+    return name, value, status, (time.perf_counter() - started) * 1000
+
+
+async def gather_sources(sources: list[tuple], label: str = "контекст") -> dict[str, Any]:
+    """
+    Run all ``sources`` concurrently and return ``{name: value}``. Late or
+    failed sources fall back to their defaults instead of raising.
+    """
+    if not sources:
+        return {}
+    started = time.perf_counter()
+    outcomes = await asyncio.gather(*(_run_source(*spec) for spec in sources))
+    total_ms = (time.perf_counter() - started) * 1000
+
+    timings = ", ".join(
+        f"{name}={elapsed:.0f}мс" + (f" ({status})" if status else "")
+        for name, _, status, elapsed in outcomes
+    )
+    logger.info(f"⏱️ {label}: {total_ms:.0f} мс [{timings}]")
+    for name, _, status, _ in outcomes:
+        if status:
+            logger.warning(f"⚠️ Джерело «{name}» пропущено ({status}), використано значення за замовчуванням")
+    return {name: value for name, value, _, _ in outcomes}
+
+
+__all__ = ["SOURCE_TIMEOUT", "gather_sources", "source"]
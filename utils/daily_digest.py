@@ -0,0 +1,104 @@
+"""
+Рендер щоденного дайджесту подій.
+
+Усі події дня пакуються в одне MarkdownV2-повідомлення з компактною
+клавіатурою «ℹ️ N». Нове повідомлення починається лише тоді, коли
+наступна подія не вміщується в ліміт Telegram 4096 символів.
+Результат – готові елементи outbox, які рендеряться один раз і
+однаково надсилаються всім отримувачам.
+"""
+from datetime import datetime
+
+from telegram.helpers import escape_markdown
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+DIGEST_BUTTONS_PER_ROW = 4
+SUMMARY_MAX_CHARS = 200
+LOCATION_MAX_CHARS = 200
+
+
+def utf16_len(text: str) -> int:
+    """Telegram рахує довжину повідомлення в UTF-16 code units."""
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(str(text).split())
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+def _event_time(event: dict, tz) -> str:
+    start = event.get("start") or {}
+    raw = start.get("dateTime")
+    if raw:
+        return datetime.fromisoformat(raw.replace("Z", "+00:00")).astimezone(tz).strftime("%H:%M")
+    return "(весь день)" if start.get("date") else ""
+
+
+def render_event_line(number: int, event: dict, tz) -> str:
+    """One escaped MarkdownV2 block for a digest entry."""
+    summary = escape_markdown(_clip(event.get("summary") or "Без назви", SUMMARY_MAX_CHARS), version=2)
+    when = _event_time(event, tz)
+    line = f"*{number}\\.* "
+    if when:
+        line += f"🕒 *{escape_markdown(when, version=2)}* – "
+    line += summary
+    location = event.get("location")
+    if location:
+        line += f"\n      📍 {escape_markdown(_clip(location, LOCATION_MAX_CHARS), version=2)}"
+    return line
+
+
+def _keyboard(buttons: list[dict]) -> list[list[dict]]:
+    return [
+        buttons[i : i + DIGEST_BUTTONS_PER_ROW]
+        for i in range(0, len(buttons), DIGEST_BUTTONS_PER_ROW)
+    ]
+
+
+def render_daily_digest(
+    title: str,
+    events: list[dict],
+    tz,
+    callback_data=None,
+    category: str | None = None,
+    limit: int = TELEGRAM_MESSAGE_LIMIT,
+) -> list[dict]:
+    """
+    Render ``events`` into as few pre-escaped MarkdownV2 outbox items as
+    the ``limit`` allows. ``callback_data(event)`` returns the payload of the
+    event's «ℹ️ N» button (or None to omit it). Buttons are attached to the
+    message that contains the event.
+    """
+    header = f"*{escape_markdown(title, version=2)}*"
+    items: list[dict] = []
+    text, buttons = header, []
+
+    def _flush():
+        item = {"text": text, "kind": "markdown_v2"}
+        if buttons:
+            item["buttons"] = _keyboard(buttons)
+        if category:
+            item["category"] = category
+        items.append(item)
+
+    for number, event in enumerate(events, 1):
+        line = render_event_line(number, event, tz)
+        if utf16_len(text) + 2 + utf16_len(line) > limit:
+            _flush()
+            text, buttons = line, []
+        else:
+            text += "\n\n" + line
+        data = callback_data(event) if callback_data else None
+        if data:
+            buttons.append({"text": f"ℹ️ {number}", "callback_data": data})
+    _flush()
+    return items
+
+
+__all__ = [
+    "TELEGRAM_MESSAGE_LIMIT",
+    "utf16_len",
+    "render_event_line",
+    "render_daily_digest",
+]
@@ -0,0 +1,220 @@
+import asyncio
+import os
+import time
+from datetime import timedelta
+
+from utils.logger import logger
+
+# Telegram дозволяє ~30 повідомлень/с на бота, ~1/с у приватний чат
+# і ~20/хв у групу. Тримаємо запас від жорстких лімітів.
+GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "25"))
+GLOBAL_BURST = int(os.getenv("TELEGRAM_GLOBAL_BURST", "5"))
+PRIVATE_CHAT_RATE = 1.0
+PRIVATE_CHAT_BURST = 3
+GROUP_CHAT_RATE = 20 / 60
+GROUP_CHAT_BURST = 3
+FANOUT_CONCURRENCY = int(os.getenv("TELEGRAM_FANOUT_CONCURRENCY", "16"))
+RETRY_AFTER_ATTEMPTS = 3
+
+# Методи бота, що надсилають повідомлення і підпадають під ліміти
+THROTTLED_METHODS = frozenset(
+    {
+        "send_message",
+        "send_photo",
+        "send_document",
+        "send_media_group",
+        "copy_message",
+        "forward_message",
+    }
+)
+
+
+class _Bucket:
+    """Token bucket scheduled in virtual time (GCRA)."""
+
+    __slots__ = ("interval", "tolerance", "tat")
+
+    def __init__(self, rate: float, burst: int):
+        self.interval = 1.0 / rate
+        self.tolerance = max(burst - 1, 0) * self.interval
+        self.tat = 0.0
+
+    def reserve(self, now: float, not_before: float = 0.0) -> float:
+        """Reserve the next token and return the moment it becomes usable."""
+        tat = max(self.tat, now, not_before)
+        ready_at = max(now, not_before, tat - self.tolerance)
+        self.tat = tat + self.interval
+        return ready_at
+
+
+class TelegramRateLimiter:
+    """Global and per-chat send limiter shared by all jobs of the bot."""
+
+    def __init__(
+        self,
+        rate: float = GLOBAL_RATE,
+        burst: int = GLOBAL_BURST,
+        clock=time.monotonic,
+        sleep=asyncio.sleep,
+    ):
+        self._global = _Bucket(rate, burst)
+        self._chats: dict[str, _Bucket] = {}
+        self._paused_until = 0.0
+        self._clock = clock
+        self._sleep = sleep
+
+    @staticmethod
+    def _is_group(chat_id) -> bool:
+        return str(chat_id).startswith("-")
+
+    def _chat_bucket(self, chat_id) -> _Bucket:
+        key = str(chat_id)
+        bucket = self._chats.get(key)
+        if bucket is None:
+            if self._is_group(key):
+                bucket = _Bucket(GROUP_CHAT_RATE, GROUP_CHAT_BURST)
+            else:
+                bucket = _Bucket(PRIVATE_CHAT_RATE, PRIVATE_CHAT_BURST)
+            self._chats[key] = bucket
+        return bucket
+
+    async def _wait_until(self, moment: float):
+        delay = moment - self._clock()
+        if delay > 0:
+            await self._sleep(delay)
+
+    async def acquire(self, chat_id=None):
+        """Wait until a message to ``chat_id`` may be sent."""
+        if chat_id is not None:
+            await self._wait_until(self._chat_bucket(chat_id).reserve(self._clock()))
+        # Глобальний слот резервуємо лише коли чат уже готовий,
+        # щоб повільна група не блокувала решту отримувачів
+        await self._wait_until(
+            self._global.reserve(self._clock(), not_before=self._paused_until)
+        )
+        while self._paused_until > self._clock():
+            await self._wait_until(self._paused_until)
+
+    def pause(self, seconds: float):
+        """Stop all sends for ``seconds`` (Telegram flood control)."""
+        self._paused_until = max(self._paused_until, self._clock() + seconds)
+
+    def forget(self, chat_id):
+        self._chats.pop(str(chat_id), None)
+
+
+telegram_limiter = TelegramRateLimiter()
+
+
+def _retry_after_seconds(exc: Exception) -> float | None:
+    retry_after = getattr(exc, "retry_after", None)
+    if retry_after is None:
+        return None
+    if isinstance(retry_after, timedelta):
+        return retry_after.total_seconds()
+    try:
+        return float(retry_after)
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimitedBot:
+    """
+    Proxy around ``telegram.Bot`` that throttles outgoing messages and turns
+    ``RetryAfter`` into a global pause followed by a retry.
+    """
+
+    def __init__(self, bot, limiter: TelegramRateLimiter | None = None):
+        self._bot = bot
+        self._limiter = limiter or telegram_limiter
+
+    def __getattr__(self, name):
+        attr = getattr(self._bot, name)
+        if name not in THROTTLED_METHODS:
+            return attr
+
+        async def call(*args, **kwargs):
+            chat_id = kwargs.get("chat_id", args[0] if args else None)
+            for attempt in range(1, RETRY_AFTER_ATTEMPTS + 1):
+                await self._limiter.acquire(chat_id)
+                try:
+                    return await attr(*args, **kwargs)
+                except Exception as e:
+                    seconds = _retry_after_seconds(e)
+                    if seconds is None or attempt == RETRY_AFTER_ATTEMPTS:
+                        raise
+                    logger.warning(
+                        f"⏳ Telegram просить зачекати {seconds:.0f} с (chat_id={chat_id}), спроба {attempt}/{RETRY_AFTER_ATTEMPTS}"
+                    )
+                    self._limiter.pause(seconds)
+
+        return call
+
+
+def limited_bot(bot, limiter: TelegramRateLimiter | None = None) -> RateLimitedBot:
+    """Wrap ``bot`` with the shared limiter unless it is already wrapped."""
+    if isinstance(bot, RateLimitedBot):
+        return bot
+    return RateLimitedBot(bot, limiter)
+
+
+class DeliveryResult:
+    """Outcome of delivering to one recipient."""
+
+    __slots__ = ("chat_id", "message", "error")
+
+    def __init__(self, chat_id, message=None, error: str | None = None):
+        self.chat_id = chat_id
+        self.message = message
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.message is not None and self.error is None
+
+    def __repr__(self):
+        status = "ok" if self.ok else f"failed: {self.error or 'no message'}"
+        return f"DeliveryResult({self.chat_id}, {status})"
+
+
+async def fan_out(
+    recipients,
+    send,
+    concurrency: int = FANOUT_CONCURRENCY,
+    label: str = "delivery",
+) -> list[DeliveryResult]:
+    """
+    Call ``await send(chat_id)`` for every unique recipient with bounded
+    concurrency. Rate limits are enforced by the bot passed to ``send``
+    (see :func:`limited_bot`). Returns results in recipient order.
+    """
+    unique = list({str(chat_id): chat_id for chat_id in recipients}.values())
+    if not unique:
+        return []
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    started = time.monotonic()
+
+    async def _deliver(chat_id):
+        async with semaphore:
+            try:
+                return DeliveryResult(chat_id, await send(chat_id))
+            except Exception as e:
+                logger.error(f"❌ {label}: не вдалося надіслати в чат {chat_id}: {e}")
+                return DeliveryResult(chat_id, error=str(e))
+
+    results = await asyncio.gather(*(_deliver(chat_id) for chat_id in unique))
+    delivered = sum(1 for r in results if r.ok)
+    logger.info(
+        f"📬 {label}: доставлено {delivered}/{len(results)} за {time.monotonic() - started:.2f} с"
+    )
+    return list(results)
+
+
+__all__ = [
+    "TelegramRateLimiter",
+    "RateLimitedBot",
+    "DeliveryResult",
+    "telegram_limiter",
+    "limited_bot",
+    "fan_out",
+]
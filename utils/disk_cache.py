@@ -0,0 +1,161 @@
+"""
+Обмежений за розміром LRU-кеш файлів на диску.
+
+Записи зберігаються як окремі файли з ім'ям sha256(ключа); запис
+атомарний (тимчасовий файл + os.replace). Порядок LRU визначається
+mtime, який оновлюється при кожному зверненні, тож стан кешу
+переживає перезапуск без окремого індексу.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+from utils.logger import logger
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_ROOT = os.getenv("BOT_CACHE_DIR", os.path.join(ROOT_DIR, "cache"))
+
+
+class DiskLRUCache:
+    """Size-capped directory of cached blobs with LRU eviction."""
+
+    def __init__(self, directory: str, max_bytes: int, suffix: str = ""):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+        self._entries: dict[str, list] | None = None  # файл -> [розмір, час доступу]
+
+    def _filename(self, key: str) -> str:
+        return hashlib.sha256(key.encode("utf-8")).hexdigest() + self.suffix
+
+    def _index(self) -> dict[str, list]:
+        if self._entries is None:
+            entries = {}
+            names = os.listdir(self.directory) if os.path.isdir(self.directory) else []
+            for filename in names:
+                # .tmp* – незавершені записи, інші файли з крапкою – службові
+                if filename.startswith("."):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.directory, filename))
+                except OSError:
+                    continue
+                entries[filename] = [stat.st_size, stat.st_mtime]
+            self._entries = entries
+        return self._entries
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(size for size, _ in self._index().values())
+
+    def contains(self, key: str) -> bool:
+        """Membership test that does not touch LRU order or counters."""
+        with self._lock:
+            return self._filename(key) in self._index()
+
+    def path(self, key: str) -> str | None:
+        """Return the path of a cached entry (and mark it used) or None."""
+        filename = self._filename(key)
+        with self._lock:
+            entry = self._index().get(filename)
+            if entry is None:
+                self.misses += 1
+                return None
+            path = os.path.join(self.directory, filename)
+            now = time.time()
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                self._entries.pop(filename, None)
+                self.misses += 1
+                return None
+            entry[1] = now
+            self.hits += 1
+            self.bytes_saved += entry[0]
+            return path
+
+    def get(self, key: str) -> bytes | None:
+        path = self.path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def temp_path(self) -> str:
+        """A temporary file inside the cache directory (same filesystem for os.replace)."""
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=".tmp", dir=self.directory)
+        os.close(fd)
+        return tmp
+
+    def put_file(self, key: str, src_path: str) -> str:
+        """Move ``src_path`` into the cache atomically; returns the cached path."""
+        filename = self._filename(key)
+        dst = os.path.join(self.directory, filename)
+        with self._lock:
+            self._index()
+            os.replace(src_path, dst)
+            self._entries[filename] = [os.path.getsize(dst), time.time()]
+            self._evict(keep=filename)
+        return dst
+
+    def set(self, key: str, data: bytes) -> str:
+        tmp = self.temp_path()
+        try:
+            with open(tmp, "wb") as f:
+                f.write(data)
+            return self.put_file(key, tmp)
+        except Exception:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def discard(self, key: str):
+        filename = self._filename(key)
+        with self._lock:
+            if self._index().pop(filename, None) is not None:
+                try:
+                    os.unlink(os.path.join(self.directory, filename))
+                except OSError:
+                    pass
+
+    def _evict(self, keep: str | None = None):
+        total = sum(size for size, _ in self._entries.values())
+        if total <= self.max_bytes:
+            return
+        for filename, (size, _) in sorted(self._entries.items(), key=lambda item: item[1][1]):
+            if total <= self.max_bytes:
+                break
+            if filename == keep:
+                continue
+            try:
+                os.unlink(os.path.join(self.directory, filename))
+            except OSError as e:
+                logger.warning(f"⚠️ Не вдалося видалити {filename} з кешу: {e}")
+            self._entries.pop(filename, None)
+            total -= size
+
+    def stats(self) -> dict:
+        requests = self.hits + self.misses
+        with self._lock:
+            index = self._index()
+            return {
+                "entries": len(index),
+                "bytes": sum(size for size, _ in index.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "bytes_saved": self.bytes_saved,
+                "hit_rate": round(self.hits / requests, 3) if requests else 0.0,
+            }
+
+
+__all__ = ["CACHE_ROOT", "DiskLRUCache"]
@@ -0,0 +1,248 @@
+"""
+Кеш embedding-ів пошукових запитів асистента.
+
+Ключ – модель і нормалізований текст запиту, тож "Коли репетиція?" і
+"коли  репетиція" беруть той самий вектор. Записи зберігаються в таблиці
+``query_embeddings`` і переживають перезапуск; у пам'яті тримається LRU
+на ``EMBEDDING_CACHE_SIZE`` записів, а в базі – стільки ж найсвіжіших за
+часом використання, не старших за ``EMBEDDING_CACHE_TTL_DAYS``.
+Найчастіші запити з ``Analytics.log_query`` прогріваються заздалегідь.
+"""
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+
+from database import get_cursor
+from utils import call_openai_embedding
+from utils.analytics import POPULAR_QUERIES_DAYS, Analytics
+from utils.logger import logger
+from utils.sheet_index import normalize
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_CACHE_SIZE = int(os.getenv("ASSISTANT_EMBEDDING_CACHE_SIZE", "500"))
+EMBEDDING_CACHE_TTL_DAYS = int(os.getenv("ASSISTANT_EMBEDDING_CACHE_TTL_DAYS", "30"))
+PREWARM_QUERIES = int(os.getenv("ASSISTANT_EMBEDDING_PREWARM", "20"))
+# Час використання влучань записується пакетами, а не на кожне питання:
+# щойно набралось TOUCH_BATCH ключів або минуло TOUCH_INTERVAL секунд
+TOUCH_BATCH = 20
+TOUCH_INTERVAL = 300
+
+_embeddings: OrderedDict[str, tuple[list[float], float]] = OrderedDict()
+_loaded = False
+# Поки embedding запиту не отримано, однакові питання чекають на перший
+# запит до OpenAI, а не надсилають кожне свій
+_locks: dict[str, asyncio.Lock] = {}
+_counters = {"hits": 0, "misses": 0, "prewarmed": 0}
+# cache_key -> last_used, ще не записаний у базу
+_touched: dict[str, float] = {}
+_touches_flushed_at = 0.0
+
+
+def create_query_embeddings_table():
+    with get_cursor() as cursor:
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS query_embeddings (
+                cache_key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                query TEXT NOT NULL,
+                embedding TEXT NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+    logger.info("✅ Таблиця query_embeddings створена або вже існує.")
+
+
+def cache_key(query: str, model: str = EMBEDDING_MODEL) -> str:
+    return f"{model}:{normalize(query)}"
+
+
+def _expired(last_used: float, now: float) -> bool:
+    return now - last_used > EMBEDDING_CACHE_TTL_DAYS * 86400
+
+
+def _load():
+    global _loaded
+    if _loaded:
+        return
+    try:
+        with get_cursor() as cursor:
+            cursor.execute(
+                "SELECT cache_key, embedding, last_used FROM query_embeddings "
+                "ORDER BY last_used DESC LIMIT ?",
+                (EMBEDDING_CACHE_SIZE,),
+            )
+            rows = cursor.fetchall()
+        now = time.time()
+        # Від найстаріших до найсвіжіших, щоб свіжі опинились у кінці LRU
+        for key, embedding, last_used in reversed(rows):
+            if not _expired(last_used, now):
+                _embeddings[key] = (json.loads(embedding), last_used)
+    except Exception as e:
+        logger.warning(f"⚠️ Не вдалося завантажити кеш embedding-ів запитів: {e}")
+    _loaded = True
+
+
+def _store(key: str, model: str, query: str, embedding: list[float], last_used: float, touched: dict[str, float]):
+    """Upsert one row, write pending ``last_used`` touches and trim the table."""
+    try:
+        with get_cursor() as cursor:
+            _write_touches(cursor, touched)
+            cursor.execute(
+                """
+                INSERT OR REPLACE INTO query_embeddings (cache_key, model, query, embedding, last_used)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (key, model, normalize(query), json.dumps(embedding), last_used),
+            )
+            cursor.execute(
+                """
+                DELETE FROM query_embeddings
+                WHERE last_used < ? OR cache_key NOT IN (
+                    SELECT cache_key FROM query_embeddings ORDER BY last_used DESC LIMIT ?
+                )
+                """,
+                (last_used - EMBEDDING_CACHE_TTL_DAYS * 86400, EMBEDDING_CACHE_SIZE),
+            )
+    except Exception as e:
+        logger.warning(f"⚠️ Не вдалося зберегти embedding запиту: {e}")
+
+
+def _write_touches(cursor, touched: dict[str, float]):
+    if touched:
+        cursor.executemany(
+            "UPDATE query_embeddings SET last_used = ? WHERE cache_key = ?",
+            [(last_used, key) for key, last_used in touched.items()],
+        )
+
+
+def _flush_touches(touched: dict[str, float]):
+    try:
+        with get_cursor() as cursor:
+            _write_touches(cursor, touched)
+    except Exception as e:
+        logger.warning(f"⚠️ Не вдалося оновити час використання embedding-ів: {e}")
+
+
+def _take_touches() -> dict[str, float]:
+    global _touched, _touches_flushed_at
+    touched, _touched = _touched, {}
+    _touches_flushed_at = time.time()
+    return touched
+
+
+def _remember(key: str, embedding: list[float], last_used: float):
+    _embeddings[key] = (embedding, last_used)
+    _embeddings.move_to_end(key)
+    while len(_embeddings) > EMBEDDING_CACHE_SIZE:
+        _embeddings.popitem(last=False)
+
+
+def _cached(key: str, now: float) -> list[float] | None:
+    entry = _embeddings.get(key)
+    if entry is None:
+        return None
+    embedding, last_used = entry
+    if _expired(last_used, now):
+        del _embeddings[key]
+        return None
+    return embedding
+
+
+async def get_query_embedding(query: str, model: str = EMBEDDING_MODEL) -> list[float]:
+    """Embedding of ``query``: from the cache or, on a miss, from OpenAI."""
+    if not _loaded:
+        await asyncio.to_thread(_load)
+    if not normalize(query):
+        return await call_openai_embedding(query, model=model)
+    key = cache_key(query, model)
+    embedding = _cached(key, time.time())
+    if embedding is None:
+        lock = _locks.setdefault(key, asyncio.Lock())
+        try:
+            async with lock:
+                embedding = _cached(key, time.time())
+                if embedding is None:
+                    _counters["misses"] += 1
+                    embedding = await call_openai_embedding(query, model=model)
+                    if embedding:
+                        now = time.time()
+                        _remember(key, embedding, now)
+                        await asyncio.to_thread(
+                            _store, key, model, query, embedding, now, _take_touches()
+                        )
+                    return embedding
+        finally:
+            _locks.pop(key, None)
+    _counters["hits"] += 1
+    now = time.time()
+    _remember(key, embedding, now)
+    _touched[key] = now
+    if len(_touched) >= TOUCH_BATCH or now - _touches_flushed_at >= TOUCH_INTERVAL:
+        await asyncio.to_thread(_flush_touches, _take_touches())
+    return embedding
+
+
+async def prewarm_query_embeddings(limit: int = PREWARM_QUERIES, days: int = POPULAR_QUERIES_DAYS) -> int:
+    """Embed the most frequent logged queries that are not cached yet."""
+    if not _loaded:
+        await asyncio.to_thread(_load)
+    popular = await Analytics().get_popular_queries(days=days, limit=limit)
+    now = time.time()
+    warmed = 0
+    for query, _count in popular:
+        if not normalize(query) or _cached(cache_key(query), now) is not None:
+            continue
+        try:
+            embedding = await call_openai_embedding(query)
+        except Exception as e:
+            logger.warning(f"⚠️ Прогрів embedding-ів перервано: {e}")
+            break
+        if embedding:
+            key = cache_key(query)
+            _remember(key, embedding, now)
+            await asyncio.to_thread(
+                _store, key, EMBEDDING_MODEL, query, embedding, now, _take_touches()
+            )
+            warmed += 1
+    if _touched:
+        await asyncio.to_thread(_flush_touches, _take_touches())
+    _counters["prewarmed"] += warmed
+    if warmed:
+        logger.info(f"🔥 Прогріто embedding-ів популярних запитів: {warmed}")
+    return warmed
+
+
+async def prewarm_query_embeddings_job(context):
+    await prewarm_query_embeddings()
+
+
+def embedding_cache_stats() -> dict:
+    lookups = _counters["hits"] + _counters["misses"]
+    return {
+        **_counters,
+        "entries": len(_embeddings),
+        "hit_rate": _counters["hits"] / lookups if lookups else 0.0,
+    }
+
+
+def format_embedding_cache_report() -> str:
+    stats = embedding_cache_stats()
+    return (
+        "🧭 Кеш embedding-ів запитів:\n"
+        f"Влучань: {stats['hits']}, промахів: {stats['misses']}, частка: {stats['hit_rate']:.0%}, "
+        f"записів: {stats['entries']}, прогріто: {stats['prewarmed']}"
+    )
+
+
+__all__ = [
+    "create_query_embeddings_table",
+    "embedding_cache_stats",
+    "format_embedding_cache_report",
+    "get_query_embedding",
+    "prewarm_query_embeddings",
+    "prewarm_query_embeddings_job",
+]
@@ -0,0 +1,281 @@
+"""
+Швидкі відповіді асистента без звернення до OpenAI.
+
+Прості питання про розклад («коли наступна репетиція», «де концерт»,
+«скільки виступів цього року», «коли був останній виступ») повністю
+покриваються даними календаря. Парсер визначає намір і тип події, а
+шаблон формує відповідь за мілісекунди. Відкриті питання та все, для чого
+в календарі немає даних, повертають None і йдуть до LLM.
+"""
+import re
+import threading
+import time
+from datetime import datetime
+
+from utils.calendar_utils import (
+    BERLIN_TZ,
+    count_events,
+    get_calendar_events_cached,
+    get_last_event,
+    get_next_event,
+    get_past_events_cached,
+)
+from utils.logger import logger
+
+# Тип події → основи слів для пошуку та форми для відповіді (1, 2-4, 5+)
+EVENT_KINDS = {
+    "rehearsal": {
+        "stems": ("репетиц",),
+        "emoji": "🎶",
+        "forms": ("репетиція", "репетиції", "репетицій"),
+    },
+    "performance": {
+        "stems": ("виступ", "концерт"),
+        "emoji": "🎤",
+        "forms": ("виступ", "виступи", "виступів"),
+    },
+    "birthday": {
+        "stems": ("день народж", "дня народж", "днем народж", "днів народж", "іменин"),
+        "emoji": "🎂",
+        "forms": ("день народження", "дні народження", "днів народження"),
+    },
+}
+NEXT_TITLES = {
+    "rehearsal": "Наступна репетиція",
+    "performance": "Наступний виступ",
+    "birthday": "Найближчий день народження",
+}
+LAST_TITLES = {
+    "rehearsal": "Остання репетиція",
+    "performance": "Останній виступ",
+    "birthday": "Останній день народження",
+}
+# Такі питання потребують міркувань, а не одного факту з календаря
+OPEN_ENDED_MARKERS = (
+    "чому", "навіщо", "як ", "порад", "розкаж", "поясни", "опиши", "що спів",
+    "що взяти", "що вдягти", "знайди", "пошук", "ноти", "відео",
+)
+MAX_QUESTION_WORDS = 10
+# Розміри кешованих списків подій, з яких рахуються події за період
+PAST_EVENTS_LIMIT = 50
+UPCOMING_EVENTS_LIMIT = 150
+
+_lock = threading.Lock()
+_counters = {"questions": 0, "hits": 0, "misses": 0, "hit_ms": 0.0}
+_by_intent: dict[str, int] = {}
+
+
+def _plural(n: int, forms: tuple[str, str, str]) -> str:
+    if n % 10 == 1 and n % 100 != 11:
+        return forms[0]
+    if 2 <= n % 10 <= 4 and (n % 100 < 10 or n % 100 >= 20):
+        return forms[1]
+    return forms[2]
+
+
+def _period(text: str, now: datetime) -> tuple[datetime, datetime, str] | None:
+    year_start = now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
+    month_start = year_start.replace(month=now.month)
+    if "минулого місяця" in text or "минулому місяці" in text:
+        end = month_start
+        start = (end.replace(year=end.year - 1, month=12) if end.month == 1
+                 else end.replace(month=end.month - 1))
+        return start, end, f"за {start.strftime('%m.%Y')}"
+    if "цього місяця" in text or "цьому місяці" in text:
+        end = (month_start.replace(year=now.year + 1, month=1) if now.month == 12
+               else month_start.replace(month=now.month + 1))
+        return month_start, end, f"за {month_start.strftime('%m.%Y')}"
+    if "минулого року" in text or "минулому році" in text:
+        start = year_start.replace(year=now.year - 1)
+        return start, year_start, f"у {start.year} році"
+    if "цього року" in text or "цьому році" in text or "за рік" in text:
+        return year_start, year_start.replace(year=now.year + 1), f"у {now.year} році"
+    return None
+
+
+def parse_intent(message: str) -> dict | None:
+    """
+    Recognize a schedule question: ``{"intent": "next" | "where" | "last" |
+    "count", "kind": ..., "period": ...}`` or None for open-ended text.
+    """
+    text = " ".join(message.lower().replace("?", " ").split())
+    if not text or len(text.split()) > MAX_QUESTION_WORDS:
+        return None
+    if any(marker in f"{text} " for marker in OPEN_ENDED_MARKERS):
+        return None
+    kinds = [kind for kind, spec in EVENT_KINDS.items() if any(s in text for s in spec["stems"])]
+    if len(kinds) != 1:
+        return None
+    kind = kinds[0]
+
+    if "скільки" in text:
+        period = _period(text, datetime.now(BERLIN_TZ))
+        return {"intent": "count", "kind": kind, "period": period} if period else None
+    if re.search(r"\bде\b", text):
+        return {"intent": "where", "kind": kind}
+    if "останн" in text or "минул" in text:
+        return {"intent": "last", "kind": kind}
+    if "коли" in text or "наступн" in text or "найближч" in text:
+        return {"intent": "next", "kind": kind}
+    return None
+
+
+def _event_text(event: dict) -> str:
+    return " ".join(
+        [event.get("summary", ""), event.get("description", "") or "", event.get("location", "") or ""]
+    ).lower()
+
+
+def _matches(event: dict | None, kind: str) -> bool:
+    return bool(event) and any(stem in _event_text(event) for stem in EVENT_KINDS[kind]["stems"])
+
+
+def _start(event: dict) -> datetime:
+    start = event.get("start", {})
+    raw = start.get("dateTime")
+    if raw:
+        return datetime.fromisoformat(raw.replace("Z", "+00:00")).astimezone(BERLIN_TZ)
+    return datetime.fromisoformat(start["date"]).replace(tzinfo=BERLIN_TZ)
+
+
+def _when(event: dict) -> str:
+    start = _start(event)
+    if event.get("start", {}).get("dateTime"):
+        return f"📅 {start.strftime('%d-%m-%Y')} ⏰ {start.strftime('%H:%M')}"
+    return f"📅 {start.strftime('%d-%m-%Y')}"
+
+
+def _location(event: dict) -> str:
+    return (event.get("location") or "").strip() or "місце ще не вказано"
+
+
+def _closest(events: list[dict], latest: bool) -> dict | None:
+    if not events:
+        return None
+    return (max if latest else min)(events, key=_start)
+
+
+def _events_between(start: datetime, end: datetime) -> list[dict] | None:
+    """
+    Events of ``[start, end)`` from the cached past and upcoming lists, or
+    None when a full cached list does not reach the period boundary.
+    """
+    past = get_past_events_cached(max_results=PAST_EVENTS_LIMIT)
+    upcoming = get_calendar_events_cached(max_results=UPCOMING_EVENTS_LIMIT)
+    try:
+        # Кеш обмежений за кількістю: заповнений список, що не сягає межі
+        # періоду, дав би занижений рахунок
+        if len(past) >= PAST_EVENTS_LIMIT and min(map(_start, past)) > start:
+            return None
+        if len(upcoming) >= UPCOMING_EVENTS_LIMIT and max(map(_start, upcoming)) < end:
+            return None
+        events, seen = [], set()
+        for event in past + upcoming:
+            key = event.get("id") or (event.get("summary"), _start(event))
+            if key not in seen and start <= _start(event) < end:
+                seen.add(key)
+                events.append(event)
+        return events
+    except (KeyError, ValueError) as e:
+        logger.debug(f"Подію без дати пропущено під час підрахунку: {e}")
+        return None
+
+
+def answer_intent(intent: dict) -> str | None:
+    """Template answer from calendar data, or None when the data is missing."""
+    kind = intent["kind"]
+    spec = EVENT_KINDS[kind]
+    stems = spec["stems"]
+
+    if intent["intent"] in ("next", "where"):
+        event = _closest([ev for ev in map(get_next_event, stems) if _matches(ev, kind)], latest=False)
+        if event is None:
+            return None
+        if intent["intent"] == "where":
+            return (
+                f"📍 {event.get('summary', 'Без назви')}: {_location(event)}\n"
+                f"{_when(event)} #Оберіг"
+            )
+        return (
+            f"{spec['emoji']} {NEXT_TITLES[kind]}: {event.get('summary', 'Без назви')}\n"
+            f"{_when(event)}\n📍 {_location(event)} #Оберіг"
+        )
+
+    if intent["intent"] == "last":
+        # get_last_event повертає будь-яку минулу подію, якщо збігу немає
+        event = _closest([ev for ev in map(get_last_event, stems) if _matches(ev, kind)], latest=True)
+        if event is None:
+            return None
+        return (
+            f"{spec['emoji']} {LAST_TITLES[kind]}: {event.get('summary', 'Без назви')}\n"
+            f"{_when(event)}\n📍 {_location(event)} #Оберіг"
+        )
+
+    start, end, label = intent["period"]
+    events = _events_between(start, end)
+    if events is None:
+        return None
+    total = count_events([ev for ev in events if _matches(ev, kind)])
+    if not total:
+        # Порожній результат може означати і збій календаря – хай вирішує LLM
+        return None
+    return f"{spec['emoji']} {label.capitalize()} у календарі {total} {_plural(total, spec['forms'])}. #Оберіг"
+
+
+def fast_answer(message: str) -> str | None:
+    """Answer ``message`` locally if it is a schedule question; counts hits."""
+    started = time.perf_counter()
+    intent = parse_intent(message)
+    answer = None
+    if intent is not None:
+        try:
+            answer = answer_intent(intent)
+        except Exception as e:
+            logger.warning(f"⚠️ Швидка відповідь не вдалася, передаємо запит до LLM: {e}")
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    with _lock:
+        _counters["questions"] += 1
+        if answer is None:
+            _counters["misses"] += 1
+        else:
+            _counters["hits"] += 1
+            _counters["hit_ms"] += elapsed_ms
+            name = f"{intent['intent']}:{intent['kind']}"
+            _by_intent[name] = _by_intent.get(name, 0) + 1
+        hits, questions = _counters["hits"], _counters["questions"]
+    if answer is not None:
+        logger.info(
+            f"⚡ Швидка відповідь {intent['intent']}:{intent['kind']} за {elapsed_ms:.1f} мс "
+            f"(без LLM: {hits}/{questions})"
+        )
+    return answer
+
+
+def fast_answer_stats() -> dict:
+    with _lock:
+        stats = dict(_counters)
+        stats["by_intent"] = dict(_by_intent)
+    questions = stats["questions"]
+    stats["hit_rate"] = stats["hits"] / questions if questions else 0.0
+    stats["avg_hit_ms"] = stats.pop("hit_ms") / stats["hits"] if stats["hits"] else 0.0
+    return stats
+
+
+def format_fast_answer_report() -> str:
+    stats = fast_answer_stats()
+    lines = [
+        "⚡ Швидкі відповіді асистента (з моменту запуску):",
+        f"Питань: {stats['questions']}, без LLM: {stats['hits']} ({stats['hit_rate']:.0%}), "
+        f"середній час: {stats['avg_hit_ms']:.1f} мс",
+    ]
+    lines += [f"• {name}: {count}" for name, count in sorted(stats["by_intent"].items())]
+    return "\n".join(lines)
+
+
+__all__ = [
+    "fast_answer",
+    "fast_answer_stats",
+    "format_fast_answer_report",
+    "parse_intent",
+    "answer_intent",
+]
@@ -0,0 +1,174 @@
+"""
+Реєстр file_id Telegram для повторного надсилання медіа.
+
+Після першого завантаження файлу Telegram повертає ``file_id``, за яким
+той самий файл можна надіслати в будь-який чат без передачі байтів.
+Ключ запису – хеш вмісту (``content_key``) або ідентифікатор Drive з
+ревізією (``drive_key``), тож нова версія файлу отримує новий ключ.
+"""
+import asyncio
+import hashlib
+import inspect
+import time
+
+from database import get_cursor
+from utils.logger import logger
+
+try:
+    from telegram.error import BadRequest
+except Exception:  # pragma: no cover - fallback for tests/minimal environments
+    class BadRequest(Exception):
+        pass
+
+MEDIA_ATTRIBUTES = ("document", "video", "audio", "animation", "voice")
+# Лише ці відповіді Telegram означають, що застарів сам file_id; інші
+# помилки (чат не знайдено, розмітка підпису) повторне завантаження не виправить
+STALE_FILE_ID_ERRORS = (
+    "wrong file identifier",
+    "wrong remote file identifier",
+    "file reference expired",
+    "file_reference_expired",
+)
+
+# Дзеркало таблиці media_files: ключ -> file_id
+_file_ids: dict[str, str] = {}
+_loaded = False
+# Поки файл не завантажено, паралельні надсилання того ж ключа чекають
+# на перше завантаження, а не вантажать байти кожне окремо
+_locks: dict[str, asyncio.Lock] = {}
+_counters = {"uploads": 0, "reused": 0, "stale": 0}
+
+
+def create_media_registry_table():
+    with get_cursor() as cursor:
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS media_files (
+                media_key TEXT PRIMARY KEY,
+                media_type TEXT NOT NULL,
+                file_id TEXT NOT NULL,
+                file_unique_id TEXT,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+    logger.info("✅ Таблиця media_files створена або вже існує.")
+
+
+def content_key(data: bytes) -> str:
+    return "sha256:" + hashlib.sha256(data).hexdigest()
+
+
+def drive_key(drive_id: str, revision: str | None) -> str:
+    return f"drive:{drive_id}:{revision or ''}"
+
+
+def _load():
+    global _loaded
+    if _loaded:
+        return
+    try:
+        with get_cursor() as cursor:
+            cursor.execute("SELECT media_key, file_id FROM media_files")
+            _file_ids.update({key: file_id for key, file_id in cursor.fetchall()})
+    except Exception as e:
+        logger.warning(f"⚠️ Не вдалося завантажити реєстр медіа: {e}")
+    _loaded = True
+
+
+def lookup(key: str) -> str | None:
+    _load()
+    return _file_ids.get(key)
+
+
+def extract_file_id(message) -> tuple[str | None, str | None]:
+    """Return ``(file_id, file_unique_id)`` of the media in a sent message."""
+    photo = getattr(message, "photo", None)
+    if photo:
+        largest = photo[-1]
+        return largest.file_id, getattr(largest, "file_unique_id", None)
+    for attr in MEDIA_ATTRIBUTES:
+        media = getattr(message, attr, None)
+        if media is not None and getattr(media, "file_id", None):
+            return media.file_id, getattr(media, "file_unique_id", None)
+    return None, None
+
+
+def remember(key: str, media_type: str, message) -> str | None:
+    file_id, unique_id = extract_file_id(message)
+    if not file_id:
+        return None
+    _load()
+    _file_ids[key] = file_id
+    with get_cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT OR REPLACE INTO media_files (media_key, media_type, file_id, file_unique_id, created_at)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (key, media_type, file_id, unique_id, time.time()),
+        )
+    return file_id
+
+
+def is_stale_file_id(error: Exception) -> bool:
+    message = str(error).lower()
+    return any(marker in message for marker in STALE_FILE_ID_ERRORS)
+
+
+def forget(key: str):
+    _file_ids.pop(key, None)
+    with get_cursor() as cursor:
+        cursor.execute("DELETE FROM media_files WHERE media_key = ?", (key,))
+
+
+async def send_media(send, key: str, media_type: str, load):
+    """
+    Send media through ``send(payload)`` using the registered file_id when
+    there is one. Otherwise ``load()`` (sync or async) provides the bytes or
+    file object to upload, and the returned file_id is remembered. A
+    file_id that Telegram reports as invalid or expired is dropped and the
+    file uploaded again; any other error is raised.
+    """
+    file_id = lookup(key)
+    if file_id is None:
+        lock = _locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            file_id = lookup(key)
+            if file_id is None:
+                payload = load()
+                if inspect.isawaitable(payload):
+                    payload = await payload
+                message = await send(payload)
+                _counters["uploads"] += 1
+                remember(key, media_type, message)
+                return message
+    try:
+        message = await send(file_id)
+        _counters["reused"] += 1
+        return message
+    except BadRequest as e:
+        if not is_stale_file_id(e):
+            raise
+        logger.warning(f"⚠️ Telegram відхилив file_id для {key}: {e}. Завантажуємо файл знову")
+        _counters["stale"] += 1
+        forget(key)
+        return await send_media(send, key, media_type, load)
+
+
+def media_stats() -> dict:
+    return dict(_counters)
+
+
+__all__ = [
+    "create_media_registry_table",
+    "content_key",
+    "drive_key",
+    "lookup",
+    "extract_file_id",
+    "remember",
+    "forget",
+    "is_stale_file_id",
+    "send_media",
+    "media_stats",
+]
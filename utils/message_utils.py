@@ -4,14 +4,21 @@ from telegram.constants import ParseMode
 from telegram.helpers import escape_markdown
 from utils.logger import logger
 
-async def safe_send_markdown(bot, chat_id: int, text: str, retries: int = 3, **kwargs):
-    """Send a MarkdownV2 message with basic retries and escaping."""
-    escaped = escape_markdown(text, version=2)
+async def safe_send_markdown(
+    bot, chat_id: int, text: str, retries: int = 3, escaped: bool = False, **kwargs
+):
+    """
+    Send a MarkdownV2 message with basic retries and escaping.
+    With ``escaped=True`` the text is already valid MarkdownV2 and is sent
+    as is; on a parse error it falls back to the fully escaped text.
+    """
+    raw = text
+    text = text if escaped else escape_markdown(text, version=2)
     for attempt in range(1, retries + 1):
         try:
             return await bot.send_message(
                 chat_id=chat_id,
-                text=escaped,
+                text=text,
                 parse_mode=ParseMode.MARKDOWN_V2,
                 **kwargs,
             )
@@ -26,7 +33,7 @@ async def safe_send_markdown(bot, chat_id: int, text: str, retries: int = 3, **k
                 logger.warning(f"Chat not found (BadRequest), припиняю відправку в chat_id={chat_id}")
                 break
             logger.error(f"BadRequest while sending message: {e}")
-            escaped = escape_markdown(text, version=2)
+            text = escape_markdown(raw, version=2)
         except Exception as e:
             logger.error(f"Unexpected error while sending message: {e}")
             break
@@ -0,0 +1,142 @@
+"""
+Спільний асинхронний клієнт OpenAI.
+
+Один ``openai.AsyncOpenAI`` на весь бот з власним пулом з'єднань httpx
+(keep-alive, обмежена кількість з'єднань) замість потоку на кожен запит.
+Таймаути задаються для кожного запиту, а семафор обмежує кількість
+одночасних звернень до OpenAI; ``llm_slot`` додатково обмежує кількість
+цілих викликів LLM, що виконуються водночас. Для навантажувальних тестів без мережі
+транспорт можна підмінити через ``use_transport`` (див. utils/openai_fake.py).
+"""
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+import openai
+
+from utils.logger import logger
+
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))
+OPENAI_MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", "10"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "30"))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+OPENAI_CONCURRENCY = int(os.getenv("OPENAI_CONCURRENCY", "8"))
+# Цілі виклики LLM (з повторами, потоком чи очікуванням run асистента)
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "4"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "20"))
+
+_client = None
+_client_loop = None
+_semaphore: asyncio.Semaphore | None = None
+_semaphore_loop = None
+_llm_semaphore: asyncio.Semaphore | None = None
+_llm_semaphore_loop = None
+_transport = None
+
+
+def request_timeout(total: float):
+    """Per-request timeout: ``total`` for reads, a shorter connect phase."""
+    # httpx потрібен лише тут і в _build_client – імпорт utils лишається легким
+    import httpx
+
+    return httpx.Timeout(total, connect=min(OPENAI_CONNECT_TIMEOUT, total))
+
+
+def _build_client():
+    import httpx
+
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+            keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+        ),
+        timeout=request_timeout(30),
+        transport=_transport,
+    )
+    # Повтори робить викликач (call_openai_chat тощо), тож SDK не повторює сам
+    return openai.AsyncOpenAI(
+        api_key=openai.api_key or os.getenv("OPENAI_API_KEY"),
+        http_client=http_client,
+        max_retries=0,
+    )
+
+
+def get_openai_client():
+    """Shared client for the running event loop."""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop:
+        # Пул httpx прив'язаний до циклу подій, у якому створений
+        _client = _build_client()
+        _client_loop = loop
+        logger.info(
+            f"🔌 Клієнт OpenAI: до {OPENAI_MAX_CONNECTIONS} з'єднань, "
+            f"одночасних запитів до {OPENAI_CONCURRENCY}"
+        )
+    return _client
+
+
+def openai_slot() -> asyncio.Semaphore:
+    """Semaphore bounding concurrent OpenAI requests in the running loop."""
+    global _semaphore, _semaphore_loop
+    loop = asyncio.get_running_loop()
+    if _semaphore is None or _semaphore_loop is not loop:
+        _semaphore = asyncio.Semaphore(OPENAI_CONCURRENCY)
+        _semaphore_loop = loop
+    return _semaphore
+
+
+@asynccontextmanager
+async def llm_slot(wait: float | None = None):
+    """
+    Cap on in-flight LLM calls in the running loop. Raises
+    ``asyncio.TimeoutError`` if no slot frees up within ``wait`` seconds.
+    """
+    global _llm_semaphore, _llm_semaphore_loop
+    loop = asyncio.get_running_loop()
+    if _llm_semaphore is None or _llm_semaphore_loop is not loop:
+        _llm_semaphore = asyncio.Semaphore(LLM_CONCURRENCY)
+        _llm_semaphore_loop = loop
+    semaphore = _llm_semaphore
+    try:
+        await asyncio.wait_for(semaphore.acquire(), LLM_QUEUE_TIMEOUT if wait is None else wait)
+    except asyncio.TimeoutError:
+        logger.warning(f"⏳ Усі {LLM_CONCURRENCY} слоти LLM зайняті – запит відхилено")
+        raise
+    try:
+        yield
+    finally:
+        semaphore.release()
+
+
+def use_transport(transport):
+    """Route the shared client through ``transport`` (None restores the network)."""
+    global _transport, _client, _client_loop
+    previous = _transport
+    _transport = transport
+    _client = None
+    _client_loop = None
+    return previous
+
+
+async def close_openai_client():
+    global _client, _client_loop
+    client, _client, _client_loop = _client, None, None
+    if client is not None:
+        try:
+            await client.close()
+        except Exception as e:
+            logger.warning(f"⚠️ Не вдалося закрити клієнт OpenAI: {e}")
+
+
+__all__ = [
+    "LLM_CONCURRENCY",
+    "OPENAI_CONCURRENCY",
+    "close_openai_client",
+    "get_openai_client",
+    "llm_slot",
+    "openai_slot",
+    "request_timeout",
+    "use_transport",
+]
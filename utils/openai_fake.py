@@ -0,0 +1,108 @@
+"""
+Фейковий транспорт OpenAI для навантажувальних тестів без мережі.
+
+Підключається замість мережі через ``use_transport(FakeOpenAITransport())``:
+справжній ``AsyncOpenAI`` і httpx працюють як зазвичай, але відповіді на
+chat/completions (звичайні й потокові) та embeddings генеруються локально
+із заданою затримкою. Лічильники показують, скільки запитів виконувалось
+одночасно.
+"""
+import asyncio
+import json
+from collections import Counter
+
+import httpx
+
+
+class FakeOpenAITransport(httpx.AsyncBaseTransport):
+    def __init__(
+        self,
+        latency: float = 0.05,
+        reply: str = "Привіт від тестового OpenAI 🎵 #Оберіг",
+        stream_chunks: int = 5,
+        embedding_size: int = 8,
+    ):
+        self.latency = latency
+        self.reply = reply
+        self.stream_chunks = stream_chunks
+        self.embedding_size = embedding_size
+        self.requests: Counter = Counter()
+        self.active = 0
+        self.peak = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        self.requests[path] += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.latency)
+            body = json.loads(request.content or b"{}")
+            model = body.get("model", "fake")
+            if path.endswith("/chat/completions"):
+                if body.get("stream"):
+                    return self._stream(model)
+                return httpx.Response(200, json=self._completion(model))
+            if path.endswith("/embeddings"):
+                inputs = body.get("input")
+                inputs = inputs if isinstance(inputs, list) else [inputs]
+                return httpx.Response(200, json=self._embeddings(model, inputs))
+            return httpx.Response(
+                404, json={"error": {"message": f"fake transport: {path}", "type": "not_found"}}
+            )
+        finally:
+            self.active -= 1
+
+    def _completion(self, model: str) -> dict:
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": 0,
+            "model": model,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": self.reply},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }
+
+    def _stream(self, model: str) -> httpx.Response:
+        size = max(1, len(self.reply) // self.stream_chunks + 1)
+        events = []
+        for start in range(0, len(self.reply), size):
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": model,
+                "choices": [
+                    {"index": 0, "delta": {"content": self.reply[start:start + size]}, "finish_reason": None}
+                ],
+            }
+            events.append(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n")
+        events.append("data: [DONE]\n\n")
+        return httpx.Response(
+            200,
+            headers={"content-type": "text/event-stream"},
+            content="".join(events).encode(),
+        )
+
+    def _embeddings(self, model: str, inputs: list) -> dict:
+        data = []
+        for index, text in enumerate(inputs):
+            # Детермінований вектор: однаковий текст – однаковий embedding
+            seed = sum(str(text).encode()) or 1
+            vector = [((seed * (i + 1)) % 97) / 97 for i in range(self.embedding_size)]
+            data.append({"object": "embedding", "index": index, "embedding": vector})
+        return {
+            "object": "list",
+            "data": data,
+            "model": model,
+            "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)},
+        }
+
+
+__all__ = ["FakeOpenAITransport"]
@@ -0,0 +1,281 @@
+import asyncio
+import json
+import os
+import time
+
+from telegram.constants import ParseMode
+
+from database import get_cursor, save_bot_message
+from utils.delivery import DeliveryResult, fan_out, limited_bot
+from utils.logger import logger
+from utils.render_cache import BroadcastPayload, build_markup, count
+
+try:
+    from utils.message_utils import safe_send_markdown
+except Exception:  # pragma: no cover - fallback for tests
+    async def safe_send_markdown(bot, chat_id, text, escaped=False, **kwargs):
+        return await bot.send_message(
+            chat_id=chat_id,
+            text=text,
+            parse_mode=ParseMode.MARKDOWN_V2,
+            **kwargs,
+        )
+
+STATUS_PENDING = "pending"
+STATUS_SENT = "sent"
+STATUS_DEAD = "dead"
+
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+OUTBOX_BACKOFF_BASE = 30
+OUTBOX_BACKOFF_MAX = 3600
+OUTBOX_DRAIN_LIMIT = 1000
+OUTBOX_RETENTION_DAYS = 7
+
+# Один процес – один дренер: періодичний job і негайна розсилка
+# не повинні відправити той самий рядок двічі
+_drain_lock = asyncio.Lock()
+
+
+def create_outbox_table():
+    with get_cursor() as cursor:
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                idempotency_key TEXT NOT NULL UNIQUE,
+                batch TEXT NOT NULL,
+                chat_id TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL DEFAULT 0,
+                last_error TEXT,
+                message_id INTEGER,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_outbox_pending ON outbox (status, next_attempt_at)"
+        )
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_outbox_batch ON outbox (batch)")
+    logger.info("✅ Таблиця outbox створена або вже існує.")
+
+
+async def send_item(bot, chat_id, item: dict, markup=None):
+    """
+    Send one outbox item. ``item`` keys: ``text``, ``kind`` (``markdown`` –
+    via safe_send_markdown, ``markdown_v2`` – already escaped MarkdownV2,
+    ``text`` – plain send_message), ``buttons``, ``options`` (extra send kwargs).
+    A prebuilt ``markup`` shared between recipients may be passed in.
+    """
+    kwargs = dict(item.get("options") or {})
+    if markup is None:
+        markup = build_markup(item.get("buttons"))
+    if markup:
+        kwargs["reply_markup"] = markup
+    kind = item.get("kind", "markdown")
+    if kind == "text":
+        return await bot.send_message(chat_id=int(chat_id), text=item["text"], **kwargs)
+    return await safe_send_markdown(
+        bot, int(chat_id), item["text"], escaped=kind == "markdown_v2", **kwargs
+    )
+
+
+def _serialize(item) -> str:
+    if isinstance(item, BroadcastPayload):
+        return item.serialized()
+    return json.dumps(item, ensure_ascii=False)
+
+
+def enqueue(batch: str, recipients, items: list) -> int:
+    """
+    Durably store ``items`` for every recipient. Keys are derived from
+    ``batch``, so enqueuing the same batch twice is a no-op. ``items`` are
+    dicts or :class:`BroadcastPayload` objects.
+    Returns the number of newly queued rows.
+    """
+    now = time.time()
+    # Payload серіалізується один раз і спільний для всіх отримувачів
+    payloads = [_serialize(item) for item in items]
+    rows = []
+    for chat_id in dict.fromkeys(str(c) for c in recipients):
+        for idx, payload in enumerate(payloads):
+            rows.append((f"{batch}:{chat_id}:{idx}", batch, chat_id, payload, now, now))
+    with get_cursor() as cursor:
+        cursor.executemany(
+            """
+            INSERT OR IGNORE INTO outbox
+                (idempotency_key, batch, chat_id, payload, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            rows,
+        )
+        return max(cursor.rowcount, 0)
+
+
+def _backoff(attempts: int) -> float:
+    return min(OUTBOX_BACKOFF_BASE * 2 ** max(attempts - 1, 0), OUTBOX_BACKOFF_MAX)
+
+
+def _mark_sent(row_id: int, message_id):
+    with get_cursor() as cursor:
+        cursor.execute(
+            "UPDATE outbox SET status = ?, message_id = ?, last_error = NULL, updated_at = ? WHERE id = ?",
+            (STATUS_SENT, message_id, time.time(), row_id),
+        )
+
+
+def _mark_failed(row_id: int, attempts: int, error: str, key: str):
+    now = time.time()
+    attempts += 1
+    status = STATUS_DEAD if attempts >= OUTBOX_MAX_ATTEMPTS else STATUS_PENDING
+    with get_cursor() as cursor:
+        cursor.execute(
+            """
+            UPDATE outbox
+            SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, updated_at = ?
+            WHERE id = ?
+            """,
+            (status, attempts, now + _backoff(attempts), error[:500], now, row_id),
+        )
+    if status == STATUS_DEAD:
+        logger.error(f"☠️ Outbox: {key} переміщено в dead-letter після {attempts} спроб: {error}")
+    else:
+        logger.warning(f"⚠️ Outbox: {key} не надіслано (спроба {attempts}), повтор пізніше: {error}")
+
+
+async def drain(bot, batch: str | None = None, limit: int = OUTBOX_DRAIN_LIMIT) -> list[DeliveryResult]:
+    """
+    Deliver due pending rows. Rows of one chat go out in order; the first
+    failure in a chat postpones the rest of that chat to keep ordering.
+    A chat is skipped while any of its pending rows waits for a retry.
+    """
+    async with _drain_lock:
+        now = time.time()
+        # Рядок у backoff блокує весь чат: пізніші рядки не обганяють його
+        query = (
+            "SELECT id, idempotency_key, chat_id, payload, attempts FROM outbox "
+            "WHERE status = ? AND next_attempt_at <= ? AND chat_id NOT IN ("
+            "SELECT chat_id FROM outbox WHERE status = ? AND next_attempt_at > ?)"
+        )
+        params: list = [STATUS_PENDING, now, STATUS_PENDING, now]
+        if batch is not None:
+            query += " AND batch = ?"
+            params.append(batch)
+        query += " ORDER BY id LIMIT ?"
+        params.append(limit)
+        with get_cursor() as cursor:
+            rows = cursor.execute(query, params).fetchall()
+        if not rows:
+            return []
+
+        by_chat: dict[str, list] = {}
+        for row in rows:
+            by_chat.setdefault(row[2], []).append(row)
+        bot = limited_bot(bot)
+
+        # Однаковий payload у різних чатах декодується і отримує клавіатуру один раз
+        prepared: dict[str, tuple] = {}
+
+        def _prepare(payload: str):
+            cached = prepared.get(payload)
+            if cached is None:
+                count("payload_decodes")
+                item = json.loads(payload)
+                cached = prepared[payload] = (item, build_markup(item.get("buttons")))
+            return cached
+
+        async def _drain_chat(chat_id):
+            last_message = None
+            for row_id, key, _, payload, attempts in by_chat[chat_id]:
+                item, markup = _prepare(payload)
+                try:
+                    message = await send_item(bot, chat_id, item, markup=markup)
+                    error = None if message else "повідомлення не доставлено"
+                except Exception as e:
+                    message, error = None, str(e)
+                if error:
+                    _mark_failed(row_id, attempts, error, key)
+                    raise RuntimeError(error)
+                _mark_sent(row_id, getattr(message, "message_id", None))
+                if item.get("category"):
+                    save_bot_message(chat_id, message.message_id, item["category"])
+                last_message = message
+            return last_message
+
+        return await fan_out(list(by_chat), _drain_chat, label=f"outbox {batch or 'all'}")
+
+
+async def broadcast(bot, batch: str, recipients, items: list):
+    """
+    Queue ``items`` for ``recipients`` and deliver them right away.
+
+    Returns ``(queued, results)``: ``queued`` is True when the deliveries are
+    persisted and will be retried by :func:`drain_outbox_job` after failures
+    or a restart. If the outbox is unavailable, items are sent directly.
+    """
+    try:
+        enqueue(batch, recipients, items)
+    except Exception as e:
+        logger.error(f"❌ Outbox недоступний, надсилаємо напряму ({batch}): {e}")
+        bot = limited_bot(bot)
+        prepared = [
+            (item.as_item(), item.markup)
+            if isinstance(item, BroadcastPayload)
+            else (item, build_markup(item.get("buttons")))
+            for item in items
+        ]
+
+        async def _send_direct(chat_id):
+            last_message = None
+            for item, markup in prepared:
+                message = await send_item(bot, chat_id, item, markup=markup)
+                if message:
+                    if item.get("category"):
+                        save_bot_message(str(chat_id), message.message_id, item["category"])
+                    last_message = message
+            return last_message
+
+        return False, await fan_out(recipients, _send_direct, label=batch)
+    return True, await drain(bot, batch=batch)
+
+
+def outbox_stats() -> dict:
+    with get_cursor() as cursor:
+        rows = cursor.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+    return {row[0]: row[1] for row in rows}
+
+
+async def drain_outbox_job(context):
+    """Periodic worker: resumes interrupted broadcasts and retries failures."""
+    try:
+        results = await drain(context.bot)
+        if results:
+            logger.info(f"📤 Outbox: оброблено {len(results)} чатів")
+    except Exception as e:
+        logger.error(f"❌ Помилка обробки outbox: {e}")
+
+
+async def cleanup_outbox_job(context):
+    cutoff = time.time() - OUTBOX_RETENTION_DAYS * 86400
+    with get_cursor() as cursor:
+        cursor.execute(
+            "DELETE FROM outbox WHERE status IN (?, ?) AND updated_at < ?",
+            (STATUS_SENT, STATUS_DEAD, cutoff),
+        )
+    logger.info("✅ Очищено старі записи outbox")
+
+
+__all__ = [
+    "create_outbox_table",
+    "build_markup",
+    "send_item",
+    "enqueue",
+    "drain",
+    "broadcast",
+    "outbox_stats",
+    "drain_outbox_job",
+    "cleanup_outbox_job",
+]
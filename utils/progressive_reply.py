@@ -0,0 +1,105 @@
+"""
+Поступовий показ відповіді в Telegram.
+
+Спершу надсилається повідомлення-заглушка, далі воно редагується в міру
+надходження тексту – не частіше ніж раз на ``interval`` секунд (у групах
+рідше, бо Telegram суворіше обмежує редагування) і лише коли додалося
+достатньо нових символів. ``RetryAfter`` відкладає наступне проміжне
+редагування; фінальний текст чекає, скільки попросив Telegram, а якщо
+редагувати неможливо, надсилається новим повідомленням.
+"""
+import asyncio
+import os
+import time
+
+from telegram.error import BadRequest, RetryAfter
+
+from utils.logger import logger
+
+STREAM_PLACEHOLDER = "💭 Думаю над відповіддю…"
+STREAM_CURSOR = " ▌"
+STREAM_EDIT_INTERVAL = float(os.getenv("ASSISTANT_STREAM_EDIT_INTERVAL", "1.0"))
+STREAM_GROUP_EDIT_INTERVAL = float(os.getenv("ASSISTANT_STREAM_GROUP_EDIT_INTERVAL", "3.0"))
+# Менші прирости не варті окремого запиту до Telegram
+STREAM_MIN_CHARS = 40
+TELEGRAM_TEXT_LIMIT = 4096
+
+
+def _fit(text: str, suffix: str = "") -> str:
+    limit = TELEGRAM_TEXT_LIMIT - len(suffix)
+    if len(text) > limit:
+        text = text[: limit - 3] + "..."
+    return text + suffix
+
+
+class ProgressiveReply:
+    """Placeholder message that is edited as the answer streams in."""
+
+    def __init__(self, message, placeholder: str = STREAM_PLACEHOLDER, interval: float | None = None):
+        self._source = message
+        self.placeholder = placeholder
+        if interval is None:
+            chat_type = getattr(getattr(message, "chat", None), "type", "private")
+            interval = STREAM_EDIT_INTERVAL if chat_type == "private" else STREAM_GROUP_EDIT_INTERVAL
+        self.interval = interval
+        self.message = None
+        self.edits = 0
+        self._shown = placeholder
+        self._next_edit = 0.0
+
+    async def start(self):
+        """Send the placeholder; without it the reply falls back to a plain message."""
+        try:
+            self.message = await self._source.reply_text(self.placeholder)
+            self._next_edit = time.monotonic() + self.interval
+        except Exception as e:
+            logger.warning(f"⚠️ Не вдалося надіслати заглушку відповіді: {e}")
+            self.message = None
+
+    async def update(self, text: str):
+        """Show partial ``text`` if the throttle allows; never raises."""
+        if self.message is None or not text:
+            return
+        now = time.monotonic()
+        if now < self._next_edit or len(text) - len(self._shown) < STREAM_MIN_CHARS:
+            return
+        shown = _fit(text, STREAM_CURSOR)
+        try:
+            await self.message.edit_text(shown)
+            self._shown = text
+            self.edits += 1
+            self._next_edit = now + self.interval
+        except RetryAfter as e:
+            self._next_edit = now + float(e.retry_after)
+            logger.info(f"⏳ Telegram просить зачекати {e.retry_after} с перед редагуванням")
+        except BadRequest as e:
+            if "not modified" not in str(e).lower():
+                logger.warning(f"⚠️ Не вдалося оновити відповідь: {e}")
+            self._next_edit = now + self.interval
+        except Exception as e:
+            logger.warning(f"⚠️ Не вдалося оновити відповідь: {e}")
+            self._next_edit = now + self.interval
+
+    async def finish(self, text: str, retries: int = 3):
+        """Replace the placeholder with the final ``text``."""
+        text = _fit(text)
+        if self.message is not None:
+            for _ in range(retries):
+                try:
+                    await self.message.edit_text(text)
+                    self.edits += 1
+                    return self.message
+                except RetryAfter as e:
+                    await asyncio.sleep(float(e.retry_after))
+                except BadRequest as e:
+                    if "not modified" in str(e).lower():
+                        return self.message
+                    logger.warning(f"⚠️ Не вдалося відредагувати відповідь, надсилаємо нову: {e}")
+                    break
+                except Exception as e:
+                    logger.warning(f"⚠️ Не вдалося відредагувати відповідь, надсилаємо нову: {e}")
+                    break
+        return await self._source.reply_text(text)
+
+
+__all__ = ["ProgressiveReply", "STREAM_EDIT_INTERVAL", "STREAM_GROUP_EDIT_INTERVAL"]
@@ -0,0 +1,151 @@
+"""
+Збирання промпту асистента в межах бюджету токенів.
+
+Промпт складається з обов'язкових частин (системний текст, інструкції) і
+секцій з рядками. Кожен рядок має пріоритет секції та оцінку релевантності
+до питання; рядки додаються від найважливіших, доки не вичерпано бюджет.
+Рядок з тим самим ключем (одна подія, одне повідомлення) потрапляє в
+промпт лише один раз – у секцію з вищим пріоритетом.
+"""
+import math
+import os
+import re
+
+from utils.logger import logger
+
+try:
+    import tiktoken
+
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+except Exception:  # pragma: no cover - optional dependency
+    _ENCODING = None
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("ASSISTANT_PROMPT_TOKENS", "1500"))
+# Без tiktoken: кирилиця в токенізаторах OpenAI – приблизно 3 символи на токен
+CHARS_PER_TOKEN = 3
+
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def stems(text: str) -> set[str]:
+    # Перші п'ять літер слова грубо знімають відмінювання: «репетиція»/«репетиції»
+    return {token[:5] for token in re.findall(r"[\w\u0400-\u04FF]{4,}", (text or "").lower())}
+
+
+class PromptBuilder:
+    """Collects prompt sections and renders them within a token budget."""
+
+    def __init__(self, question: str, budget: int = PROMPT_TOKEN_BUDGET):
+        self.budget = budget
+        self.question_stems = stems(question)
+        self.stats: dict = {}
+        self._head: list[str] = []
+        self._tail: list[str] = []
+        self._sections: list[dict] = []
+
+    def head(self, text: str):
+        """Always included, before the sections."""
+        self._head.append(text)
+
+    def tail(self, text: str):
+        """Always included, after the sections."""
+        self._tail.append(text)
+
+    def relevance(self, text: str) -> float:
+        if not self.question_stems:
+            return 0.0
+        return len(self.question_stems & stems(text)) / len(self.question_stems)
+
+    def add(
+        self,
+        title: str,
+        lines: list[str],
+        priority: int,
+        keys: list | None = None,
+        empty: str | None = None,
+    ):
+        """
+        Add a section. Lower ``priority`` is filled first; inside a section
+        lines are ranked by relevance to the question, then by their order.
+        """
+        pairs = [(line, key) for line, key in zip(lines, keys or [None] * len(lines)) if line]
+        items = []
+        for i, (line, key) in enumerate(pairs):
+            score = 2 * self.relevance(line) + (1 - i / len(pairs))
+            if key is None:
+                key = " ".join(line.lower().split())
+            items.append({"text": line, "score": score, "key": key, "order": i})
+        self._sections.append(
+            {"title": title, "priority": priority, "items": items, "empty": empty}
+        )
+
+    def build(self) -> str:
+        head = "".join(self._head)
+        tail = "".join(self._tail)
+        used = estimate_tokens(head) + estimate_tokens(tail)
+        candidates = sorted(
+            (
+                (section["priority"], -item["score"], index, item["order"])
+                for index, section in enumerate(self._sections)
+                for item in section["items"]
+            )
+        )
+        chosen: dict[int, list[dict]] = {}
+        seen = set()
+        dropped = duplicates = 0
+        for _, _, index, order in candidates:
+            section = self._sections[index]
+            item = section["items"][order]
+            if item["key"] in seen:
+                duplicates += 1
+                continue
+            cost = estimate_tokens(item["text"]) + 1
+            if index not in chosen:
+                cost += estimate_tokens(f"\n- {section['title']}:")
+            if used + cost > self.budget:
+                dropped += 1
+                continue
+            used += cost
+            seen.add(item["key"])
+            chosen.setdefault(index, []).append(item)
+
+        parts = [head]
+        for index, section in enumerate(self._sections):
+            items = sorted(chosen.get(index, []), key=lambda item: item["order"])
+            if items:
+                if len(items) == 1:
+                    parts.append(f"\n- {section['title']}: {items[0]['text']}")
+                else:
+                    parts.append(f"\n- {section['title']}:")
+                    parts.extend(f"\n{item['text']}" for item in items)
+            elif section["empty"] and not section["items"]:
+                # Порожня секція – явне «немає», а не мовчання
+                line = f"\n- {section['title']}: {section['empty']}"
+                cost = estimate_tokens(line)
+                if used + cost <= self.budget:
+                    used += cost
+                    parts.append(line)
+        parts.append(tail)
+        prompt = "".join(parts)
+
+        self.stats = {
+            "tokens": used,
+            "budget": self.budget,
+            "lines": sum(len(items) for items in chosen.values()),
+            "dropped": dropped,
+            "duplicates": duplicates,
+        }
+        logger.info(
+            f"🧮 Промпт асистента: ~{used} токенів із {self.budget}, рядків: {self.stats['lines']}, "
+            f"відкинуто за бюджетом: {dropped}, дублікатів: {duplicates}"
+        )
+        return prompt
+
+
+__all__ = ["PROMPT_TOKEN_BUDGET", "PromptBuilder", "estimate_tokens", "stems"]
@@ -0,0 +1,335 @@
+import contextvars
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import pytz
+
+from database import get_cursor
+from utils.logger import logger
+
+PRIORITY_USER = "user"
+PRIORITY_BACKGROUND = "background"
+
+# Добові квоти Google скидаються опівночі за тихоокеанським часом
+QUOTA_TZ = pytz.timezone("America/Los_Angeles")
+
+# Вартість методів в одиницях квоти. YouTube Data API має різні ціни,
+# Calendar і Drive рахують кожен запит як одну одиницю.
+METHOD_COSTS = {
+    "youtube": {
+        "playlistItems.list": 1,
+        "videos.list": 1,
+        "channels.list": 1,
+        "search.list": 100,
+    },
+    "calendar": {},
+    "drive": {},
+}
+DEFAULT_METHOD_COST = 1
+
+DAILY_BUDGETS = {
+    "youtube": int(os.getenv("YOUTUBE_DAILY_QUOTA", "10000")),
+    "calendar": int(os.getenv("CALENDAR_DAILY_QUOTA", "10000")),
+    "drive": int(os.getenv("DRIVE_DAILY_QUOTA", "10000")),
+}
+# Частка бюджету, після якої фонові оновлення відкладаються або об'єднуються
+BACKGROUND_SOFT_RATIO = float(os.getenv("QUOTA_BACKGROUND_SOFT_RATIO", "0.8"))
+# Вікно, в межах якого повторне фонове оновлення того ж ключа вважається зайвим
+COALESCE_WINDOW_SECONDS = int(os.getenv("QUOTA_COALESCE_WINDOW", "900"))
+
+_feature_var: contextvars.ContextVar[str | None] = contextvars.ContextVar(
+    "quota_feature", default=None
+)
+_priority_var: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "quota_priority", default=PRIORITY_USER
+)
+
+
+class QuotaExceeded(Exception):
+    """Raised when a Google API call is not admitted by the daily budget."""
+
+    def __init__(self, api: str, method: str, reason: str):
+        super().__init__(f"{api}.{method}: {reason}")
+        self.api = api
+        self.method = method
+        self.reason = reason
+
+
+def _quota_day() -> str:
+    return datetime.now(QUOTA_TZ).date().isoformat()
+
+
+class QuotaBudgeter:
+    """
+    Central accountant for YouTube, Calendar and Drive quota.
+
+    Usage is kept in memory (hot path has no DB access) and persisted by
+    :meth:`flush` to ``api_quota_usage``; :meth:`load` restores today's totals
+    after a restart.
+    """
+
+    def __init__(
+        self,
+        budgets: dict[str, int] | None = None,
+        soft_ratio: float = BACKGROUND_SOFT_RATIO,
+        coalesce_window: int = COALESCE_WINDOW_SECONDS,
+    ):
+        self.budgets = dict(budgets or DAILY_BUDGETS)
+        self.soft_ratio = soft_ratio
+        self.coalesce_window = coalesce_window
+        self._lock = threading.Lock()
+        self._day = _quota_day()
+        # (api, feature, method) -> [units, calls, deferred]
+        self._usage: dict[tuple[str, str, str], list[int]] = {}
+        # (day, api, feature, method) -> [units, calls, deferred] ще не записані в БД;
+        # день у ключі, щоб дельти до півночі не потрапили в рядок нового дня
+        self._dirty: dict[tuple[str, str, str, str], list[int]] = {}
+        self._totals: dict[str, int] = {}
+        self._last_refresh: dict[str, float] = {}
+
+    def _roll_day(self):
+        day = _quota_day()
+        if day != self._day:
+            self._day = day
+            self._usage.clear()
+            self._totals.clear()
+            self._last_refresh.clear()
+
+    @staticmethod
+    def cost(api: str, method: str) -> int:
+        return METHOD_COSTS.get(api, {}).get(method, DEFAULT_METHOD_COST)
+
+    def used(self, api: str) -> int:
+        with self._lock:
+            self._roll_day()
+            return self._totals.get(api, 0)
+
+    def _bump(self, key: tuple[str, str, str], units: int, calls: int, deferred: int):
+        for store, store_key in ((self._usage, key), (self._dirty, (self._day, *key))):
+            row = store.setdefault(store_key, [0, 0, 0])
+            row[0] += units
+            row[1] += calls
+            row[2] += deferred
+
+    def charge(
+        self,
+        api: str,
+        method: str,
+        feature: str | None = None,
+        priority: str | None = None,
+        key: str | None = None,
+        units: int | None = None,
+    ) -> int:
+        """
+        Admit and account one API call. Raises :class:`QuotaExceeded` when the
+        call must be deferred; returns the number of units charged otherwise.
+        """
+        feature = feature or _feature_var.get() or "other"
+        priority = priority or _priority_var.get()
+        units = self.cost(api, method) if units is None else units
+        budget = self.budgets.get(api)
+        now_ts = time.monotonic()
+
+        with self._lock:
+            self._roll_day()
+            used = self._totals.get(api, 0)
+            reason = None
+            if budget is not None and used + units > budget:
+                reason = "daily budget exhausted"
+            elif (
+                budget is not None
+                and priority == PRIORITY_BACKGROUND
+                and used + units > budget * self.soft_ratio
+            ):
+                last = self._last_refresh.get(key) if key else None
+                if key is None or (last is not None and now_ts - last < self.coalesce_window):
+                    reason = "background refresh deferred near budget limit"
+            if reason:
+                self._bump((api, feature, method), 0, 0, 1)
+            else:
+                self._bump((api, feature, method), units, 1, 0)
+                self._totals[api] = used + units
+                if key:
+                    self._last_refresh[key] = now_ts
+
+        if reason:
+            logger.warning(
+                "⏳ Квота %s: виклик %s (%s, %s) відкладено – %s",
+                api,
+                method,
+                feature,
+                priority,
+                reason,
+            )
+            raise QuotaExceeded(api, method, reason)
+        return units
+
+    def load(self):
+        """Restore today's counters from the database."""
+        try:
+            with get_cursor() as cursor:
+                cursor.execute(
+                    """
+                    SELECT api, feature, method, units, calls, deferred
+                    FROM api_quota_usage WHERE day = ?
+                    """,
+                    (self._day,),
+                )
+                rows = cursor.fetchall()
+        except Exception as e:
+            logger.error(f"❌ Не вдалося завантажити облік квоти: {e}")
+            return
+        with self._lock:
+            for row in rows:
+                key = (row[0], row[1], row[2])
+                self._usage[key] = [int(row[3]), int(row[4]), int(row[5])]
+                self._totals[row[0]] = self._totals.get(row[0], 0) + int(row[3])
+        logger.info("✅ Облік квоти відновлено: %s", self._totals or "порожньо")
+
+    def flush(self) -> int:
+        """Persist accumulated deltas; returns the number of rows written."""
+        with self._lock:
+            pending, self._dirty = self._dirty, {}
+        if not pending:
+            return 0
+        try:
+            with get_cursor() as cursor:
+                cursor.executemany(
+                    """
+                    INSERT INTO api_quota_usage (day, api, feature, method, units, calls, deferred)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(day, api, feature, method) DO UPDATE SET
+                        units = units + excluded.units,
+                        calls = calls + excluded.calls,
+                        deferred = deferred + excluded.deferred
+                    """,
+                    [(*key, *row) for key, row in pending.items()],
+                )
+            return len(pending)
+        except Exception as e:
+            logger.error(f"❌ Не вдалося зберегти облік квоти: {e}")
+            with self._lock:
+                for key, row in pending.items():
+                    dirty = self._dirty.setdefault(key, [0, 0, 0])
+                    for i in range(3):
+                        dirty[i] += row[i]
+            return 0
+
+    def report(self) -> dict:
+        """Return today's burn grouped by API and feature."""
+        with self._lock:
+            self._roll_day()
+            result: dict[str, dict] = {}
+            for (api, feature, method), (units, calls, deferred) in self._usage.items():
+                api_entry = result.setdefault(
+                    api,
+                    {
+                        "used": self._totals.get(api, 0),
+                        "budget": self.budgets.get(api),
+                        "features": {},
+                    },
+                )
+                feat = api_entry["features"].setdefault(
+                    feature, {"units": 0, "calls": 0, "deferred": 0, "methods": {}}
+                )
+                feat["units"] += units
+                feat["calls"] += calls
+                feat["deferred"] += deferred
+                feat["methods"][method] = feat["methods"].get(method, 0) + units
+            return result
+
+    def format_report(self) -> str:
+        report = self.report()
+        if not report:
+            return f"📈 Квота API за {self._day}: викликів ще не було."
+        lines = [f"📈 Квота API за {self._day} (PT):"]
+        for api in sorted(report):
+            entry = report[api]
+            budget = entry["budget"]
+            percent = f" ({entry['used'] * 100 // budget}%)" if budget else ""
+            lines.append(f"\n{api}: {entry['used']}/{budget or '∞'}{percent}")
+            features = sorted(
+                entry["features"].items(), key=lambda item: item[1]["units"], reverse=True
+            )
+            for feature, stats in features:
+                line = f"  • {feature}: {stats['units']} од., {stats['calls']} викл."
+                if stats["deferred"]:
+                    line += f", відкладено {stats['deferred']}"
+                lines.append(line)
+        return "\n".join(lines)
+
+
+quota = QuotaBudgeter()
+
+
+def charge_quota(api: str, method: str, key: str | None = None, feature: str | None = None) -> int:
+    """Shortcut for :meth:`QuotaBudgeter.charge` on the shared budgeter."""
+    return quota.charge(api, method, feature=feature, key=key)
+
+
+@contextmanager
+def quota_scope(feature: str, priority: str = PRIORITY_USER):
+    """Attribute API calls made inside the block to ``feature`` with ``priority``."""
+    feature_token = _feature_var.set(feature)
+    priority_token = _priority_var.set(priority)
+    try:
+        yield
+    finally:
+        _priority_var.reset(priority_token)
+        _feature_var.reset(feature_token)
+
+
+def quota_job(feature: str, priority: str = PRIORITY_BACKGROUND):
+    """Decorate a job coroutine so its API calls are attributed to ``feature``."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with quota_scope(feature, priority):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def create_quota_table():
+    with get_cursor() as cursor:
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS api_quota_usage (
+                day TEXT NOT NULL,
+                api TEXT NOT NULL,
+                feature TEXT NOT NULL,
+                method TEXT NOT NULL,
+                units INTEGER NOT NULL DEFAULT 0,
+                calls INTEGER NOT NULL DEFAULT 0,
+                deferred INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, api, feature, method)
+            )
+            """
+        )
+    logger.info("✅ Таблиця api_quota_usage створена або вже існує.")
+
+
+async def flush_quota_job(context):
+    """Periodic write-behind of quota counters."""
+    quota.flush()
+
+
+__all__ = [
+    "PRIORITY_USER",
+    "PRIORITY_BACKGROUND",
+    "QuotaExceeded",
+    "QuotaBudgeter",
+    "quota",
+    "charge_quota",
+    "quota_scope",
+    "quota_job",
+    "create_quota_table",
+    "flush_quota_job",
+]
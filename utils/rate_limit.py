@@ -0,0 +1,194 @@
+"""
+Ліміти запитів користувачів до LLM-функцій бота.
+
+Для кожної пари (функція, користувач) діють два обмеження:
+
+* token bucket – не більше ``burst`` запитів поспіль, далі один запит
+  на ``refill_seconds`` секунд;
+* добова квота в ковзному вікні – не більше ``daily`` запитів за останні
+  24 години (без скидання опівночі, тож ліміт не "обнуляється" о 00:00).
+
+Перевірка працює лише з пам'яттю. Час кожного дозволеного запиту
+накопичується і раз на хвилину записується в ``rate_limit_events``
+(write-behind), а після перезапуску :meth:`RateLimiter.load` відновлює
+вікно квоти.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from database import get_cursor
+from utils.logger import logger
+
+DAILY_WINDOW_SECONDS = 86400
+
+FEATURE_LIMITS = {
+    "assistant": {
+        "daily": int(os.getenv("ASSISTANT_DAILY_LIMIT", "10")),
+        "burst": int(os.getenv("ASSISTANT_BURST_LIMIT", "3")),
+        "refill_seconds": float(os.getenv("ASSISTANT_REFILL_SECONDS", "20")),
+    },
+}
+
+REASON_BURST = "burst"
+REASON_DAILY = "daily"
+
+
+class RateLimitDecision:
+    __slots__ = ("allowed", "reason", "retry_after", "remaining")
+
+    def __init__(self, allowed: bool, reason: str | None = None, retry_after: float = 0.0, remaining: int = 0):
+        self.allowed = allowed
+        self.reason = reason
+        self.retry_after = retry_after
+        self.remaining = remaining
+
+    def __bool__(self) -> bool:
+        return self.allowed
+
+
+class RateLimiter:
+    """
+    Token buckets and sliding-window daily quotas per feature and user.
+
+    The hot path has no DB access; :meth:`flush` persists new events and
+    :meth:`load` restores the last 24 hours after a restart.
+    """
+
+    def __init__(self, limits: dict[str, dict] | None = None, window: int = DAILY_WINDOW_SECONDS):
+        self.limits = dict(limits or FEATURE_LIMITS)
+        self.window = window
+        self._lock = threading.Lock()
+        # (feature, user_id) -> [tokens, monotonic time of last refill]
+        self._buckets: dict[tuple[str, str], list[float]] = {}
+        # (feature, user_id) -> timestamps of admitted requests in the window
+        self._events: dict[tuple[str, str], deque] = {}
+        self._dirty: list[tuple[str, str, float]] = []
+        self._counters = {"allowed": 0, REASON_BURST: 0, REASON_DAILY: 0}
+
+    def _trim(self, events: deque, now: float):
+        while events and events[0] <= now - self.window:
+            events.popleft()
+
+    def acquire(self, feature: str, user_id: str | int) -> RateLimitDecision:
+        """Admit one request of ``user_id`` to ``feature`` or say why not."""
+        limit = self.limits.get(feature)
+        if limit is None:
+            return RateLimitDecision(True)
+        key = (feature, str(user_id))
+        now = time.time()
+        mono = time.monotonic()
+        capacity = limit["burst"]
+        rate = 1 / limit["refill_seconds"]
+
+        with self._lock:
+            events = self._events.setdefault(key, deque())
+            self._trim(events, now)
+            if len(events) >= limit["daily"]:
+                self._counters[REASON_DAILY] += 1
+                return RateLimitDecision(
+                    False, REASON_DAILY, retry_after=events[0] + self.window - now
+                )
+
+            bucket = self._buckets.setdefault(key, [float(capacity), mono])
+            bucket[0] = min(capacity, bucket[0] + (mono - bucket[1]) * rate)
+            bucket[1] = mono
+            if bucket[0] < 1:
+                self._counters[REASON_BURST] += 1
+                return RateLimitDecision(
+                    False, REASON_BURST, retry_after=(1 - bucket[0]) / rate
+                )
+
+            bucket[0] -= 1
+            events.append(now)
+            self._dirty.append((feature, key[1], now))
+            self._counters["allowed"] += 1
+            return RateLimitDecision(True, remaining=limit["daily"] - len(events))
+
+    def load(self):
+        """Restore the daily windows from the database."""
+        since = time.time() - self.window
+        try:
+            with get_cursor() as cursor:
+                cursor.execute(
+                    "SELECT feature, user_id, ts FROM rate_limit_events WHERE ts > ? ORDER BY ts",
+                    (since,),
+                )
+                rows = cursor.fetchall()
+        except Exception as e:
+            logger.error(f"❌ Не вдалося завантажити ліміти запитів: {e}")
+            return
+        with self._lock:
+            for feature, user_id, ts in rows:
+                self._events.setdefault((feature, str(user_id)), deque()).append(float(ts))
+        logger.info(f"✅ Ліміти запитів відновлено: {len(rows)} подій за добу")
+
+    def flush(self) -> int:
+        """Persist admitted requests and drop expired ones; returns rows written."""
+        with self._lock:
+            pending, self._dirty = self._dirty, []
+            # Порожні вікна не тримаємо в пам'яті
+            now = time.time()
+            for key in [k for k, events in self._events.items() if not events or events[-1] <= now - self.window]:
+                del self._events[key]
+                self._buckets.pop(key, None)
+        try:
+            with get_cursor() as cursor:
+                if pending:
+                    cursor.executemany(
+                        "INSERT INTO rate_limit_events (feature, user_id, ts) VALUES (?, ?, ?)",
+                        pending,
+                    )
+                cursor.execute("DELETE FROM rate_limit_events WHERE ts <= ?", (now - self.window,))
+            return len(pending)
+        except Exception as e:
+            logger.error(f"❌ Не вдалося зберегти ліміти запитів: {e}")
+            with self._lock:
+                self._dirty[:0] = pending
+            return 0
+
+    def format_report(self) -> str:
+        with self._lock:
+            users = len({user for _, user in self._events})
+            counters = dict(self._counters)
+        return (
+            "🚦 Ліміти асистента:\n"
+            f"Дозволено: {counters['allowed']}, відхилено поспіль: {counters[REASON_BURST]}, "
+            f"через добовий ліміт: {counters[REASON_DAILY]}, користувачів за добу: {users}"
+        )
+
+
+rate_limiter = RateLimiter()
+
+
+def create_rate_limit_table():
+    with get_cursor() as cursor:
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS rate_limit_events (
+                feature TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                ts REAL NOT NULL
+            )
+            """
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_rate_limit_events_ts ON rate_limit_events (ts)"
+        )
+    logger.info("✅ Таблиця rate_limit_events створена або вже існує.")
+
+
+async def flush_rate_limits_job(context):
+    """Periodic write-behind of admitted requests."""
+    rate_limiter.flush()
+
+
+__all__ = [
+    "FEATURE_LIMITS",
+    "RateLimitDecision",
+    "RateLimiter",
+    "create_rate_limit_table",
+    "flush_rate_limits_job",
+    "rate_limiter",
+]
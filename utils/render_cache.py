@@ -0,0 +1,158 @@
+"""
+Кеш готових повідомлень для розсилок.
+
+Текст MarkdownV2 екранується, клавіатура будується, а елемент outbox
+серіалізується рівно один раз на підпис події (хеш вмісту). Усі
+отримувачі та повторні запуски job'ів отримують той самий об'єкт.
+Лічильники ``render_stats()`` показують, скільки рендерів, часу CPU
+і байтів заощаджено.
+"""
+import json
+import time
+from collections import Counter, OrderedDict
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+RENDER_CACHE_SIZE = 256
+
+_counters: Counter = Counter()
+
+
+def count(name: str, value: int = 1):
+    _counters[name] += value
+
+
+def build_markup(buttons):
+    """Recreate InlineKeyboardMarkup from a JSON-serializable button spec."""
+    if not buttons:
+        return None
+    count("markup_builds")
+    rows = []
+    for row in buttons:
+        rows.append(
+            [
+                InlineKeyboardButton(
+                    button["text"],
+                    **{k: v for k, v in button.items() if k in ("callback_data", "url")},
+                )
+                for button in row
+            ]
+        )
+    return InlineKeyboardMarkup(rows)
+
+
+class BroadcastPayload:
+    """
+    One rendered message shared by every recipient: already escaped
+    MarkdownV2 ``text``, button spec, extra send ``options`` and the
+    bot_messages ``category``. Markup and the outbox item are built lazily
+    and only once.
+    """
+
+    __slots__ = ("key", "text", "buttons", "options", "category", "_markup", "_item", "_payload")
+
+    def __init__(self, text: str, buttons=None, options=None, category=None, key=None):
+        self.key = key
+        self.text = text
+        self.buttons = buttons or None
+        self.options = options or None
+        self.category = category
+        self._markup = None
+        self._item = None
+        self._payload = None
+
+    @classmethod
+    def from_item(cls, item: dict) -> "BroadcastPayload":
+        """Wrap an already escaped outbox item (``kind`` ``markdown_v2``)."""
+        return cls(
+            item["text"],
+            buttons=item.get("buttons"),
+            options=item.get("options"),
+            category=item.get("category"),
+        )
+
+    @property
+    def markup(self):
+        if self._markup is None and self.buttons:
+            self._markup = build_markup(self.buttons)
+        return self._markup
+
+    def as_item(self) -> dict:
+        if self._item is None:
+            item = {"text": self.text, "kind": "markdown_v2"}
+            if self.buttons:
+                item["buttons"] = self.buttons
+            if self.options:
+                item["options"] = self.options
+            if self.category:
+                item["category"] = self.category
+            self._item = item
+        return self._item
+
+    def serialized(self) -> str:
+        """JSON payload for the outbox, encoded once."""
+        if self._payload is None:
+            self._payload = json.dumps(self.as_item(), ensure_ascii=False)
+            count("payload_bytes", len(self._payload.encode("utf-8")))
+        return self._payload
+
+
+class RenderCache:
+    """Small LRU of :class:`BroadcastPayload` keyed by event signature."""
+
+    def __init__(self, maxsize: int = RENDER_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._items: OrderedDict[str, BroadcastPayload] = OrderedDict()
+
+    def get(self, key: str, render):
+        """Return the cached payload for ``key`` or build it with ``render()``."""
+        payload = self._items.get(key)
+        if payload is not None:
+            self._items.move_to_end(key)
+            count("hits")
+            return payload
+
+        started = time.process_time_ns()
+        rendered = render()
+        count("render_cpu_ns", time.process_time_ns() - started)
+        count("renders")
+        items = rendered if isinstance(rendered, list) else [rendered]
+        for item in items:
+            item.key = key
+            count("rendered_bytes", len(item.text.encode("utf-8")))
+        self._items[key] = rendered
+        if len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+        return rendered
+
+    def clear(self):
+        self._items.clear()
+
+
+payload_cache = RenderCache()
+
+
+def render_once(key: str, render):
+    """Module-level shortcut for :meth:`RenderCache.get` on the shared cache."""
+    return payload_cache.get(key, render)
+
+
+def render_stats() -> dict:
+    stats = dict(_counters)
+    stats["cached"] = len(payload_cache._items)
+    return stats
+
+
+def reset_render_stats():
+    _counters.clear()
+
+
+__all__ = [
+    "BroadcastPayload",
+    "RenderCache",
+    "build_markup",
+    "payload_cache",
+    "render_once",
+    "render_stats",
+    "reset_render_stats",
+]
@@ -0,0 +1,158 @@
+"""
+Кеш відповідей асистента.
+
+Ключ – нормалізоване питання (той самий normalize, що й у пошуку нот), а
+майже однакові формулювання знаходяться за схожістю триграм. Усі записи
+належать одній версії даних: відбитку кешу календаря, YouTube, фактів
+групи, кожних ``GROUP_MESSAGE_BUCKET`` нових повідомлень групи та
+поточної дати. Щойно будь-що з цього
+змінюється, кеш очищається і наступне питання йде до LLM.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+from database import get_cursor, get_value
+from utils.logger import logger
+from utils.sheet_index import normalize, trigrams
+
+RESPONSE_CACHE_SIZE = int(os.getenv("ASSISTANT_CACHE_SIZE", "200"))
+RESPONSE_CACHE_TTL = int(os.getenv("ASSISTANT_CACHE_TTL", "900"))
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("ASSISTANT_CACHE_SIMILARITY", "0.85"))
+# Однослівні питання надто залежать від попередньої розмови
+MIN_QUESTION_WORDS = 2
+
+# Ключі key-value сховища, з яких асистент будує контекст
+DATA_KEYS = (
+    "calendar_events_cache",
+    "past_events_cache",
+    "yt_latest",
+    "yt_popular",
+    "yt_top10",
+)
+# Повідомлення групи враховуються пачками: інакше в активному чаті кожне
+# нове повідомлення скидало б увесь кеш. Нові факти скидають його одразу
+GROUP_MESSAGE_BUCKET = max(1, int(os.getenv("ASSISTANT_CACHE_MESSAGE_BUCKET", "50")))
+INDEX_QUERIES = (
+    ("SELECT COALESCE(MAX(id), 0) / ? FROM group_message_index", (GROUP_MESSAGE_BUCKET,)),
+    ("SELECT MAX(id) FROM group_facts", ()),
+)
+
+
+def _numbers(norm: str) -> set[str]:
+    return {token for token in norm.split() if any(ch.isdigit() for ch in token)}
+
+
+def data_version() -> str:
+    """Fingerprint of the data the assistant prompt is built from."""
+    digest = hashlib.sha256(date.today().isoformat().encode())
+    for key in DATA_KEYS:
+        digest.update(b"\0" + str(get_value(key) or "").encode())
+    try:
+        with get_cursor() as cursor:
+            for query, params in INDEX_QUERIES:
+                cursor.execute(query, params)
+                row = cursor.fetchone()
+                digest.update(b"\0" + str(row[0] if row else "").encode())
+    except Exception as e:
+        logger.debug(f"Не вдалося прочитати версію індексу чату: {e}")
+    return digest.hexdigest()[:16]
+
+
+class ResponseCache:
+    """LRU of answers for the current data version with fuzzy lookup."""
+
+    def __init__(
+        self,
+        size: int = RESPONSE_CACHE_SIZE,
+        ttl: int = RESPONSE_CACHE_TTL,
+        similarity: float = RESPONSE_CACHE_SIMILARITY,
+    ):
+        self.size = size
+        self.ttl = ttl
+        self.similarity = similarity
+        self.version: str | None = None
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._counters = {"hits": 0, "similar_hits": 0, "misses": 0, "invalidations": 0}
+
+    def _sync_version(self, version: str):
+        if version != self.version:
+            if self._entries:
+                self._counters["invalidations"] += 1
+                logger.info(f"♻️ Дані асистента змінилися, кеш відповідей очищено ({len(self._entries)})")
+            self._entries.clear()
+            self.version = version
+
+    def get(self, question: str, version: str) -> str | None:
+        norm = normalize(question)
+        if len(norm.split()) < MIN_QUESTION_WORDS:
+            return None
+        now = time.time()
+        with self._lock:
+            self._sync_version(version)
+            for key in [k for k, entry in self._entries.items() if now - entry["at"] > self.ttl]:
+                del self._entries[key]
+            entry = self._entries.get(norm)
+            if entry is not None:
+                self._entries.move_to_end(norm)
+                self._counters["hits"] += 1
+                return entry["answer"]
+            grams, numbers = trigrams(norm), _numbers(norm)
+            best_key, best_score = None, 0.0
+            for key, candidate in self._entries.items():
+                # «у 2023» і «у 2024» схожі за триграмами, але це різні питання
+                if candidate["numbers"] != numbers:
+                    continue
+                shared = len(grams & candidate["grams"])
+                score = 2 * shared / (len(grams) + len(candidate["grams"]) or 1)
+                if score > best_score:
+                    best_key, best_score = key, score
+            if best_key is not None and best_score >= self.similarity:
+                self._entries.move_to_end(best_key)
+                self._counters["similar_hits"] += 1
+                return self._entries[best_key]["answer"]
+            self._counters["misses"] += 1
+            return None
+
+    def put(self, question: str, version: str, answer: str):
+        norm = normalize(question)
+        if len(norm.split()) < MIN_QUESTION_WORDS or not answer:
+            return
+        with self._lock:
+            self._sync_version(version)
+            self._entries[norm] = {
+                "answer": answer,
+                "grams": trigrams(norm),
+                "numbers": _numbers(norm),
+                "at": time.time(),
+            }
+            self._entries.move_to_end(norm)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["similar_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] + stats["similar_hits"]) / lookups if lookups else 0.0
+        return stats
+
+    def format_report(self) -> str:
+        stats = self.stats()
+        return (
+            "🗄️ Кеш відповідей асистента:\n"
+            f"Влучань: {stats['hits']} (схожих: {stats['similar_hits']}), промахів: {stats['misses']}, "
+            f"частка: {stats['hit_rate']:.0%}, записів: {stats['entries']}, "
+            f"скидань через нові дані: {stats['invalidations']}"
+        )
+
+
+response_cache = ResponseCache()
+
+
+__all__ = ["ResponseCache", "response_cache", "data_version"]
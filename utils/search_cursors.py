@@ -0,0 +1,126 @@
+"""
+Курсори посторінкового пошуку нот.
+
+Для кожного чату зберігається лише (запит, зсув, версія каталогу);
+сторінка результатів щоразу обчислюється з індексу нот. Версія – це
+збережена в БД версія каталогу (``catalog_version``), тож після
+перезапуску курсор так само звіряється з каталогом. Курсори живуть
+у LRU-словнику з обмеженим розміром і дублюються в таблиці
+search_cursors, тож «➡️ Ще результати» працює і після перезапуску.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from database import get_cursor
+from utils.logger import logger
+
+SEARCH_CURSOR_LIMIT = int(os.getenv("SEARCH_CURSOR_LIMIT", "500"))
+
+
+def create_search_cursors_table():
+    with get_cursor() as cursor:
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS search_cursors (
+                chat_id TEXT PRIMARY KEY,
+                query TEXT NOT NULL,
+                result_offset INTEGER NOT NULL,
+                version INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+    logger.info("✅ Таблиця search_cursors створена або вже існує.")
+
+
+class SearchCursors:
+    """LRU of ``chat_id -> {"query", "offset", "version"}`` with write-through."""
+
+    def __init__(self, limit: int = SEARCH_CURSOR_LIMIT):
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._cursors: OrderedDict[str, dict] = OrderedDict()
+
+    def get(self, chat_id: str) -> dict | None:
+        chat_id = str(chat_id)
+        with self._lock:
+            cursor_state = self._cursors.get(chat_id)
+            if cursor_state is not None:
+                self._cursors.move_to_end(chat_id)
+        if cursor_state is not None:
+            self._touch(chat_id)
+            return dict(cursor_state)
+        # Після перезапуску словник порожній – дивимося в таблицю
+        try:
+            with get_cursor() as cursor:
+                cursor.execute(
+                    "SELECT query, result_offset, version FROM search_cursors WHERE chat_id = ?",
+                    (chat_id,),
+                )
+                row = cursor.fetchone()
+        except Exception as e:
+            logger.warning(f"⚠️ Не вдалося прочитати курсор пошуку: {e}")
+            return None
+        if row is None:
+            return None
+        cursor_state = {"query": row[0], "offset": int(row[1]), "version": int(row[2])}
+        with self._lock:
+            self._cursors[chat_id] = cursor_state
+            self._trim()
+        self._touch(chat_id)
+        return dict(cursor_state)
+
+    def _touch(self, chat_id: str):
+        # Гортання сторінок теж рахується як використання: курсор активного
+        # користувача не витісняється з таблиці посеред пошуку
+        try:
+            with get_cursor() as cursor:
+                cursor.execute(
+                    "UPDATE search_cursors SET updated_at = ? WHERE chat_id = ?",
+                    (time.time(), chat_id),
+                )
+        except Exception as e:
+            logger.warning(f"⚠️ Не вдалося оновити курсор пошуку: {e}")
+
+    def save(self, chat_id: str, query: str, offset: int, version: int):
+        chat_id = str(chat_id)
+        cursor_state = {"query": query, "offset": offset, "version": version}
+        with self._lock:
+            self._cursors[chat_id] = cursor_state
+            self._cursors.move_to_end(chat_id)
+            self._trim()
+        try:
+            with get_cursor() as cursor:
+                cursor.execute(
+                    """
+                    INSERT OR REPLACE INTO search_cursors (chat_id, query, result_offset, version, updated_at)
+                    VALUES (?, ?, ?, ?, ?)
+                    """,
+                    (chat_id, query, offset, version, time.time()),
+                )
+                # Та сама політика LRU для таблиці: лишаються найсвіжіші курсори
+                cursor.execute(
+                    """
+                    DELETE FROM search_cursors WHERE chat_id NOT IN (
+                        SELECT chat_id FROM search_cursors ORDER BY updated_at DESC LIMIT ?
+                    )
+                    """,
+                    (self.limit,),
+                )
+        except Exception as e:
+            logger.warning(f"⚠️ Не вдалося зберегти курсор пошуку: {e}")
+
+    def _trim(self):
+        while len(self._cursors) > self.limit:
+            self._cursors.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._cursors)
+
+
+search_cursors = SearchCursors()
+
+
+__all__ = ["SEARCH_CURSOR_LIMIT", "SearchCursors", "create_search_cursors_table", "search_cursors"]
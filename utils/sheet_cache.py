@@ -0,0 +1,104 @@
+"""
+Дисковий LRU-кеш PDF нот з Google Drive.
+
+Файл зберігається за ключем «id Drive + ревізія» (md5Checksum або
+modifiedTime), тож перевірка актуальності – це один запит метаданих.
+Невеликий індекс ``.index.json`` поруч із файлами пам'ятає поточну
+ревізію, назву й розмір кожного файлу, щоб застарілі версії
+видалялися одразу після завантаження нової.
+"""
+import json
+import os
+import threading
+import time
+
+from utils.disk_cache import CACHE_ROOT, DiskLRUCache
+from utils.logger import logger
+
+SHEET_CACHE_DIR = os.getenv("SHEET_CACHE_DIR", os.path.join(CACHE_ROOT, "sheets"))
+SHEET_CACHE_MAX_BYTES = int(os.getenv("SHEET_CACHE_MB", "200")) * 1024 * 1024
+INDEX_FILENAME = ".index.json"
+
+sheet_cache = DiskLRUCache(SHEET_CACHE_DIR, SHEET_CACHE_MAX_BYTES, suffix=".pdf")
+_index_lock = threading.Lock()
+_index: dict[str, dict] | None = None
+
+
+def sheet_key(drive_id: str, revision: str | None) -> str:
+    return f"{drive_id}:{revision or ''}"
+
+
+def _index_path() -> str:
+    return os.path.join(sheet_cache.directory, INDEX_FILENAME)
+
+
+def _load_index() -> dict[str, dict]:
+    global _index
+    if _index is None:
+        try:
+            with open(_index_path(), encoding="utf-8") as f:
+                _index = json.load(f)
+        except FileNotFoundError:
+            _index = {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Індекс кешу нот пошкоджено, починаємо заново: {e}")
+            _index = {}
+    return _index
+
+
+def _save_index():
+    # Записи, витіснені з кешу, з індексу теж прибираємо
+    for drive_id, meta in list(_index.items()):
+        if not sheet_cache.contains(sheet_key(drive_id, meta.get("revision"))):
+            del _index[drive_id]
+    tmp = sheet_cache.temp_path()
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(_index, f, ensure_ascii=False)
+        os.replace(tmp, _index_path())
+    except OSError as e:
+        logger.warning(f"⚠️ Не вдалося зберегти індекс кешу нот: {e}")
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+
+
+def cached_sheet(drive_id: str, revision: str | None) -> str | None:
+    """Path of the cached PDF for this exact revision, or None."""
+    return sheet_cache.path(sheet_key(drive_id, revision))
+
+
+def store_sheet(drive_id: str, revision: str | None, name: str, tmp_path: str) -> str:
+    """
+    Move a fully downloaded ``tmp_path`` (from ``sheet_cache.temp_path()``)
+    into the cache and drop the previous revision of the same file.
+    """
+    path = sheet_cache.put_file(sheet_key(drive_id, revision), tmp_path)
+    with _index_lock:
+        index = _load_index()
+        previous = index.get(drive_id)
+        if previous and previous.get("revision") != revision:
+            sheet_cache.discard(sheet_key(drive_id, previous.get("revision")))
+        size = os.path.getsize(path)
+        index[drive_id] = {
+            "revision": revision,
+            "name": name,
+            "bytes": size,
+            "cached_at": time.time(),
+        }
+        _save_index()
+    logger.info(f"💾 Ноти '{name}' збережено в кеші ({size} байт)")
+    return path
+
+
+def sheet_cache_stats() -> dict:
+    """Hit rate and bytes served from disk instead of Drive."""
+    return sheet_cache.stats()
+
+
+__all__ = [
+    "sheet_cache",
+    "sheet_key",
+    "cached_sheet",
+    "store_sheet",
+    "sheet_cache_stats",
+]
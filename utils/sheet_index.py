@@ -0,0 +1,213 @@
+"""
+Індекс пошуку нот у пам'яті.
+
+Назви нормалізуються (нижній регістр, транслітерація кирилиці в
+латиницю, без діакритики й розділових знаків), тож «Щедрик»,
+«shchedryk» і «Shchedrýk» дають однаковий ключ. Триграми кожного слова
+ведуть у posting-списки, кандидати ранжуються за входженням підрядка,
+відстанню Левенштейна між словами і коефіцієнтом Дайса. Точна назва
+кнопки «📃 назва» знаходиться через словник за O(1).
+"""
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
+
+# Українська (і кілька російських) літер → латиниця, спрощена схема КМУ 2010
+TRANSLITERATION = {
+    "а": "a", "б": "b", "в": "v", "г": "h", "ґ": "g", "д": "d", "е": "e",
+    "є": "ie", "ж": "zh", "з": "z", "и": "y", "і": "i", "ї": "i", "й": "i",
+    "к": "k", "л": "l", "м": "m", "н": "n", "о": "o", "п": "p", "р": "r",
+    "с": "s", "т": "t", "у": "u", "ф": "f", "х": "kh", "ц": "ts", "ч": "ch",
+    "ш": "sh", "щ": "shch", "ь": "", "ю": "iu", "я": "ia",
+    "ё": "e", "ы": "y", "э": "e", "ъ": "",
+    "'": "", "’": "", "ʼ": "", "`": "",
+}
+# Частка спільних триграм, за якої назва вважається схожою без збігу слів
+MIN_DICE = 0.5
+# Скільки списків результатів (запит, версія каталогу) тримати для посторінкового показу
+RESULT_CACHE_SIZE = 64
+
+
+def normalize(text: str) -> str:
+    text = unicodedata.normalize("NFC", text.lower())
+    text = "".join(TRANSLITERATION.get(ch, ch) for ch in text)
+    text = "".join(
+        ch for ch in unicodedata.normalize("NFKD", text) if not unicodedata.combining(ch)
+    )
+    return " ".join("".join(ch if ch.isalnum() else " " for ch in text).split())
+
+
+def trigrams(normalized: str) -> set[str]:
+    grams = set()
+    for token in normalized.split():
+        padded = f"  {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def edit_distance(a: str, b: str) -> int:
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def _token_distance(token: str, words: list[str]) -> int:
+    # Слово можна ввести не до кінця: порівнюємо і з префіксом тієї ж довжини
+    return min(
+        min(edit_distance(token, word), edit_distance(token, word[:len(token)]))
+        for word in words
+    ) if words else len(token)
+
+
+class SheetIndex:
+    """Trigram postings over normalized sheet names, updated incrementally."""
+
+    def __init__(self):
+        self.loaded = False
+        # Зростає при кожній зміні каталогу; старі результати стають недійсними
+        self.version = 0
+        self._lock = threading.Lock()
+        self._results: OrderedDict[tuple[str, int], list[dict]] = OrderedDict()
+        self._docs: dict[str, dict] = {}
+        self._postings: dict[str, set[str]] = {}
+        self._by_name: dict[str, str] = {}
+        self._by_normalized: dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def _add(self, sheet_id: str, name: str):
+        norm = normalize(name)
+        grams = trigrams(norm)
+        self._docs[sheet_id] = {
+            "id": sheet_id,
+            "name": name,
+            "norm": norm,
+            "words": norm.split(),
+            "grams": grams,
+        }
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(sheet_id)
+        self._by_name[name] = sheet_id
+        self._by_normalized.setdefault(norm, sheet_id)
+
+    def _remove(self, sheet_id: str):
+        doc = self._docs.pop(sheet_id, None)
+        if doc is None:
+            return
+        for gram in doc["grams"]:
+            ids = self._postings.get(gram)
+            if ids is not None:
+                ids.discard(sheet_id)
+                if not ids:
+                    del self._postings[gram]
+        if self._by_name.get(doc["name"]) == sheet_id:
+            del self._by_name[doc["name"]]
+        if self._by_normalized.get(doc["norm"]) == sheet_id:
+            del self._by_normalized[doc["norm"]]
+
+    def rebuild(self, sheets: list[dict]):
+        """Replace the whole index with ``sheets`` (``{"id", "name"}``)."""
+        with self._lock:
+            self._docs.clear()
+            self._postings.clear()
+            self._by_name.clear()
+            self._by_normalized.clear()
+            for sheet in sheets:
+                self._add(sheet["id"], sheet["name"])
+            self.loaded = True
+            self._changed()
+
+    def rebuild_from_catalog(self, catalog: dict[str, list[dict]]):
+        self.rebuild([sheet for items in catalog.values() for sheet in items])
+
+    def apply(self, upserts: list[dict], removed: list[str]):
+        """Incremental update: re-index changed sheets, drop removed ids."""
+        with self._lock:
+            for sheet_id in removed:
+                self._remove(sheet_id)
+            for sheet in upserts:
+                self._remove(sheet["id"])
+                self._add(sheet["id"], sheet["name"])
+            if upserts or removed:
+                self._changed()
+
+    def _changed(self):
+        self.version += 1
+        self._results.clear()
+
+    def id_for_name(self, name: str) -> str | None:
+        """Exact keyboard-label lookup, then the normalized form."""
+        with self._lock:
+            sheet_id = self._by_name.get(name)
+            if sheet_id is None:
+                sheet_id = self._by_normalized.get(normalize(name))
+            return sheet_id
+
+    def search(self, query: str, limit: int | None = None) -> list[dict]:
+        """
+        Sheets matching ``query``: substring matches of the normalized name
+        first, then typo-tolerant matches ordered by edit distance.
+        """
+        norm = normalize(query)
+        if not norm:
+            return []
+        tokens = norm.split()
+        query_grams = trigrams(norm)
+        # Одна помилка на кожні три літери слова; коротші слова – лише точно
+        budget = sum(len(token) // 3 for token in tokens)
+        with self._lock:
+            shared = Counter()
+            for gram in query_grams:
+                for sheet_id in self._postings.get(gram, ()):
+                    shared[sheet_id] += 1
+            if len(norm) < 3:
+                # Одна-дві літери можуть стояти всередині слова, де триграм немає
+                shared.update(
+                    {sheet_id: 0 for sheet_id, doc in self._docs.items() if norm in doc["norm"]}
+                )
+            ranked = []
+            for sheet_id, common in shared.items():
+                doc = self._docs[sheet_id]
+                if norm in doc["norm"]:
+                    ranked.append((0, 0, 0.0, doc["norm"], doc))
+                    continue
+                distance = sum(_token_distance(token, doc["words"]) for token in tokens)
+                dice = 2 * common / (len(query_grams) + len(doc["grams"]))
+                if distance <= budget or dice >= MIN_DICE:
+                    ranked.append((1, distance, -dice, doc["norm"], doc))
+        ranked.sort(key=lambda item: item[:4])
+        results = [{"id": doc["id"], "name": doc["name"]} for *_, doc in ranked]
+        return results[:limit] if limit else results
+
+    def page(self, query: str, offset: int, size: int) -> tuple[list[dict], int]:
+        """
+        One page of ``search(query)`` and the total number of matches. Result
+        lists are shared between users through a small LRU keyed by the
+        normalized query and catalog version.
+        """
+        key = (normalize(query), self.version)
+        with self._lock:
+            results = self._results.get(key)
+            if results is not None:
+                self._results.move_to_end(key)
+        if results is None:
+            results = self.search(query)
+            with self._lock:
+                if key[1] == self.version:
+                    self._results[key] = results
+                    while len(self._results) > RESULT_CACHE_SIZE:
+                        self._results.popitem(last=False)
+        return results[offset:offset + size], len(results)
+
+
+sheet_index = SheetIndex()
+
+
+__all__ = ["SheetIndex", "sheet_index", "normalize", "trigrams", "edit_distance"]
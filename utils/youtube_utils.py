@@ -1,6 +1,7 @@
 from googleapiclient.discovery import build
 from config import YOUTUBE_API_KEY, OBERIG_PLAYLIST_ID
 from database import get_value, set_value
+from utils.quota import QuotaExceeded, charge_quota
 import json
 import time
 
@@ -21,6 +22,7 @@ def get_playlist_items(playlist_id, max_results=50):
     request = youtube.playlistItems().list(
         part="snippet", playlistId=playlist_id, maxResults=max_results
     )
+    charge_quota("youtube", "playlistItems.list", key=f"playlist:{playlist_id}")
     response = request.execute()
 
     return response.get("items", [])
@@ -33,6 +35,7 @@ def get_video_details(video_id):
     youtube = get_youtube_service()
 
     request = youtube.videos().list(part="snippet,statistics", id=video_id)
+    charge_quota("youtube", "videos.list", key=f"video:{video_id}")
     response = request.execute()
 
     return response.get("items", [])[0] if response.get("items") else None
@@ -151,40 +154,33 @@ def _set_cached_value(key: str, value):
         pass
 
 
-def get_latest_video_cached(ttl: int = 300):
-    cached = _get_cached_value("yt_latest", ttl)
+def _cached_call(key: str, ttl: int, fetch):
+    cached = _get_cached_value(key, ttl)
     if cached is not None:
         return cached
-    result = get_latest_video(OBERIG_PLAYLIST_ID)
-    _set_cached_value("yt_latest", result)
+    try:
+        result = fetch(OBERIG_PLAYLIST_ID)
+    except QuotaExceeded:
+        # Квоту вичерпано – краще показати застарілі дані, ніж нічого
+        return _get_cached_value(key, float("inf"))
+    _set_cached_value(key, result)
     return result
 
 
+def get_latest_video_cached(ttl: int = 300):
+    return _cached_call("yt_latest", ttl, get_latest_video)
+
+
 def get_most_popular_video_cached(ttl: int = 300):
-    cached = _get_cached_value("yt_popular", ttl)
-    if cached is not None:
-        return cached
-    result = get_most_popular_video(OBERIG_PLAYLIST_ID)
-    _set_cached_value("yt_popular", result)
-    return result
+    return _cached_call("yt_popular", ttl, get_most_popular_video)
 
 
 def get_top_5_videos_cached(ttl: int = 300):
-    cached = _get_cached_value("yt_top5", ttl)
-    if cached is not None:
-        return cached
-    result = get_top_5_videos(OBERIG_PLAYLIST_ID)
-    _set_cached_value("yt_top5", result)
-    return result
+    return _cached_call("yt_top5", ttl, get_top_5_videos)
 
 
 def get_top_10_videos_cached(ttl: int = 300):
-    cached = _get_cached_value("yt_top10", ttl)
-    if cached is not None:
-        return cached
-    result = get_top_10_videos(OBERIG_PLAYLIST_ID)
-    _set_cached_value("yt_top10", result)
-    return result
+    return _cached_call("yt_top10", ttl, get_top_10_videos)
 
 
 __all__ = [